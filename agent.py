@@ -26,7 +26,7 @@ from langchain_core.prompts import (
 from langchain_core.messages import SystemMessage, BaseMessage
 
 import helpers.log as Log
-from helpers.dirty_json import DirtyJson
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
 from helpers.defer import DeferredTask
 from typing import Callable
 from helpers.localization import Localization
@@ -62,6 +62,7 @@ class AgentContext:
         data: dict | None = None,
         output_data: dict | None = None,
         set_current: bool = False,
+        agents_loader: "Callable[[AgentContext], tuple[Agent, Agent | None]] | None" = None,
     ):
         # initialize context
         self.id = id or AgentContext.generate_id()
@@ -84,7 +85,11 @@ class AgentContext:
         self.log = log or Log.Log()
         self.log.context = self
         self.paused = paused
-        self.streaming_agent = streaming_agent
+        # agents of a loaded chat are built on first access to agent0 or streaming_agent
+        self._agents_loader = agents_loader
+        self._agents_lock = threading.RLock()
+        self._agents_loading = False
+        self._streaming_agent = streaming_agent
         self.task: DeferredTask | None = None
         self.created_at = created_at or datetime.now(timezone.utc)
         self.type = type
@@ -93,7 +98,49 @@ class AgentContext:
         self.last_message = last_message or datetime.now(timezone.utc)
 
         # initialize agent at last (context is complete now)
-        self.agent0 = agent0 or Agent(0, self.config, self)
+        self._agent0 = agent0 or (None if agents_loader else Agent(0, self.config, self))
+
+    @property
+    def agent0(self) -> "Agent":
+        if self._agents_loader:
+            self._load_agents()
+        return self._agent0  # type: ignore[return-value]
+
+    @agent0.setter
+    def agent0(self, agent: "Agent"):
+        with self._agents_lock:
+            self._agents_loader = None
+            self._agent0 = agent
+
+    @property
+    def streaming_agent(self) -> "Agent | None":
+        if self._agents_loader:
+            self._load_agents()
+        return self._streaming_agent
+
+    @streaming_agent.setter
+    def streaming_agent(self, agent: "Agent | None"):
+        if self._agents_loader:
+            self._load_agents()
+        self._streaming_agent = agent
+
+    def agents_loaded(self) -> bool:
+        return self._agents_loader is None
+
+    def _load_agents(self):
+        # returns once the agents are assigned, the loader is cleared only after that
+        # so other threads never see a loaded context without agents
+        with self._agents_lock:
+            loader = self._agents_loader
+            # a call from within the loader sees the agents built so far
+            if loader is None or self._agents_loading:
+                return
+            self._agents_loading = True
+            try:
+                self._agent0, self._streaming_agent = loader(self)
+                self._agents_loader = None
+            finally:
+                self._agents_loading = False
 
     @staticmethod
     def get(id: str):
@@ -188,7 +235,7 @@ class AgentContext:
             ),
             "no": self.no,
             "log_guid": self.log.guid,
-            "log_version": len(self.log.updates),
+            "log_version": self.log.version,
             "log_length": len(self.log.logs),
             "paused": self.paused,
             "last_message": (
@@ -389,6 +436,8 @@ class Agent:
                     self.loop_data.iteration += 1
                     self.loop_data.params_temporary = {}  # clear temporary params
                     last_response_stream_full = ""
+                    response_root = extract_tools.JsonRootStream()
+                    response_parser = DirtyJsonStream()
 
                     # call message_loop_start extensions
                     await extension.call_extensions_async(
@@ -435,9 +484,9 @@ class Agent:
                             stream_data = {"chunk": chunk, "full": full}
                             stop_response: str | None = None
 
-                            snapshot = extract_tools.extract_json_root_string(full)
+                            snapshot = response_root.update(full)
                             if snapshot:
-                                parsed_snapshot = extract_tools.json_parse_dirty(snapshot)
+                                parsed_snapshot = response_root.result
                                 if parsed_snapshot is not None:
                                     try:
                                         await self.validate_tool_request(parsed_snapshot)
@@ -462,7 +511,9 @@ class Agent:
                             if stream_data.get("chunk"):
                                 printer.stream(stream_data["chunk"])
                             # Use the potentially modified full text for downstream processing
-                            await self.handle_response_stream(stream_data["full"])
+                            await self.handle_response_stream(
+                                stream_data["full"], parser=response_parser
+                            )
                             last_response_stream_full = stream_data["full"]
                             if stop_response is not None:
                                 return stop_response
@@ -984,12 +1035,17 @@ class Agent:
             text=stream,
         )
 
-    async def handle_response_stream(self, stream: str):
+    async def handle_response_stream(
+        self, stream: str, parser: DirtyJsonStream | None = None
+    ):
         await self.handle_intervention()
         try:
             if len(stream) < 25:
                 return  # no reason to try
-            response = DirtyJson.parse_string(stream)
+            if parser:  # incremental parser kept across chunks of one response
+                response = parser.update(stream)
+            else:
+                response = DirtyJson.parse_string(stream)
             if isinstance(response, dict):
                 await extension.call_extensions_async(
                     "response_stream",
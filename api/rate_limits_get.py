@@ -0,0 +1,9 @@
+from helpers.api import ApiHandler, Input, Output, Request
+
+import models
+
+
+class GetRateLimits(ApiHandler):
+    async def process(self, input: Input, request: Request) -> Output:
+        # usage of the configured limits in the current window, by provider\model
+        return {"rate_limits": models.get_rate_limiter_usage()}
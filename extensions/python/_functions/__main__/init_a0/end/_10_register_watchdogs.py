@@ -6,6 +6,16 @@ class RegisterWatchDogs(Extension):
     def execute(self, **kwargs):
         from helpers.plugins import register_watchdogs as register_plugins_watchdogs
         from helpers.api import register_watchdogs as register_api_watchdogs
+        from helpers.templates import register_watchdogs as register_templates_watchdogs
+        from helpers.prompt_sections import register_watchdogs as register_prompt_sections_watchdogs
+        from helpers.task_scheduler import register_watchdogs as register_scheduler_watchdogs
+        from helpers.settings import register_watchdogs as register_settings_watchdogs
+        from helpers.skills import register_watchdogs as register_skills_watchdogs
 
         register_plugins_watchdogs()
-        register_api_watchdogs()
\ No newline at end of file
+        register_api_watchdogs()
+        register_templates_watchdogs()
+        register_prompt_sections_watchdogs()
+        register_scheduler_watchdogs()
+        register_settings_watchdogs()
+        register_skills_watchdogs()
\ No newline at end of file
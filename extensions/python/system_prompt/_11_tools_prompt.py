@@ -1,27 +1,26 @@
 import os
 from typing import Any
 
-from helpers.extension import Extension, extensible
-from helpers import files, subagents
+from helpers.extension import extensible
+from helpers import cache, files, prompt_sections, subagents
 from helpers.print_style import PrintStyle
-from agent import Agent, LoopData
+from agent import Agent
 
 
 TOOL_KWARGS_KEY = "_tool_prompt_kwargs"
 
 
-class ToolsPrompt(Extension):
+class ToolsPrompt(prompt_sections.SystemPromptSection):
 
-    async def execute(
-        self,
-        system_prompt: list[str] = [],
-        loop_data: LoopData = LoopData(),
-        **kwargs: Any,
-    ):
-        if not self.agent:
-            return
-        prompt = await build_prompt(self.agent)
-        system_prompt.append(prompt)
+    def cache_key(self, agent: Agent) -> Any:
+        from plugins._model_config.helpers.model_config import get_chat_model_config
+
+        all_tool_kwargs = agent.get_data(TOOL_KWARGS_KEY) or {}
+        vision = bool(get_chat_model_config(agent).get("vision", False))
+        return cache.determine_cache_key(agent, repr(all_tool_kwargs), vision)
+
+    async def build(self, agent: Agent) -> str:
+        return await build_prompt(agent)
 
 
 @extensible
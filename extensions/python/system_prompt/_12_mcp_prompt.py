@@ -1,23 +1,18 @@
 from typing import Any
 
-from helpers.extension import Extension, extensible
+from helpers.extension import extensible
+from helpers import prompt_sections
 from helpers.mcp_handler import MCPConfig
-from agent import Agent, LoopData
-
-
-class MCPToolsPrompt(Extension):
-
-    async def execute(
-        self,
-        system_prompt: list[str] = [],
-        loop_data: LoopData = LoopData(),
-        **kwargs: Any,
-    ):
-        if not self.agent:
-            return
-        prompt = await build_prompt(self.agent)
-        if prompt:
-            system_prompt.append(prompt)
+from agent import Agent
+
+
+class MCPToolsPrompt(prompt_sections.SystemPromptSection):
+
+    def cache_key(self, agent: Agent) -> Any:
+        return MCPConfig.get_tools_version()
+
+    async def build(self, agent: Agent) -> str:
+        return await build_prompt(agent)
 
 
 @extensible
@@ -1,22 +1,17 @@
 from typing import Any
 
-from helpers.extension import Extension, extensible
-from agent import Agent, LoopData
-
-
-class SecretsPrompt(Extension):
-
-    async def execute(
-        self,
-        system_prompt: list[str] = [],
-        loop_data: LoopData = LoopData(),
-        **kwargs: Any,
-    ):
-        if not self.agent:
-            return
-        prompt = await build_prompt(self.agent)
-        if prompt:
-            system_prompt.append(prompt)
+from helpers.extension import extensible
+from helpers import cache, prompt_sections
+from agent import Agent
+
+
+class SecretsPrompt(prompt_sections.SystemPromptSection):
+
+    def cache_key(self, agent: Agent) -> Any:
+        return cache.determine_cache_key(agent)
+
+    async def build(self, agent: Agent) -> str:
+        return await build_prompt(agent)
 
 
 @extensible
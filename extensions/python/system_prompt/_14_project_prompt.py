@@ -1,23 +1,17 @@
 from typing import Any
 
-from helpers.extension import Extension, extensible
-from helpers import projects
-from agent import Agent, LoopData
+from helpers.extension import extensible
+from helpers import cache, projects, prompt_sections
+from agent import Agent
 
 
-class ProjectPrompt(Extension):
+class ProjectPrompt(prompt_sections.SystemPromptSection):
 
-    async def execute(
-        self,
-        system_prompt: list[str] = [],
-        loop_data: LoopData = LoopData(),
-        **kwargs: Any,
-    ):
-        if not self.agent:
-            return
-        prompt = await build_prompt(self.agent)
-        if prompt:
-            system_prompt.append(prompt)
+    def cache_key(self, agent: Agent) -> Any:
+        return cache.determine_cache_key(agent)
+
+    async def build(self, agent: Agent) -> str:
+        return await build_prompt(agent)
 
 
 @extensible
@@ -1,4 +1,6 @@
 import json
+import re
+from typing import Any
 
 def try_parse(json_string: str):
     try:
@@ -351,3 +353,458 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+_STRING_SPECIALS = {
+    quote: re.compile(r"[%s\\]" % re.escape(quote)) for quote in ['"', "'", "`"]
+}
+_WHITESPACE = re.compile(r"\s*")
+_ROOT_START = re.compile(r'[{\["]')
+_LITERALS = {
+    "t": ("true", True),
+    "f": ("false", False),
+    "n": ("null", None),
+    "u": ("undefined", None),
+}
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+# longest lookahead DirtyJson can use past its current index (_match("undefined"))
+_MAX_PEEK = 8
+
+
+class _Fallback(Exception):
+    """Raised internally when the input needs DirtyJson's full re-parse."""
+
+
+class _ValueFrame:
+    __slots__ = ("depth",)
+
+    def __init__(self, depth: int):
+        self.depth = depth
+
+
+class _ObjectFrame:
+    __slots__ = ("obj", "depth", "state", "key", "entered")
+
+    def __init__(self, depth: int):
+        self.obj: dict = {}
+        self.depth = depth
+        self.state = "loop"
+        self.key: Any = None
+        self.entered = False
+
+
+class _ArrayFrame:
+    __slots__ = ("arr", "depth", "state", "entered")
+
+    def __init__(self, depth: int):
+        self.arr: list = []
+        self.depth = depth
+        self.state = "loop"
+        self.entered = False
+
+
+class _StringFrame:
+    __slots__ = ("quote", "parts", "escape", "hex")
+
+    def __init__(self, quote: str):
+        self.quote = quote
+        self.parts: list[str] = []
+        self.escape = 0  # 0 = none, 1 = after backslash, 2 = reading \u digits
+        self.hex = ""
+
+    def text(self) -> str:
+        if len(self.parts) > 1:
+            self.parts[:] = ["".join(self.parts)]
+        return self.parts[0] if self.parts else ""
+
+
+class _NumberFrame:
+    __slots__ = ("start",)
+
+    def __init__(self, start: int):
+        self.start = start
+
+
+class DirtyJsonStream:
+    """Resumable DirtyJson parser for text that arrives in chunks.
+
+    Parser state survives between calls, so each character is consumed once
+    and a whole streamed response costs O(n) instead of one full parse per
+    chunk. `result` is always what `DirtyJson.parse_string` would return for
+    the text received so far and `completed` flips once the root container is
+    explicitly closed, with `index` pointing right after it.
+
+    Rare dirty syntax (comments, unquoted keys or values, triple-quoted
+    strings, ...) switches the stream to full re-parsing with DirtyJson so the
+    results stay identical.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.start: int | None = None
+        self.pos = 0
+        self.frames: list = []
+        self.done = False
+        self.value: Any = None
+        self._completed = False
+        self._index = 0
+        self._fallback = False
+        self._scan = 0
+        self._full: tuple[int, DirtyJson, bool] | None = None
+
+    def feed(self, chunk: str) -> Any:
+        """Append a chunk and return the current partial result."""
+        self.text += chunk
+        self._consume()
+        return self.result
+
+    def update(self, text: str) -> Any:
+        """Advance to `text`, normally the previous text plus new output.
+
+        Text that does not extend what was already parsed (e.g. masked after
+        the fact) restarts the parser.
+        """
+        if not text.startswith(self.text):
+            self.reset()
+        self.text = text
+        self._consume()
+        return self.result
+
+    @property
+    def result(self) -> Any:
+        if self._fallback or self.start is None:
+            return _shallow_copy(self._parse_full().result)
+        if self.done:
+            return _shallow_copy(self.value)
+        return self._materialize()[0]
+
+    @property
+    def completed(self) -> bool:
+        if self._fallback or self.start is None:
+            return self._parse_full().completed
+        if self._completed or self.done:
+            return self._completed
+        try:
+            return self._materialize()[1]
+        except Exception:
+            return False
+
+    @property
+    def index(self) -> int:
+        if self._fallback or self.start is None:
+            return self._parse_full().index
+        if self._completed or self.done:
+            return self._index if self._completed else self.pos
+        try:
+            return self._materialize()[2]
+        except Exception:
+            return self.pos
+
+    def _parse_full(self) -> DirtyJson:
+        # A parse that returned well before the end of the text cannot change
+        # when more text is appended; only a newly found root start moves it.
+        if self._full and (self._full[0] == len(self.text) or self._full[2]):
+            return self._full[1]
+        parser = DirtyJson()
+        parser.parse(self.text)
+        frozen = parser.index + _MAX_PEEK < len(self.text)
+        self._full = (len(self.text), parser, frozen)
+        return parser
+
+    def _consume(self):
+        if self._fallback or self.done:
+            return
+        if self.start is None:
+            match = _ROOT_START.search(self.text, self._scan)
+            if not match:
+                self._scan = len(self.text)
+                return
+            self.start = self.pos = match.start()
+            self._full = None
+            self.frames.append(_ValueFrame(0))
+        try:
+            while not self.done and self._step(self.frames[-1]):
+                pass
+        except _Fallback:
+            self._fallback = True
+            self._full = None
+            self.frames = []
+
+    def _step(self, frame) -> bool:
+        if isinstance(frame, _StringFrame):
+            return self._step_string(frame)
+        if isinstance(frame, _ObjectFrame):
+            return self._step_object(frame)
+        if isinstance(frame, _ArrayFrame):
+            return self._step_array(frame)
+        if isinstance(frame, _NumberFrame):
+            return self._step_number(frame)
+        return self._step_value(frame)
+
+    def _skip_whitespace(self) -> str | None:
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()  # type: ignore[union-attr]
+        if self.pos >= len(self.text):
+            return None
+        char = self.text[self.pos]
+        if char == "/":
+            raise _Fallback()  # comments or a stray slash
+        return char
+
+    def _finish(self, value: Any):
+        self.frames.pop()
+        if not self.frames:
+            self.done = True
+            self.value = value
+            return
+        parent = self.frames[-1]
+        if isinstance(parent, _ObjectFrame):
+            if parent.state == "key":
+                parent.key = value
+                parent.state = "after_key"
+            else:
+                parent.obj[parent.key] = value
+                parent.state = "after_value"
+        else:
+            parent.arr.append(value)
+            parent.state = "after_value"
+
+    def _close(self, frame, value: Any, end: int):
+        self.pos = end
+        if frame.depth == 1:
+            self._completed = True
+            self._index = end
+        self._finish(value)
+
+    def _step_value(self, frame: _ValueFrame) -> bool:
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        text, pos = self.text, self.pos
+        if char == "{":
+            if frame.depth == 0:
+                if pos + 1 >= len(text):
+                    return False
+                if text[pos + 1] == "{":
+                    raise _Fallback()  # "{{" wrapper
+            self.pos += 1
+            self.frames[-1] = _ObjectFrame(frame.depth + 1)
+        elif char == "[":
+            self.pos += 1
+            self.frames[-1] = _ArrayFrame(frame.depth + 1)
+        elif char in ('"', "'", "`"):
+            if pos + 2 >= len(text):
+                return False
+            if text[pos + 1 : pos + 3] == char * 2:
+                raise _Fallback()  # triple-quoted string
+            self.pos += 1
+            self.frames[-1] = _StringFrame(char)
+        elif char.isdigit() or char in ("-", "+"):
+            self.frames[-1] = _NumberFrame(pos)
+        else:
+            literal = _LITERALS.get(char.lower())
+            if not literal:
+                raise _Fallback()  # unquoted string
+            word, value = literal
+            segment = text[pos : pos + len(word)].lower()
+            if len(segment) < len(word) and word.startswith(segment):
+                return False
+            if segment != word:
+                raise _Fallback()
+            self.pos += len(word)
+            self._finish(value)
+        return True
+
+    def _step_object(self, frame: _ObjectFrame) -> bool:
+        if frame.state == "loop" and self.pos < len(self.text):
+            frame.entered = True
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        if frame.state == "loop":
+            if char == "}":
+                end = self.pos + 1
+                if frame.depth == 1:
+                    if end >= len(self.text):
+                        return False
+                    if self.text[end] == "}":
+                        end += 1
+                self._close(frame, frame.obj, end)
+            elif char in ('"', "'"):
+                self.pos += 1
+                frame.state = "key"
+                self.frames.append(_StringFrame(char))
+            else:
+                raise _Fallback()  # unquoted key
+        elif frame.state == "after_key":
+            if char == ":":
+                self.pos += 1
+            frame.state = "value"
+            self.frames.append(_ValueFrame(frame.depth))
+        else:  # after_value
+            if char == ",":
+                self.pos += 1
+            frame.state = "loop"
+            frame.entered = False
+        return True
+
+    def _step_array(self, frame: _ArrayFrame) -> bool:
+        if frame.state == "loop" and self.pos < len(self.text):
+            frame.entered = True
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+        if frame.state == "after_value":
+            if char == ",":
+                self.pos += 1
+                frame.state = "after_comma"
+            elif char == "]":
+                frame.state = "loop"
+            else:
+                raise _Fallback()  # array closed implicitly
+        elif char == "]":
+            self._close(frame, frame.arr, self.pos + 1)
+        elif frame.state == "after_comma":
+            frame.state = "loop"
+        else:
+            frame.state = "value"
+            frame.entered = False
+            self.frames.append(_ValueFrame(frame.depth))
+        return True
+
+    def _step_string(self, frame: _StringFrame) -> bool:
+        text, end = self.text, len(self.text)
+        while True:
+            if frame.escape == 1:
+                if self.pos >= end:
+                    return False
+                char = text[self.pos]
+                self.pos += 1
+                frame.escape = 0
+                if char in ('"', "'", "\\", "/", "b", "f", "n", "r", "t"):
+                    frame.parts.append(_ESCAPES.get(char, char))
+                elif char == "u":
+                    frame.escape = 2
+                    frame.hex = ""
+                continue
+            if frame.escape == 2:
+                while len(frame.hex) < 4:
+                    if self.pos >= end:
+                        return False
+                    char = text[self.pos]
+                    if not char.isalnum():
+                        raise _Fallback()  # truncated \u escape
+                    frame.hex += char
+                    self.pos += 1
+                try:
+                    frame.parts.append(chr(int(frame.hex, 16)))
+                except ValueError:
+                    frame.parts.append("\\u" + frame.hex)
+                frame.escape = 0
+                continue
+            match = _STRING_SPECIALS[frame.quote].search(text, self.pos)
+            if not match:
+                if self.pos < end:
+                    frame.parts.append(text[self.pos :])
+                    self.pos = end
+                return False
+            if match.start() > self.pos:
+                frame.parts.append(text[self.pos : match.start()])
+            self.pos = match.end()
+            if match.group() == frame.quote:
+                self._finish(frame.text())
+                return True
+            frame.escape = 1
+
+    def _step_number(self, frame: _NumberFrame) -> bool:
+        text, pos = self.text, self.pos
+        while pos < len(text) and (text[pos].isdigit() or text[pos] in "-+.eE"):
+            pos += 1
+        self.pos = pos
+        if pos >= len(text):
+            return False
+        try:
+            value = _to_number(text[frame.start : pos])
+        except ValueError:
+            raise _Fallback()  # DirtyJson raises here
+        self._finish(value)
+        return True
+
+    def _materialize(self) -> tuple[Any, bool, int]:
+        """Finish the parse as DirtyJson would if the text ended here.
+
+        Works on copies of the open containers and replays DirtyJson's own
+        end-of-input stack handling, quirks included.
+        Returns (result, completed, index).
+        """
+        frames = self.frames
+        copies = {}
+        for frame in frames:
+            if isinstance(frame, _ObjectFrame):
+                copies[id(frame)] = dict(frame.obj)
+            elif isinstance(frame, _ArrayFrame):
+                copies[id(frame)] = list(frame.arr)
+
+        tail = self.text[self.pos :]
+        sim = DirtyJson()
+        sim.json_string = tail
+        sim.current_char = tail[0] if tail else None
+        sim.stack = list(copies.values())
+        sim._parsing_started = bool(copies)
+
+        top = frames[-1]
+        if isinstance(top, _ValueFrame):
+            value = sim._parse_value() if tail else None
+        elif isinstance(top, _StringFrame):
+            value = top.text()
+            if top.escape == 2:
+                value += "\\u" + top.hex
+        elif isinstance(top, _NumberFrame):
+            value = _to_number(self.text[top.start : self.pos])
+        elif isinstance(top, _ObjectFrame):
+            value = copies[id(top)]
+            if top.state == "loop":
+                if tail:
+                    sim._parse_object_content()
+                elif top.entered:
+                    sim._pop_stack()
+            else:
+                if top.state == "after_key":
+                    sim.stack[-1][top.key] = None
+                sim._pop_stack()
+        else:
+            value = copies[id(top)]
+            if top.state == "after_comma":
+                sim._pop_stack(root_closed=True)
+            elif top.state == "after_value":
+                sim._pop_stack()
+            elif top.entered:
+                sim.stack[-1].append(None)
+                sim._pop_stack()
+
+        for frame in reversed(frames[:-1]):
+            if isinstance(frame, _ObjectFrame):
+                if frame.state == "key":
+                    sim.stack[-1][value] = None
+                else:
+                    sim.stack[-1][frame.key] = value
+            else:
+                sim.stack[-1].append(value)
+            sim._pop_stack()
+            value = copies[id(frame)]
+        return value, sim.completed, self.pos + sim.index
+
+
+def _to_number(number_str: str) -> int | float:
+    try:
+        return int(number_str)
+    except ValueError:
+        return float(number_str)
+
+
+def _shallow_copy(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return value.copy()
+    return value
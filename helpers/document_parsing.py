@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from helpers.print_style import PrintStyle
+
+# parsed pages and documents kept in memory, least recently used ones are evicted first
+CACHE_MAX_ENTRIES = 4096
+
+# part of every cache key, bump it when the parser settings below change
+PARSER_VERSION = "1"
+
+MAX_WORKERS = 4
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+_cache: OrderedDict[str, str] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+                # forked workers could inherit locks held by other threads
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a parser in the worker pool, keeping OCR and layout work off the event loop."""
+    global _executor
+    executor = get_executor()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        # a native parser crashed a worker, the next call starts a new pool
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        raise
+
+
+def get_cached(kind: str, key: str) -> str | None:
+    with _cache_lock:
+        cache_key = f"{kind}:{PARSER_VERSION}:{key}"
+        text = _cache.get(cache_key)
+        if text is not None:
+            _cache.move_to_end(cache_key)
+        return text
+
+
+def set_cached(kind: str, key: str, text: str) -> None:
+    with _cache_lock:
+        cache_key = f"{kind}:{PARSER_VERSION}:{key}"
+        _cache[cache_key] = text
+        _cache.move_to_end(cache_key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+async def parse_pdf(content: bytes) -> str:
+    """Text of a PDF, only pages not parsed before are sent to the workers.
+
+    Pages are told apart by a hash of their text, drawings and images, so a
+    re-uploaded PDF with one changed page parses just that page. When no page
+    has any text the page images are OCRed, cached the same way.
+    """
+    try:
+        hashes: list[str] = await run_in_process(pdf_page_hashes, content)
+    except BrokenProcessPool:
+        raise
+    except Exception as e:
+        PrintStyle.error(f"document_parsing::parse_pdf: Error reading PDF pages: {e}")
+        return await _parse_cached("pdf_ocr", content_hash(content), ocr_pdf, content)
+
+    texts = await _parse_pages("pdf_page", hashes, parse_pdf_pages, content)
+    contents = "\n".join(texts)
+    if contents.strip():
+        return contents
+
+    PrintStyle.debug("document_parsing::parse_pdf: FALLBACK OCR of PDF page images")
+    texts = await _parse_pages("pdf_page_ocr", hashes, ocr_pdf_pages, content)
+    return "".join(text + "\n\n" for text in texts)
+
+
+async def parse_unstructured(content: bytes, suffix: str) -> str:
+    """Text of any other document, parsed once per content in the worker pool."""
+    return await _parse_cached(
+        "unstructured", content_hash(content) + suffix, unstructured_text, content, suffix
+    )
+
+
+async def _parse_cached(kind: str, key: str, func: Callable[..., str], *args: Any) -> str:
+    text = get_cached(kind, key)
+    if text is None:
+        text = await run_in_process(func, *args)
+        set_cached(kind, key, text)
+    return text
+
+
+async def _parse_pages(
+    kind: str,
+    hashes: list[str],
+    func: Callable[[bytes, list[int]], list[str]],
+    content: bytes,
+) -> list[str]:
+    texts = [get_cached(kind, page_hash) for page_hash in hashes]
+    missing = [number for number, text in enumerate(texts) if text is None]
+    if missing:
+        try:
+            parsed = await run_in_process(func, content, missing)
+        except BrokenProcessPool:
+            raise
+        except Exception as e:
+            PrintStyle.error(f"document_parsing::{func.__name__}: Error parsing pages: {e}")
+            parsed = None
+        for i, number in enumerate(missing):
+            if parsed is None:
+                texts[number] = ""  # failed pages are not cached
+            else:
+                texts[number] = parsed[i]
+                set_cached(kind, hashes[number], parsed[i])
+    return texts  # type: ignore
+
+
+# worker functions, they run in the pool processes and import their parsers there
+
+
+def pdf_page_hashes(content: bytes) -> list[str]:
+    import pymupdf
+
+    with pymupdf.open(stream=content, filetype="pdf") as doc:
+        return [_page_hash(doc, page) for page in doc]
+
+
+def _page_hash(doc: Any, page: Any) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.rect), page.rotation)).encode())
+    digest.update(page.get_text().encode("utf-8", errors="surrogatepass"))
+    # table lines and other vector graphics
+    digest.update(repr(page.get_cdrawings()).encode())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def parse_pdf_pages(content: bytes, pages: list[int]) -> list[str]:
+    import pymupdf
+    from langchain_community.document_loaders.parsers.images import TesseractBlobParser
+    from langchain_community.document_loaders.parsers.pdf import PyMuPDFParser
+    from langchain_core.documents.base import Blob
+
+    with pymupdf.open(stream=content, filetype="pdf") as doc:
+        doc.select(pages)
+        selected = doc.tobytes()
+
+    parser = PyMuPDFParser(
+        mode="page",
+        extract_tables="markdown",
+        extract_images=True,
+        images_inner_format="text",
+        images_parser=TesseractBlobParser(),
+    )
+    blob = Blob.from_data(selected, mime_type="application/pdf")
+    return [element.page_content for element in parser.lazy_parse(blob)]
+
+
+def ocr_pdf_pages(content: bytes, pages: list[int]) -> list[str]:
+    import pdf2image
+    import pytesseract
+
+    texts = []
+    for number in pages:
+        images = pdf2image.convert_from_bytes(
+            content, first_page=number + 1, last_page=number + 1
+        )
+        texts.append("".join(pytesseract.image_to_string(image) for image in images))
+    return texts
+
+
+def ocr_pdf(content: bytes) -> str:
+    import pdf2image
+    import pytesseract
+
+    pages = pdf2image.convert_from_bytes(content)
+    return "".join(pytesseract.image_to_string(page) + "\n\n" for page in pages)
+
+
+def unstructured_text(content: bytes, suffix: str) -> str:
+    os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"
+    from langchain_unstructured import UnstructuredLoader
+
+    # the loader needs a file path, keep the extension for type detection
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        temp_file.write(content)
+        temp_file_path = temp_file.name
+    try:
+        loader = UnstructuredLoader(
+            file_path=temp_file_path,
+            mode="single",
+            partition_via_api=False,
+            # chunking_strategy="by_page",
+            strategy="hi_res",
+        )
+        return "\n".join(element.page_content for element in loader.load())
+    finally:
+        os.unlink(temp_file_path)
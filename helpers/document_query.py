@@ -5,24 +5,19 @@ import json
 
 from helpers.vector_db import VectorDB
 
-os.environ["USER_AGENT"] = "@mixedbread-ai/unstructured"  # noqa E402
-from langchain_unstructured import UnstructuredLoader  # noqa E402
-
 from urllib.parse import urlparse
 from typing import Callable, Sequence, List, Optional, Tuple
 from datetime import datetime
 
-from langchain_community.document_loaders.pdf import PyMuPDFLoader
 from langchain_community.document_transformers import MarkdownifyTransformer
-from langchain_community.document_loaders.parsers.images import TesseractBlobParser
 
 from langchain_core.documents import Document
 from langchain.schema import SystemMessage, HumanMessage
 
 from helpers.print_style import PrintStyle
-from helpers import files, errors
+from helpers import document_parsing, files, errors
 from helpers.network import HttpFetchResult, fetch_public_http_resource
-from agent import Agent
+from agent import Agent, AgentContext
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
@@ -42,17 +37,29 @@ class DocumentQueryStore:
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 100
 
-    # Cache for initialized stores
+    # Chunks embedded per request
+    EMBED_BATCH_SIZE = 64
+
+    # Cache for initialized stores, one per context
     _stores: dict[str, "DocumentQueryStore"] = {}
 
     @staticmethod
     def get(agent: Agent):
-        """Create a DocumentQueryStore instance for the specified agent."""
+        """Get the DocumentQueryStore of the agent's context, documents stay indexed between calls."""
         if not agent or not agent.config:
             raise ValueError("Agent and agent config must be provided")
 
-        # Initialize store
-        store = DocumentQueryStore(agent)
+        # drop stores of removed contexts
+        for context_id in list(DocumentQueryStore._stores):
+            if not AgentContext.get(context_id):
+                DocumentQueryStore._stores.pop(context_id, None)
+
+        context_id = agent.context.id
+        store = DocumentQueryStore._stores.get(context_id)
+        if not store:
+            store = DocumentQueryStore(agent)
+            DocumentQueryStore._stores[context_id] = store
+        store.agent = agent
         return store
 
     def __init__(
@@ -62,6 +69,10 @@ class DocumentQueryStore:
         """Initialize a DocumentQueryStore instance."""
         self.agent = agent
         self.vector_db: VectorDB | None = None
+        # normalized URI -> (content hash, full text) of indexed documents
+        self.documents: dict[str, tuple[str, str]] = {}
+        # normalized URI -> ids of its chunks in the vector db
+        self.document_ids: dict[str, set[str]] = {}
 
     @staticmethod
     def normalize_uri(uri: str) -> str:
@@ -97,8 +108,28 @@ class DocumentQueryStore:
     def init_vector_db(self):
         return VectorDB(self.agent, cache=True)
 
+    def get_indexed_content(self, document_uri: str, content_hash: str) -> str | None:
+        """
+        Get the text of a document indexed from the same content.
+
+        Args:
+            document_uri: The URI of the document
+            content_hash: Hash of the current document content
+
+        Returns:
+            The indexed text, None if not indexed or indexed from other content
+        """
+        indexed = self.documents.get(self.normalize_uri(document_uri))
+        if indexed and indexed[0] == content_hash:
+            return indexed[1]
+        return None
+
     async def add_document(
-        self, text: str, document_uri: str, metadata: dict | None = None
+        self,
+        text: str,
+        document_uri: str,
+        metadata: dict | None = None,
+        content_hash: str = "",
     ) -> tuple[bool, list[str]]:
         """
         Add a document to the store with the given URI.
@@ -107,6 +138,7 @@ class DocumentQueryStore:
             text: The document text content
             document_uri: The URI that uniquely identifies this document
             metadata: Optional metadata for the document
+            content_hash: Hash of the content the text was parsed from
 
         Returns:
             True if successful, False otherwise
@@ -121,6 +153,8 @@ class DocumentQueryStore:
         doc_metadata = metadata or {}
         doc_metadata["document_uri"] = document_uri
         doc_metadata["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if content_hash:
+            doc_metadata["content_hash"] = content_hash
 
         # Split text into chunks
         text_splitter = RecursiveCharacterTextSplitter(
@@ -140,12 +174,19 @@ class DocumentQueryStore:
             PrintStyle.error(f"No chunks created for document: {document_uri}")
             return False, []
 
+        ids: list[str] = []
         try:
             # Initialize vector db if not already initialized
             if not self.vector_db:
                 self.vector_db = self.init_vector_db()
 
-            ids = await self.vector_db.insert_documents(docs)
+            # embed in batches, large documents do not go out as one request
+            for start in range(0, len(docs), self.EMBED_BATCH_SIZE):
+                batch = docs[start : start + self.EMBED_BATCH_SIZE]
+                ids += await self.vector_db.insert_documents(batch)
+            self.document_ids[document_uri] = set(ids)
+            if content_hash:
+                self.documents[document_uri] = (content_hash, text)
             PrintStyle.standard(
                 f"Added document '{document_uri}' with {len(docs)} chunks"
             )
@@ -153,6 +194,9 @@ class DocumentQueryStore:
         except Exception as e:
             err_text = errors.format_error(e)
             PrintStyle.error(f"Error adding document '{document_uri}': {err_text}")
+            if ids and self.vector_db:
+                # no partially indexed documents
+                await self.vector_db.delete_documents_by_ids(ids)
             return False, []
 
     async def get_document(self, document_uri: str) -> Optional[Document]:
@@ -181,7 +225,11 @@ class DocumentQueryStore:
 
         # Combine chunks into a single document
         chunks = sorted(docs, key=lambda x: x.metadata.get("chunk_index", 0))
-        full_content = "\n".join(chunk.page_content for chunk in chunks)
+        if document_uri in self.documents:
+            # text as it was indexed, the chunks overlap
+            full_content = self.documents[document_uri][1]
+        else:
+            full_content = "\n".join(chunk.page_content for chunk in chunks)
 
         # Use metadata from first chunk
         metadata = chunks[0].metadata.copy()
@@ -209,9 +257,8 @@ class DocumentQueryStore:
         document_uri = self.normalize_uri(document_uri)
 
         # get docs from vector db
-
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
+        chunks = await self.vector_db.db.aget_by_ids(
+            list(self.document_ids.get(document_uri, ()))
         )
 
         PrintStyle.standard(f"Found {len(chunks)} chunks for document: {document_uri}")
@@ -255,15 +302,10 @@ class DocumentQueryStore:
 
         # Normalize the URI
         document_uri = self.normalize_uri(document_uri)
-
-        chunks = await self.vector_db.search_by_metadata(
-            filter=f"document_uri == '{document_uri}'",
-        )
-        if not chunks:
-            return False
+        self.documents.pop(document_uri, None)
 
         # Collect IDs to delete
-        ids_to_delete = [chunk.metadata["id"] for chunk in chunks]
+        ids_to_delete = list(self.document_ids.pop(document_uri, ()))
 
         # Delete from vector store
         if ids_to_delete:
@@ -329,6 +371,47 @@ class DocumentQueryStore:
             query, limit, threshold, f"document_uri == '{document_uri}'"
         )
 
+    async def search_many(
+        self,
+        queries: List[str],
+        document_uris: List[str],
+        limit: int = 10,
+        threshold: float = 0.5,
+    ) -> List[List[Document]]:
+        """
+        Search several queries within the given documents at once.
+
+        Args:
+            queries: The search query strings
+            document_uris: The URIs of the documents to search within
+            limit: Maximum number of results per query
+            threshold: Minimum similarity score threshold (0-1)
+
+        Returns:
+            List of matching document chunks for each query
+        """
+
+        # DB not initialized, no documents inside
+        if not self.vector_db or not queries:
+            return [[] for _ in queries]
+
+        # chunk ids of the documents, no filter expression evaluated per chunk
+        ids: set[str] = set()
+        for uri in document_uris:
+            ids.update(self.document_ids.get(self.normalize_uri(uri), ()))
+
+        try:
+            results = await self.vector_db.search_many_by_similarity_threshold(
+                queries=queries, limit=limit, threshold=threshold, ids=ids
+            )
+            PrintStyle.standard(
+                f"Search of {len(queries)} queries returned {sum(len(found) for found in results)} results"
+            )
+            return results
+        except Exception as e:
+            PrintStyle.error(f"Error searching documents: {str(e)}")
+            return [[] for _ in queries]
+
     async def list_documents(self) -> List[str]:
         """
         Get a list of all document URIs in the store.
@@ -374,38 +457,27 @@ class DocumentQueryHelper:
             *[self.document_get_content(uri, True) for uri in document_uris]
         )
         await self.agent.handle_intervention()
-        selected_chunks = {}
-        for question in questions:
-            self.progress_callback(f"Optimizing query: {question}")
-            await self.agent.handle_intervention()
-            human_content = f'Search Query: "{question}"'
-            system_content = self.agent.parse_prompt(
-                "fw.document_query.optmimize_query.md"
-            )
-
-            optimized_query = (
-                await self.agent.call_utility_model(
-                    system=system_content, message=human_content
-                )
-            ).strip()
+        self.progress_callback(f"Optimizing {len(questions)} queries")
+        system_content = self.agent.parse_prompt("fw.document_query.optmimize_query.md")
+        optimized_queries = await asyncio.gather(
+            *[self._optimize_query(system_content, question) for question in questions]
+        )
 
-            await self.agent.handle_intervention()
+        await self.agent.handle_intervention()
+        for optimized_query in optimized_queries:
             self.progress_callback(f"Searching documents with query: {optimized_query}")
 
-            normalized_uris = [self.store.normalize_uri(uri) for uri in document_uris]
-            doc_filter = " or ".join(
-                [f"document_uri == '{uri}'" for uri in normalized_uris]
-            )
-
-            chunks = await self.store.search_documents(
-                query=optimized_query,
-                limit=100,
-                threshold=DEFAULT_SEARCH_THRESHOLD,
-                filter=doc_filter,
-            )
+        # all queries embedded and searched together
+        results = await self.store.search_many(
+            queries=list(optimized_queries),
+            document_uris=document_uris,
+            limit=100,
+            threshold=DEFAULT_SEARCH_THRESHOLD,
+        )
 
+        selected_chunks = {}
+        for chunks in results:
             self.progress_callback(f"Found {len(chunks)} chunks")
-
             for chunk in chunks:
                 selected_chunks[chunk.metadata["id"]] = chunk
 
@@ -449,6 +521,14 @@ class DocumentQueryHelper:
 
         return True, str(ai_response)
 
+    async def _optimize_query(self, system_content: str, question: str) -> str:
+        human_content = f'Search Query: "{question}"'
+        return (
+            await self.agent.call_utility_model(
+                system=system_content, message=human_content
+            )
+        ).strip()
+
     @staticmethod
     def _small_document_fallback_content(
         document_uris: Sequence[str], document_contents: Sequence[str]
@@ -509,52 +589,53 @@ class DocumentQueryHelper:
         document_uri_norm = self.store.normalize_uri(document_uri)
 
         await self.agent.handle_intervention()
-        exists = await self.store.document_exists(document_uri_norm)
-        document_content = ""
-        if not exists:
-            await self.agent.handle_intervention()
-            if mimetype.startswith("image/"):
-                document_content = self.handle_image_document(
-                    document_uri, scheme, remote_resource=remote_resource
-                )
-            elif mimetype == "text/html":
-                document_content = self.handle_html_document(
-                    document_uri, scheme, remote_resource=remote_resource
-                )
-            elif mimetype.startswith("text/") or mimetype == "application/json":
-                document_content = self.handle_text_document(
-                    document_uri, scheme, remote_resource=remote_resource
-                )
-            elif mimetype == "application/pdf":
-                document_content = self.handle_pdf_document(
-                    document_uri, scheme, remote_resource=remote_resource
-                )
-            else:
-                document_content = self.handle_unstructured_document(
-                    document_uri, scheme, remote_resource=remote_resource
-                )
-            if add_to_db:
-                self.progress_callback(f"Indexing document")
-                await self.agent.handle_intervention()
-                async with self.store_lock:
-                    success, ids = await self.store.add_document(
-                        document_content, document_uri_norm
-                    )
-                if not success:
-                    self.progress_callback(f"Failed to index document")
-                    raise ValueError(
-                        f"DocumentQueryHelper::document_get_content: Failed to index document: {document_uri_norm}"
-                    )
-                self.progress_callback(f"Indexed {len(ids)} chunks")
+        if remote_resource is not None:
+            content = remote_resource.content
         else:
+            content = await asyncio.to_thread(files.read_file_bin, document_uri)
+        content_hash = document_parsing.content_hash(content)
+
+        # parsed and indexed once per content, changed documents are indexed again
+        document_content = self.store.get_indexed_content(
+            document_uri_norm, content_hash
+        )
+        if document_content is not None:
+            return document_content
+
+        await self.agent.handle_intervention()
+        if mimetype.startswith("image/"):
+            document_content = await self.handle_image_document(
+                document_uri, scheme, content, remote_resource=remote_resource
+            )
+        elif mimetype == "text/html":
+            document_content = self.handle_html_document(
+                document_uri, scheme, content, remote_resource=remote_resource
+            )
+        elif mimetype.startswith("text/") or mimetype == "application/json":
+            document_content = self.handle_text_document(
+                document_uri, scheme, content, remote_resource=remote_resource
+            )
+        elif mimetype == "application/pdf":
+            document_content = await self.handle_pdf_document(
+                document_uri, scheme, content, remote_resource=remote_resource
+            )
+        else:
+            document_content = await self.handle_unstructured_document(
+                document_uri, scheme, content, remote_resource=remote_resource
+            )
+        if add_to_db:
+            self.progress_callback(f"Indexing document")
             await self.agent.handle_intervention()
-            doc = await self.store.get_document(document_uri_norm)
-            if doc:
-                document_content = doc.page_content
-            else:
+            async with self.store_lock:
+                success, ids = await self.store.add_document(
+                    document_content, document_uri_norm, content_hash=content_hash
+                )
+            if not success:
+                self.progress_callback(f"Failed to index document")
                 raise ValueError(
-                    f"DocumentQueryHelper::document_get_content: Document not found: {document_uri_norm}"
+                    f"DocumentQueryHelper::document_get_content: Failed to index document: {document_uri_norm}"
                 )
+            self.progress_callback(f"Indexed {len(ids)} chunks")
         return document_content
 
     @staticmethod
@@ -583,36 +664,34 @@ class DocumentQueryHelper:
 
         return ".bin"
 
-    def handle_image_document(
+    async def handle_image_document(
         self,
         document: str,
         scheme: str,
+        content: bytes,
         remote_resource: HttpFetchResult | None = None,
     ) -> str:
-        return self.handle_unstructured_document(
-            document, scheme, remote_resource=remote_resource
+        return await self.handle_unstructured_document(
+            document, scheme, content, remote_resource=remote_resource
         )
 
     def handle_html_document(
         self,
         document: str,
         scheme: str,
+        content: bytes,
         remote_resource: HttpFetchResult | None = None,
     ) -> str:
         if scheme in ["http", "https"]:
             if remote_resource is None:
                 raise ValueError("Missing prefetched remote HTML content")
             html_content = self._decode_remote_text(remote_resource)
-            parts = [Document(page_content=html_content, metadata={"source": document})]
         elif scheme == "file":
-            # Use RFC file operations instead of TextLoader
-            file_content_bytes = files.read_file_bin(document)
-            file_content = file_content_bytes.decode("utf-8")
-            # Create Document manually since we're not using TextLoader
-            parts = [Document(page_content=file_content, metadata={"source": document})]
+            html_content = content.decode("utf-8")
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
+        parts = [Document(page_content=html_content, metadata={"source": document})]
         return "\n".join(
             [
                 element.page_content
@@ -624,151 +703,44 @@ class DocumentQueryHelper:
         self,
         document: str,
         scheme: str,
+        content: bytes,
         remote_resource: HttpFetchResult | None = None,
     ) -> str:
         if scheme in ["http", "https"]:
             if remote_resource is None:
                 raise ValueError("Missing prefetched remote text content")
-            file_content = self._decode_remote_text(remote_resource)
-            elements = [
-                Document(page_content=file_content, metadata={"source": document})
-            ]
+            return self._decode_remote_text(remote_resource)
         elif scheme == "file":
-            # Use RFC file operations instead of TextLoader
-            file_content_bytes = files.read_file_bin(document)
-            file_content = file_content_bytes.decode("utf-8")
-            # Create Document manually since we're not using TextLoader
-            elements = [
-                Document(page_content=file_content, metadata={"source": document})
-            ]
+            return content.decode("utf-8")
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
-        return "\n".join([element.page_content for element in elements])
-
-    def handle_pdf_document(
+    async def handle_pdf_document(
         self,
         document: str,
         scheme: str,
+        content: bytes,
         remote_resource: HttpFetchResult | None = None,
     ) -> str:
-        temp_file_path = ""
-        if scheme == "file":
-            # Use RFC file operations to read the PDF file as binary
-            file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for PyMuPDFLoader since it needs a file path
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(file_content_bytes)
-                temp_file_path = temp_file.name
-        elif scheme in ["http", "https"]:
-            import tempfile
-
-            if remote_resource is None:
-                raise ValueError("Missing prefetched remote PDF content")
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(remote_resource.content)
-                temp_file_path = temp_file.name
-        else:
+        if scheme not in ["file", "http", "https"]:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
-        if not os.path.exists(temp_file_path):
-            raise ValueError(
-                f"DocumentQueryHelper::handle_pdf_document: Temporary file not found: {temp_file_path}"
-            )
-
-        try:
-            try:
-                loader = PyMuPDFLoader(
-                    temp_file_path,
-                    mode="single",
-                    extract_tables="markdown",
-                    extract_images=True,
-                    images_inner_format="text",
-                    images_parser=TesseractBlobParser(),
-                    pages_delimiter="\n",
-                )
-                elements: list[Document] = loader.load()
-                contents = "\n".join([element.page_content for element in elements])
-            except Exception as e:
-                PrintStyle.error(
-                    f"DocumentQueryHelper::handle_pdf_document: Error loading with PyMuPDF: {e}"
-                )
-                contents = ""
-
-            if not contents:
-                import pdf2image
-                import pytesseract
-
-                PrintStyle.debug(
-                    f"DocumentQueryHelper::handle_pdf_document: FALLBACK Converting PDF to images: {temp_file_path}"
-                )
-
-                # Convert PDF to images
-                pages = pdf2image.convert_from_path(temp_file_path)  # type: ignore
-                for page in pages:
-                    contents += pytesseract.image_to_string(page) + "\n\n"
-
-            return contents
-        finally:
-            os.unlink(temp_file_path)
+        # parsed and OCRed page by page in worker processes, unchanged pages come from cache
+        return await document_parsing.parse_pdf(content)
 
-    def handle_unstructured_document(
+    async def handle_unstructured_document(
         self,
         document: str,
         scheme: str,
+        content: bytes,
         remote_resource: HttpFetchResult | None = None,
     ) -> str:
-        elements: list[Document] = []
         if scheme in ["http", "https"]:
-            if remote_resource is None:
-                raise ValueError("Missing prefetched remote document content")
-            import tempfile
-
-            temp_file_path = ""
             suffix = self._get_temp_file_suffix(document, remote_resource)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-                temp_file.write(remote_resource.content)
-                temp_file_path = temp_file.name
-
-            try:
-                loader = UnstructuredLoader(
-                    file_path=temp_file_path,
-                    mode="single",
-                    partition_via_api=False,
-                    # chunking_strategy="by_page",
-                    strategy="hi_res",
-                )
-                elements = loader.load()
-            finally:
-                os.unlink(temp_file_path)
         elif scheme == "file":
-            # Use RFC file operations to read the file as binary
-            file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for UnstructuredLoader since it needs a file path
-            import tempfile
-            import os
-
             # Get file extension to preserve it for proper processing
-            _, ext = os.path.splitext(document)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-                temp_file.write(file_content_bytes)
-                temp_file_path = temp_file.name
-
-            try:
-                loader = UnstructuredLoader(
-                    file_path=temp_file_path,
-                    mode="single",
-                    partition_via_api=False,
-                    # chunking_strategy="by_page",
-                    strategy="hi_res",
-                )
-                elements = loader.load()
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
+            _, suffix = os.path.splitext(document)
         else:
             raise ValueError(f"Unsupported scheme: {scheme}")
 
-        return "\n".join([element.page_content for element in elements])
+        return await document_parsing.parse_unstructured(content, suffix)
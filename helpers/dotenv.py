@@ -10,8 +10,17 @@ KEY_AUTH_PASSWORD = "AUTH_PASSWORD"
 KEY_RFC_PASSWORD = "RFC_PASSWORD"
 KEY_ROOT_PASSWORD = "ROOT_PASSWORD"
 
+# increases on every (re)load, values read from the environment may have changed
+_version = 0
+
 def load_dotenv():
+    global _version
     _load_dotenv(get_dotenv_file_path(), override=True)
+    _version += 1
+
+
+def get_version() -> int:
+    return _version
 
 
 def get_dotenv_file_path():
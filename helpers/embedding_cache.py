@@ -0,0 +1,247 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from typing import Any, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from helpers import files
+
+CACHE_FILE = "tmp/embeddings.sqlite3"
+# one file per vector cache of memory stores, replaced by CACHE_FILE
+LEGACY_CACHE_DIR = "tmp/memory/embeddings"
+
+# entries kept across all models, least recently used ones are evicted first
+MAX_ENTRIES = 100_000
+
+# sqlite limits the number of bound parameters per statement
+_BATCH = 500
+
+
+class EmbeddingCache:
+    """Embeddings of document texts keyed by (model, text hash) in one SQLite file.
+
+    Lookups and inserts work on batches, every hit refreshes the entry so the
+    least recently used ones are evicted once max_entries is exceeded. The cache
+    also remembers the vector dimension of each model.
+    """
+
+    def __init__(self, path: str = ":memory:", max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                used INTEGER NOT NULL,
+                PRIMARY KEY (model, hash)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used);
+            CREATE TABLE IF NOT EXISTS models (
+                model TEXT PRIMARY KEY,
+                dimension INTEGER NOT NULL
+            );
+            """
+        )
+        self._clock = self._conn.execute(
+            "SELECT COALESCE(MAX(used), 0) FROM embeddings"
+        ).fetchone()[0]
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[list[float] | None]:
+        """Cached vectors for texts in order, None for misses."""
+        hashes = [_text_hash(text) for text in texts]
+        found: dict[bytes, list[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            self._clock += 1
+            for start in range(0, len(unique), _BATCH):
+                batch = unique[start : start + _BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({marks})",
+                    (model, *batch),
+                ).fetchall()
+                for hash, vector in rows:
+                    found[hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+                if rows:
+                    hit = [row[0] for row in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET used = ? WHERE model = ? AND hash IN ({','.join('?' * len(hit))})",
+                        (self._clock, model, *hit),
+                    )
+            self._conn.commit()
+        return [found.get(hash) for hash in hashes]
+
+    def put_many(
+        self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> None:
+        if not texts:
+            return
+        with self._lock:
+            self._clock += 1
+            rows = [
+                (model, _text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), self._clock)
+                for text, vector in zip(texts, vectors)
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._set_dimension(model, len(vectors[0]))
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def get_dimension(self, model: str) -> int | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dimension FROM models WHERE model = ?", (model,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_dimension(self, model: str, dimension: int) -> None:
+        with self._lock:
+            self._set_dimension(model, dimension)
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _set_dimension(self, model: str, dimension: int) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO models (model, dimension) VALUES (?, ?)",
+            (model, dimension),
+        )
+
+    def _evict(self) -> None:
+        # the running count includes replaced rows, recount before evicting
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        # leave some headroom so eviction does not run on every insert
+        excess += self.max_entries // 10
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE (model, hash) IN "
+            "(SELECT model, hash FROM embeddings ORDER BY used LIMIT ?)",
+            (excess,),
+        )
+        self._count = max(0, self._count - excess)
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings model backed by an EmbeddingCache for documents.
+
+    Queries are not cached, like langchain's CacheBackedEmbeddings.
+    """
+
+    def __init__(self, underlying_embeddings: Embeddings, cache: EmbeddingCache, namespace: str):
+        self.underlying_embeddings = underlying_embeddings
+        self.cache = cache
+        self.namespace = namespace
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.cache.get_many(self.namespace, texts)
+        missing = self._missing(texts, vectors)
+        if missing:
+            embedded = self.underlying_embeddings.embed_documents(missing)
+            self._fill(texts, vectors, missing, embedded)
+        return vectors  # type: ignore
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.cache.get_many(self.namespace, texts)
+        missing = self._missing(texts, vectors)
+        if missing:
+            embedded = await self.underlying_embeddings.aembed_documents(missing)
+            self._fill(texts, vectors, missing, embedded)
+        return vectors  # type: ignore
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.underlying_embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.underlying_embeddings.aembed_query(text)
+
+    def get_dimension(self) -> int:
+        """Vector dimension of the model, embeds a probe text only the first time."""
+        return get_dimension(self.underlying_embeddings, self.cache, self.namespace)
+
+    @staticmethod
+    def _missing(texts: list[str], vectors: list[list[float] | None]) -> list[str]:
+        return list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+
+    def _fill(
+        self,
+        texts: list[str],
+        vectors: list[list[float] | None],
+        missing: list[str],
+        embedded: list[list[float]],
+    ) -> None:
+        self.cache.put_many(self.namespace, missing, embedded)
+        by_text = dict(zip(missing, embedded))
+        for i, text in enumerate(texts):
+            if vectors[i] is None:
+                vectors[i] = by_text[text]
+
+
+def get_dimension(model: Embeddings, cache: EmbeddingCache, namespace: str) -> int:
+    dimension = cache.get_dimension(namespace)
+    if dimension is None:
+        dimension = len(model.embed_query("example"))
+        cache.set_dimension(namespace, dimension)
+    return dimension
+
+
+def get_namespace(model: Embeddings) -> str:
+    """Cache namespace of an embeddings model, covers settings that change vectors.
+
+    Provider and api_base are part of it, different endpoints may serve different
+    models or versions under the same name.
+    """
+    namespace = getattr(model, "model_name", None) or type(model).__name__
+    provider = getattr(model, "provider", None)
+    if provider and not namespace.startswith(f"{provider}/"):
+        namespace = f"{provider}/{namespace}"
+    kwargs: dict[str, Any] = getattr(model, "kwargs", None) or {}
+    if kwargs.get("dimensions"):
+        namespace += f"@{kwargs['dimensions']}"
+    api_base = kwargs.get("api_base") or kwargs.get("base_url")
+    if api_base:
+        namespace += f" {str(api_base).rstrip('/')}"
+    return namespace
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    """The shared on-disk cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            path = files.get_abs_path(CACHE_FILE)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _cache = EmbeddingCache(path)
+            shutil.rmtree(files.get_abs_path(LEGACY_CACHE_DIR), ignore_errors=True)
+        return _cache
+
+
+def _text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
@@ -1,5 +1,5 @@
 
-from .dirty_json import DirtyJson
+from .dirty_json import DirtyJson, DirtyJsonStream
 import regex, re
 from helpers.modules import load_classes_from_file, load_classes_from_folder # keep here for backwards compatibility
 from typing import Any
@@ -68,6 +68,61 @@ def extract_json_root_string(content: str) -> str | None:
     return content[start : start + parser.index]
 
 
+class JsonRootStream:
+    """Incremental `extract_json_root_string` for a growing response stream.
+
+    Call `update` with the full text after every chunk; only the new part is
+    parsed. Returns the closed root JSON object string once available.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self.start = -1
+        self.blocked = False
+        self.parser = DirtyJsonStream()
+
+    def update(self, content: str) -> str | None:
+        if not content or not isinstance(content, str):
+            return None
+        if not content.startswith(self.text):
+            self.reset()
+        scanned = len(self.text)
+        self.text = content
+
+        if self.blocked:
+            return None
+        if self.start == -1:
+            start = content.find("{", scanned)
+            if start == -1:
+                if content.find("[", scanned) != -1:
+                    self.blocked = True
+                return None
+            if content.find("[", scanned, start) != -1:
+                self.blocked = True
+                return None
+            self.start = start
+
+        try:
+            self.parser.update(content[self.start :])
+            if not self.parser.completed:
+                return None
+            return content[self.start : self.start + self.parser.index]
+        except Exception:
+            return None
+
+    @property
+    def result(self) -> dict[str, Any] | None:
+        """Parsed root object, same as `json_parse_dirty` on the root string."""
+        try:
+            data = self.parser.result
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
+
+
 def extract_json_object_string(content):
     start = content.find("{")
     if start == -1:
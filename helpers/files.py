@@ -37,23 +37,15 @@ def load_plugin_variables(
     if backup_dirs is None:
         backup_dirs = []
 
-    try:
-        # Create filename and directories list
-        plugin_filename = basename(file, ".md") + ".py"
-        directories = [dirname(file)] + backup_dirs
-        plugin_file = find_file_in_dirs(plugin_filename, directories)
-    except FileNotFoundError:
-        plugin_file = None
-
-    if plugin_file and exists(plugin_file):
+    # Create filename and directories list
+    plugin_filename = basename(file, ".md") + ".py"
+    directories = [dirname(file)] + backup_dirs
 
-        from helpers import modules
+    from helpers import templates
 
-        classes = modules.load_classes_from_file(
-            plugin_file, VariablesPlugin, one_per_file=False
-        )
-        for cls in classes:
-            return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
+    cls = templates.get_variables_plugin(plugin_filename, directories)
+    if cls:
+        return cls().get_variables(file, backup_dirs, **kwargs)  # type: ignore < abstract class here is ok, it is always a subclass
 
         # load python code and extract variables variables from it
         # module = None
@@ -91,13 +83,13 @@ def parse_file(
     if _directories is None:
         _directories = []
 
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_filename, _directories)
+    from helpers import templates
 
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
+    # Find the file in the directories and read its content
+    absolute_path, template = templates.load_template(
+        _filename, _directories, _encoding
+    )
+    content = template.content
 
     is_json = is_full_json_template(content)
     content = remove_code_fences(content)
@@ -123,43 +115,10 @@ def parse_file(
 def read_prompt_file(
     _file: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs
 ):
-    if _directories is None:
-        _directories = []
-
-    # If filename contains folder path, extract it and add to directories
-    if os.path.dirname(_file):
-        folder_path = os.path.dirname(_file)
-        _file = os.path.basename(_file)
-        _directories = [folder_path] + _directories
-
-    # Find the file in the directories
-    absolute_path = find_file_in_dirs(_file, _directories)
-    source_dir = os.path.dirname(absolute_path)
-
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        content = f.read()
-
-    variables = load_plugin_variables(_file, _directories, **kwargs) or {}  # type: ignore
-    variables.update(kwargs)
-
-    # evaluate conditions
-    content = evaluate_text_conditions(content, **variables)
-
-    # Replace placeholders with values from kwargs
-    content = replace_placeholders_text(content, **variables)
-
-    # Process include statements (with source tracking for {{include original}})
-    content = process_includes(
-        # here we use kwargs, the plugin variables are not inherited
-        content,
-        _directories,
-        _source_file=_file,
-        _source_dir=source_dir,
-        **kwargs,
-    )
+    # Compiled templates are cached, see helpers/templates.py
+    from helpers import templates
 
-    return content
+    return templates.read_prompt_file(_file, _directories, _encoding, **kwargs)
 
 
 def evaluate_text_conditions(_content: str, **kwargs):
@@ -87,7 +87,20 @@ class Message(Record):
         self.ai = ai
         self.content = content
         self.summary: str = ""
-        self.tokens: int = tokens or self.calculate_tokens()
+        self.topic: Topic | None = None  # set by the topic holding this message
+        self._tokens = 0
+        self.tokens = tokens or self.calculate_tokens()
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, value: int):
+        delta = value - self._tokens
+        self._tokens = value
+        if delta and self.topic:
+            self.topic._message_tokens_changed(delta)
 
     def get_tokens(self) -> int:
         if not self.tokens:
@@ -101,6 +114,13 @@ class Message(Record):
     def set_summary(self, summary: str):
         self.summary = summary
         self.tokens = self.calculate_tokens()
+        if self.topic:
+            self.topic.history.revision += 1
+
+    def set_content(self, content: MessageContent):
+        # the summary described the previous content
+        self.content = content
+        self.set_summary("")
 
     async def compress(self):
         return False
@@ -136,20 +156,66 @@ class Message(Record):
 class Topic(Record):
     def __init__(self, history: "History"):
         self.history = history
-        self.summary: str = ""
+        self.parent: History | Bulk | None = None
+        self._summary: str = ""
+        self._summary_tokens: int | None = None
+        # running total of message tokens, with the message count it was built for
+        self._messages_tokens: tuple[int, int] | None = None
         self.messages: list[Message] = []
 
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @summary.setter
+    def summary(self, value: str):
+        self._summary = value
+        self._summary_tokens = None
+        self.history.revision += 1
+        _tokens_changed(self.parent, self)
+
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            if self._summary_tokens is None:
+                self._summary_tokens = tokens.approximate_tokens(self.summary)
+            return self._summary_tokens
         else:
-            return sum(msg.get_tokens() for msg in self.messages)
+            return self.get_messages_tokens()
+
+    def get_messages_tokens(self) -> int:
+        cached = self._messages_tokens
+        if cached and cached[0] == len(self.messages):
+            return cached[1]
+        # messages changed outside add_message, recount and adopt them
+        for msg in self.messages:
+            msg.topic = self
+        total = sum(msg.get_tokens() for msg in self.messages)
+        self._messages_tokens = (len(self.messages), total)
+        return total
+
+    def _message_tokens_changed(self, delta: int):
+        if self._messages_tokens:
+            count, total = self._messages_tokens
+            self._messages_tokens = (count, total + delta)
+        if not self.summary:
+            _tokens_changed(self.parent, self)
+
+    def _messages_changed(self):
+        self._messages_tokens = None
+        self.history.revision += 1
+        if not self.summary:
+            _tokens_changed(self.parent, self)
 
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0, id: str = ""
     ) -> Message:
         msg = Message(ai=ai, content=content, tokens=tokens, id=id)
+        total = self.get_messages_tokens() + msg.get_tokens()
+        msg.topic = self
         self.messages.append(msg)
+        self._messages_tokens = (len(self.messages), total)
+        if not self.summary:
+            _tokens_changed(self.parent, self)
         return msg
 
     def output(self) -> list[OutputMessage]:
@@ -176,11 +242,10 @@ class Topic(Record):
         large_msgs = []
         for m in (m for m in self.messages if not m.summary):
             # TODO refactor this
-            out = m.output()
-            text = output_text(out)
             tok = m.get_tokens()
-            leng = len(text)
             if tok > msg_max_size:
+                out = m.output()
+                leng = len(output_text(out))
                 large_msgs.append((m, tok, leng, out))
         large_msgs.sort(key=lambda x: x[1], reverse=True)
         for msg, tok, leng, out in large_msgs:
@@ -225,6 +290,7 @@ class Topic(Record):
         )
         sum_msg = Message(False, sum_msg_content)
         self.messages[1 : cnt_to_sum + 1] = [sum_msg]
+        self._messages_changed()
         return True
 
     async def summarize_messages(self, messages: list[Message]):
@@ -251,20 +317,49 @@ class Topic(Record):
         topic.messages = [
             Message.from_dict(m, history=history) for m in data.get("messages", [])
         ]
+        topic._messages_changed()
         return topic
 
 
 class Bulk(Record):
     def __init__(self, history: "History"):
         self.history = history
-        self.summary: str = ""
+        self.parent: History | Bulk | None = None
+        self._summary: str = ""
+        self._summary_tokens: int | None = None
+        self._records_tokens: tuple[int, int] | None = None
         self.records: list[Record] = []
 
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    @summary.setter
+    def summary(self, value: str):
+        self._summary = value
+        self._summary_tokens = None
+        _tokens_changed(self.parent, self)
+
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            if self._summary_tokens is None:
+                self._summary_tokens = tokens.approximate_tokens(self.summary)
+            return self._summary_tokens
         else:
-            return sum([r.get_tokens() for r in self.records])
+            self._records_tokens = _sum_tokens(self, self.records, self._records_tokens)
+            return self._records_tokens[1]
+
+    def add_records(self, records: "list[Record]"):
+        for record in records:
+            if isinstance(record, (Topic, Bulk)):
+                record.parent = self
+        self.records.extend(records)
+        self._child_tokens_changed(None)
+
+    def _child_tokens_changed(self, record: "Record | None"):
+        self._records_tokens = None
+        if not self.summary:
+            _tokens_changed(self.parent, self)
 
     def output(
         self, human_label: str = "user", ai_label: str = "ai"
@@ -299,7 +394,9 @@ class Bulk(Record):
         bulk = Bulk(history=history)
         bulk.summary = data["summary"]
         cls = data["_cls"]
-        bulk.records = [Record.from_dict(r, history=history) for r in data["records"]]
+        bulk.add_records(
+            [Record.from_dict(r, history=history) for r in data["records"]]
+        )
         return bulk
 
 
@@ -308,10 +405,17 @@ class History(Record):
         from agent import Agent
 
         self.counter = 0
+        # bumped by every change except adding messages and starting a new topic,
+        # lets persistence journal just the new messages
+        self.revision = 0
         self.bulks: list[Bulk] = []
         self.topics: list[Topic] = []
         self.current = Topic(history=self)
+        self.current.parent = self
         self.agent: Agent = agent
+        # running totals of bulks and topics, with the record count they were built for
+        self._bulks_tokens: tuple[int, int] | None = None
+        self._topics_tokens: tuple[int, int] | None = None
 
     def get_tokens(self) -> int:
         return (
@@ -326,10 +430,22 @@ class History(Record):
         return total > limit
 
     def get_bulks_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.bulks)
+        self._bulks_tokens = _sum_tokens(self, self.bulks, self._bulks_tokens)
+        return self._bulks_tokens[1]
 
     def get_topics_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.topics)
+        self._topics_tokens = _sum_tokens(self, self.topics, self._topics_tokens)
+        return self._topics_tokens[1]
+
+    def _child_tokens_changed(self, record: "Record | None"):
+        if record is self.current:
+            return  # current topic is not part of the cached totals
+        if record is not None:
+            self.revision += 1
+        if record is None or isinstance(record, Topic):
+            self._topics_tokens = None
+        if record is None or isinstance(record, Bulk):
+            self._bulks_tokens = None
 
     def get_current_topic_tokens(self) -> int:
         return self.current.get_tokens()
@@ -344,6 +460,8 @@ class History(Record):
         if self.current.messages:
             self.topics.append(self.current)
             self.current = Topic(history=self)
+            self.current.parent = self
+            self._child_tokens_changed(None)
 
     def output(self) -> list[OutputMessage]:
         self.trim_embeds(self._get_max_embeds())
@@ -416,6 +534,9 @@ class History(Record):
         history.bulks = [Bulk.from_dict(b, history=history) for b in data["bulks"]]
         history.topics = [Topic.from_dict(t, history=history) for t in data["topics"]]
         history.current = Topic.from_dict(data["current"], history=history)
+        for record in [*history.bulks, *history.topics, history.current]:
+            record.parent = history
+        history._child_tokens_changed(None)
         return history
 
     def to_dict(self):
@@ -499,10 +620,13 @@ class History(Record):
             count = TOPICS_MERGE_COUNT if len(self.topics) >= TOPICS_MERGE_COUNT else 1
             chunk = self.topics[:count]
             bulk = Bulk(history=self)
-            bulk.records.extend(chunk)
+            bulk.add_records(cast(list[Record], chunk))
             await bulk.summarize()
+            bulk.parent = self
             self.bulks.append(bulk)
             self.topics[:count] = []
+            self.revision += 1
+            self._child_tokens_changed(None)
             return True
         return False
 
@@ -512,6 +636,8 @@ class History(Record):
         # remove oldest bulk if necessary
         if not compressed:
             self.bulks.pop(0)
+            self.revision += 1
+            self._child_tokens_changed(None)
             return True
         return compressed
 
@@ -526,12 +652,16 @@ class History(Record):
                 for i in range(0, len(self.bulks), count)
             ]
         )
+        for bulk in bulks:
+            bulk.parent = self
         self.bulks = bulks
+        self.revision += 1
+        self._child_tokens_changed(None)
         return True
 
     async def merge_bulks(self, bulks: list[Bulk]) -> Bulk:
         bulk = Bulk(history=self)
-        bulk.records = cast(list[Record], bulks)
+        bulk.add_records(cast(list[Record], bulks))
         await bulk.summarize()
         return bulk
 
@@ -553,10 +683,28 @@ class History(Record):
 
 
 
-def deserialize_history(json_data: str, agent) -> History:
+def _tokens_changed(parent: "History | Bulk | None", record: Record):
+    if parent:
+        parent._child_tokens_changed(record)
+
+
+def _sum_tokens(
+    parent: "History | Bulk", records: "list", cached: tuple[int, int] | None
+) -> tuple[int, int]:
+    # cached totals are dropped on every known change, the count guards
+    # against records appended or removed from outside
+    if cached and cached[0] == len(records):
+        return cached
+    for record in records:
+        if isinstance(record, (Topic, Bulk)):
+            record.parent = parent
+    return (len(records), sum(record.get_tokens() for record in records))
+
+
+def deserialize_history(json_data: str | dict, agent) -> History:
     history = History(agent=agent)
     if json_data:
-        data = _json_loads(json_data)
+        data = json_data if isinstance(json_data, dict) else _json_loads(json_data)
         history = History.from_dict(data, history=history)
     return history
 
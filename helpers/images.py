@@ -1,13 +1,34 @@
+import asyncio
 import base64
+import hashlib
 import io
 import math
 import mimetypes
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 from urllib.parse import unquote, urlparse
 
 from PIL import Image
 
+# default of the vision_max_edge setting, local images sent to vision models are scaled
+# down to this longest edge as JPEG, 0 sends them as they are
+VISION_MAX_EDGE = 0
+VISION_QUALITY = 85
+
+# model-ready data URLs kept in memory, least recently used ones are evicted first
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# data URLs of downscaled images are also kept on disk, empty disables it
+DISK_CACHE_DIR = "tmp/vision_cache"
+DISK_CACHE_MAX_FILES = 500
+
+_cache: OrderedDict[str, str] = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
 
 def prepare_content(content: Any) -> Any:
     if isinstance(content, list):
@@ -29,6 +50,46 @@ def prepare_content(content: Any) -> Any:
     return {key: prepare_content(value) for key, value in content.items()}
 
 
+async def preload(contents: Iterable[Any]) -> None:
+    """Read and encode local images of contents missing from the memory cache in a
+    worker thread, so prepare_content on the event loop only hits the cache."""
+    missing = []
+    for content in contents:
+        for url in _local_refs(content):
+            try:
+                if _get_cached(_cache_key(resolve_ref(url))) is None:
+                    missing.append(url)
+            except (OSError, ValueError):
+                pass  # prepare_content raises it where it did before
+    if missing:
+        await asyncio.to_thread(lambda: [to_data_url(url) for url in missing])
+
+
+def _local_refs(content: Any) -> Iterator[str]:
+    if isinstance(content, list):
+        for item in content:
+            yield from _local_refs(item)
+        return
+    if not isinstance(content, dict):
+        return
+    if content.get("type") == "image_url":
+        image_url = content.get("image_url")
+        url = image_url.get("url", "") if isinstance(image_url, dict) else image_url
+        url = str(url or "").strip()
+        if is_local_ref(url):
+            yield url
+            return
+    for value in content.values():
+        yield from _local_refs(value)
+
+
+def get_max_edge() -> int:
+    """The vision_max_edge setting, 0 when local images are sent unscaled."""
+    from helpers import settings
+
+    return max(0, int(settings.get_settings().get("vision_max_edge", VISION_MAX_EDGE) or 0))
+
+
 def is_local_ref(url: str) -> bool:
     if not url:
         return False
@@ -39,12 +100,128 @@ def is_local_ref(url: str) -> bool:
 
 
 def to_data_url(url: str) -> str:
+    """Data URL of a local image as sent to the model.
+
+    Cached by path, modification time and size, so images kept in the history
+    are read, scaled and encoded once instead of on every model call.
+    """
     path = resolve_ref(url)
+    mime_type = _mime_type(path)
+    max_edge = get_max_edge()
+    key = _cache_key(path, max_edge)
+    data_url = _get_cached(key)
+    if data_url is None:
+        data_url = _read_disk_cache(key)
+        if data_url is None:
+            data_url, scaled = _encode_image(path.read_bytes(), mime_type, max_edge)
+            if scaled:
+                _write_disk_cache(key, data_url)
+        _set_cached(key, data_url)
+    return data_url
+
+
+def _mime_type(path: Path) -> str:
     mime_type = mimetypes.guess_type(path.name)[0]
     if not mime_type or not mime_type.startswith("image/"):
         raise ValueError(f"Image attachment must have an image MIME type: {path}")
-    encoded = base64.b64encode(path.read_bytes()).decode("utf-8")
-    return f"data:{mime_type};base64,{encoded}"
+    return mime_type
+
+
+def _cache_key(path: Path, max_edge: int | None = None) -> str:
+    if max_edge is None:
+        max_edge = get_max_edge()
+    stat = path.stat()
+    return f"{path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}:{max_edge}:{VISION_QUALITY}"
+
+
+def _encode_image(data: bytes, mime_type: str, max_edge: int) -> tuple[str, bool]:
+    scaled = _scale_image(data, max_edge)
+    if scaled is not None:
+        data, mime_type = scaled, "image/jpeg"
+    encoded = base64.b64encode(data).decode("utf-8")
+    return f"data:{mime_type};base64,{encoded}", scaled is not None
+
+
+def _scale_image(data: bytes, max_edge: int) -> bytes | None:
+    """JPEG of an image larger than max_edge scaled down to it, None otherwise."""
+    if max_edge <= 0:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+        longest = max(width, height)
+        if longest <= max_edge:
+            return None
+        max_pixels = int(width * height * (max_edge / longest) ** 2)
+        return compress_image(data, max_pixels=max_pixels, quality=VISION_QUALITY)
+    except Exception:
+        # formats PIL cannot read or save as JPEG are sent unchanged
+        return None
+
+
+def _get_cached(key: str) -> str | None:
+    with _cache_lock:
+        data_url = _cache.get(key)
+        if data_url is not None:
+            _cache.move_to_end(key)
+        return data_url
+
+
+def _set_cached(key: str, data_url: str) -> None:
+    global _cache_bytes
+    with _cache_lock:
+        previous = _cache.pop(key, None)
+        if previous is not None:
+            _cache_bytes -= len(previous)
+        _cache[key] = data_url
+        _cache_bytes += len(data_url)
+        while _cache_bytes > CACHE_MAX_BYTES and len(_cache) > 1:
+            _old_key, old = _cache.popitem(last=False)
+            _cache_bytes -= len(old)
+
+
+def clear_cache() -> None:
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def _disk_cache_path(key: str) -> Path | None:
+    if not DISK_CACHE_DIR:
+        return None
+    from helpers import files
+
+    name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return Path(files.get_abs_path(DISK_CACHE_DIR, f"{name}.txt"))
+
+
+def _read_disk_cache(key: str) -> str | None:
+    path = _disk_cache_path(key)
+    if path is None:
+        return None
+    try:
+        data_url = path.read_text(encoding="utf-8")
+        os.utime(path)  # the oldest files are pruned first
+        return data_url
+    except OSError:
+        return None
+
+
+def _write_disk_cache(key: str, data_url: str) -> None:
+    path = _disk_cache_path(key)
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_path.write_text(data_url, encoding="utf-8")
+        os.replace(temp_path, path)
+        entries = sorted(path.parent.glob("*.txt"), key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries[: max(0, len(entries) - DISK_CACHE_MAX_FILES)]:
+            entry.unlink(missing_ok=True)
+    except OSError:
+        pass
 
 
 def resolve_ref(url: str) -> Path:
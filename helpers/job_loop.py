@@ -16,22 +16,33 @@ pause_time = 0
 async def run_loop():
     global pause_time, keep_running
 
+    # scheduled tasks run as soon as they are due, everything else every SLEEP_TIME
+    scheduler = TaskScheduler.get()
+    next_tick = 0.0
     while True:
-        if runtime.is_development():
-            # Signal to container that the job loop should be paused
-            # if we are runing a development instance to avoid duble-running the jobs
-            try:
-                await runtime.call_development_function(pause_loop)
-            except Exception as e:
-                PrintStyle().error("Failed to pause job loop by development instance: " + errors.error_text(e))
-        if not keep_running and (time.time() - pause_time) > (SLEEP_TIME * 2):
-            resume_loop()
-        if keep_running:
+        if time.monotonic() >= next_tick:
+            next_tick = time.monotonic() + SLEEP_TIME
+            if runtime.is_development():
+                # Signal to container that the job loop should be paused
+                # if we are runing a development instance to avoid duble-running the jobs
+                try:
+                    await runtime.call_development_function(pause_loop)
+                except Exception as e:
+                    PrintStyle().error("Failed to pause job loop by development instance: " + errors.error_text(e))
+            if not keep_running and (time.time() - pause_time) > (SLEEP_TIME * 2):
+                resume_loop()
+            if keep_running:
+                try:
+                    await scheduler_tick()
+                except Exception as e:
+                    PrintStyle().error(errors.format_error(e))
+        elif keep_running:
             try:
-                await scheduler_tick()
+                await scheduler.tick()
             except Exception as e:
                 PrintStyle().error(errors.format_error(e))
-        await asyncio.sleep(SLEEP_TIME)  # TODO! - if we lower it under 1min, it can run a 5min job multiple times in it's target minute
+        # wakes up early when a task is added or rescheduled to an earlier time
+        await scheduler.wait_until_due(max(0.0, next_tick - time.monotonic()))
 
 
 async def scheduler_tick():
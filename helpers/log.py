@@ -4,10 +4,11 @@ import threading
 import time
 import uuid
 from collections import OrderedDict
-from dataclasses import dataclass
-from typing import Any, Literal, Optional, TYPE_CHECKING, TypeVar, cast
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Literal, Optional, TYPE_CHECKING, TypeVar, cast
 
-from helpers.secrets import get_secrets_manager
+from helpers.secrets import SecretsMatcher, get_secrets_manager
 from helpers.strings import truncate_text_by_ratio
 
 
@@ -19,14 +20,14 @@ _MARK_DIRTY_ALL = None
 _MARK_DIRTY_FOR_CONTEXT = None
 
 
-def _lazy_mark_dirty_all(*, reason: str | None = None) -> None:
+def _lazy_mark_dirty_all(*, reason: str | None = None, context_id: str | None = None) -> None:
     # Lazy import to avoid circular import at module load time (AgentContext -> Log).
     global _MARK_DIRTY_ALL
     if _MARK_DIRTY_ALL is None:
         from helpers.state_monitor_integration import mark_dirty_all
 
         _MARK_DIRTY_ALL = mark_dirty_all
-    _MARK_DIRTY_ALL(reason=reason)
+    _MARK_DIRTY_ALL(reason=reason, context_id=context_id)
 
 
 def _lazy_mark_dirty_for_context(context_id: str, *, reason: str | None = None) -> None:
@@ -143,19 +144,76 @@ def _truncate_content(text: str | None, type: Type) -> str:
     return truncated
 
 
+class _MaskedStream:
+    """Masked text of a streamed log field, kept as a list of chunks.
+
+    Only the tail that may still turn into a secret is re-scanned per chunk,
+    the settled prefix is masked once and joined only when the text is read.
+    """
+
+    def __init__(self, matcher: SecretsMatcher, base: str):
+        self.matcher = matcher
+        self.parts: list[str] = []
+        self.tail = base
+        self.version = 0
+        self.output: Any = None  # last value written to the item
+
+    def append(self, chunk: str) -> "_MaskedStream":
+        self.tail += chunk
+        settled, length = self.matcher.sub_stable(self.tail)
+        if length:
+            self.parts.append(settled)
+            self.tail = self.tail[length:]
+        self.version += 1
+        return self
+
+    def text(self) -> str:
+        return "".join(self.parts) + self.matcher.sub(self.tail)
+
+
+class _StreamedContent:
+    """Descriptor for LogItem.content.
+
+    Streamed content is appended as chunks and only joined and truncated when read,
+    assigning a value ends the stream.
+    """
+
+    def __get__(self, obj: "LogItem | None", objtype: Any = None) -> str:
+        if obj is None:
+            return ""
+        stream = obj._streams.get("content")
+        if stream is not None:
+            with obj.log._lock:
+                key = (stream, stream.version, obj.type)
+                if obj.__dict__.get("_content_key") != key:
+                    obj.__dict__["_content"] = _truncate_content(stream.text(), obj.type)
+                    obj.__dict__["_content_key"] = key
+        return obj.__dict__.get("_content", "")
+
+    def __set__(self, obj: "LogItem", value: str) -> None:
+        obj.__dict__["_content"] = value
+        obj.__dict__.pop("_content_key", None)
+        streams = obj.__dict__.get("_streams")
+        if streams:
+            streams.pop("content", None)
+
+
 @dataclass
 class LogItem:
     log: "Log"
     no: int
     type: Type
     heading: str = ""
-    content: str = ""
+    content: str = _StreamedContent()  # type: ignore[assignment]
     update_progress: Optional[ProgressUpdate] = "persistent"
     kvps: Optional[OrderedDict] = None  # Use OrderedDict for kvps
     id: Optional[str] = None  # Add id field
     guid: str = ""
     timestamp: float = 0.0
     agentno: int = 0
+    _streams: dict[str, _MaskedStream] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
         self.guid = self.log.guid
@@ -187,14 +245,8 @@ class LogItem:
         content: str | None = None,
         **kwargs,
     ):
-        if heading is not None:
-            self.update(heading=self.heading + heading)
-        if content is not None:
-            self.update(content=self.content + content)
-
-        for k, v in kwargs.items():
-            prev = self.kvps.get(k, "") if self.kvps else ""
-            self.update(**{k: prev + v})
+        if self.guid == self.log.guid:
+            self.log._stream_item(self.no, heading=heading, content=content, **kwargs)
 
     def output(self):
         return {
@@ -209,6 +261,34 @@ class LogItem:
         }
 
 
+def _unmasked(obj: T) -> T:
+    return obj
+
+
+def _kvp(item: LogItem, key: str) -> Any:
+    return item.kvps.get(key, "") if item.kvps else ""
+
+
+def _append_stream(
+    item: LogItem,
+    name: str,
+    current: Callable[[], Any],
+    chunk: str,
+    matcher: SecretsMatcher,
+) -> _MaskedStream:
+    state = item._streams.get(name)
+    if (
+        state is None
+        or state.matcher is not matcher
+        # assigning content drops its stream, other fields are compared
+        or (name != "content" and state.output != current())
+    ):
+        # First chunk, secrets reloaded or the field was changed by a regular update
+        state = _MaskedStream(matcher, current())
+        item._streams[name] = state
+    return state.append(chunk)
+
+
 @dataclass(frozen=True)
 class LogOutput:
     items: list[dict[str, Any]]
@@ -222,7 +302,9 @@ class Log:
         self._lock = threading.RLock()
         self.context: "AgentContext|None" = None  # set from outside
         self.guid: str = str(uuid.uuid4())
-        self.updates: list[int] = []
+        self.version: int = 0
+        # item no -> version of its last update, least recently updated first
+        self._versions: OrderedDict[int, int] = OrderedDict()
         self.logs: list[LogItem] = []
         self.progress: str = ""
         self.progress_no: int = 0
@@ -282,6 +364,7 @@ class Log:
         update_progress: ProgressUpdate | None = None,
         id: Optional[str] = None,
         notify_state_monitor: bool = True,
+        mask: bool = True,
         **kwargs,
     ):
         # Capture the effective type for truncation without holding the lock during
@@ -290,25 +373,27 @@ class Log:
             current_type = self.logs[no].type
         type_for_truncation = type if type is not None else current_type
 
+        masker = self._mask_recursive if mask else _unmasked
+
         heading_out: str | None = None
         if heading is not None:
-            heading_out = _truncate_heading(self._mask_recursive(heading))
+            heading_out = _truncate_heading(masker(heading))
 
         content_out: str | None = None
         if content is not None:
-            content_out = _truncate_content(self._mask_recursive(content), type_for_truncation)
+            content_out = _truncate_content(masker(content), type_for_truncation)
 
         kvps_out: OrderedDict | None = None
         if kvps is not None:
             kvps_out_tmp = OrderedDict(copy.deepcopy(kvps))
-            kvps_out_tmp = self._mask_recursive(kvps_out_tmp)
+            kvps_out_tmp = masker(kvps_out_tmp)
             kvps_out_tmp = _truncate_value(kvps_out_tmp)
             kvps_out = OrderedDict(kvps_out_tmp)
 
         kwargs_out: dict | None = None
         if kwargs:
             kwargs_out = copy.deepcopy(kwargs)
-            kwargs_out = self._mask_recursive(kwargs_out)
+            kwargs_out = masker(kwargs_out)
 
         with self._lock:
             item = self.logs[no]
@@ -338,7 +423,7 @@ class Log:
                     item.kvps = OrderedDict()
                 item.kvps.update(kwargs_out)
 
-            self.updates.append(item.no)
+            self._mark_updated(item.no)
 
             if item.heading and item.update_progress != "none":
                 if item.no >= self.progress_no:
@@ -350,6 +435,57 @@ class Log:
         if notify_state_monitor:
             self._notify_state_monitor_for_context_update()
 
+    def _stream_item(
+        self,
+        no: int,
+        heading: str | None = None,
+        content: str | None = None,
+        **kwargs,
+    ):
+        # Append chunks to item fields, masking only the new text instead of
+        # re-masking the whole accumulated value on every chunk. Content is kept
+        # as chunks and joined only when read.
+        matcher = self._get_matcher()
+        values: dict[str, Any] = {}
+        with self._lock:
+            item = self.logs[no]
+            if matcher is None:
+                # Masking unavailable, fall back to full updates
+                if heading is not None:
+                    values["heading"] = item.heading + heading
+                if content is not None:
+                    values["content"] = item.content + content
+                for k, v in kwargs.items():
+                    values[k] = _kvp(item, k) + v
+            else:
+                if heading is not None:
+                    values["heading"] = _append_stream(
+                        item, "heading", lambda: item.heading, heading, matcher
+                    ).text()
+                if content is not None:
+                    _append_stream(item, "content", lambda: item.content, content, matcher)
+                for k, v in kwargs.items():
+                    values[k] = _append_stream(
+                        item, "kvps." + k, partial(_kvp, item, k), v, matcher
+                    ).text()
+
+        self._update_item(no, mask=matcher is None, **values)
+
+        if matcher is not None:
+            with self._lock:
+                if heading is not None and "heading" in item._streams:
+                    item._streams["heading"].output = item.heading
+                for k in kwargs:
+                    state = item._streams.get("kvps." + k)
+                    if state is not None and item.kvps is not None:
+                        state.output = item.kvps.get(k)
+
+    def _mark_updated(self, no: int):
+        # Record a new log version for the item, keeping items ordered by last update
+        self.version += 1
+        self._versions[no] = self.version
+        self._versions.move_to_end(no)
+
     def _notify_state_monitor(self) -> None:
         ctx = self.context
         if not ctx:
@@ -357,7 +493,8 @@ class Log:
         # Logs update both the active chat stream (sid-bound) and the global chats list
         # (context metadata like last_message/log_version). Broadcast so all tabs refresh
         # their chat/task lists without leaking logs (logs are still scoped per-sid).
-        _lazy_mark_dirty_all(reason="log.Log._notify_state_monitor")
+        # Only this context's list entry changed, the shared list rebuilds just that.
+        _lazy_mark_dirty_all(reason="log.Log._notify_state_monitor", context_id=ctx.id)
 
     def _notify_state_monitor_for_context_update(self) -> None:
         ctx = self.context
@@ -393,29 +530,38 @@ class Log:
         self.set_progress("Waiting for input", 0, False)
 
     def output(self, start=None, end=None):
+        """Return items whose last update falls after version start (and up to end),
+        in item order. Only the changed items are visited."""
         with self._lock:
             if start is None:
                 start = 0
             if end is None:
-                end = len(self.updates)
-            updates = self.updates[start:end]
-            logs = list(self.logs)
-
-        out = []
-        seen = set()
-        for update in updates:
-            if update not in seen and update < len(logs):
-                out.append(logs[update].output())
-                seen.add(update)
+                end = self.version
+            changed = []
+            for no, version in reversed(self._versions.items()):
+                if version <= start:
+                    break
+                if version <= end and no < len(self.logs):
+                    changed.append(no)
+            out = [self.logs[no].output() for no in sorted(changed)]
         return LogOutput(items=out, start=start, end=end)
 
     def reset(self):
         with self._lock:
             self.guid = str(uuid.uuid4())
-            self.updates = []
+            self.version = 0
+            self._versions = OrderedDict()
             self.logs = []
         self.set_initial_progress()
 
+    def _get_matcher(self) -> SecretsMatcher | None:
+        try:
+            from agent import AgentContext
+            secrets_mgr = get_secrets_manager(self.context or AgentContext.current())
+            return secrets_mgr.get_matcher()
+        except Exception:
+            return None
+
     def _mask_recursive(self, obj: T) -> T:
         """Recursively mask secrets in nested objects."""
         try:
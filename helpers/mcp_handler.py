@@ -17,6 +17,9 @@ from typing import (
 )
 import threading
 import asyncio
+import atexit
+import time
+import weakref
 from contextlib import AsyncExitStack
 from shutil import which
 from datetime import timedelta
@@ -24,6 +27,7 @@ import json
 from helpers import errors
 from helpers import settings
 from helpers.log import LogItem
+from helpers.defer import EventLoopThread
 
 import httpx
 
@@ -31,8 +35,9 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 from mcp.shared.message import SessionMessage
-from mcp.types import CallToolResult, ListToolsResult
+from mcp.types import CONNECTION_CLOSED, CallToolResult, ListToolsResult
 from anyio.streams.memory import (
     MemoryObjectReceiveStream,
     MemoryObjectSendStream,
@@ -262,8 +267,13 @@ class MCPServerRemote(BaseModel):
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # not awaited under the lock, calls share the pooled session concurrently
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    def close(self):
+        """Close the pooled session, the next call reconnects"""
+        self.__client.close()  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerRemote":
         with self.__lock:
@@ -286,6 +296,9 @@ class MCPServerRemote(BaseModel):
                         key = "url"  # remap serverUrl to url
 
                     setattr(self, key, value)
+            # reconnect with the new settings
+            self.__client.close()  # type: ignore
+            _tools_changed()
             return self
 
     async def initialize(self) -> "MCPServerRemote":
@@ -340,8 +353,13 @@ class MCPServerLocal(BaseModel):
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # not awaited under the lock, calls share the pooled session concurrently
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    def close(self):
+        """Close the pooled session, the next call reconnects"""
+        self.__client.close()  # type: ignore
 
     def update(self, config: dict[str, Any]) -> "MCPServerLocal":
         with self.__lock:
@@ -362,6 +380,9 @@ class MCPServerLocal(BaseModel):
                     if key == "name":
                         value = normalize_name(value)
                     setattr(self, key, value)
+            # reconnect with the new settings
+            self.__client.close()  # type: ignore
+            _tools_changed()
             return self
 
     async def initialize(self) -> "MCPServerLocal":
@@ -378,6 +399,15 @@ MCPServer = Annotated[
 ]
 
 
+# bumped whenever the configured servers or their tool lists change
+_tools_version = 0
+
+
+def _tools_changed():
+    global _tools_version
+    _tools_version += 1
+
+
 class MCPConfig(BaseModel):
     servers: list[MCPServer] = Field(default_factory=list)
     disconnected_servers: list[dict[str, Any]] = Field(default_factory=list)
@@ -392,6 +422,11 @@ class MCPConfig(BaseModel):
             cls.__instance = cls(servers_list=[])
         return cls.__instance
 
+    @classmethod
+    def get_tools_version(cls) -> int:
+        """Version of the servers and tool lists, changes whenever get_tools_prompt may change"""
+        return _tools_version
+
     @classmethod
     def wait_for_lock(cls):
         with cls.__lock:
@@ -473,6 +508,10 @@ class MCPConfig(BaseModel):
                 "servers": servers_data
             }  # Prepare data for re-initialization or update
 
+            # sessions of the replaced servers are not reused
+            for server in instance.servers:
+                server.close()
+
             # Option 1: Re-initialize the existing instance (if __init__ is idempotent for other fields)
             instance.__init__(servers_list=servers_data)
 
@@ -534,6 +573,7 @@ class MCPConfig(BaseModel):
         self.servers = []
         # initialize failed servers list
         self.disconnected_servers = []
+        _tools_changed()
 
         if not isinstance(servers_list, Iterable):
             (
@@ -799,19 +839,216 @@ class MCPConfig(BaseModel):
             raise ValueError(f"Tool {tool_name} not found")
         server_name_part, tool_name_part = tool_name.split(".")
         with self.__lock:
-            for server in self.servers:
-                if server.name == server_name_part and server.has_tool(tool_name_part):
-                    return await server.call_tool(tool_name_part, input_data)
+            server = next(
+                (
+                    server
+                    for server in self.servers
+                    if server.name == server_name_part and server.has_tool(tool_name_part)
+                ),
+                None,
+            )
+        if server is None:
             raise ValueError(f"Tool {tool_name} not found")
+        return await server.call_tool(tool_name_part, input_data)
 
 
 T = TypeVar("T")
 
+# pooled sessions live on their own event loop thread, so agents running on
+# different loops can share them
+SESSION_LOOP_THREAD = "MCPSessions"
+# close a session nobody used for this many seconds
+SESSION_IDLE_TIMEOUT = 300.0
+# ping a session idle for this many seconds before reusing it
+SESSION_PING_INTERVAL = 30.0
+# operations in flight on one session
+SESSION_MAX_CONCURRENCY = 8
+
+
+class MCPSessionManager:
+    """
+    Long-lived MCP session of one server.
+    Opened lazily by the first operation, shared by up to max_concurrency
+    operations at a time, pinged before reuse after being idle, closed after
+    idle_timeout and reopened once the transport breaks.
+    """
+
+    def __init__(
+        self,
+        client: "MCPClientBase",
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        ping_interval: float = SESSION_PING_INTERVAL,
+        max_concurrency: int = SESSION_MAX_CONCURRENCY,
+    ):
+        self.client = client
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.max_concurrency = max_concurrency
+        self.connects = 0  # sessions opened so far
+        # everything below is only touched on the session loop
+        self._session: Optional[ClientSession] = None
+        self._owner: Optional[asyncio.Task] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight = 0
+        self._last_used = 0.0
+        _session_managers.add(self)
+
+    async def run(
+        self,
+        coro_func: Callable[[ClientSession], Awaitable[T]],
+        read_timeout_seconds: float = 60,
+    ) -> T:
+        """Run coro_func with the session, from any event loop"""
+        future = EventLoopThread(SESSION_LOOP_THREAD).run_coroutine(
+            self._run(coro_func, read_timeout_seconds)
+        )
+        return await asyncio.wrap_future(future)
+
+    def is_open(self) -> bool:
+        return self._session is not None
+
+    def close(self, wait: bool = False):
+        """Close the session, from any thread"""
+        if self._owner is None:
+            return
+        future = EventLoopThread(SESSION_LOOP_THREAD).run_coroutine(self._close())
+        if wait:
+            future.result(timeout=10)
+
+    async def _run(
+        self,
+        coro_func: Callable[[ClientSession], Awaitable[T]],
+        read_timeout_seconds: float,
+    ) -> T:
+        async with self._slots:
+            session, reused = await self._get_session(read_timeout_seconds)
+            self._in_flight += 1
+            try:
+                return await coro_func(session)
+            except Exception as e:
+                if not _is_connection_error(e):
+                    raise
+                # broken transport, drop the session so the next operation reconnects
+                await self._close(session)
+                if not (reused and _is_send_error(e)):
+                    raise
+                # the request never reached the server, safe to retry once
+                session, _ = await self._get_session(read_timeout_seconds)
+                return await coro_func(session)
+            finally:
+                self._in_flight -= 1
+                self._last_used = time.monotonic()
+
+    async def _get_session(self, read_timeout_seconds: float) -> tuple[ClientSession, bool]:
+        async with self._lock:
+            session = self._session
+            if (
+                session is not None
+                and self._in_flight == 0
+                and time.monotonic() - self._last_used >= self.ping_interval
+            ):
+                try:
+                    await asyncio.wait_for(session.send_ping(), read_timeout_seconds)
+                except Exception:
+                    await self._close(session)
+                    session = None
+            if session is not None:
+                return session, True
+
+            ready: asyncio.Future[ClientSession] = asyncio.get_running_loop().create_future()
+            self._stop = asyncio.Event()
+            self._owner = asyncio.create_task(
+                self._hold_session(ready, self._stop, read_timeout_seconds)
+            )
+            # the owner keeps the session even if this caller is cancelled meanwhile
+            return await asyncio.shield(ready), False
+
+    async def _hold_session(
+        self,
+        ready: "asyncio.Future[ClientSession]",
+        stop: asyncio.Event,
+        read_timeout_seconds: float,
+    ):
+        # transport and session are entered and exited in this one task, as anyio requires
+        session = None
+        try:
+            async with AsyncExitStack() as stack:
+                stdio, write = await self.client._create_stdio_transport(stack)
+                session = await stack.enter_async_context(
+                    ClientSession(
+                        stdio,  # type: ignore
+                        write,  # type: ignore
+                        read_timeout_seconds=timedelta(seconds=read_timeout_seconds),
+                    )
+                )
+                await session.initialize()
+                self._session = session
+                self._last_used = time.monotonic()
+                self.connects += 1
+                ready.set_result(session)
+
+                while not stop.is_set():
+                    try:
+                        await asyncio.wait_for(stop.wait(), self.idle_timeout)
+                    except asyncio.TimeoutError:
+                        idle = time.monotonic() - self._last_used
+                        if self._in_flight == 0 and idle >= self.idle_timeout:
+                            break
+        except Exception as e:
+            excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
+            error = excs[0] if excs else e
+            if not ready.done():
+                ready.set_exception(error)
+        finally:
+            if not ready.done():
+                ready.set_exception(ConnectionError("MCP session closed during startup"))
+            if session is not None and self._session is session:
+                self._session = None
+
+    async def _close(self, session: Optional[ClientSession] = None):
+        if session is not None and session is not self._session:
+            return  # already replaced
+        owner, stop = self._owner, self._stop
+        self._session = None
+        self._owner = None
+        if stop:
+            stop.set()
+        if owner and owner is not asyncio.current_task():
+            await asyncio.wait({owner}, timeout=10)
+
+
+def _is_connection_error(e: Exception) -> bool:
+    # errors returned by the server keep the session usable, timeouts included
+    if isinstance(e, McpError):
+        return e.error.code == CONNECTION_CLOSED
+    return not isinstance(e, (ValueError, TypeError))
+
+
+def _is_send_error(e: Exception) -> bool:
+    import anyio
+
+    return isinstance(e, (anyio.ClosedResourceError, anyio.BrokenResourceError))
+
+
+_session_managers: "weakref.WeakSet[MCPSessionManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_sessions():
+    # stop local server processes with the app
+    for manager in list(_session_managers):
+        try:
+            manager.close(wait=True)
+        except Exception:
+            pass
+
 
 class MCPClientBase(ABC):
     # server: Union[MCPServerLocal, MCPServerRemote] # Defined in __init__
     # tools: List[dict[str, Any]] # Defined in __init__
-    # No self.session, self.exit_stack, self.stdio, self.write as persistent instance fields
+    # sessions: MCPSessionManager # Defined in __init__, owns the transport and session
 
     __lock: ClassVar[threading.Lock] = threading.Lock()
 
@@ -821,6 +1058,7 @@ class MCPClientBase(ABC):
         self.error: str = ""
         self.log: List[str] = []
         self.log_file: Optional[TextIO] = None
+        self.sessions = MCPSessionManager(self)
 
     # Protected method
     @abstractmethod
@@ -839,62 +1077,23 @@ class MCPClientBase(ABC):
         read_timeout_seconds=60,
     ) -> T:
         """
-        Manages the lifecycle of an MCP session for a single operation.
-        Creates a temporary session, executes coro_func with it, and ensures cleanup.
+        Runs coro_func with the pooled session of this server.
+        The session is opened on first use and reused by later operations.
         """
         operation_name = coro_func.__name__  # For logging
-        # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Creating new session for operation '{operation_name}'...")
-        # Store the original exception outside the async block
-        original_exception = None
         try:
-            async with AsyncExitStack() as temp_stack:
-                try:
-
-                    stdio, write = await self._create_stdio_transport(temp_stack)
-                    # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name} - {operation_name}): Transport created. Initializing session...")
-                    session = await temp_stack.enter_async_context(
-                        ClientSession(
-                            stdio,  # type: ignore
-                            write,  # type: ignore
-                            read_timeout_seconds=timedelta(
-                                seconds=read_timeout_seconds
-                            ),
-                        )
-                    )
-                    await session.initialize()
-
-                    result = await coro_func(session)
-
-                    return result
-                except Exception as e:
-                    # Store the original exception and raise a dummy exception
-                    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
-                    if excs:
-                        original_exception = excs[0]
-                    else:
-                        original_exception = e
-                    # Create a dummy exception to break out of the async block
-                    raise RuntimeError("Dummy exception to break out of async block")
+            return await self.sessions.run(coro_func, read_timeout_seconds)
         except Exception as e:
-            # Check if this is our dummy exception
-            if original_exception is not None:
-                e = original_exception
-            # We have the original exception stored
             PrintStyle(
                 background_color="#AA4455", font_color="white", padding=False
             ).print(
                 f"MCPClientBase ({self.server.name} - {operation_name}): Error during operation: {type(e).__name__}: {e}"
             )
-            raise e  # Re-raise the original exception
-        # finally:
-        #     PrintStyle(font_color="cyan").print(
-        #         f"MCPClientBase ({self.server.name} - {operation_name}): Session and transport will be closed by AsyncExitStack."
-        #     )
-        # This line should ideally be unreachable if the try/except/finally logic within the 'async with' is exhaustive.
-        # Adding it to satisfy linters that might not fully trace the raise/return paths through async context managers.
-        raise RuntimeError(
-            f"MCPClientBase ({self.server.name} - {operation_name}): _execute_with_session exited 'async with' block unexpectedly."
-        )
+            raise e
+
+    def close(self):
+        """Close the pooled session, the next operation reconnects"""
+        self.sessions.close()
 
     async def update_tools(self) -> "MCPClientBase":
         # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Starting 'update_tools' operation...")
@@ -910,6 +1109,7 @@ class MCPClientBase(ABC):
                     }
                     for tool in response.tools
                 ]
+                _tools_changed()
             PrintStyle(font_color="green").print(
                 f"MCPClientBase ({self.server.name}): Tools updated. Found {len(self.tools)} tools."
             )
@@ -932,6 +1132,7 @@ class MCPClientBase(ABC):
             )
             with self.__lock:
                 self.tools = []  # Ensure tools are cleared on failure
+                _tools_changed()
                 self.error = f"Failed to initialize. {error_text[:200]}{'...' if len(error_text) > 200 else ''}"  # store error from tools fetch
         return self
 
@@ -1,9 +1,14 @@
 from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+import os
+import threading
+from typing import Any, Callable
 import uuid
+import weakref
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
 from helpers import files, history
+from helpers.strings import sanitize_string
 import json
 from initialize import initialize_agent
 
@@ -13,6 +18,50 @@ CHATS_FOLDER = "usr/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
 
+# Chat folder layout: chat.json holds the context and its log, history.json the
+# agents with their histories. Saves append the changes since the last save to
+# chat.journal and history.journal as JSON lines, tagged with the generation of
+# the snapshot they apply to. A snapshot is rewritten and its journal emptied
+# once the journal grows past JOURNAL_COMPACT_SIZE.
+CHAT_JOURNAL_FILE_NAME = "chat.journal"
+HISTORY_FILE_NAME = "history.json"
+HISTORY_JOURNAL_FILE_NAME = "history.journal"
+JOURNAL_COMPACT_SIZE = 1024 * 1024
+STORAGE_FORMAT = 2
+
+
+@dataclass
+class _HistoryCursor:
+    # what was persisted of an agent's history, new messages are journaled after it
+    history: Callable[[], "history.History | None"]
+    current: Callable[[], "history.Topic | None"]
+    revision: int
+    topics: int
+    count: int
+    last_id: str
+    data: str
+
+
+@dataclass
+class _ChatState:
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    generation: str = ""
+    header: str = ""
+    log_guid: str = ""
+    log_version: int = 0
+    journal_size: int = 0
+    history_generation: str = ""
+    history_journal_size: int = 0
+    agents: list[_HistoryCursor] = field(default_factory=list)
+    # streaming agent number of a chat whose agents are not loaded yet
+    streaming_agent: int = 0
+    # agents of a chat.json saved before history.json existed
+    raw_agents: list[dict[str, Any]] | None = None
+
+
+_states: "weakref.WeakKeyDictionary[AgentContext, _ChatState]" = weakref.WeakKeyDictionary()
+_states_lock = threading.Lock()
+
 
 def get_chat_folder_path(ctxid: str):
     """
@@ -30,16 +79,21 @@ def get_chat_msg_files_folder(ctxid: str):
     return files.get_abs_path(get_chat_folder_path(ctxid), "messages")
 
 def save_tmp_chat(context: AgentContext):
-    """Save context to the chats folder"""
+    """Save context to the chats folder, appending what changed since the last save"""
     # Skip saving BACKGROUND contexts as they should be ephemeral
     if context.type == AgentContextType.BACKGROUND:
         return
 
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    folder = get_chat_folder_path(context.id)
+    state = _get_state(context)
+    with state.lock:
+        os.makedirs(folder, exist_ok=True)
+        # history first, a chat folder is loaded once chat.json exists
+        if context.agents_loaded():
+            _save_agents(context, folder, state)
+        elif state.raw_agents is not None:
+            _save_raw_agents(folder, state)
+        _save_context(context, folder, state)
 
 
 def save_tmp_chats():
@@ -52,22 +106,17 @@ def save_tmp_chats():
 
 
 def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+    """Load all contexts from the chats folder, their agents are loaded on first use"""
     _convert_v080_chats()
     folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
 
     ctxids = []
-    for file in json_files:
+    for folder_name in folders:
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
+            ctx = _load_chat(get_chat_folder_path(folder_name))
             ctxids.append(ctx.id)
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
+            print(f"Error loading chat {_get_chat_file_path(folder_name)}: {e}")
     return ctxids
 
 
@@ -116,19 +165,25 @@ def remove_msg_files(ctxid):
 
 
 def _serialize_context(context: AgentContext):
-    profile = str(
-        getattr(context.config, "profile", None)
-        or getattr(context.agent0.config, "profile", None)
-        or ""
-    )
+    return {
+        **_serialize_header(context),
+        "agents": [_serialize_agent(agent) for agent in _agent_chain(context.agent0)],
+        "log": _serialize_log(context.log),
+    }
 
-    # serialize agents
-    agents = []
-    agent = context.agent0
-    while agent:
-        agents.append(_serialize_agent(agent))
-        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
 
+def _serialize_header(context: AgentContext, state: _ChatState | None = None):
+    # a chat whose agents are not loaded keeps the values it was loaded with
+    if state is None or context.agents_loaded():
+        profile = str(
+            getattr(context.config, "profile", None)
+            or getattr(context.agent0.config, "profile", None)
+            or ""
+        )
+        streaming_agent = context.streaming_agent.number if context.streaming_agent else 0
+    else:
+        profile = str(getattr(context.config, "profile", None) or "")
+        streaming_agent = state.streaming_agent
 
     data = {k: v for k, v in context.data.items() if not k.startswith("_")}
     output_data = {k: v for k, v in context.output_data.items() if not k.startswith("_")}
@@ -147,12 +202,8 @@ def _serialize_context(context: AgentContext):
             if context.last_message
             else datetime.fromtimestamp(0).isoformat()
         ),
-        "agents": agents,
-        "streaming_agent": (
-            context.streaming_agent.number if context.streaming_agent else 0
-        ),
+        "streaming_agent": streaming_agent,
         "agent_profile": profile,
-        "log": _serialize_log(context.log),
         "data": data,
         "output_data": output_data,
     }
@@ -170,6 +221,14 @@ def _serialize_agent(agent: Agent):
     }
 
 
+def _agent_chain(agent: Agent | None) -> list[Agent]:
+    agents = []
+    while agent:
+        agents.append(agent)
+        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    return agents
+
+
 def _serialize_log(log: Log):
     # Guard against concurrent log mutations while serializing.
     with log._lock:
@@ -185,7 +244,7 @@ def _serialize_log(log: Log):
     }
 
 
-def _deserialize_context(data):
+def _deserialize_context(data, agents_loader=None):
     profile = data.get("agent_profile")
     override_settings = {"agent_profile": profile} if profile else None
     config = initialize_agent(override_settings=override_settings)
@@ -213,7 +272,10 @@ def _deserialize_context(data):
         output_data=data.get("output_data", {}),
         # agent0=agent0,
         # streaming_agent=straming_agent,
+        agents_loader=agents_loader,
     )
+    if agents_loader:
+        return context
 
     agents = data.get("agents", [])
     agent0 = _deserialize_agents(agents, config, context)
@@ -291,7 +353,7 @@ def _deserialize_log(data: dict[str, Any]) -> "Log":
                 id=item_data.get("id"),
             )
         )
-        log.updates.append(i)
+        log._mark_updated(i)
         i += 1
 
     return log
@@ -316,3 +378,332 @@ def _safe_json_serialize(obj, **kwargs):
             return False
 
     return json.dumps(obj, default=serializer, **kwargs)
+
+
+def _get_state(context: AgentContext) -> _ChatState:
+    with _states_lock:
+        state = _states.get(context)
+        if state is None:
+            state = _states[context] = _ChatState()
+        return state
+
+
+def _save_context(context: AgentContext, folder: str, state: _ChatState):
+    header_data = _serialize_header(context, state)
+    header = _safe_json_serialize(header_data, ensure_ascii=False)
+    log = context.log
+    chat_path = os.path.join(folder, CHAT_FILE_NAME)
+    journal_path = os.path.join(folder, CHAT_JOURNAL_FILE_NAME)
+
+    if (
+        not state.generation
+        or state.log_guid != log.guid
+        or state.journal_size > JOURNAL_COMPACT_SIZE
+        or not os.path.exists(chat_path)
+    ):
+        with log._lock:
+            log_data = _serialize_log(log)
+            log_version = log.version
+        generation = str(uuid.uuid4())
+        snapshot = {
+            "format": STORAGE_FORMAT,
+            "generation": generation,
+            **header_data,
+            "log": log_data,
+        }
+        _write_atomic(chat_path, _safe_json_serialize(snapshot, ensure_ascii=False))
+        _write_atomic(journal_path, "")
+        state.generation = generation
+        state.log_guid = log_data["guid"]
+        state.journal_size = 0
+    else:
+        output = log.output(start=state.log_version)
+        log_version = output.end
+        record: dict[str, Any] = {"generation": state.generation}
+        if header != state.header:
+            record["context"] = header_data
+        if output.items:
+            record["log"] = output.items
+        if len(record) > 1:
+            state.journal_size += _append_journal(journal_path, record)
+
+    state.header = header
+    state.log_version = log_version
+
+
+def _save_agents(context: AgentContext, folder: str, state: _ChatState):
+    agents = _agent_chain(context.agent0)
+    history_path = os.path.join(folder, HISTORY_FILE_NAME)
+    journal_path = os.path.join(folder, HISTORY_JOURNAL_FILE_NAME)
+    compact = (
+        not state.history_generation
+        or state.history_journal_size > JOURNAL_COMPACT_SIZE
+        or not os.path.exists(history_path)
+    )
+
+    records = []
+    cursors = []
+    for index, agent in enumerate(agents):
+        cursor = state.agents[index] if not compact and index < len(state.agents) else None
+        record, cursor = _agent_changes(agent, cursor)
+        if record:
+            records.append(record)
+        cursors.append(cursor)
+
+    if compact:
+        generation = str(uuid.uuid4())
+        snapshot = {"format": STORAGE_FORMAT, "generation": generation, "agents": records}
+        _write_atomic(history_path, _safe_json_serialize(snapshot, ensure_ascii=False))
+        _write_atomic(journal_path, "")
+        state.history_generation = generation
+        state.history_journal_size = 0
+    elif records or len(agents) != len(state.agents):
+        record = {"generation": state.history_generation, "count": len(agents), "agents": records}
+        state.history_journal_size += _append_journal(journal_path, record)
+
+    state.agents = cursors
+    state.raw_agents = None
+
+
+def _agent_changes(
+    agent: Agent, cursor: _HistoryCursor | None
+) -> tuple[dict[str, Any] | None, _HistoryCursor]:
+    """Journal record of what changed since the cursor, and the cursor after it.
+    Without a cursor the record holds the whole agent."""
+    data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
+    data_json = _safe_json_serialize(data, ensure_ascii=False)
+    hist = agent.history
+    record: dict[str, Any] = {"number": agent.number}
+    if cursor is None or data_json != cursor.data:
+        record["data"] = data
+
+    ops = _history_ops(hist, cursor)
+    if ops is None:
+        history_data = hist.to_dict()
+        record["history"] = history_data
+        topics = len(history_data["topics"])
+        messages = history_data["current"]["messages"]
+        count = len(messages)
+        last_id = messages[-1]["id"] if messages else ""
+    else:
+        topics, count, last_id, ops = ops
+        if ops:
+            record["ops"] = ops
+            record["counter"] = hist.counter
+
+    new_cursor = _HistoryCursor(
+        history=weakref.ref(hist),
+        current=weakref.ref(hist.current),
+        revision=hist.revision,
+        topics=topics,
+        count=count,
+        last_id=last_id,
+        data=data_json,
+    )
+    return (record if cursor is None or len(record) > 1 else None), new_cursor
+
+
+def _loaded_cursor(agent: Agent) -> _HistoryCursor:
+    hist = agent.history
+    messages = hist.current.messages
+    data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
+    return _HistoryCursor(
+        history=weakref.ref(hist),
+        current=weakref.ref(hist.current),
+        revision=hist.revision,
+        topics=len(hist.topics),
+        count=len(messages),
+        last_id=messages[-1].id if messages else "",
+        data=_safe_json_serialize(data, ensure_ascii=False),
+    )
+
+
+def _history_ops(hist: history.History, cursor: _HistoryCursor | None):
+    """Messages added since the cursor as journal ops, None when the history
+    changed in any other way and has to be written whole."""
+    if cursor is None or cursor.history() is not hist or cursor.revision != hist.revision:
+        return None
+    ops: list[list[Any]] = []
+    topic = cursor.current()
+    start = cursor.count
+    if topic is not hist.current:
+        # only new_topic() moved the saved current topic to topics
+        if topic is None or len(hist.topics) != cursor.topics + 1 or hist.topics[-1] is not topic:
+            return None
+        appended = _appended_messages(topic, cursor.count, cursor.last_id)
+        if appended is None:
+            return None
+        if appended[0]:
+            ops.append(["append", appended[0]])
+        ops.append(["new_topic"])
+        topic, start = hist.current, 0
+    elif len(hist.topics) != cursor.topics:
+        return None
+
+    appended = _appended_messages(topic, start, cursor.last_id if start else "")
+    if appended is None:
+        return None
+    messages, count, last_id = appended
+    if messages:
+        ops.append(["append", messages])
+    return len(hist.topics), count, last_id, ops
+
+
+def _appended_messages(topic: history.Topic, start: int, last_id: str):
+    messages = topic.messages
+    count = len(messages)
+    if count < start or (start and messages[start - 1].id != last_id):
+        return None  # messages were removed or replaced
+    return (
+        [message.to_dict() for message in messages[start:count]],
+        count,
+        messages[count - 1].id if count else "",
+    )
+
+
+def _save_raw_agents(folder: str, state: _ChatState):
+    # agents of an older chat.json are moved to history.json without loading them
+    agents = [
+        {
+            "number": agent.get("number", 0),
+            "data": agent.get("data", {}),
+            "history": json.loads(agent["history"]) if agent.get("history") else {},
+        }
+        for agent in state.raw_agents or []
+    ]
+    generation = str(uuid.uuid4())
+    snapshot = {"format": STORAGE_FORMAT, "generation": generation, "agents": agents}
+    _write_atomic(
+        os.path.join(folder, HISTORY_FILE_NAME),
+        _safe_json_serialize(snapshot, ensure_ascii=False),
+    )
+    _write_atomic(os.path.join(folder, HISTORY_JOURNAL_FILE_NAME), "")
+    state.history_generation = generation
+    state.history_journal_size = 0
+    state.raw_agents = None
+
+
+def _load_chat(folder: str) -> AgentContext:
+    data = json.loads(files.read_file(os.path.join(folder, CHAT_FILE_NAME)))
+    raw_agents = data.pop("agents", None)
+    generation = data.get("generation", "")
+    records, journal_size = _read_journal(
+        os.path.join(folder, CHAT_JOURNAL_FILE_NAME), generation
+    )
+
+    log_data = data.get("log") or {}
+    items = {item.get("no", i): item for i, item in enumerate(log_data.get("logs", []))}
+    for record in records:
+        data.update(record.get("context", {}))
+        for item in record.get("log", []):
+            items[item["no"]] = item
+    numbers = sorted(items)[-LOG_SIZE:]
+    data["log"] = {**log_data, "logs": [items[no] for no in numbers]}
+
+    context = _deserialize_context(data, agents_loader=_load_agents)
+    state = _get_state(context)
+    state.generation = generation
+    state.journal_size = journal_size
+    state.streaming_agent = data.get("streaming_agent", 0)
+    state.raw_agents = raw_agents
+    state.header = _safe_json_serialize(_serialize_header(context, state), ensure_ascii=False)
+    state.log_version = context.log.version
+    # items are numbered from zero when loaded, journaling goes on only if they were before
+    if numbers == list(range(len(numbers))):
+        state.log_guid = context.log.guid
+    return context
+
+
+def _load_agents(context: AgentContext) -> tuple[Agent, Agent | None]:
+    state = _get_state(context)
+    with state.lock:
+        try:
+            if state.raw_agents is not None:
+                agents = state.raw_agents
+            else:
+                agents = _read_agents(get_chat_folder_path(context.id), state)
+            agent0 = _deserialize_agents(agents, context.config, context)
+        except Exception as e:
+            print(f"Error loading agents of chat {context.id}: {e}")
+            agents, agent0 = [], Agent(0, context.config, context)
+
+        streaming_agent = agent0
+        while streaming_agent and streaming_agent.number != state.streaming_agent:
+            streaming_agent = streaming_agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+
+        if state.raw_agents is None and agents:
+            state.agents = [_loaded_cursor(agent) for agent in _agent_chain(agent0)]
+        return agent0, streaming_agent
+
+
+def _read_agents(folder: str, state: _ChatState) -> list[dict[str, Any]]:
+    path = os.path.join(folder, HISTORY_FILE_NAME)
+    if not os.path.exists(path):
+        return []
+    data = json.loads(files.read_file(path))
+    generation = data.get("generation", "")
+    records, journal_size = _read_journal(
+        os.path.join(folder, HISTORY_JOURNAL_FILE_NAME), generation
+    )
+
+    agents: list[dict[str, Any]] = data.get("agents", [])
+    for record in records:
+        agents = agents[: record.get("count", len(agents))]
+        for change in record.get("agents", []):
+            agent = next((a for a in agents if a["number"] == change["number"]), None)
+            if agent is None:
+                agent = {"number": change["number"], "data": {}, "history": {}}
+                agents.append(agent)
+            if "data" in change:
+                agent["data"] = change["data"]
+            if "history" in change:
+                agent["history"] = change["history"]
+            for op in change.get("ops", []):
+                _apply_history_op(agent, op)
+            if "counter" in change:
+                agent["history"]["counter"] = change["counter"]
+
+    state.history_generation = generation
+    state.history_journal_size = journal_size
+    return agents
+
+
+def _apply_history_op(agent: dict[str, Any], op: list[Any]):
+    hist = agent["history"] or {"_cls": "History", "counter": 0, "bulks": [], "topics": []}
+    agent["history"] = hist
+    current = hist.setdefault("current", {"_cls": "Topic", "summary": "", "messages": []})
+    if op[0] == "append":
+        current["messages"].extend(op[1])
+    elif op[0] == "new_topic" and current["messages"]:
+        hist["topics"].append(current)
+        hist["current"] = {"_cls": "Topic", "summary": "", "messages": []}
+
+
+def _read_journal(path: str, generation: str) -> tuple[list[dict[str, Any]], int]:
+    """Records of the snapshot generation, and the journal size."""
+    if not generation or not os.path.exists(path):
+        return [], 0
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    for line in content.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Warning: ignoring incomplete chat journal record in '{path}'")
+            break
+        if record.get("generation") == generation:
+            records.append(record)
+    return records, len(content)
+
+
+def _append_journal(path: str, record: dict[str, Any]) -> int:
+    line = sanitize_string(_safe_json_serialize(record, ensure_ascii=False)) + "\n"
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+    return len(line)
+
+
+def _write_atomic(path: str, content: str):
+    files.write_file(path + ".tmp", content)
+    os.replace(path + ".tmp", path)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+import copy
 import re, json, glob
 import time
 from pathlib import Path
@@ -28,6 +29,7 @@ from helpers import (
     watchdog,
     modules,
     functions,
+    prompt_sections,
 )
 from pydantic import BaseModel, Field
 
@@ -65,6 +67,11 @@ HOOKS_CACHE_AREA = "plugin_hooks(plugins)"
 PLUGINS_LIST_CACHE_AREA = "plugins_list(plugins)"
 ENABLED_PLUGINS_LIST_CACHE_AREA = "enabled_plugins(plugins)"
 ENABLED_PLUGINS_PATHS_CACHE_AREA = "enabled_plugins_paths(plugins)"
+CONFIG_CACHE_AREA = "plugin_config:{plugin_name}(plugins)"
+
+# bumped whenever plugin configs or settings may have changed
+_config_version = 0
+_MISSING = object()
 
 
 _last_frontend_reload_notification_at = 0.0
@@ -120,20 +127,32 @@ class PluginUpdateInfo(BaseModel):
 
 def register_watchdogs():
 
-    def on_plugin_change(events: list[WatchItem]):
+    def changed_plugin_names(events: list[WatchItem], innermost: bool = False):
         plugin_names: list[str] = []
         for path, _event in events:
             path = path.replace("\\", "/")
             if "/plugins/" not in path:
                 continue
-            plugin_name = path.split("/plugins/", 1)[1].split("/", 1)[0]
+            parts = path.rsplit("/plugins/", 1) if innermost else path.split("/plugins/", 1)
+            plugin_name = parts[1].split("/", 1)[0]
             if plugin_name and plugin_name not in plugin_names:
                 plugin_names.append(plugin_name)
+        return plugin_names
+
+    def on_plugin_change(events: list[WatchItem]):
+        plugin_names = changed_plugin_names(events)
         print_style.PrintStyle.debug("Plugins watchdog triggered", plugin_names)
         python_change = any(path.endswith('.py') for path, _event in events)
         after_plugin_change(plugin_names or None, python_change=python_change)
 
+    def on_config_change(events: list[WatchItem]):
+        # config files may be nested in other plugins' agent profiles, the innermost plugin owns them
+        plugin_names = changed_plugin_names(events, innermost=True)
+        print_style.PrintStyle.debug("Plugin configs watchdog triggered", plugin_names)
+        clear_plugin_config_cache(plugin_names or None)
+
     relevant_patterns = ["**/extensions/**/*", TOGGLE_FILE_PATTERN, HOOKS_SCRIPT]
+    config_patterns = [CONFIG_FILE_NAME, CONFIG_DEFAULT_FILE_NAME]
 
     # combine relevant patterns with base path
     def expand_patterns(base_path: str):
@@ -149,6 +168,12 @@ def register_watchdogs():
         patterns=[*expand_patterns("*/")],
         handler=on_plugin_change,
     )
+    watchdog.add_watchdog(
+        id="plugins_roots_configs",
+        roots=get_plugin_roots(),
+        patterns=config_patterns,
+        handler=on_config_change,
+    )
 
     from helpers import projects
     from helpers import subagents
@@ -163,6 +188,16 @@ def register_watchdogs():
         ],
         handler=on_plugin_change,
     )
+    watchdog.add_watchdog(
+        id="plugins_projects_configs",
+        roots=[files.get_abs_path(projects.PROJECTS_PARENT_DIR)],
+        patterns=[
+            f"{projects.PROJECT_META_DIR}/plugins/*/{name}" for name in config_patterns
+        ] + [
+            f"{projects.PROJECT_META_DIR}/agents/*/plugins/*/{name}" for name in config_patterns
+        ],
+        handler=on_config_change,
+    )
 
     # add watchdogs for plugin overrides in /agents/plugins and /usr/agents/plugins
     watchdog.add_watchdog(
@@ -174,6 +209,15 @@ def register_watchdogs():
         patterns=[*expand_patterns(f"*/plugins/*/")],
         handler=on_plugin_change,
     )
+    watchdog.add_watchdog(
+        id="plugins_agents_configs",
+        roots=[
+            files.get_abs_path(subagents.DEFAULT_AGENTS_DIR),
+            files.get_abs_path(subagents.USER_AGENTS_DIR),
+        ],
+        patterns=[f"plugins/*/{name}" for name in config_patterns],
+        handler=on_config_change,
+    )
 
 
 @extension.extensible
@@ -201,6 +245,8 @@ def clear_plugin_cache(plugin_names: list[str] | None = None):
     areas = ["*(plugins)*", "*(extensions)*", "*(api)*"]
     for area in areas:
         cache.clear(area)
+    clear_plugin_config_cache()
+    prompt_sections.invalidate()
 
     from helpers.ws_manager import send_data
 
@@ -212,6 +258,25 @@ def clear_plugin_cache(plugin_names: list[str] | None = None):
     )
 
 
+def clear_plugin_config_cache(plugin_names: list[str] | None = None):
+    """Drop cached configs of the given plugins (all when None) and bump the config version."""
+    global _config_version
+    _config_version += 1
+    if plugin_names:
+        for plugin_name in plugin_names:
+            cache.clear(CONFIG_CACHE_AREA.format(plugin_name=plugin_name))
+    else:
+        cache.clear(CONFIG_CACHE_AREA.format(plugin_name="*"))
+
+
+def get_config_version() -> int:
+    """Increases whenever plugin configs or settings may have changed.
+
+    Caches derived from configs can store it and rebuild when it differs.
+    """
+    return _config_version
+
+
 def get_plugin_roots(plugin_name: str = "") -> List[str]:
     """Plugin root directories, ordered by priority (user first)."""
     return [
@@ -586,9 +651,6 @@ def get_plugin_config(
     project_name: str | None = None,
     agent_profile: str | None = None,
 ):
-
-    default_used = False
-
     if project_name is None and agent is not None:
         from helpers import projects
 
@@ -596,6 +658,27 @@ def get_plugin_config(
     if agent_profile is None and agent is not None:
         agent_profile = agent.config.profile
 
+    # configs are cached per location, callers get their own copy to modify
+    area = CONFIG_CACHE_AREA.format(plugin_name=plugin_name)
+    key = (project_name or "", agent_profile or "")
+    result = cache.get(area, key, _MISSING)
+    if result is _MISSING:
+        # read the version first, an invalidation during loading wins
+        version = _config_version
+        result = _load_plugin_config(plugin_name, agent, project_name, agent_profile)
+        if version == _config_version:
+            cache.add(area, key, result)
+    return copy.deepcopy(result)
+
+
+def _load_plugin_config(
+    plugin_name: str,
+    agent: Agent | None,
+    project_name: str | None,
+    agent_profile: str | None,
+):
+    default_used = False
+
     # find config.json in all possible places
     file = find_plugin_asset(
         plugin_name,
@@ -677,6 +760,8 @@ def save_plugin_config(
     # or do standard load
     if new_settings is not None and file_path:
         files.write_file(file_path, json.dumps(new_settings))
+        clear_plugin_config_cache([plugin_name])
+        prompt_sections.invalidate()
         # after_plugin_change([plugin_name]) # don't trigger when only config changes
 
 
@@ -0,0 +1,95 @@
+from typing import TYPE_CHECKING, Any
+
+from helpers import files
+from helpers.extension import Extension
+
+if TYPE_CHECKING:
+    from agent import Agent
+
+# memoized sections by extension class: {name: ((generation, key), text)}
+DATA_NAME_SECTIONS = "_system_prompt_sections"
+
+_generation = 0
+
+
+def invalidate() -> None:
+    """Make all agents rebuild their memoized system prompt sections."""
+    global _generation
+    _generation += 1
+
+
+def get_generation() -> int:
+    return _generation
+
+
+class SystemPromptSection(Extension):
+    """system_prompt extension contributing one section that can be memoized.
+
+    Subclasses implement build(). Returning a key from cache_key() opts into
+    memoization: the agent reuses the previously built text while the key stays
+    the same and invalidate() has not been called since. The key should cover
+    agent state the section depends on (profile, project, tool versions...),
+    while file, settings, secrets and plugin changes call invalidate().
+    """
+
+    async def execute(self, system_prompt: list[str] = [], **kwargs: Any):
+        if not self.agent:
+            return
+        prompt = await self.get_prompt()
+        if prompt:
+            system_prompt.append(prompt)
+
+    def cache_key(self, agent: "Agent") -> Any:
+        return None
+
+    async def build(self, agent: "Agent") -> str:
+        return ""
+
+    async def get_prompt(self) -> str:
+        agent = self.agent
+        assert agent
+        key = self.cache_key(agent)
+        if key is None:
+            return await self.build(agent)
+
+        # read generation before building, a concurrent invalidation wins
+        key = (_generation, key)
+        name = f"{type(self).__module__}.{type(self).__qualname__}"
+        sections: dict[str, tuple[Any, str]] = agent.data.setdefault(
+            DATA_NAME_SECTIONS, {}
+        )
+        cached = sections.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        prompt = await self.build(agent)
+        sections[name] = (key, prompt)
+        return prompt
+
+
+def register_watchdogs():
+    from helpers import watchdog
+    from helpers.print_style import PrintStyle
+
+    def on_sources_change(items: list[watchdog.WatchItem]):
+        PrintStyle.debug("System prompt sources watchdog triggered:", items)
+        invalidate()
+
+    # prompt files outside of prompts folders, skills, agent profiles and project meta files
+    watchdog.add_watchdog(
+        id="system_prompt_sections",
+        roots=[
+            files.get_abs_path("skills"),
+            files.get_abs_path(files.AGENTS_DIR),
+            files.get_abs_path(files.PLUGINS_DIR),
+            files.get_abs_path(files.USER_DIR),
+        ],
+        patterns=[
+            "agent.system.*",
+            "SKILL.md",
+            "agent.yaml",
+            ".a0proj/*",
+            ".a0proj/*/*",
+        ],
+        handler=on_sources_change,
+    )
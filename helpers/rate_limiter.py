@@ -1,57 +1,112 @@
 import asyncio
+import threading
 import time
-from typing import Callable, Awaitable
+from collections import deque
+from typing import Any, Callable, Awaitable
+
+# the timeframe is split into this many buckets, values expire a bucket at a time
+BUCKETS = 60
 
 
 class RateLimiter:
+    """Sliding window limits per key.
+
+    Values are summed into time buckets with a running total per key, so adding
+    and checking are O(1) amortized. wait() sleeps until the oldest buckets
+    that keep a key over its limit expire instead of polling.
+    """
+
+    clock: Callable[[], float] = staticmethod(time.monotonic)
+
     def __init__(self, seconds: int = 60, **limits: int):
         self.timeframe = seconds
+        self.bucket_seconds = seconds / BUCKETS
         self.limits = {key: value if isinstance(value, (int, float)) else 0 for key, value in (limits or {}).items()}
-        self.values = {key: [] for key in self.limits.keys()}
-        self._lock = asyncio.Lock()
+        self.values: dict[str, deque[list[float]]] = {key: deque() for key in self.limits.keys()}
+        self.totals: dict[str, float] = {key: 0 for key in self.limits.keys()}
+        # sync callers run the limiter on their own event loops, so no asyncio lock
+        self._lock = threading.Lock()
 
     def add(self, **kwargs: int):
-        now = time.time()
-        for key, value in kwargs.items():
-            if not key in self.values:
-                self.values[key] = []
-            self.values[key].append((now, value))
+        now = self.clock()
+        bucket = now // self.bucket_seconds
+        with self._lock:
+            for key, value in kwargs.items():
+                if not key in self.values:
+                    self.values[key] = deque()
+                    self.totals[key] = 0
+                buckets = self.values[key]
+                if buckets and buckets[-1][0] == bucket:
+                    buckets[-1][1] += value
+                else:
+                    buckets.append([bucket, value])
+                self.totals[key] += value
 
     async def cleanup(self):
-        async with self._lock:
-            now = time.time()
-            cutoff = now - self.timeframe
-            for key in self.values:
-                self.values[key] = [(t, v) for t, v in self.values[key] if t > cutoff]
+        with self._lock:
+            self._expire(self.clock())
 
     async def get_total(self, key: str) -> int:
-        async with self._lock:
-            if not key in self.values:
-                return 0
-            return sum(value for _, value in self.values[key])
+        with self._lock:
+            self._expire(self.clock())
+            return self.totals.get(key, 0)
+
+    def get_usage(self) -> dict[str, dict[str, Any]]:
+        """Current totals against the limits, utilization is None for unlimited keys."""
+        with self._lock:
+            self._expire(self.clock())
+            usage = {}
+            for key, total in self.totals.items():
+                limit = self.limits.get(key, 0)
+                usage[key] = {
+                    "total": total,
+                    "limit": limit,
+                    "utilization": total / limit if limit > 0 else None,
+                }
+            return usage
+
+    def get_delay(self) -> tuple[float, str, int, int]:
+        """Seconds until all keys are within their limits, with the key that takes longest."""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            result = (0.0, "", 0, 0)
+            for key, limit in self.limits.items():
+                total = self.totals.get(key, 0)
+                if limit <= 0 or total <= limit:  # Skip if no limit set
+                    continue
+                # drop the oldest buckets until the rest fits
+                remaining = total
+                for bucket, value in self.values[key]:
+                    remaining -= value
+                    if remaining <= limit:
+                        break
+                delay = self._expires_at(bucket) - now
+                if delay > result[0]:
+                    result = (delay, key, total, limit)
+            return result
 
     async def wait(
         self,
         callback: Callable[[str, str, int, int], Awaitable[bool]] | None = None,
     ):
         while True:
-            await self.cleanup()
-            should_wait = False
-
-            for key, limit in self.limits.items():
-                if limit <= 0:  # Skip if no limit set
-                    continue
+            delay, key, total, limit = self.get_delay()
+            if delay <= 0:
+                break
 
-                total = await self.get_total(key)
-                if total > limit:
-                    if callback:
-                        msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting..."
-                        should_wait = not await callback(msg, key, total, limit)
-                    else:
-                        should_wait = True
+            if callback:
+                msg = f"Rate limit exceeded for {key} ({total}/{limit}), waiting {delay:.0f}s..."
+                if await callback(msg, key, total, limit):
                     break
 
-            if not should_wait:
-                break
+            # exact wake-up time, never longer than the timeframe plus one bucket
+            await asyncio.sleep(delay)
+
+    def _expires_at(self, bucket: float) -> float:
+        return (bucket + 1) * self.bucket_seconds + self.timeframe
 
-            await asyncio.sleep(1)
+    def _expire(self, now: float):
+        for key, buckets in self.values.items():
+            while buckets and self._expires_at(buckets[0][0]) <= now:
+                self.totals[key] -= buckets.popleft()[1]
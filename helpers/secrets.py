@@ -4,7 +4,7 @@ import time
 import os
 from io import StringIO
 from dataclasses import dataclass
-from typing import Dict, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
+from typing import Dict, Iterable, Iterator, Optional, List, Literal, Set, Callable, Tuple, TYPE_CHECKING
 from dotenv.parser import parse_stream
 from helpers.errors import RepairableException
 from helpers import files
@@ -36,6 +36,124 @@ class EnvLine:
     )
 
 
+class SecretsMatcher:
+    """Single-pass replacement of many secret values at once.
+
+    All values are compiled into one trie-shaped regex, so a text is scanned once
+    regardless of the number of secrets. At each position the longest value wins,
+    values overlapping a match are merged into it and the union is masked.
+    """
+
+    def __init__(self, replacements: Dict[str, str]):
+        # Map secret value -> replacement text, empty values are ignored
+        self.replacements: Dict[str, str] = {
+            v: r for v, r in replacements.items() if isinstance(v, str) and v
+        }
+        self.max_len: int = max((len(v) for v in self.replacements), default=0)
+        self.pattern: Optional[re.Pattern[str]] = (
+            re.compile(self._build_pattern(self.replacements)) if self.replacements else None
+        )
+
+    @staticmethod
+    def _build_pattern(values: Iterable[str]) -> str:
+        # Build a character trie, "" marks the end of a value
+        trie: dict = {}
+        for value in values:
+            node = trie
+            for ch in value:
+                node = node.setdefault(ch, {})
+            node[""] = True
+
+        def build(node: dict) -> str:
+            # Collapse single-child chains iteratively, secrets may be long
+            chain: List[str] = []
+            while "" not in node and len(node) == 1:
+                ch, node = next(iter(node.items()))
+                chain.append(ch)
+            prefix = re.escape("".join(chain))
+            branches = [
+                re.escape(ch) + build(child)
+                for ch, child in sorted(node.items())
+                if ch != ""
+            ]
+            if not branches:
+                return prefix
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            if "" in node:
+                # Greedy optional part prefers the longer value
+                return prefix + "(?:" + body + ")?"
+            return prefix + body
+
+        return build(trie)
+
+    def sub(self, text: str) -> str:
+        """Replace all secret values in text."""
+        if not text or self.pattern is None:
+            return text
+        out: List[str] = []
+        pos = 0
+        for start, end, replacement in self._spans(text):
+            out.append(text[pos:start])
+            out.append(replacement)
+            pos = end
+        out.append(text[pos:])
+        return "".join(out)
+
+    def sub_stable(self, text: str) -> Tuple[str, int]:
+        """Replace secret values in the part of text that appending more text cannot change.
+
+        Returns the replaced part and the number of characters of text it covers;
+        the rest may still turn into a secret and should be kept for later.
+        """
+        if self.pattern is None:
+            return text, len(text)
+        limit = len(text) - self.max_len + 1
+        if limit <= 0:
+            return "", 0
+        out: List[str] = []
+        pos = 0
+        stable = None
+        for start, end, replacement in self._spans(text):
+            # values starting from limit on may still grow and overlap this span
+            if start >= limit or end > limit:
+                stable = max(pos, min(start, limit))
+                break
+            out.append(text[pos:start])
+            out.append(replacement)
+            pos = end
+        if stable is None:
+            stable = max(pos, limit)
+        out.append(text[pos:stable])
+        return "".join(out), stable
+
+    def _spans(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Masked spans with their replacement, overlapping values are merged.
+
+        A value starting inside a match and reaching past it would otherwise stay
+        partly visible, the merged span takes the replacement of the longest value.
+        """
+        assert self.pattern is not None
+        pos = 0
+        while match := self.pattern.search(text, pos):
+            start, end = match.span()
+            value = match.group(0)
+            inner_pos = start + 1
+            while inner_pos < end:
+                inner = self.pattern.match(text, inner_pos)
+                if inner and inner.end() > end:
+                    following = self.pattern.match(text, end)
+                    if following and following.end() >= inner.end():
+                        # the next span masks the rest, e.g. a value repeated back to back
+                        inner_pos += 1
+                        continue
+                    end = inner.end()
+                    if len(inner.group(0)) > len(value):
+                        value = inner.group(0)
+                inner_pos += 1
+            yield start, end, self.replacements[value]
+            pos = end
+
+
 class StreamingSecretsFilter:
     """Stateful streaming filter that masks secrets on the fly.
 
@@ -45,7 +163,12 @@ class StreamingSecretsFilter:
     - On finalize(), any unresolved partial is masked with '***'.
     """
 
-    def __init__(self, key_to_value: Dict[str, str], min_trigger: int = 3):
+    def __init__(
+        self,
+        key_to_value: Dict[str, str],
+        min_trigger: int = 3,
+        matcher: Optional[SecretsMatcher] = None,
+    ):
         self.min_trigger = max(1, int(min_trigger))
         # Map value -> key for placeholder construction
         self.value_to_key: Dict[str, str] = {
@@ -59,20 +182,16 @@ class StreamingSecretsFilter:
             for i in range(self.min_trigger, len(v) + 1):
                 self.prefixes.add(v[:i])
         self.max_len: int = max((len(v) for v in self.secret_values), default=0)
+        self.matcher: SecretsMatcher = matcher or SecretsMatcher(
+            {v: alias_for_key(k) for v, k in self.value_to_key.items()}
+        )
 
         # Internal buffer of pending text that is not safe to flush yet
         self.pending: str = ""
 
     def _replace_full_values(self, text: str) -> str:
         """Replace all full secret values with placeholders in the given text."""
-        # Sort by length desc to avoid partial overlaps
-        for val in sorted(self.secret_values, key=len, reverse=True):
-            if not val:
-                continue
-            key = self.value_to_key.get(val, "")
-            if key:
-                text = text.replace(val, alias_for_key(key))
-        return text
+        return self.matcher.sub(text)
 
     def _longest_suffix_prefix(self, text: str) -> int:
         """Return length of longest suffix of text that is a known secret prefix.
@@ -147,6 +266,9 @@ class SecretsManager:
         self._raw_snapshots: Dict[str, str] = {}
         self._secrets_cache = None
         self._last_raw_text = None
+        # compiled matchers for the currently loaded secrets, see get_matcher
+        self._matchers: Dict[Tuple[int, str], SecretsMatcher] = {}
+        self._matchers_source: Optional[Dict[str, str]] = None
 
     def read_secrets_raw(self) -> str:
         """Read raw secrets file content from local filesystem (same system)."""
@@ -257,7 +379,38 @@ class SecretsManager:
 
     def create_streaming_filter(self) -> "StreamingSecretsFilter":
         """Create a streaming-aware secrets filter snapshotting current secret values."""
-        return StreamingSecretsFilter(self.load_secrets())
+        secrets = self.load_secrets()
+        return StreamingSecretsFilter(secrets, matcher=self._get_matcher(secrets, 0))
+
+    def get_matcher(
+        self, min_length: int = 4, placeholder: str = "§§secret({key})"
+    ) -> SecretsMatcher:
+        """Get a compiled matcher replacing current secret values with placeholders"""
+        return self._get_matcher(self.load_secrets(), min_length, placeholder)
+
+    def _get_matcher(
+        self,
+        secrets: Dict[str, str],
+        min_length: int,
+        placeholder: str = "§§secret({key})",
+    ) -> SecretsMatcher:
+        with self._lock:
+            # Matchers are only valid for the secrets dict they were built from
+            if self._matchers_source is not secrets:
+                self._matchers = {}
+                self._matchers_source = secrets
+            matcher = self._matchers.get((min_length, placeholder))
+            if matcher is None:
+                replacements: Dict[str, str] = {}
+                # Longest first so duplicate values keep the same key as before
+                for key, value in sorted(
+                    secrets.items(), key=lambda x: len(x[1]), reverse=True
+                ):
+                    if value and len(value.strip()) >= min_length:
+                        replacements.setdefault(value, alias_for_key(key, placeholder))
+                matcher = SecretsMatcher(replacements)
+                self._matchers[(min_length, placeholder)] = matcher
+            return matcher
 
     def replace_placeholders(self, text: str) -> str:
         """Replace secret placeholders with actual values"""
@@ -303,17 +456,7 @@ class SecretsManager:
         if not text:
             return text
 
-        secrets = self.load_secrets()
-        result = text
-
-        # Sort by length (longest first) to avoid partial replacements
-        for key, value in sorted(
-            secrets.items(), key=lambda x: len(x[1]), reverse=True
-        ):
-            if value and len(value.strip()) >= min_length:
-                result = result.replace(value, alias_for_key(key, placeholder))
-
-        return result
+        return self.get_matcher(min_length, placeholder).sub(text)
 
     def get_masked_secrets(self) -> str:
         """Get content with values masked for frontend display (preserves comments and unrecognized lines)"""
@@ -352,11 +495,16 @@ class SecretsManager:
             self._secrets_cache = None
             self._raw_snapshots = {}
             self._last_raw_text = None
+            self._matchers = {}
+            self._matchers_source = None
 
     @classmethod
     def _invalidate_all_caches(cls):
+        from helpers import prompt_sections
+
         for instance in cls._instances.values():
             instance.clear_cache()
+        prompt_sections.invalidate()
 
     # ---------------- Internal helpers for parsing/merging ----------------
 
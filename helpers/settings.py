@@ -1,4 +1,5 @@
 import base64
+import copy
 import hashlib
 import json
 import os
@@ -7,11 +8,11 @@ import subprocess
 from typing import Any, Literal, TypedDict, cast, TypeVar
 
 import models
-from helpers import runtime, whisper, defer, git, subagents
+from helpers import runtime, whisper, defer, git, subagents, prompt_sections, images
 from . import files, dotenv
 from helpers.print_style import PrintStyle
 from helpers.providers import get_providers, FieldOption as ProvidersFO
-from helpers.secrets import get_default_secrets_manager
+from helpers.secrets import DEFAULT_SECRETS_FILE, get_default_secrets_manager
 from helpers import dirty_json
 from helpers.notification import NotificationManager, NotificationType, NotificationPriority
 
@@ -103,6 +104,9 @@ class Settings(TypedDict):
     update_check_enabled: bool
     chat_inherit_project: bool
 
+    # longest edge of local images sent to vision models, 0 sends them unscaled
+    vision_max_edge: int
+
 
 class PartialSettings(Settings, total=False):
     pass
@@ -166,6 +170,8 @@ API_KEY_PLACEHOLDER = "************"
 
 SETTINGS_FILE = files.get_abs_path("usr/settings.json")
 _settings: Settings | None = None
+# normalized settings with sensitive values, valid for one dotenv version
+_settings_cache: tuple[int, Settings] | None = None
 _runtime_settings_snapshot: Settings | None = None
 
 OptionT = TypeVar("OptionT", bound=FieldOption)
@@ -291,22 +297,59 @@ def convert_in(settings: Settings) -> Settings:
 
 
 def get_settings() -> Settings:
-    global _settings
-    if not _settings:
-        _settings = _read_settings_file()
-    if not _settings:
-        _settings = get_default_settings()
-    norm = normalize_settings(_settings)
-    _load_sensitive_settings(norm)
-    return norm
+    global _settings, _settings_cache
+    cached = _settings_cache
+    if cached is None or cached[0] != dotenv.get_version():
+        # read the versions first, an invalidation during loading wins
+        from helpers import plugins
+
+        version = plugins.get_config_version()
+        dotenv_version = dotenv.get_version()
+        if not _settings:
+            _settings = _read_settings_file()
+        if not _settings:
+            _settings = get_default_settings()
+        norm = normalize_settings(_settings)
+        _load_sensitive_settings(norm)
+        cached = (dotenv_version, norm)
+        if version == plugins.get_config_version():
+            _settings_cache = cached
+    # callers modify their copy freely
+    return copy.deepcopy(cached[1])
 
 
 def reload_settings() -> Settings:
     global _settings
     _settings = None
+    _invalidate_settings_cache()
     return get_settings()
 
 
+def _invalidate_settings_cache():
+    global _settings_cache
+    from helpers import plugins
+
+    _settings_cache = None
+    plugins.clear_plugin_config_cache()
+
+
+def register_watchdogs():
+    from helpers import watchdog
+
+    def on_secrets_change(items: list[watchdog.WatchItem]):
+        PrintStyle.debug("Settings secrets watchdog triggered:", items)
+        _invalidate_settings_cache()
+
+    # secrets are part of the settings and may be edited outside of set_settings
+    secrets_file = files.get_abs_path(DEFAULT_SECRETS_FILE)
+    watchdog.add_watchdog(
+        id="settings_secrets",
+        roots=[os.path.dirname(secrets_file)],
+        patterns=[os.path.basename(secrets_file)],
+        handler=on_secrets_change,
+    )
+
+
 def set_runtime_settings_snapshot(settings: Settings) -> None:
     global _runtime_settings_snapshot
     _runtime_settings_snapshot = settings.copy()
@@ -317,6 +360,8 @@ def set_settings(settings: Settings, apply: bool = True):
     previous = _settings
     _settings = normalize_settings(settings)
     _write_settings_file(_settings)
+    _invalidate_settings_cache()
+    prompt_sections.invalidate()
     if apply:
         _apply_settings(previous)
     return reload_settings()
@@ -487,6 +532,7 @@ def get_default_settings() -> Settings:
         litellm_global_kwargs=get_default_value("litellm_global_kwargs", {}),
         update_check_enabled=get_default_value("update_check_enabled", True),
         chat_inherit_project=get_default_value("chat_inherit_project", True),
+        vision_max_edge=get_default_value("vision_max_edge", images.VISION_MAX_EDGE),
     )
 
 
@@ -500,8 +546,8 @@ def _apply_settings(previous: Settings | None):
             profile = str(getattr(ctx.config, "profile", "") or _settings["agent_profile"])
             config = initialize_agent(override_settings={"agent_profile": profile})
             ctx.config = config  # reinitialize context config with new settings
-            # apply config to agents
-            agent = ctx.agent0
+            # apply config to agents, agents not loaded yet are built with it
+            agent = ctx.agent0 if ctx.agents_loaded() else None
             while agent:
                 agent.config = ctx.config
                 agent = agent.get_data(agent.DATA_NAME_SUBORDINATE)
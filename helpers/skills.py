@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import bisect
+import heapq
 import os
+import pickle
 import re
-from dataclasses import dataclass, field
+import threading
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple, TYPE_CHECKING, TypedDict
+from typing import Any, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, TYPE_CHECKING, TypedDict
 
 from helpers import files, subagents, projects, file_tree, runtime
 from helpers import plugins as plugin_helpers
@@ -319,33 +323,518 @@ def skill_from_markdown(
     return skill
 
 
-def list_skills(
-    agent:Agent|None=None,
-    include_content: bool = False,
-) -> List[Skill]:
-    """List skills, optionally filtered by agent scope."""
-    skills: List[Skill] = []
+# parsed skills survive restarts in this file, rebuilt when the format changes
+INDEX_FILE = "tmp/skills_index.pickle"
+INDEX_FORMAT = 1
+INDEX_SAVE_DELAY = 2.0
+
+# BM25F ranking, term frequencies are weighted by the field they appear in
+SEARCH_FIELD_WEIGHTS = {
+    "name": 3.0,
+    "triggers": 3.0,
+    "tags": 2.0,
+    "description": 2.0,
+    "body": 1.0,
+}
+SEARCH_BODY_TOKENS = 1000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# share of embedding similarity in blended scores, and the similarity that
+# lets a skill without any matching term into the results
+SEMANTIC_WEIGHT = 0.5
+SEMANTIC_MIN_SIMILARITY = 0.3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    """
+    a an and any are as at be but by can could do does for from has have how i if
+    in into is it its me my no not of on or our please should so some than that
+    the their them then there these this to up us use using was we what when
+    where which while who why will with would you your
+    """.split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS or (len(token) < 2 and not token.isdigit()):
+            continue
+        # fold plurals, so "reports" finds "report"
+        if len(token) > 4 and token.endswith("ies"):
+            token = token[:-3] + "y"
+        elif len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
 
-    roots = get_skill_roots(agent)
 
+def _normalize_phrase(text: str) -> str:
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+
+@dataclass(slots=True)
+class _IndexedSkill:
+    path: str
+    mtime_ns: int
+    size: int
+    skill: Optional[Skill]  # None when the file is not a valid skill
+    terms: Optional[Dict[str, float]] = None
+    length: float = 0.0
+    digest: str = ""
+
+    def weighted_terms(self) -> Tuple[Dict[str, float], float]:
+        if self.terms is None:
+            terms: Dict[str, float] = {}
+            length = 0.0
+            skill = self.skill
+            if skill:
+                fields = (
+                    ("name", skill.name),
+                    ("triggers", " ".join(skill.triggers)),
+                    ("tags", " ".join(skill.tags)),
+                    ("description", skill.description),
+                    ("body", skill.content),
+                )
+                for name, text in fields:
+                    weight = SEARCH_FIELD_WEIGHTS[name]
+                    tokens = _tokenize(text)
+                    if name == "body":
+                        tokens = tokens[:SEARCH_BODY_TOKENS]
+                    for token in tokens:
+                        terms[token] = terms.get(token, 0.0) + weight
+                    length += weight * len(tokens)
+            self.terms, self.length = terms, length
+        return self.terms, self.length
+
+    def embedding_text(self) -> str:
+        skill = self.skill
+        if not skill:
+            return ""
+        parts = [skill.name, skill.description]
+        if skill.tags:
+            parts.append("Tags: " + ", ".join(skill.tags))
+        if skill.triggers:
+            parts.append("Triggers: " + ", ".join(skill.triggers))
+        return "\n".join(part for part in parts if part)
+
+
+class _Corpus:
+    """BM25 postings and name/trigger phrases over a list of indexed skills."""
+
+    def __init__(self, entries: List[_IndexedSkill]):
+        self.entries = entries
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.names: Dict[str, set[int]] = {}
+        self.triggers: Dict[str, set[int]] = {}
+        self.lengths: List[float] = []
+        self.vectors: Dict[str, Any] = {}  # normalized embedding matrix by namespace
+        for i, entry in enumerate(entries):
+            self.lengths.append(self._add(i, entry))
+        self._normalize()
+
+    def update(self, entries: List[_IndexedSkill]) -> bool:
+        """Replace the few entries that changed, False when the list itself changed.
+
+        Runs under the index lock, searches read postings through snapshots.
+        """
+        if len(entries) != len(self.entries):
+            return False
+        changed = [i for i, (old, new) in enumerate(zip(self.entries, entries)) if old is not new]
+        if len(changed) > max(1, len(entries) // 10) or any(
+            self.entries[i].path != entries[i].path for i in changed
+        ):
+            return False
+        for i in changed:
+            self._remove(i, self.entries[i])
+            self.entries[i] = entries[i]
+            self.lengths[i] = self._add(i, entries[i])
+        self._normalize()
+        self.vectors = {}
+        return True
+
+    def _add(self, i: int, entry: _IndexedSkill) -> float:
+        terms, length = entry.weighted_terms()
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[i] = tf
+        for mapping, phrases in self._phrases(entry):
+            for phrase in phrases:
+                mapping.setdefault(phrase, set()).add(i)
+        return length
+
+    def _remove(self, i: int, entry: _IndexedSkill) -> None:
+        terms, _length = entry.weighted_terms()
+        for term in terms:
+            postings = self.postings.get(term, {})
+            postings.pop(i, None)
+            if not postings:
+                self.postings.pop(term, None)
+        for mapping, phrases in self._phrases(entry):
+            for phrase in phrases:
+                ids = mapping.get(phrase, set())
+                ids.discard(i)
+                if not ids:
+                    mapping.pop(phrase, None)
+
+    def _phrases(self, entry: _IndexedSkill) -> Tuple[Tuple[Dict[str, set[int]], set[str]], ...]:
+        skill = entry.skill
+        assert skill
+        names = {_normalize_phrase(skill.name)} - {""}
+        triggers = {_normalize_phrase(t) for t in skill.triggers} - {""}
+        return (self.names, names), (self.triggers, triggers)
+
+    def _normalize(self) -> None:
+        lengths = self.lengths
+        avg_length = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+        self.norms = [BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) for length in lengths]
+        self.phrase_words = max(
+            (phrase.count(" ") + 1 for phrase in (*self.names, *self.triggers)), default=0
+        )
+
+    def scores(self, terms: Iterable[str]) -> Dict[int, float]:
+        import math
+
+        count = len(self.entries)
+        norms = self.norms
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            postings = list(self.postings.get(term, {}).items())
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1)
+            for i, tf in postings:
+                scores[i] = scores.get(i, 0.0) + idf * tf / (tf + norms[i])
+        return scores
+
+    def phrase_bonuses(self, query: str) -> Dict[int, float]:
+        """The exact name or a trigger, or either mentioned in the query."""
+        bonuses: Dict[int, float] = {}
+        for i in {*self.names.get(query, ()), *self.triggers.get(query, ())}:
+            bonuses[i] = 10.0
+        words = query.split()
+        mentioned_names: set[int] = set()
+        mentioned_triggers: set[int] = set()
+        for size in range(1, min(self.phrase_words, len(words)) + 1):
+            for start in range(len(words) - size + 1):
+                phrase = " ".join(words[start : start + size])
+                if len(phrase) < 4:
+                    continue
+                mentioned_names.update(self.names.get(phrase, ()))
+                mentioned_triggers.update(self.triggers.get(phrase, ()))
+        for i in mentioned_names:
+            bonuses[i] = bonuses.get(i, 0.0) + 5.0
+        for i in mentioned_triggers:
+            bonuses[i] = bonuses.get(i, 0.0) + 5.0
+        return bonuses
+
+
+class _SkillsIndex:
+    """Parsed SKILL.md files of every skills root, kept until they change.
+
+    While the skills watchdog runs, known roots are served from memory and its
+    events reparse single files or rescan a root when folders come and go.
+    Without it every lookup still walks the roots, but only files with a new
+    mtime or size are parsed again. Parsed skills are persisted to INDEX_FILE
+    so a restart does not parse unchanged files either.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.watched = False
+        self.version = 0
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _IndexedSkill] = {}
+        self._roots: Dict[str, List[str]] = {}
+        self._dirty: Dict[str, set[str]] = {}
+        self._loaded = False
+        self._unsaved = False
+        self._save_timer: threading.Timer | None = None
+        self._corpora: Dict[Any, Tuple[int, _Corpus]] = {}
+        self._vectors: Dict[Tuple[str, str], Any] = {}
+
+    def root_entries(self, root: str) -> List[_IndexedSkill]:
+        root = os.path.abspath(root)
+        with self._lock:
+            self._load()
+            paths = self._roots.get(root) if self.watched else None
+            if paths is None:
+                paths = self._scan(root)
+            elif root in self._dirty:
+                self._update(root, paths, self._dirty.pop(root))
+            self._schedule_save()
+            return [
+                entry
+                for path in paths
+                if (entry := self._entries.get(path)) is not None and entry.skill
+            ]
+
+    def watch(self) -> None:
+        """Trust known roots from now on, the caller forwards file events to changed()."""
+        with self._lock:
+            self.watched = True
+            self._roots.clear()
+            self._dirty.clear()
+
+    def changed(self, items: Iterable[Sequence[str]]) -> None:
+        """Apply watchdog items: [path, event] pairs."""
+        with self._lock:
+            for path, event in items:
+                path = os.path.abspath(path)
+                is_skill_md = os.path.basename(path) == "SKILL.md"
+                for root in list(self._roots):
+                    if path == root or path.startswith(root + os.sep):
+                        if is_skill_md:
+                            self._dirty.setdefault(root, set()).add(path)
+                        elif event in ("delete", "move") or (
+                            event == "create" and os.path.isdir(path)
+                        ):
+                            # folders appear without events for their content
+                            self._forget_root(root)
+                    elif root.startswith(path + os.sep):
+                        self._forget_root(root)
+
+    def invalidate(self) -> None:
+        """Walk all roots again on next use, unchanged files are not reparsed."""
+        with self._lock:
+            self._roots.clear()
+            self._dirty.clear()
+
+    def corpus(self, key: Any, entries: List[_IndexedSkill]) -> _Corpus:
+        with self._lock:
+            cached = self._corpora.get(key)
+            if cached and cached[0] == self.version:
+                return cached[1]
+            if cached is None and len(self._corpora) >= 16:
+                self._corpora.clear()
+            if cached and cached[1].update(entries):
+                corpus = cached[1]
+            else:
+                corpus = _Corpus(entries)
+            self._corpora[key] = (self.version, corpus)
+            return corpus
+
+    def vectors(self, corpus: _Corpus, embeddings: Any) -> Any:
+        """Row-normalized embeddings of the corpus, vectors are kept by content hash."""
+        import hashlib
+
+        import numpy as np
+
+        from helpers import embedding_cache
+
+        namespace = embedding_cache.get_namespace(embeddings)
+        # an update while embedding swaps in a new dict, the result is not kept then
+        store = corpus.vectors
+        matrix = store.get(namespace)
+        if matrix is not None:
+            return matrix
+
+        texts = [entry.embedding_text() for entry in corpus.entries]
+        for entry, text in zip(corpus.entries, texts):
+            if not entry.digest:
+                entry.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            found = [self._vectors.get((namespace, entry.digest)) for entry in corpus.entries]
+        missing = [i for i, vector in enumerate(found) if vector is None]
+        if missing:
+            cached = embedding_cache.CachedEmbeddings(
+                embeddings, embedding_cache.get_cache(), namespace
+            )
+            embedded = cached.embed_documents([texts[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, embedded):
+                    found[i] = np.asarray(vector, dtype=np.float32)
+                    self._vectors[(namespace, corpus.entries[i].digest)] = found[i]
+
+        matrix = np.vstack(found) if found else np.zeros((0, 1), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        store[namespace] = matrix
+        return matrix
+
+    def flush(self) -> None:
+        """Persist pending changes now."""
+        with self._lock:
+            if self._save_timer:
+                self._save_timer.cancel()
+                self._save_timer = None
+        self._save()
+
+    def _scan(self, root: str) -> List[str]:
+        paths = [str(path) for path in discover_skill_md_files(Path(root))]
+        for path in paths:
+            self._refresh(path)
+        listed = set(paths)
+        prefix = root + os.sep
+        for path in [p for p in self._entries if p.startswith(prefix) and p not in listed]:
+            del self._entries[path]
+            self._touch()
+        self._roots[root] = paths
+        self._dirty.pop(root, None)
+        return paths
+
+    def _update(self, root: str, paths: List[str], dirty: Iterable[str]) -> None:
+        listed = set(paths)
+        for path in dirty:
+            relative = Path(os.path.relpath(path, root))
+            if os.path.isfile(path) and not _is_hidden_path(relative):
+                self._refresh(path)
+                if path not in listed:
+                    bisect.insort(paths, path)
+                    listed.add(path)
+            elif path in listed:
+                paths.remove(path)
+                listed.discard(path)
+                self._entries.pop(path, None)
+                self._touch()
+
+    def _refresh(self, path: str) -> None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if self._entries.pop(path, None):
+                self._touch()
+            return
+        entry = self._entries.get(path)
+        if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return
+        skill = skill_from_markdown(Path(path), include_content=True)
+        self._entries[path] = _IndexedSkill(path, stat.st_mtime_ns, stat.st_size, skill)
+        self._touch()
+
+    def _forget_root(self, root: str) -> None:
+        self._roots.pop(root, None)
+        self._dirty.pop(root, None)
+
+    def _touch(self) -> None:
+        self.version += 1
+        self._unsaved = True
+
+    def _file(self) -> str:
+        if self.path is None:
+            self.path = files.get_abs_path(INDEX_FILE)
+        return self.path
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        path = self._file()
+        if not path or not os.path.isfile(path):
+            return
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if (
+                data.get("format") != INDEX_FORMAT
+                or data.get("development") != runtime.is_development()
+            ):
+                return
+            for key, (mtime_ns, size, skill) in data["entries"].items():
+                self._entries.setdefault(key, _IndexedSkill(key, mtime_ns, size, skill))
+        except Exception:
+            # a broken index file only costs a full parse
+            return
+
+    def _schedule_save(self) -> None:
+        if not self._unsaved or self._save_timer or not self._file():
+            return
+        self._save_timer = threading.Timer(INDEX_SAVE_DELAY, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _save(self) -> None:
+        with self._lock:
+            path = self._file()
+            if not self._unsaved or not path:
+                return
+            self._unsaved = False
+            data = {
+                "format": INDEX_FORMAT,
+                "development": runtime.is_development(),
+                "entries": {
+                    key: (entry.mtime_ns, entry.size, entry.skill)
+                    for key, entry in self._entries.items()
+                },
+            }
+        temp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception:
+            pass
+
+
+_index = _SkillsIndex()
+
+
+def register_watchdogs():
+    from helpers import watchdog
+    from helpers.print_style import PrintStyle
+
+    def on_skills_change(items: list[watchdog.WatchItem]):
+        PrintStyle.debug("Skills watchdog triggered:", items)
+        _index.changed(items)
+
+    # SKILL.md files, and skill folders that come, go or move as a whole
+    watchdog.add_watchdog(
+        id="skills_index",
+        roots=[
+            files.get_abs_path("skills"),
+            files.get_abs_path(files.AGENTS_DIR),
+            files.get_abs_path(files.PLUGINS_DIR),
+            files.get_abs_path(files.USER_DIR),
+        ],
+        patterns=["SKILL.md", "skills", "skills/*", "skills/*/*"],
+        handler=on_skills_change,
+    )
+    _index.watch()
+
+
+def _copy_skill(skill: Skill, include_content: bool) -> Skill:
+    # callers own their copy, the indexed skill stays untouched
+    return replace(
+        skill,
+        tags=list(skill.tags),
+        triggers=list(skill.triggers),
+        allowed_tools=list(skill.allowed_tools),
+        metadata=dict(skill.metadata),
+        content=skill.content if include_content else "",
+        raw_frontmatter=dict(skill.raw_frontmatter) if include_content else {},
+    )
+
+
+def _list_entries(agent: Agent | None) -> Tuple[List[str], List[_IndexedSkill]]:
+    roots = get_skill_roots(agent)
+    entries: List[_IndexedSkill] = []
     for root in roots:
-        for skill_md in discover_skill_md_files(Path(root)):
-            s = skill_from_markdown(skill_md, include_content=include_content)
-            if s:
-                skills.append(s)
+        entries.extend(_index.root_entries(root))
 
     # no deduplication for global skills
     if not agent:
-        return skills
+        return roots, entries
 
     # Dedupe by normalized name, preserving root_order priority (earlier wins)
-    by_name: Dict[str, Skill] = {}
-    for s in skills:
+    by_name: Dict[str, _IndexedSkill] = {}
+    for entry in entries:
+        s = entry.skill
+        assert s
         key = _normalize_name(s.name) or _normalize_name(s.path.name)
         if key and key not in by_name:
-            by_name[key] = s
-    
-    return list(by_name.values())
+            by_name[key] = entry
+    return roots, list(by_name.values())
+
+
+def list_skills(
+    agent:Agent|None=None,
+    include_content: bool = False,
+) -> List[Skill]:
+    """List skills, optionally filtered by agent scope."""
+    _roots, entries = _list_entries(agent)
+    return [_copy_skill(entry.skill, include_content) for entry in entries if entry.skill]
 
 
 def delete_skill(
@@ -374,6 +863,7 @@ def delete_skill(
 
     # delete directory
     files.delete_dir(skill_path)
+    _index.changed([[skill_path, "delete"]])
 
 
 def find_skill(
@@ -388,12 +878,11 @@ def find_skill(
     roots = get_skill_roots(agent)
 
     for root in roots:
-        for skill_md in discover_skill_md_files(Path(root)):
-            s = skill_from_markdown(skill_md, include_content=include_content)
-            if not s:
-                continue
+        for entry in _index.root_entries(root):
+            s = entry.skill
+            assert s
             if _normalize_name(s.name) == target or _normalize_name(s.path.name) == target:
-                return s
+                return _copy_skill(s, include_content)
     return None
 
 def load_skill_for_agent(
@@ -470,54 +959,50 @@ def search_skills(
     query: str,
     limit: int = 25,
     agent: Agent|None=None,
+    embeddings: Any = None,
+    semantic_weight: float = SEMANTIC_WEIGHT,
 ) -> List[Skill]:
-    q = (query or "").strip().lower()
+    """Skills ranked by BM25 over name, triggers, tags, description and body.
+
+    Passing an embeddings model blends in the cosine similarity of the query to
+    each skill's name, description, tags and triggers.
+    """
+    q = _normalize_phrase(query or "")
     if not q:
         return []
 
-    raw_terms = [t for t in re.split(r"\s+", q) if t]
-    terms = [
-        t for t in raw_terms
-        if len(t) >= 3 or any(ch.isdigit() for ch in t)
-    ] or raw_terms
-    candidates = list_skills(agent)
-
-    scored: List[Tuple[int, Skill]] = []
-    for s in candidates:
-        name = s.name.lower()
-        desc = (s.description or "").lower()
-        tags = [t.lower() for t in s.tags]
-        triggers = [t.lower() for t in s.triggers]
-
-        score = 0
-        if q == name:
-            score += 10
-        if any(q == trigger for trigger in triggers):
-            score += 9
-        if q in name:
-            score += 6
-        if q in desc:
-            score += 4
-        if any(q in tag for tag in tags):
-            score += 3
-        if any(q in trigger for trigger in triggers):
-            score += 8
-
-        for term in terms:
-            if term in name:
-                score += 3
-            if term in desc:
-                score += 2
-            if any(term in tag for tag in tags):
-                score += 1
-            if any(term in trigger for trigger in triggers):
-                score += 4
+    roots, entries = _list_entries(agent)
+    corpus = _index.corpus((tuple(roots), agent is not None), entries)
+    scores = corpus.scores(_tokenize(q))
+    for i, bonus in corpus.phrase_bonuses(q).items():
+        scores[i] = scores.get(i, 0.0) + bonus
 
-        if score > 0:
-            scored.append((score, s))
+    if embeddings is not None and semantic_weight > 0 and corpus.entries:
+        try:
+            import numpy as np
 
-    scored.sort(key=lambda pair: (-pair[0], pair[1].name))
-    return [s for _score, s in scored[:limit]]
+            matrix = _index.vectors(corpus, embeddings)
+            vector = np.asarray(embeddings.embed_query(query), dtype=np.float32)
+            similarities = matrix @ (vector / (np.linalg.norm(vector) or 1))
+        except Exception:
+            # lexical ranking still works without the embedding model
+            similarities = None
+        if similarities is not None:
+            top = max(scores.values(), default=0.0) or 1.0
+            blended: Dict[int, float] = {}
+            for i, similarity in enumerate(similarities.tolist()):
+                lexical = scores.get(i, 0.0) / top
+                if lexical <= 0 and similarity < SEMANTIC_MIN_SIMILARITY:
+                    continue
+                blended[i] = (1 - semantic_weight) * lexical + semantic_weight * max(similarity, 0.0)
+            scores = blended
+
+    ranked = heapq.nsmallest(
+        limit,
+        (i for i, score in scores.items() if score > 0),
+        key=lambda i: (-scores[i], corpus.entries[i].skill.name),  # type: ignore[union-attr]
+    )
+    return [_copy_skill(corpus.entries[i].skill, False) for i in ranked]  # type: ignore[arg-type]
 
 
 _NAME_RE = re.compile(r"^[a-z0-9-]+$")
@@ -618,11 +1103,9 @@ def list_skill_catalog(
     seen_paths: set[str] = set()
 
     for root in _get_catalog_roots(project_name=project_name, agent=agent):
-        root_path = Path(root)
-        for skill_md in discover_skill_md_files(root_path):
-            skill = skill_from_markdown(skill_md, include_content=False)
-            if not skill:
-                continue
+        for entry in _index.root_entries(root):
+            skill = entry.skill
+            assert skill
 
             runtime_path = files.normalize_a0_path(str(skill.path))
             if runtime_path in seen_paths:
@@ -1063,16 +1546,15 @@ def _resolve_active_skill_entry(
 
     target = skill_name.lower().strip()
     for root in visible_roots:
-        for skill_md in discover_skill_md_files(Path(root)):
-            skill = skill_from_markdown(skill_md, include_content=True)
-            if not skill:
-                continue
+        for entry in _index.root_entries(root):
+            skill = entry.skill
+            assert skill
             candidates = {
                 (skill.name or "").strip().lower(),
                 skill.path.name.strip().lower(),
             }
             if target in candidates:
-                return skill
+                return _copy_skill(skill, include_content=True)
 
     return None
 
@@ -13,6 +13,8 @@ from helpers.state_snapshot import (
     StateRequestV1,
     advance_state_request_after_snapshot,
     build_snapshot_from_request,
+    get_chat_list,
+    invalidate_chat_list,
 )
 from helpers.ws import ConnectionIdentity, ConnectionNotFoundError, _ws_debug_enabled, ws_debug
 from helpers.ws_manager import STATE_PUSH_EVENT
@@ -28,6 +30,9 @@ class ConnectionProjection:
     request: StateRequestV1 | None = None
     seq: int = 0
     seq_base: int = 0
+    # Chat list versions the client holds (ChatList.versions()), None until the
+    # first push after a state_request delivered the full lists.
+    list_versions: dict[str, tuple[str, int]] | None = None
     # Incremented on every dirty signal. Used to coalesce bursts without delaying
     # pushes indefinitely during continuous activity (throttled coalescing).
     dirty_version: int = 0
@@ -84,7 +89,11 @@ class StateMonitor:
             self._projections.pop(identity, None)
         ws_debug(f"[StateMonitor] unregister_sid namespace={namespace} sid={sid}")
 
-    def mark_dirty_all(self, *, reason: str | None = None) -> None:
+    def mark_dirty_all(
+        self, *, reason: str | None = None, context_id: str | None = None
+    ) -> None:
+        """Mark every sid dirty. Pass context_id when only that context's list entry changed."""
+        invalidate_chat_list(context_id)
         wave_id = None
         if _ws_debug_enabled():
             with self._lock:
@@ -99,6 +108,7 @@ class StateMonitor:
         if not isinstance(context_id, str) or not context_id.strip():
             return
         target = context_id.strip()
+        invalidate_chat_list(target)
         wave_id = None
         if _ws_debug_enabled():
             with self._lock:
@@ -129,6 +139,7 @@ class StateMonitor:
             projection.request = request
             projection.seq_base = seq_base
             projection.seq = seq_base
+            projection.list_versions = None
         ws_debug(
             f"[StateMonitor] update_projection namespace={namespace} sid={sid} context={request.context!r} "
             f"log_from={request.log_from} notifications_from={request.notifications_from} "
@@ -249,11 +260,16 @@ class StateMonitor:
                 request = projection.request
                 if request is None:
                     return
+                known_list = projection.list_versions
                 base_version = projection.dirty_version
                 dirty_reason = projection.dirty_reason
                 dirty_wave_id = projection.dirty_wave_id
 
-            snapshot = await build_snapshot_from_request(request=request)
+            # The chat list is shared by all sids, each only receives its changes.
+            chat_list = get_chat_list(request.timezone)
+            snapshot = await build_snapshot_from_request(
+                request=request, chat_list=chat_list, known_list=known_list
+            )
 
             with self._lock:
                 projection = self._projections.get(identity)
@@ -261,6 +277,7 @@ class StateMonitor:
                     return
                 if projection.request != request:
                     return
+                projection.list_versions = chat_list.versions()
 
                 # INVARIANT.STATE.SEQ_MONOTONIC + SEQ_RESET_ON_REQUEST
                 projection.seq += 1
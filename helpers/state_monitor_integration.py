@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 
-def mark_dirty_all(*, reason: str | None = None) -> None:
+def mark_dirty_all(*, reason: str | None = None, context_id: str | None = None) -> None:
     from helpers.state_monitor import get_state_monitor
 
-    get_state_monitor().mark_dirty_all(reason=reason)
+    get_state_monitor().mark_dirty_all(reason=reason, context_id=context_id)
 
 
 def mark_dirty_for_context(context_id: str, *, reason: str | None = None) -> None:
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import time
 import types
 from typing import Any, Mapping, TypedDict, Union, get_args, get_origin, get_type_hints
 
@@ -30,6 +32,9 @@ class SnapshotV1(TypedDict):
     notifications: list[dict[str, Any]]
     notifications_guid: str
     notifications_version: int
+    # Set instead of contexts/tasks when the receiver already holds earlier lists:
+    # {"contexts": {"put": [...], "removed": [ids]}, "tasks": {...}}
+    list_patch: dict[str, Any] | None
 
 @dataclass(frozen=True)
 class StateRequestV1:
@@ -39,6 +44,128 @@ class StateRequestV1:
     timezone: str
 
 
+# Chat list entries are rebuilt for dirty contexts only, everything at most this often
+CHAT_LIST_MAX_AGE = 5.0
+
+LIST_KINDS = ("contexts", "tasks")
+
+
+@dataclass(frozen=True)
+class ChatListEntry:
+    kind: str  # "contexts" or "tasks"
+    version: int
+    data: dict[str, Any]
+
+
+class ChatList:
+    """Immutable chat and task list entries of one build, shared by all sids."""
+
+    def __init__(self, entries: dict[str, ChatListEntry]) -> None:
+        self.entries = entries
+
+    def versions(self) -> dict[str, tuple[str, int]]:
+        return {ctxid: (entry.kind, entry.version) for ctxid, entry in self.entries.items()}
+
+    def lists(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        ctxs = [e.data for e in self.entries.values() if e.kind == "contexts"]
+        tasks = [e.data for e in self.entries.values() if e.kind == "tasks"]
+        ctxs.sort(key=lambda x: x["created_at"], reverse=True)
+        tasks.sort(key=lambda x: x["created_at"], reverse=True)
+        return ctxs, tasks
+
+    def patch(self, known: Mapping[str, tuple[str, int]]) -> dict[str, Any]:
+        """Entries added, changed or removed since the lists described by known versions."""
+        patch: dict[str, Any] = {kind: {"put": [], "removed": []} for kind in LIST_KINDS}
+        for ctxid, entry in self.entries.items():
+            previous = known.get(ctxid)
+            if previous == (entry.kind, entry.version):
+                continue
+            patch[entry.kind]["put"].append(entry.data)
+            if previous is not None and previous[0] != entry.kind:
+                patch[previous[0]]["removed"].append(ctxid)
+        for ctxid, (kind, _version) in known.items():
+            if ctxid not in self.entries:
+                patch[kind]["removed"].append(ctxid)
+        return patch
+
+
+class ChatListProjection:
+    """Chat and task lists for one timezone, rebuilt only for contexts marked dirty."""
+
+    def __init__(self, timezone: str, max_age: float = CHAT_LIST_MAX_AGE) -> None:
+        self.timezone = timezone
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._entries: dict[str, ChatListEntry] = {}
+        self._dirty_all = True
+        self._dirty_ids: set[str] = set()
+        self._built_at = 0.0
+        self._version = 0
+        self._labels: dict[str, str] = {}
+
+    def invalidate(self, context_id: str | None = None) -> None:
+        with self._lock:
+            if context_id:
+                self._dirty_ids.add(context_id)
+            else:
+                self._dirty_all = True
+
+    def get(self) -> ChatList:
+        with self._lock:
+            Localization.get().set_timezone(self.timezone)
+            contexts = {
+                ctx.id: ctx
+                for ctx in AgentContext.all()
+                if ctx.type != AgentContextType.BACKGROUND
+            }
+
+            now = time.monotonic()
+            if self._dirty_all or now - self._built_at > self.max_age:
+                stale = set(contexts)
+                self._labels = _get_agent_profile_labels()
+                self._built_at = now
+            else:
+                stale = (self._dirty_ids | (contexts.keys() - self._entries.keys())) & contexts.keys()
+            self._dirty_all = False
+            self._dirty_ids = set()
+
+            entries = {
+                ctxid: entry for ctxid, entry in self._entries.items() if ctxid in contexts
+            }
+            if stale:
+                scheduler = TaskScheduler.get()
+                for ctxid in stale:
+                    kind, data = _build_list_entry(contexts[ctxid], scheduler, self._labels)
+                    previous = self._entries.get(ctxid)
+                    if previous and previous.kind == kind and previous.data == data:
+                        entries[ctxid] = previous
+                        continue
+                    self._version += 1
+                    entries[ctxid] = ChatListEntry(kind, self._version, data)
+            self._entries = entries
+            return ChatList(entries)
+
+
+_chat_lists: dict[str, ChatListProjection] = {}
+_chat_lists_lock = threading.RLock()
+
+
+def get_chat_list(timezone: str) -> ChatList:
+    with _chat_lists_lock:
+        projection = _chat_lists.get(timezone)
+        if projection is None:
+            projection = _chat_lists[timezone] = ChatListProjection(timezone)
+    return projection.get()
+
+
+def invalidate_chat_list(context_id: str | None = None) -> None:
+    """Mark one context, or all of them, for rebuild in every chat list projection."""
+    with _chat_lists_lock:
+        projections = list(_chat_lists.values())
+    for projection in projections:
+        projection.invalidate(context_id)
+
+
 class StateRequestValidationError(ValueError):
     def __init__(
         self,
@@ -130,7 +257,10 @@ def _apply_agent_profile_metadata(
     ctx: AgentContext,
     labels: dict[str, str],
 ) -> None:
-    agent_config = getattr(getattr(ctx, "agent0", None), "config", None)
+    # chats whose agents are not loaded yet use the context config, it is the agents' config
+    agents_loaded = getattr(ctx, "agents_loaded", None)
+    agent0 = getattr(ctx, "agent0", None) if agents_loaded is None or agents_loaded() else None
+    agent_config = getattr(agent0, "config", None)
     profile = str(
         getattr(agent_config, "profile", None)
         or getattr(getattr(ctx, "config", None), "profile", "")
@@ -239,8 +369,55 @@ def advance_state_request_after_snapshot(
     )
 
 
-async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
-    """Build a poll-shaped snapshot for both /poll and state_push."""
+def _build_list_entry(
+    ctx: AgentContext, scheduler: TaskScheduler, labels: dict[str, str]
+) -> tuple[str, dict[str, Any]]:
+    context_data = ctx.output()
+    _apply_agent_profile_metadata(context_data, ctx, labels)
+
+    context_task = scheduler.get_task_by_uuid(ctx.id)
+    is_task_context = context_task is not None and context_task.context_id == ctx.id
+    if not is_task_context:
+        return "contexts", context_data
+
+    task_details = scheduler.serialize_task(ctx.id)
+    if task_details:
+        context_data.update(
+            {
+                "task_name": task_details.get("name"),
+                "uuid": task_details.get("uuid"),
+                "state": task_details.get("state"),
+                "type": task_details.get("type"),
+                "system_prompt": task_details.get("system_prompt"),
+                "prompt": task_details.get("prompt"),
+                "last_run": task_details.get("last_run"),
+                "last_result": task_details.get("last_result"),
+                "attachments": task_details.get("attachments", []),
+                "context_id": task_details.get("context_id"),
+            }
+        )
+
+        if task_details.get("type") == "scheduled":
+            context_data["schedule"] = task_details.get("schedule")
+        elif task_details.get("type") == "planned":
+            context_data["plan"] = task_details.get("plan")
+        else:
+            context_data["token"] = task_details.get("token")
+
+    return "tasks", context_data
+
+
+async def build_snapshot_from_request(
+    *,
+    request: StateRequestV1,
+    chat_list: ChatList | None = None,
+    known_list: Mapping[str, tuple[str, int]] | None = None,
+) -> SnapshotV1:
+    """Build a poll-shaped snapshot for both /poll and state_push.
+
+    With known_list (versions from ChatList.versions() of the lists the receiver
+    already has) the chat and task lists are sent as list_patch instead.
+    """
 
     Localization.get().set_timezone(request.timezone)
 
@@ -263,61 +440,14 @@ async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
     notification_manager = AgentContext.get_notification_manager()
     notifications = notification_manager.output(start=notifications_from_no)
 
-    scheduler = TaskScheduler.get()
-
-    ctxs: list[dict[str, Any]] = []
-    tasks: list[dict[str, Any]] = []
-    processed_contexts: set[str] = set()
-    agent_profile_labels = _get_agent_profile_labels()
-
-    all_ctxs = AgentContext.all()
-    for ctx in all_ctxs:
-        if ctx.id in processed_contexts:
-            continue
-
-        if ctx.type == AgentContextType.BACKGROUND:
-            processed_contexts.add(ctx.id)
-            continue
-
-        context_data = ctx.output()
-        _apply_agent_profile_metadata(context_data, ctx, agent_profile_labels)
-
-        context_task = scheduler.get_task_by_uuid(ctx.id)
-        is_task_context = context_task is not None and context_task.context_id == ctx.id
-
-        if not is_task_context:
-            ctxs.append(context_data)
-        else:
-            task_details = scheduler.serialize_task(ctx.id)
-            if task_details:
-                context_data.update(
-                    {
-                        "task_name": task_details.get("name"),
-                        "uuid": task_details.get("uuid"),
-                        "state": task_details.get("state"),
-                        "type": task_details.get("type"),
-                        "system_prompt": task_details.get("system_prompt"),
-                        "prompt": task_details.get("prompt"),
-                        "last_run": task_details.get("last_run"),
-                        "last_result": task_details.get("last_result"),
-                        "attachments": task_details.get("attachments", []),
-                        "context_id": task_details.get("context_id"),
-                    }
-                )
-
-                if task_details.get("type") == "scheduled":
-                    context_data["schedule"] = task_details.get("schedule")
-                elif task_details.get("type") == "planned":
-                    context_data["plan"] = task_details.get("plan")
-                else:
-                    context_data["token"] = task_details.get("token")
-
-            tasks.append(context_data)
-
-        processed_contexts.add(ctx.id)
-
-    ctxs.sort(key=lambda x: x["created_at"], reverse=True)
-    tasks.sort(key=lambda x: x["created_at"], reverse=True)
+    if chat_list is None:
+        chat_list = get_chat_list(request.timezone)
+    if known_list is None:
+        ctxs, tasks = chat_list.lists()
+        list_patch = None
+    else:
+        ctxs, tasks = [], []
+        list_patch = chat_list.patch(known_list)
 
     snapshot: SnapshotV1 = {
         "deselect_chat": bool(ctxid) and active_context is None,
@@ -333,6 +463,7 @@ async def build_snapshot_from_request(*, request: StateRequestV1) -> SnapshotV1:
         "notifications": notifications,
         "notifications_guid": notification_manager.guid,
         "notifications_version": len(notification_manager.updates),
+        "list_patch": list_patch,
     }
 
     validate_snapshot_schema_v1(snapshot)
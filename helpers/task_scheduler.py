@@ -1,8 +1,10 @@
 import asyncio
 from datetime import datetime, timezone, timedelta
+import heapq
 import os
 import random
 import threading
+import time
 from urllib.parse import urlparse
 import uuid
 from enum import Enum
@@ -28,6 +30,9 @@ from typing import Annotated
 
 SCHEDULER_FOLDER = "usr/scheduler"
 LOCAL_TIMEZONE_ALIASES = {"local", "user", "default", "current", "current_timezone"}
+# cron runs that passed this many seconds before the tasks were scheduled still fire,
+# this covers startup and reloads like the look-back of check_schedule did
+SCHEDULE_LOOKBACK = 60.0
 
 
 def normalize_schedule_timezone(timezone_name: str | None) -> str:
@@ -194,7 +199,7 @@ class BaseTask(BaseModel):
     def check_schedule(self, frequency_seconds: float = 60.0) -> bool:
         return False
 
-    def get_next_run(self) -> datetime | None:
+    def get_next_run(self, after: datetime | None = None) -> datetime | None:
         return None
 
     def is_dedicated(self) -> bool:
@@ -375,13 +380,14 @@ class ScheduledTask(BaseTask):
 
             return next_run_seconds < frequency_seconds
 
-    def get_next_run(self) -> datetime | None:
+    def get_next_run(self, after: datetime | None = None) -> datetime | None:
+        """First cron run strictly after the given time, now by default."""
         with self._lock:
             crontab = CronTab(crontab=self.schedule.to_crontab())  # type: ignore
             self.schedule.timezone = normalize_schedule_timezone(self.schedule.timezone)
             task_timezone = pytz.timezone(self.schedule.timezone)
-            now_in_task_timezone = datetime.now(timezone.utc).astimezone(task_timezone)
-            next_run = crontab.next(now=now_in_task_timezone, return_datetime=True)  # type: ignore
+            reference = (after or datetime.now(timezone.utc)).astimezone(task_timezone)
+            next_run = crontab.next(now=reference, return_datetime=True)  # type: ignore
             if next_run is None:
                 return None
             if next_run.tzinfo is None:
@@ -440,7 +446,7 @@ class PlannedTask(BaseTask):
         with self._lock:
             return self.plan.should_launch() is not None
 
-    def get_next_run(self) -> datetime | None:
+    def get_next_run(self, after: datetime | None = None) -> datetime | None:
         with self._lock:
             return self.plan.get_next_launch_time()
 
@@ -496,27 +502,58 @@ class SchedulerTaskList(BaseModel):
                 make_dirs(path)
                 cls.__instance = asyncio.run(cls(tasks=[]).save())
             else:
+                signature = cls._file_signature()
                 cls.__instance = cls.model_validate_json(read_file(path))
+                cls.__instance._signature = signature
         else:
-            asyncio.run(cls.__instance.reload())
+            asyncio.run(cls.__instance.reload_if_changed())
         return cls.__instance
 
+    @classmethod
+    def on_file_change(cls):
+        # wake the job loop so it reloads tasks.json written by another process
+        instance = cls.__instance
+        if instance is not None and instance._file_signature() != instance._signature:
+            instance._notify()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._lock = threading.RLock()
+        # min-heap of (next run timestamp, task uuid), entries that don't match _next_runs are stale
+        self._heap: list[tuple[float, str]] = []
+        self._next_runs: dict[str, tuple[float, Union[ScheduledTask, AdHocTask, PlannedTask]]] = {}
+        # last due time each task was handed out for, it is never scheduled at or before it again
+        self._fired: dict[str, float] = {}
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        # (mtime, size) of tasks.json after the last load or save
+        self._signature: tuple[int, int] | None = None
+        self._saved_json = ""
+        self._schedule_all()
 
     async def reload(self) -> "SchedulerTaskList":
         path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
         if exists(path):
             with self._lock:
+                signature = self._file_signature()
                 data = self.__class__.model_validate_json(read_file(path))
                 self.tasks.clear()
                 self.tasks.extend(data.tasks)
+                self._signature = signature
+                self._saved_json = ""
+                self._schedule_all()
         return self
 
+    async def reload_if_changed(self) -> "SchedulerTaskList":
+        """Reload only when tasks.json changed on disk since it was last loaded or saved."""
+        with self._lock:
+            if self._signature is not None and self._file_signature() == self._signature:
+                return self
+            return await self.reload()
+
     async def add_task(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]) -> "SchedulerTaskList":
         with self._lock:
             self.tasks.append(task)
+            self._schedule(task)
             await self.save()
         return self
 
@@ -548,15 +585,13 @@ class SchedulerTaskList(BaseModel):
                     "ERROR: Found null token in JSON output for an adhoc task"
                 )
 
-            write_file(path, json_data)
+            # nothing changed since the last save and nobody else touched the file
+            if json_data == self._saved_json and self._file_signature() == self._signature:
+                return self
 
-            # Debug: Verify after saving
-            if exists(path):
-                loaded_json = read_file(path)
-                if '"type": "adhoc"' in loaded_json and '"token": null' in loaded_json:
-                    PrintStyle.error(
-                        "ERROR: Null token persisted in JSON file for an adhoc task"
-                    )
+            write_file(path, json_data)
+            self._saved_json = json_data
+            self._signature = self._file_signature()
 
         return self
 
@@ -575,8 +610,8 @@ class SchedulerTaskList(BaseModel):
         Returns the updated task or None if not found.
         """
         with self._lock:
-            # Reload to ensure we have the latest state
-            await self.reload()
+            # Reload if another process changed the file
+            await self.reload_if_changed()
 
             # Find the task
             task = next((task for task in self.tasks if task.uuid == task_uuid and verify_func(task)), None)
@@ -585,6 +620,7 @@ class SchedulerTaskList(BaseModel):
 
             # Apply the updates via the provided function
             updater_func(task)
+            self._schedule(task)
 
             # Save the changes
             await self.save()
@@ -604,12 +640,51 @@ class SchedulerTaskList(BaseModel):
             ]
 
     async def get_due_tasks(self) -> list[Union[ScheduledTask, AdHocTask, PlannedTask]]:
+        """Pop the idle tasks whose next run has passed and schedule their following run."""
         with self._lock:
-            await self.reload()
-            return [
-                task for task in self.tasks
-                if task.check_schedule() and task.state == TaskState.IDLE
-            ]
+            await self.reload_if_changed()
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                next_run, task_uuid = heapq.heappop(self._heap)
+                entry = self._next_runs.get(task_uuid)
+                if entry is None or entry[0] != next_run:
+                    continue
+                del self._next_runs[task_uuid]
+                task = entry[1]
+                self._fired[task_uuid] = next_run
+                if task.state == TaskState.IDLE:
+                    due.append(task)
+                self._schedule(task)
+            return due
+
+    def get_next_due_time(self) -> float | None:
+        """Timestamp of the earliest scheduled run, None when nothing is scheduled."""
+        with self._lock:
+            while self._heap:
+                next_run, task_uuid = self._heap[0]
+                entry = self._next_runs.get(task_uuid)
+                if entry is not None and entry[0] == next_run:
+                    return next_run
+                heapq.heappop(self._heap)
+            return None
+
+    async def wait_until_due(self, timeout: float):
+        """Sleep until the earliest task is due, an earlier run gets scheduled or the timeout passes."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            next_run = self.get_next_due_time()
+            if next_run is not None:
+                timeout = min(timeout, next_run - time.time())
+            if timeout > 0:
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
 
     def get_task_by_uuid(self, task_uuid: str) -> Union[ScheduledTask, AdHocTask, PlannedTask] | None:
         with self._lock:
@@ -626,15 +701,69 @@ class SchedulerTaskList(BaseModel):
     async def remove_task_by_uuid(self, task_uuid: str) -> "SchedulerTaskList":
         with self._lock:
             self.tasks = [task for task in self.tasks if task.uuid != task_uuid]
+            self._next_runs.pop(task_uuid, None)
             await self.save()
         return self
 
     async def remove_task_by_name(self, name: str) -> "SchedulerTaskList":
         with self._lock:
+            for task in self.tasks:
+                if task.name == name:
+                    self._next_runs.pop(task.uuid, None)
             self.tasks = [task for task in self.tasks if task.name != name]
             await self.save()
         return self
 
+    def _schedule(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]):
+        # replaces the task's heap entry, the old one becomes stale
+        self._next_runs.pop(task.uuid, None)
+        if task.state != TaskState.IDLE:
+            return
+        # look back for runs missed while loading, but never before the task's
+        # creation, its last run or the last run handed out
+        fired = self._fired.get(task.uuid, float("-inf"))
+        after = max(
+            time.time() - SCHEDULE_LOOKBACK,
+            (task.last_run or task.created_at).timestamp(),
+            fired,
+        )
+        next_run = task.get_next_run(after=datetime.fromtimestamp(after, timezone.utc))
+        if next_run is None:
+            return
+        timestamp = next_run.timestamp()
+        if timestamp <= fired:
+            return
+        earliest = self.get_next_due_time()
+        self._next_runs[task.uuid] = (timestamp, task)
+        heapq.heappush(self._heap, (timestamp, task.uuid))
+        if earliest is None or timestamp < earliest:
+            self._notify()
+
+    def _schedule_all(self):
+        with self._lock:
+            self._heap = []
+            self._next_runs = {}
+            for task in self.tasks:
+                self._schedule(task)
+            self._notify()
+
+    def _notify(self):
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @staticmethod
+    def _file_signature() -> tuple[int, int] | None:
+        try:
+            stat = os.stat(get_abs_path(SCHEDULER_FOLDER, "tasks.json"))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
 
 class TaskScheduler:
 
@@ -688,7 +817,10 @@ class TaskScheduler:
         return cancelled_any
 
     async def reload(self):
-        await self._tasks.reload()
+        await self._tasks.reload_if_changed()
+
+    async def wait_until_due(self, timeout: float):
+        await self._tasks.wait_until_due(timeout)
 
     def get_tasks(self) -> list[Union[ScheduledTask, AdHocTask, PlannedTask]]:
         return self._tasks.get_tasks()
@@ -730,7 +862,7 @@ class TaskScheduler:
 
     async def run_task_by_uuid(self, task_uuid: str, task_context: str | None = None):
         # First reload tasks to ensure we have the latest state
-        await self._tasks.reload()
+        await self._tasks.reload_if_changed()
 
         # Get the task to run
         task = self.get_task_by_uuid(task_uuid)
@@ -749,8 +881,8 @@ class TaskScheduler:
         if task.state == TaskState.ERROR:
             PrintStyle.info(f"Resetting task '{task.name}' from ERROR to IDLE state before running")
             await self.update_task(task_uuid, state=TaskState.IDLE)
-            # Force a reload to ensure we have the updated state
-            await self._tasks.reload()
+            # Pick up the updated state
+            await self._tasks.reload_if_changed()
             task = self.get_task_by_uuid(task_uuid)
             if not task:
                 raise ValueError(f"Task with UUID '{task_uuid}' not found after state reset")
@@ -936,7 +1068,7 @@ class TaskScheduler:
                 await current_task.on_success(result)
 
                 # Explicitly verify task was updated in storage after success
-                await self._tasks.reload()
+                await self._tasks.reload_if_changed()
                 updated_task = self.get_task_by_uuid(task_uuid)
                 if updated_task and updated_task.state != TaskState.IDLE:
                     PrintStyle.warning(f"Fixing task state consistency: '{current_task.name}' state is not IDLE after success")
@@ -955,7 +1087,7 @@ class TaskScheduler:
                 await current_task.on_error(str(e))
 
                 # Explicitly verify task was updated in storage after error
-                await self._tasks.reload()
+                await self._tasks.reload_if_changed()
                 updated_task = self.get_task_by_uuid(task_uuid)
                 if updated_task and updated_task.state != TaskState.ERROR:
                     PrintStyle.warning(f"Fixing task state consistency: '{current_task.name}' state is not ERROR after failure")
@@ -1248,3 +1380,18 @@ def deserialize_task(task_data: Dict[str, Any], task_class: Optional[Type[T]] =
         plan_data = task_data.get("plan", {})
         common_args["plan"] = parse_task_plan(plan_data)
         return PlannedTask(**common_args)  # type: ignore
+
+
+def register_watchdogs():
+    from helpers import watchdog
+
+    def on_tasks_change(items: list[watchdog.WatchItem]):
+        SchedulerTaskList.on_file_change()
+
+    # tasks.json written by another process (e.g. a development instance)
+    watchdog.add_watchdog(
+        id="scheduler_tasks",
+        roots=[get_abs_path(SCHEDULER_FOLDER)],
+        patterns=["tasks.json"],
+        handler=on_tasks_change,
+    )
@@ -0,0 +1,286 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from simpleeval import SimpleEval
+
+from helpers import cache, files
+
+# compiled templates by absolute path
+CACHE_AREA = "prompt_templates"
+# resolved absolute paths by (file, directories)
+RESOLVE_CACHE_AREA = "prompt_templates_resolve"
+# variables plugin classes by (plugin file, directories)
+VARIABLES_CACHE_AREA = "prompt_templates_variables"
+
+_IF_PATTERN = re.compile(r"{{\s*if\s+(.*?)}}", flags=re.DOTALL)
+_TOKEN_PATTERN = re.compile(r"{{\s*(if\b.*?|endif)\s*}}", flags=re.DOTALL)
+_PLACEHOLDER_PATTERN = re.compile(r"{{([^{}]*)}}")
+
+_parser = SimpleEval()
+
+
+@dataclass(slots=True)
+class _Condition:
+    """{{if}} block compiled the way files.evaluate_text_conditions processes it."""
+
+    before: str
+    condition: str
+    parsed: Any  # parsed expression or the exception raised while parsing
+    inner: "_Node"
+    after: "_Node"
+    raw: str  # returned unchanged when the condition fails to evaluate
+
+
+_Node = str | _Condition
+
+
+def _compile(text: str) -> _Node:
+    m_if = _IF_PATTERN.search(text)
+    if not m_if:
+        return text
+
+    depth = 1
+    pos = m_if.end()
+    while True:
+        m = _TOKEN_PATTERN.search(text, pos)
+        if not m:
+            # Unterminated if-block, text is kept as is
+            return text
+        depth += 1 if m.group(1).startswith("if ") else -1
+        if depth == 0:
+            break
+        pos = m.end()
+
+    condition = m_if.group(1).strip()
+    try:
+        parsed = _parser.parse(condition)
+    except Exception as e:
+        parsed = e
+    return _Condition(
+        before=text[: m_if.start()],
+        condition=condition,
+        parsed=parsed,
+        inner=_compile(text[m_if.end() : m.start()]),
+        after=_compile(text[m.end() :]),
+        raw=text,
+    )
+
+
+class _Evaluator:
+    def __init__(self, variables: dict[str, Any]):
+        self.variables = variables
+        self._eval: SimpleEval | None = None
+
+    def __call__(self, node: _Condition) -> Any:
+        if isinstance(node.parsed, Exception):
+            raise node.parsed
+        if self._eval is None:
+            self._eval = SimpleEval(names=self.variables)
+        return self._eval.eval(node.condition, previously_parsed=node.parsed)
+
+
+def _render(node: _Node, evaluate: _Evaluator) -> str:
+    if isinstance(node, str):
+        return node
+    try:
+        result = evaluate(node)
+    except Exception:
+        # On evaluation error, do not modify this block
+        return node.raw
+    if result:
+        return node.before + _render(node.inner, evaluate) + _render(node.after, evaluate)
+    return node.before + _render(node.after, evaluate)
+
+
+class PromptTemplate:
+    """Prompt file parsed once into its {{if}} blocks.
+
+    Rendering evaluates pre-parsed conditions and substitutes placeholders in a
+    single pass, producing the same text as files.evaluate_text_conditions and
+    files.replace_placeholders_text.
+    """
+
+    def __init__(self, content: str, mtime_ns: int = 0, size: int = 0):
+        self.content = content
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.root = _compile(content)
+
+    def evaluate_conditions(self, variables: dict[str, Any]) -> str:
+        return _render(self.root, _Evaluator(variables))
+
+    def render(self, variables: dict[str, Any]) -> str:
+        return replace_placeholders(self.evaluate_conditions(variables), variables)
+
+
+def replace_placeholders(text: str, variables: dict[str, Any]) -> str:
+    """Single pass equivalent of files.replace_placeholders_text."""
+    if "{{" not in text or not variables:
+        return text
+
+    nested = False
+
+    def replace(match: re.Match[str]) -> str:
+        nonlocal nested
+        key = match.group(1)
+        if key not in variables:
+            return match.group(0)
+        value = str(variables[key])
+        if "{{" in value or "}}" in value:
+            nested = True
+        return value
+
+    result = _PLACEHOLDER_PATTERN.sub(replace, text)
+    if nested or any(("{" in key or "}" in key) for key in variables):
+        # Values or keys with braces may form new placeholders, keep sequential semantics
+        return files.replace_placeholders_text(text, **variables)
+    if "{{" in result:
+        for match in _PLACEHOLDER_PATTERN.finditer(result):
+            if match.group(1) in variables:
+                return files.replace_placeholders_text(text, **variables)
+    return result
+
+
+def find_prompt_file(_file: str, _directories: list[str]) -> str:
+    """Cached files.find_file_in_dirs, hits are checked by get_template."""
+    key = (_file, tuple(_directories))
+    path = cache.get(RESOLVE_CACHE_AREA, key)
+    if path is None:
+        path = files.find_file_in_dirs(_file, _directories)
+        cache.add(RESOLVE_CACHE_AREA, key, path)
+    return path
+
+
+def get_template(absolute_path: str, _encoding: str = "utf-8") -> PromptTemplate:
+    stat = os.stat(absolute_path)
+    key = (absolute_path, _encoding)
+    template: PromptTemplate | None = cache.get(CACHE_AREA, key)
+    if template is None or template.mtime_ns != stat.st_mtime_ns or template.size != stat.st_size:
+        with open(absolute_path, "r", encoding=_encoding) as f:
+            content = f.read()
+        template = PromptTemplate(content, stat.st_mtime_ns, stat.st_size)
+        cache.add(CACHE_AREA, key, template)
+    return template
+
+
+def load_template(
+    _file: str, _directories: list[str], _encoding: str = "utf-8"
+) -> tuple[str, PromptTemplate]:
+    """Resolve and load a prompt file, returning its absolute path and template."""
+    absolute_path = find_prompt_file(_file, _directories)
+    try:
+        return absolute_path, get_template(absolute_path, _encoding)
+    except FileNotFoundError:
+        # cached path is gone, resolve again
+        cache.remove(RESOLVE_CACHE_AREA, (_file, tuple(_directories)))
+        absolute_path = find_prompt_file(_file, _directories)
+        return absolute_path, get_template(absolute_path, _encoding)
+
+
+def get_variables_plugin(plugin_filename: str, directories: list[str]) -> type | None:
+    """Cached lookup of the VariablesPlugin class for a prompt file."""
+    key = (plugin_filename, tuple(directories))
+    entry = cache.get(VARIABLES_CACHE_AREA, key)
+    if entry is not None:
+        path, mtime_ns, cls = entry
+        if path is None:
+            return None
+        try:
+            if os.stat(path).st_mtime_ns == mtime_ns:
+                return cls
+        except OSError:
+            pass
+
+    try:
+        path = files.find_file_in_dirs(plugin_filename, directories)
+    except FileNotFoundError:
+        path = None
+
+    cls = None
+    mtime_ns = 0
+    if path and files.exists(path):
+        from helpers import modules
+
+        mtime_ns = os.stat(path).st_mtime_ns
+        classes = modules.load_classes_from_file(
+            path, files.VariablesPlugin, one_per_file=False
+        )
+        cls = classes[0] if classes else None
+    else:
+        path = None
+
+    cache.add(VARIABLES_CACHE_AREA, key, (path, mtime_ns, cls))
+    return cls
+
+
+def read_prompt_file(
+    _file: str, _directories: list[str] | None = None, _encoding="utf-8", **kwargs
+) -> str:
+    if _directories is None:
+        _directories = []
+
+    # If filename contains folder path, extract it and add to directories
+    if os.path.dirname(_file):
+        folder_path = os.path.dirname(_file)
+        _file = os.path.basename(_file)
+        _directories = [folder_path] + _directories
+
+    absolute_path, template = load_template(_file, _directories, _encoding)
+    source_dir = os.path.dirname(absolute_path)
+
+    variables = files.load_plugin_variables(_file, _directories, **kwargs) or {}  # type: ignore
+    variables.update(kwargs)
+
+    content = template.render(variables)
+
+    # Process include statements (with source tracking for {{include original}})
+    if "include" in content:
+        content = files.process_includes(
+            # here we use kwargs, the plugin variables are not inherited
+            content,
+            _directories,
+            _source_file=_file,
+            _source_dir=source_dir,
+            **kwargs,
+        )
+
+    return content
+
+
+def clear_cache():
+    cache.clear(CACHE_AREA)
+    cache.clear(RESOLVE_CACHE_AREA)
+    cache.clear(VARIABLES_CACHE_AREA)
+
+
+def register_watchdogs():
+    from helpers import watchdog
+    from helpers.print_style import PrintStyle
+
+    def on_prompts_change(items: list[watchdog.WatchItem]):
+        from helpers import prompt_sections
+
+        PrintStyle.debug("Prompts watchdog triggered:", items)
+        clear_cache()
+        prompt_sections.invalidate()
+
+    # prompts
+    watchdog.add_watchdog(
+        id="prompt_templates_base",
+        roots=[files.get_abs_path("prompts")],
+        handler=on_prompts_change,
+    )
+
+    # agents, plugins and usr (profiles, plugins and projects with prompts folders)
+    watchdog.add_watchdog(
+        id="prompt_templates_nested",
+        roots=[
+            files.get_abs_path(files.AGENTS_DIR),
+            files.get_abs_path(files.PLUGINS_DIR),
+            files.get_abs_path(files.USER_DIR),
+        ],
+        patterns=["prompts/*", "prompts/*/*"],
+        handler=on_prompts_change,
+    )
@@ -1,24 +1,57 @@
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import threading
 from typing import Literal
 import tiktoken
 
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
+COUNT_CACHE_SIZE = 4096
+
+_count_cache: "OrderedDict[tuple[str, bytes], int]" = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
+    return tiktoken.get_encoding(encoding_name)
 
 
 def count_tokens(text: str, encoding_name="cl100k_base") -> int:
     if not text:
         return 0
 
-    # Get the encoding
-    encoding = tiktoken.get_encoding(encoding_name)
+    # same content is counted once, keyed by hash to keep the cache small
+    key = (
+        encoding_name,
+        hashlib.blake2b(
+            text.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest(),
+    )
+    with _count_cache_lock:
+        token_count = _count_cache.get(key)
+        if token_count is not None:
+            _count_cache.move_to_end(key)
+            return token_count
 
     # Encode the text and count the tokens
-    tokens = encoding.encode(text, disallowed_special=())
+    tokens = get_encoding(encoding_name).encode(text, disallowed_special=())
     token_count = len(tokens)
 
+    with _count_cache_lock:
+        _count_cache[key] = token_count
+        if len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
     return token_count
 
 
+def clear_count_cache() -> None:
+    with _count_cache_lock:
+        _count_cache.clear()
+
+
 def approximate_tokens(
     text: str,
 ) -> int:
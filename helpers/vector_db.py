@@ -1,4 +1,10 @@
-from typing import Any, List, Sequence
+import math
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+import numpy as np
 from langchain_community.vectorstores import FAISS
 
 # faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
@@ -7,19 +13,198 @@ import faiss
 
 
 from langchain_core.documents import Document
-from langchain.storage import InMemoryByteStore
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores.utils import (
     DistanceStrategy,
 )
-from langchain.embeddings import CacheBackedEmbeddings
 from simpleeval import simple_eval
 
 from agent import Agent
-from helpers import guids
+from helpers import embedding_cache, guids
+
+
+INDEX_FLAT = "flat"
+INDEX_IVF = "ivf"
+INDEX_HNSW = "hnsw"
+
+# docstore id of index positions deleted from approximate indexes until compaction
+DELETED_ID = ""
+# approximate indexes are compacted once this share of their positions is deleted
+COMPACT_RATIO = 0.1
+
+
+@dataclass
+class IndexSettings:
+    """Index strategy of a store, flat stores are promoted past promote_threshold."""
+
+    strategy: str = INDEX_FLAT
+    promote_threshold: int = 20000
+    ivf_nlist: int = 0  # 0 to derive from the number of vectors
+    ivf_nprobe: int = 16
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 128
+    hnsw_ef_search: int = 128
+
+    @staticmethod
+    def from_config(config: dict[str, Any] | None, prefix: str = "") -> "IndexSettings":
+        settings = IndexSettings()
+        for name, default in vars(IndexSettings()).items():
+            value = (config or {}).get(prefix + name)
+            if value is not None and value != "":
+                setattr(settings, name, type(default)(value))
+        return settings
+
+
+def get_index_strategy(index: faiss.Index) -> str:
+    if faiss.try_extract_index_ivf(index) is not None:
+        return INDEX_IVF
+    if isinstance(index, faiss.IndexHNSW):
+        return INDEX_HNSW
+    return INDEX_FLAT
+
+
+def build_index(vectors: np.ndarray, settings: IndexSettings) -> faiss.Index:
+    """Build an inner product index of the given strategy containing vectors in order."""
+    count, dimensions = vectors.shape
+    if settings.strategy == INDEX_IVF and count:
+        # ~39 training points per centroid keep k-means quiet and stable
+        nlist = settings.ivf_nlist or int(4 * math.sqrt(count))
+        nlist = max(1, min(nlist, count // 39 or 1))
+        quantizer = faiss.IndexFlatIP(dimensions)
+        index = faiss.IndexIVFFlat(
+            quantizer, dimensions, nlist, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.make_direct_map()
+    elif settings.strategy == INDEX_HNSW:
+        index = faiss.IndexHNSWFlat(
+            dimensions, settings.hnsw_m, faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = settings.hnsw_ef_construction
+    else:
+        index = faiss.IndexFlatIP(dimensions)
+    configure_index(index, settings)
+    if count:
+        index.add(vectors)
+    return index
+
+
+def configure_index(index: faiss.Index, settings: IndexSettings) -> None:
+    """Apply search time parameters, these are not tied to the stored index."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(settings.ivf_nprobe, ivf.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.hnsw_ef_search
+
+
+def get_search_parameters(
+    index: faiss.Index, selector: faiss.IDSelector
+) -> faiss.SearchParameters:
+    """Search parameters restricted to selector, keeping the index's configured ones."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+class _LiveIndex:
+    """Index view for FAISS's own searches, skipping deleted positions."""
+
+    def __init__(self, db: "MyFaiss", index: faiss.Index):
+        self._db = db
+        self._index = index
+
+    def search(self, x: np.ndarray, k: int, *args: Any, **kwargs: Any):
+        return self._db.search_index(x, k, index=self._index)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._index, name)
 
 
 class MyFaiss(FAISS):
+    index_settings: IndexSettings | None = None
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # guards index and docstore changes, persistence snapshots them under it
+        self.lock = threading.RLock()
+        # ids added, replaced or removed since the last take_changed_ids()
+        self.changed_ids: set[str] = set()
+        # docstore id -> index position, built on first use and kept up to date
+        self.positions: dict[str, int] | None = None
+        # deleted positions of approximate indexes, skipped by searches
+        self.tombstones: set[int] = set()
+        self._tombstone_selector: tuple[faiss.IDSelector, ...] | None = None
+        self.set_id_mapping(self.index_to_docstore_id)
+
+    def set_id_mapping(self, index_to_docstore_id: dict[int, str]) -> None:
+        """Replace the index position -> docstore id mapping and derived state."""
+        self.index_to_docstore_id = index_to_docstore_id
+        self.tombstones = {
+            i for i, id_ in index_to_docstore_id.items() if id_ == DELETED_ID
+        }
+        self._tombstone_selector = None
+        self.positions = None
+
+    def get_positions(self) -> dict[str, int]:
+        if self.positions is None:
+            self.positions = {
+                id_: i
+                for i, id_ in self.index_to_docstore_id.items()
+                if id_ != DELETED_ID
+            }
+        return self.positions
+
+    def _track_added(self, added: List[str]) -> None:
+        self.changed_ids.update(added)
+        if self.positions is not None:
+            start = len(self.index_to_docstore_id) - len(added)
+            self.positions.update((id_, start + i) for i, id_ in enumerate(added))
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        with self.lock:
+            added = super().add_texts(texts, metadatas, ids, **kwargs)
+            self._track_added(added)
+            return added
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        with self.lock:
+            added = super().add_embeddings(text_embeddings, metadatas, ids, **kwargs)
+            self._track_added(added)
+            return added
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        # FAISS adds straight to the index here, route it through the locked add
+        texts = list(texts)
+        embeddings = await self._aembed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas, ids, **kwargs)
+
+    def take_changed_ids(self) -> set[str]:
+        with self.lock:
+            changed, self.changed_ids = self.changed_ids, set()
+            return changed
+
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -31,29 +216,200 @@ class MyFaiss(FAISS):
     def get_all_docs(self) -> dict[str, Document]:
         return self.docstore._dict  # type: ignore
 
+    def set_index_settings(self, settings: IndexSettings | None) -> None:
+        self.index_settings = settings
+        if settings:
+            configure_index(self.index, settings)
+
+    def get_vectors(self) -> np.ndarray:
+        """All indexed vectors in index_to_docstore_id order, deleted ones included."""
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.make_direct_map()
+        if not self.index.ntotal:
+            return np.empty((0, self.index.d), dtype=np.float32)
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def apply_index_strategy(self) -> bool:
+        """Rebuild the index when it does not match the configured strategy.
+
+        Flat indexes are promoted once they reach the promote threshold, approximate
+        indexes are kept when shrinking and rebuilt when the strategy changes.
+        Returns True if the index was replaced.
+        """
+        settings = self.index_settings
+        if not settings:
+            return False
+        with self.lock:
+            current = get_index_strategy(self.index)
+            if current == settings.strategy:
+                return False
+            live = self.index.ntotal - len(self.tombstones)
+            if current == INDEX_FLAT and live < settings.promote_threshold:
+                return False
+            self._rebuild(lambda vectors: build_index(vectors, settings))
+            return True
+
+    def compact(self) -> bool:
+        """Drop deleted positions by rebuilding the index with the same strategy.
+
+        Returns True if there was anything to drop.
+        """
+        with self.lock:
+            if not self.tombstones:
+                return False
+            self._rebuild(self._refill)
+            return True
+
+    def _refill(self, vectors: np.ndarray) -> faiss.Index:
+        # a reset clone keeps the trained IVF centroids and the HNSW parameters
+        index = faiss.clone_index(self.index)
+        index.reset()
+        if len(vectors):
+            index.add(vectors)
+        return index
+
+    def _rebuild(self, make_index: Callable[[np.ndarray], faiss.Index]) -> None:
+        keep = [
+            i for i, id_ in sorted(self.index_to_docstore_id.items()) if id_ != DELETED_ID
+        ]
+        vectors = self.get_vectors()
+        if self.tombstones:
+            vectors = vectors[keep]
+        self.index = make_index(vectors)
+        self.set_id_mapping(
+            {i: self.index_to_docstore_id[old] for i, old in enumerate(keep)}
+        )
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        with self.lock:
+            deleted = self._delete(ids, **kwargs)
+            self.changed_ids.update(ids or [])
+            return deleted
+
+    def search_index(
+        self,
+        queries: np.ndarray,
+        k: int,
+        selector: faiss.IDSelector | None = None,
+        index: faiss.Index | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """index.search restricted to selector, deleted positions are never returned."""
+        index = index or self.index
+        with self.lock:
+            if selector is None and self.tombstones:
+                if self._tombstone_selector is None:
+                    # the batch selector is kept alive next to the one wrapping it
+                    batch = faiss.IDSelectorBatch(
+                        np.fromiter(self.tombstones, dtype=np.int64)
+                    )
+                    self._tombstone_selector = (faiss.IDSelectorNot(batch), batch)
+                selector = self._tombstone_selector[0]
+            params = (
+                get_search_parameters(index, selector) if selector is not None else None
+            )
+            return index.search(queries, k, params=params)
+
+    def similarity_search_with_score_by_vector(self, *args: Any, **kwargs: Any):
+        with self.lock, self._live_index():
+            return super().similarity_search_with_score_by_vector(*args, **kwargs)
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self, *args: Any, **kwargs: Any
+    ):
+        with self.lock, self._live_index():
+            return super().max_marginal_relevance_search_with_score_by_vector(
+                *args, **kwargs
+            )
+
+    @contextmanager
+    def _live_index(self):
+        if not self.tombstones:
+            yield
+            return
+        index = self.index
+        self.index = _LiveIndex(self, index)  # type: ignore
+        try:
+            yield
+        finally:
+            self.index = index
+
+    def search_by_vectors(
+        self, vectors: list[list[float]], k: int, ids: Iterable[str] | None = None
+    ) -> list[list[tuple[Document, float]]]:
+        """Top k documents with scores for each vector, all in one index search.
+
+        With ids only those documents are searched, using an id selector in the
+        index instead of evaluating a filter on each document's metadata.
+        """
+        with self.lock:
+            selector = None
+            if ids is not None:
+                positions = self.get_positions()
+                allowed = [positions[id_] for id_ in ids if id_ in positions]
+                k = min(k, len(allowed))
+                selector = faiss.IDSelectorBatch(np.array(allowed, dtype=np.int64))
+            k = min(k, self.index.ntotal - len(self.tombstones))
+            if not vectors or k <= 0:
+                return [[] for _ in vectors]
+
+            queries = np.array(vectors, dtype=np.float32)
+            if self._normalize_L2:
+                faiss.normalize_L2(queries)
+            scores, indices = self.search_index(queries, k, selector)
+            results = []
+            for row_scores, row_indices in zip(scores, indices):
+                results.append(
+                    [
+                        (self.docstore._dict[self.index_to_docstore_id[i]], float(score))  # type: ignore
+                        for score, i in zip(row_scores, row_indices)
+                        if i != -1
+                    ]
+                )
+            return results
+
+    def _delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if get_index_strategy(self.index) == INDEX_FLAT:
+            deleted = super().delete(ids, **kwargs)
+            self.positions = None
+            return deleted
+
+        # approximate indexes keep their ids on removal (IVF) or do not support
+        # it (HNSW), mark the positions deleted and compact once enough piled up
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        positions = self.get_positions()
+        missing_ids = set(ids).difference(positions)
+        if missing_ids:
+            raise ValueError(
+                f"Some specified ids do not exist in the current store. Ids not found: "
+                f"{missing_ids}"
+            )
+
+        for id_ in set(ids):
+            position = positions.pop(id_)
+            self.index_to_docstore_id[position] = DELETED_ID
+            self.tombstones.add(position)
+        self._tombstone_selector = None
+        self.docstore.delete(ids)
+        if len(self.tombstones) >= max(1, self.index.ntotal * COMPACT_RATIO):
+            self.compact()
+        return True
+
 
 class VectorDB:
 
-    _cached_embeddings: dict[str, CacheBackedEmbeddings] = {}
+    _cached_embeddings: dict[str, embedding_cache.CachedEmbeddings] = {}
 
     @staticmethod
     def _get_embeddings(agent: Agent, cache: bool = True):
         model = agent.get_embedding_model()
         if not cache:
             return model  # return raw embeddings if cache is False
-        namespace = getattr(
-            model,
-            "model_name",
-            "default",
-        )
+        namespace = embedding_cache.get_namespace(model)
         if namespace not in VectorDB._cached_embeddings:
-            store = InMemoryByteStore()
-            VectorDB._cached_embeddings[namespace] = (
-                CacheBackedEmbeddings.from_bytes_store(
-                    model,
-                    store,
-                    namespace=namespace,
-                )
+            VectorDB._cached_embeddings[namespace] = embedding_cache.CachedEmbeddings(
+                model, embedding_cache.get_cache(), namespace
             )
         return VectorDB._cached_embeddings[namespace]
 
@@ -61,7 +417,12 @@ class VectorDB:
         self.agent = agent
         self.cache = cache  # store cache preference
         self.embeddings = self._get_embeddings(agent, cache=cache)
-        self.index = faiss.IndexFlatIP(len(self.embeddings.embed_query("example")))
+        # the dimension is recorded per model, only the first store embeds a probe
+        model = getattr(self.embeddings, "underlying_embeddings", self.embeddings)
+        dimension = embedding_cache.get_dimension(
+            model, embedding_cache.get_cache(), embedding_cache.get_namespace(model)
+        )
+        self.index = faiss.IndexFlatIP(dimension)
 
         self.db = MyFaiss(
             embedding_function=self.embeddings,
@@ -86,6 +447,28 @@ class VectorDB:
             filter=comparator,
         )
 
+    async def search_many_by_similarity_threshold(
+        self,
+        queries: list[str],
+        limit: int,
+        threshold: float,
+        ids: Iterable[str] | None = None,
+    ) -> list[list[Document]]:
+        """Results for each query, embedded in one request and searched in one index search.
+
+        ids restricts the search to these documents.
+        """
+        if not queries:
+            return []
+        # queries are not cached, same as single query searches
+        model = getattr(self.embeddings, "underlying_embeddings", self.embeddings)
+        vectors = await model.aembed_documents(queries)
+        results = self.db.search_by_vectors(vectors, limit, ids)
+        return [
+            [doc for doc, score in found if cosine_normalizer(score) >= threshold]
+            for found in results
+        ]
+
     async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
         comparator = get_comparator(filter)
         all_docs = self.db.get_all_docs()
@@ -105,7 +488,7 @@ class VectorDB:
             for doc, id in zip(docs, ids):
                 doc.metadata["id"] = id  # add ids to documents metadata
 
-            self.db.add_documents(documents=docs, ids=ids)
+            await self.db.aadd_documents(documents=docs, ids=ids)
         return ids
 
     async def delete_documents_by_ids(self, ids: list[str]):
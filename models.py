@@ -227,6 +227,11 @@ def get_rate_limiter(
     return limiter
 
 
+def get_rate_limiter_usage() -> dict[str, dict[str, dict[str, Any]]]:
+    """Current usage of all rate limiters by provider\\model key"""
+    return {key: limiter.get_usage() for key, limiter in list(rate_limiters.items())}
+
+
 def _is_transient_litellm_error(exc: Exception) -> bool:
     """Uses status_code when available, else falls back to exception types"""
     # Prefer explicit status codes if present
@@ -252,12 +257,30 @@ def _is_transient_litellm_error(exc: Exception) -> bool:
     return isinstance(exc, transient_types)
 
 
+def estimate_input_tokens(messages: List[dict]) -> int:
+    """Approximate input tokens of converted messages.
+    Counted per message, so history already sent is served from the token count cache."""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and part.get("type") == "text":
+                    total += approximate_tokens(str(part.get("text", "")))
+                else:
+                    total += approximate_tokens(str(part))
+        else:
+            total += approximate_tokens(str(content))
+    return total
+
+
 async def apply_rate_limiter(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_text: str = "",
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
+    input_tokens: int | None = None,
 ):
     if not model_config:
         return
@@ -268,18 +291,20 @@ async def apply_rate_limiter(
         model_config.limit_input,
         model_config.limit_output,
     )
-    limiter.add(input=approximate_tokens(input_text))
-    limiter.add(requests=1)
+    if input_tokens is None:
+        input_tokens = approximate_tokens(input_text)
+    limiter.add(input=input_tokens, requests=1)
     await limiter.wait(rate_limiter_callback)
     return limiter
 
 
 def apply_rate_limiter_sync(
     model_config: ModelConfig | None,
-    input_text: str,
+    input_text: str = "",
     rate_limiter_callback: (
         Callable[[str, str, int, int], Awaitable[bool]] | None
     ) = None,
+    input_tokens: int | None = None,
 ):
     if not model_config:
         return
@@ -287,7 +312,9 @@ def apply_rate_limiter_sync(
 
     nest_asyncio.apply()
     return asyncio.run(
-        apply_rate_limiter(model_config, input_text, rate_limiter_callback)
+        apply_rate_limiter(
+            model_config, input_text, rate_limiter_callback, input_tokens
+        )
     )
 
 
@@ -318,6 +345,11 @@ class LiteLLMChatWrapper(SimpleChatModel):
     def _llm_type(self) -> str:
         return "litellm-chat"
 
+    async def _aconvert_messages(self, messages: List[BaseMessage], explicit_caching: bool = False) -> List[dict]:
+        # local images not encoded yet are read and encoded off the event loop
+        await images.preload(m.content for m in messages)
+        return self._convert_messages(messages, explicit_caching)
+
     def _convert_messages(self, messages: List[BaseMessage], explicit_caching: bool = False) -> List[dict]:
         result = []
         # Map LangChain message types to LiteLLM roles
@@ -393,7 +425,9 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(
+            self.a0_model_conf, input_tokens=estimate_input_tokens(msgs)
+        )
 
         # Call the model
         call_kwargs = _without_stream_kwarg({**self.kwargs, **kwargs})
@@ -418,7 +452,9 @@ class LiteLLMChatWrapper(SimpleChatModel):
         msgs = self._convert_messages(messages)
 
         # Apply rate limiting if configured
-        apply_rate_limiter_sync(self.a0_model_conf, str(msgs))
+        apply_rate_limiter_sync(
+            self.a0_model_conf, input_tokens=estimate_input_tokens(msgs)
+        )
 
         result = ChatGenerationResult()
         call_kwargs = _without_stream_kwarg({**self.kwargs, **kwargs})
@@ -447,10 +483,12 @@ class LiteLLMChatWrapper(SimpleChatModel):
         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> AsyncIterator[ChatGenerationChunk]:
-        msgs = self._convert_messages(messages)
+        msgs = await self._aconvert_messages(messages)
 
         # Apply rate limiting if configured
-        await apply_rate_limiter(self.a0_model_conf, str(msgs))
+        await apply_rate_limiter(
+            self.a0_model_conf, input_tokens=estimate_input_tokens(msgs)
+        )
 
         result = ChatGenerationResult()
         call_kwargs = _without_stream_kwarg({**self.kwargs, **kwargs})
@@ -499,11 +537,13 @@ class LiteLLMChatWrapper(SimpleChatModel):
             messages.append(HumanMessage(content=user_message))
 
         # convert to litellm format
-        msgs_conv = self._convert_messages(messages, explicit_caching=explicit_caching)
+        msgs_conv = await self._aconvert_messages(messages, explicit_caching=explicit_caching)
 
         # Apply rate limiting if configured
         limiter = await apply_rate_limiter(
-            self.a0_model_conf, str(msgs_conv), rate_limiter_callback
+            self.a0_model_conf,
+            rate_limiter_callback=rate_limiter_callback,
+            input_tokens=estimate_input_tokens(msgs_conv),
         )
 
         # Prepare call kwargs and retry config (strip A0-only params before calling LiteLLM)
@@ -530,6 +570,8 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 if stream:
                     # iterate over chunks
                     stop_response: str | None = None
+                    # output is counted once for the rate limiter, not per delta
+                    streamed: list[str] = []
                     try:
                         async for chunk in _completion:  # type: ignore
                             got_any_chunk = True
@@ -546,9 +588,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
                                         output["reasoning_delta"],
                                         approximate_tokens(output["reasoning_delta"]),
                                     )
-                                # Add output tokens to rate limiter if configured
-                                if limiter:
-                                    limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                                streamed.append(output["reasoning_delta"])
                             # collect response delta and call callbacks
                             if output["response_delta"]:
                                 if response_callback:
@@ -560,13 +600,14 @@ class LiteLLMChatWrapper(SimpleChatModel):
                                         output["response_delta"],
                                         approximate_tokens(output["response_delta"]),
                                     )
-                                # Add output tokens to rate limiter if configured
-                                if limiter:
-                                    limiter.add(output=approximate_tokens(output["response_delta"]))
+                                streamed.append(output["response_delta"])
                             if stop_response is not None:
                                 result.response = stop_response
                                 break
                     finally:
+                        # Add output tokens to rate limiter if configured
+                        if limiter and streamed:
+                            limiter.add(output=approximate_tokens("".join(streamed)))
                         if stop_response is not None and hasattr(_completion, "aclose"):
                             await _completion.aclose()  # type: ignore[attr-defined]
 
@@ -575,10 +616,11 @@ class LiteLLMChatWrapper(SimpleChatModel):
                     parsed = _parse_chunk(_completion)
                     output = result.add_chunk(parsed)
                     if limiter:
-                        if output["response_delta"]:
-                            limiter.add(output=approximate_tokens(output["response_delta"]))
-                        if output["reasoning_delta"]:
-                            limiter.add(output=approximate_tokens(output["reasoning_delta"]))
+                        limiter.add(
+                            output=approximate_tokens(
+                                output["response_delta"] + output["reasoning_delta"]
+                            )
+                        )
 
                 # Successful completion of stream
                 return result.response, result.reasoning
@@ -595,6 +637,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
 
 class LiteLLMEmbeddingWrapper(Embeddings):
     model_name: str
+    provider: str
     kwargs: dict = {}
     a0_model_conf: Optional[ModelConfig] = None
 
@@ -606,6 +649,7 @@ class LiteLLMEmbeddingWrapper(Embeddings):
         **kwargs: Any,
     ):
         self.model_name = f"{provider}/{model}" if provider != "openai" else model
+        self.provider = provider
         self.kwargs = kwargs
         self.a0_model_conf = model_config
 
@@ -658,6 +702,7 @@ class LocalSentenceTransformerWrapper(Embeddings):
 
         self.model = SentenceTransformer(model, **st_kwargs)
         self.model_name = model
+        self.provider = provider
         self.a0_model_conf = model_config
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
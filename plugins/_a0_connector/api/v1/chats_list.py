@@ -19,9 +19,7 @@ class ChatsList(connector_base.ProtectedConnectorApiHandler):
                     "created_at": data.get("created_at"),
                     "last_message": data.get("last_message"),
                     "running": data.get("running", False),
-                    "agent_profile": getattr(context.agent0.config, "profile", "default")
-                    if context.agent0
-                    else "default",
+                    "agent_profile": _agent_profile(context),
                 }
             )
 
@@ -29,3 +27,12 @@ class ChatsList(connector_base.ProtectedConnectorApiHandler):
             "contexts": contexts,
             "chats": contexts,
         }
+
+
+def _agent_profile(context) -> str:
+    # saved chats load their agents lazily, their config holds the saved profile
+    if not context.agents_loaded():
+        return getattr(context.config, "profile", None) or "default"
+    if context.agent0:
+        return getattr(context.agent0.config, "profile", "default")
+    return "default"
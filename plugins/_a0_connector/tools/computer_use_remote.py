@@ -408,7 +408,12 @@ class ComputerUseRemote(Tool):
             preview = self._capture_preview_from_message(message)
             if not preview:
                 continue
-            message.content = f"{preview} [image reference superseded]"
+            content = f"{preview} [image reference superseded]"
+            if hasattr(message, "set_content"):
+                # bumps the history revision so saved chats pick up the edit
+                message.set_content(content)
+                continue
+            message.content = content
             if hasattr(message, "summary"):
                 message.summary = ""
             if hasattr(message, "calculate_tokens"):
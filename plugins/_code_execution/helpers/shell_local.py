@@ -6,12 +6,12 @@ import sys
 from typing import Optional, Tuple
 from helpers import runtime
 from plugins._code_execution.helpers import tty_session
-from plugins._code_execution.helpers.shell_ssh import clean_string
+from plugins._code_execution.helpers.terminal_output import TerminalOutput, clean_string
 
 class LocalInteractiveSession:
     def __init__(self, cwd: str|None = None):
         self.session: tty_session.TTYSession|None = None
-        self.full_output = ''
+        self.output = TerminalOutput()
         self.cwd = cwd
 
     async def connect(self):
@@ -34,24 +34,29 @@ class LocalInteractiveSession:
     async def send_command(self, command: str):
         if not self.session:
             raise Exception("Shell not connected")
-        self.full_output = ""
+        self.output.reset()
         await self.session.sendline(command)
- 
-    async def read_output(self, timeout: float = 0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
+
+    async def read_new_output(self, timeout: float = 0, reset_full_output: bool = False) -> Optional[str]:
+        """Wait up to timeout for output, add everything that arrived to self.output and return it cleaned."""
         if not self.session:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = ""
-
-        # get output from terminal
-        partial_output = await self.session.read_full_until_idle(idle_timeout=0.01, total_timeout=timeout)
-        self.full_output += partial_output
+            self.output.reset()
+
+        # get output from terminal, returns as soon as anything arrives
+        partial_output = self.session.read_available()
+        if not partial_output and timeout > 0:
+            chunk = await self.session.read(timeout=timeout)
+            if chunk:
+                partial_output = chunk + self.session.read_available()
+        if not partial_output:
+            return None
 
-        # clean output
-        partial_output = clean_string(partial_output)
-        clean_full_output = clean_string(self.full_output)
+        self.output.feed(partial_output)
+        return clean_string(partial_output) or None
 
-        if not partial_output:
-            return clean_full_output, None
-        return clean_full_output, partial_output
\ No newline at end of file
+    async def read_output(self, timeout: float = 0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
+        partial_output = await self.read_new_output(timeout, reset_full_output)
+        return self.output.text(), partial_output
\ No newline at end of file
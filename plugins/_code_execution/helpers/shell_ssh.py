@@ -1,10 +1,13 @@
 import asyncio
+import codecs
 import paramiko
+import threading
 import time
 import re
 from typing import Tuple
 from helpers.log import Log
 from helpers.print_style import PrintStyle
+from plugins._code_execution.helpers.terminal_output import TerminalOutput, clean_string
 # from helpers.strings import calculate_valid_match_lengths
 
 
@@ -24,10 +27,14 @@ class SSHInteractiveSession:
         self.client = paramiko.SSHClient()
         self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         self.shell = None
-        self.full_output = b""
         self.last_command = b""
         self.trimmed_command_length = 0  # Initialize trimmed_command_length
         self.cwd = cwd
+        self.output = TerminalOutput()
+        # decoded output received by the reader thread, and coroutines waiting for it
+        self._received: list[str] = []
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
 
     async def connect(self, keepalive_interval: int = 5):
         """
@@ -61,6 +68,9 @@ class SSHInteractiveSession:
 
                 # invoke interactive shell
                 self.shell = self.client.invoke_shell(width=100, height=50)
+                threading.Thread(
+                    target=self._receive, args=(self.shell,), name="ssh-output", daemon=True
+                ).start()
 
                 # disable systemd/OSC prompt metadata and disable local echo
                 initial_command = "unset PROMPT_COMMAND PS0; stty -echo"
@@ -70,10 +80,9 @@ class SSHInteractiveSession:
 
                 # wait for initial prompt/output to settle
                 while True:
-                    full, part = await self.read_output()
+                    full, part = await self.read_output(timeout=0.1)
                     if full and not part:
                         return
-                    time.sleep(0.1)
 
             except Exception as e:
                 errors += 1
@@ -96,7 +105,7 @@ class SSHInteractiveSession:
     async def send_command(self, command: str):
         if not self.shell:
             raise Exception("Shell not connected")
-        self.full_output = b""
+        self.output.reset()
         # if len(command) > 10: # if command is long, add end_comment to split output
         #     command = (command + " \\\n" +SSHInteractiveSession.end_comment + "\n")
         # else:
@@ -104,142 +113,65 @@ class SSHInteractiveSession:
         self.last_command = command.encode()
         self.trimmed_command_length = 0
         self.shell.send(self.last_command)
-        
-    async def read_output(
-        self, timeout: float = 0, reset_full_output: bool = False
-    ) -> Tuple[str, str]:
+
+    async def read_new_output(self, timeout: float = 0, reset_full_output: bool = False) -> str:
+        """Wait up to timeout for output, add everything that arrived to self.output and return it cleaned."""
         if not self.shell:
             raise Exception("Shell not connected")
 
         if reset_full_output:
-            self.full_output = b""
-        partial_output = b""
-        leftover = b""
-        start_time = time.time()
-
-        while self.shell.recv_ready() and (
-            timeout <= 0 or time.time() - start_time < timeout
-        ):
-
-            # data = self.shell.recv(1024)
-            data = self.receive_bytes()
-
-            # # Trim own command from output
-            # if (
-            #     self.last_command
-            #     and len(self.last_command) > self.trimmed_command_length
-            # ):
-            #     command_to_trim = self.last_command[self.trimmed_command_length :]
-            #     data_to_trim = leftover + data
-
-            #     trim_com, trim_out = calculate_valid_match_lengths(
-            #         command_to_trim,
-            #         data_to_trim,
-            #         deviation_threshold=8,
-            #         deviation_reset=2,
-            #         ignore_patterns=[
-            #             rb"\x1b\[\?\d{4}[a-zA-Z](?:> )?",  # ANSI escape sequences
-            #             rb"\r",  # Carriage return
-            #             rb">\s",  # Greater-than symbol
-            #         ],
-            #         debug=False,
-            #     )
-
-            #     leftover = b""
-            #     if trim_com > 0 and trim_out > 0:
-            #         data = data_to_trim[trim_out:]
-            #         leftover = data
-            #         self.trimmed_command_length += trim_com
-
-            partial_output += data
-            self.full_output += data
-            await asyncio.sleep(0.1)  # Prevent busy waiting
-
-        # Decode once at the end
-        decoded_partial_output = partial_output.decode("utf-8", errors="replace")
-        decoded_full_output = self.full_output.decode("utf-8", errors="replace")
-
-        decoded_partial_output = clean_string(decoded_partial_output)
-        decoded_full_output = clean_string(decoded_full_output)
-
-        return decoded_full_output, decoded_partial_output
-
-    def receive_bytes(self, num_bytes=1024):
-        if not self.shell:
-            raise Exception("Shell not connected")
-        # Receive initial chunk of data
-        shell = self.shell
-        data = self.shell.recv(num_bytes)
-
-        # Helper function to ensure that we receive exactly `num_bytes`
-        def recv_all(num_bytes):
-            data = b""
-            while len(data) < num_bytes:
-                chunk = shell.recv(num_bytes - len(data))
-                if not chunk:
-                    break  # Connection might be closed or no more data
-                data += chunk
-            return data
-
-        # Check if the last byte(s) form an incomplete multi-byte UTF-8 sequence
-        if len(data) > 0:
-            last_byte = data[-1]
-
-            # Check if the last byte is part of a multi-byte UTF-8 sequence (continuation byte)
-            if (last_byte & 0b11000000) == 0b10000000:  # It's a continuation byte
-                # Now, find the start of this sequence by checking earlier bytes
-                for i in range(
-                    2, 5
-                ):  # Look back up to 4 bytes (since UTF-8 is up to 4 bytes long)
-                    if len(data) - i < 0:
-                        break
-                    byte = data[-i]
-
-                    # Detect the leading byte of a multi-byte sequence
-                    if (byte & 0b11100000) == 0b11000000:  # 2-byte sequence (110xxxxx)
-                        data += recv_all(1)  # Need 1 more byte to complete
-                        break
-                    elif (
-                        byte & 0b11110000
-                    ) == 0b11100000:  # 3-byte sequence (1110xxxx)
-                        data += recv_all(2)  # Need 2 more bytes to complete
-                        break
-                    elif (
-                        byte & 0b11111000
-                    ) == 0b11110000:  # 4-byte sequence (11110xxx)
-                        data += recv_all(3)  # Need 3 more bytes to complete
-                        break
-
-        return data
-
-def clean_string(input_string):
-    # Remove ANSI escape codes
-    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-    cleaned = ansi_escape.sub("", input_string)
-
-    # remove null bytes
-    cleaned = cleaned.replace("\x00", "")
-
-    # remove ipython \r\r\n> sequences from the start
-    cleaned = re.sub(r'^[ \r]*(?:\r*\n>[ \r]*)*', '', cleaned)
-    # also remove any amount of '> ' sequences from the start
-    cleaned = re.sub(r'^(>\s*)+', '', cleaned)
-
-    # Replace '\r\n' with '\n'
-    cleaned = cleaned.replace("\r\n", "\n")
-
-    # remove leading \r and spaces
-    cleaned = cleaned.lstrip("\r ")
-
-    # Split the string by newline characters to process each segment separately
-    lines = cleaned.split("\n")
-
-    for i in range(len(lines)):
-        # Handle carriage returns '\r' by splitting and taking the last part
-        parts = [part for part in lines[i].split("\r") if part.strip()]
-        if parts:
-            lines[i] = parts[
-                -1
-            ].rstrip()  # Overwrite with the last part after the last '\r'
-
-    return "\n".join(lines)
+            self.output.reset()
+
+        with self._lock:
+            received = self._take_received()
+            if not received and timeout > 0:
+                loop = asyncio.get_running_loop()
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if not received and timeout > 0:
+            try:
+                await asyncio.wait_for(waiter[1], timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                    received = self._take_received()
+
+        self.output.feed(received)
+        return clean_string(received)
+
+    async def read_output(
+        self, timeout: float = 0, reset_full_output: bool = False
+    ) -> Tuple[str, str]:
+        partial_output = await self.read_new_output(timeout, reset_full_output)
+        return self.output.text(), partial_output
+
+    def _take_received(self) -> str:
+        received = "".join(self._received)
+        self._received.clear()
+        return received
+
+    def _receive(self, shell: paramiko.Channel):
+        # blocking reads off the event loop, multi-byte characters may be split between them
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        while True:
+            try:
+                data = shell.recv(4096)
+            except Exception:
+                data = b""
+            text = decoder.decode(data, final=not data)
+            with self._lock:
+                if text:
+                    self._received.append(text)
+                for loop, future in self._waiters:
+                    loop.call_soon_threadsafe(_wake, future)
+                self._waiters.clear()
+            if not data:
+                return
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,167 @@
+import re
+
+# an escape sequence that may still be completed by the next chunk
+_INCOMPLETE_ANSI = re.compile(r"\x1B(?:\[[0-?]*[ -/]*)?\Z")
+_ANSI_ESCAPE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+
+
+class TerminalOutput:
+    """Terminal output cleaned incrementally, equal to clean_string() of all raw text fed.
+
+    Only new text is cleaned: finished lines are kept cleaned, the unfinished
+    last line is cleaned on demand and carriage-return rewrites shrink it as
+    they arrive. An escape sequence split between chunks is held back until
+    it is complete.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._lines: list[str] = []
+        self._lines_length = 0  # joined length of finished lines, with separators
+        self._line = ""  # raw unfinished last line
+        self._escape = ""  # incomplete escape sequence at the end of the last chunk
+        self._head: str | None = ""  # raw start while it may still be stripped, None once settled
+
+    def feed(self, text: str):
+        text = self._escape + text
+        self._escape = ""
+        if match := _INCOMPLETE_ANSI.search(text):
+            self._escape = match.group()
+            text = text[: match.start()]
+        text = _ANSI_ESCAPE.sub("", text).replace("\x00", "")
+        if not text:
+            return
+
+        if self._head is not None:
+            # leading prompts, blanks and '>' are stripped until the first other character
+            self._head += text
+            if self._head.replace(">", "").strip():
+                head = clean_string_start(self._head)
+                self._head = None
+                self._add(head)
+            return
+
+        # a "\r\n" split between chunks
+        if text[0] == "\n" and self._line.endswith("\r"):
+            self._line = self._line[:-1]
+        self._add(text.replace("\r\n", "\n"))
+
+    def text(self) -> str:
+        return "\n".join([*self._lines, self._last_line()])
+
+    def __len__(self) -> int:
+        return self._lines_length + len(self._last_line())
+
+    def last_lines(self, count: int) -> list[str]:
+        if count <= 0:
+            return []
+        # same as text().splitlines()[-count:], one more line for an empty last one
+        lines = [*self._lines[-count:], self._last_line()]
+        return "\n".join(lines).splitlines()[-count:]
+
+    def preview(self, max_len: int) -> str:
+        """Start and end of the output within max_len characters, for progress updates."""
+        length = len(self)
+        if length <= max_len:
+            return self.text()
+        head_len = int(max_len * 0.3)
+        tail_len = max_len - head_len
+        last = self._last_line()
+        head: list[str] = []
+        size = 0
+        for line in [*self._lines[:head_len], last]:
+            if size >= head_len:
+                break
+            head.append(line)
+            size += len(line) + 1
+        tail: list[str] = [last]
+        size = len(last)
+        for line in reversed(self._lines):
+            if size >= tail_len:
+                break
+            tail.append(line)
+            size += len(line) + 1
+        tail.reverse()
+        start = "\n".join(head)[:head_len]
+        end = "\n".join(tail)[-tail_len:]
+        return f"{start}\n\n<< {length - len(start) - len(end)} Characters hidden >>\n\n{end}"
+
+    def _last_line(self) -> str:
+        if self._head is not None:
+            return clean_string(self._head + self._escape)
+        return _clean_line(self._line + self._escape)
+
+    def _add(self, text: str):
+        *finished, line = text.split("\n")
+        if finished:
+            finished[0] = self._line + finished[0]
+            for raw in finished:
+                cleaned = _clean_line(raw)
+                self._lines.append(cleaned)
+                self._lines_length += len(cleaned) + 1
+            self._line = line
+        else:
+            self._line += line
+        if "\r" in line:
+            self._line = _drop_overwritten(self._line)
+
+
+def clean_string_start(text: str) -> str:
+    """Leading part of clean_string(): strip prompt leftovers and blanks at the start."""
+    text = re.sub(r"^[ \r]*(?:\r*\n>[ \r]*)*", "", text)
+    text = re.sub(r"^(>\s*)+", "", text)
+    return text.replace("\r\n", "\n").lstrip("\r ")
+
+
+def _clean_line(line: str) -> str:
+    # the last non-blank part after carriage returns wins
+    parts = [part for part in line.split("\r") if part.strip()]
+    return parts[-1].rstrip() if parts else line
+
+
+def _drop_overwritten(line: str) -> str:
+    # keep the line from the carriage return before its last non-blank part
+    end = len(line)
+    while end > 0:
+        start = line.rfind("\r", 0, end)
+        if line[start + 1 : end].strip():
+            return line[start:] if start > 0 else line
+        if start < 0:
+            break
+        end = start
+    return line
+
+
+def clean_string(input_string):
+    # Remove ANSI escape codes
+    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+    cleaned = ansi_escape.sub("", input_string)
+
+    # remove null bytes
+    cleaned = cleaned.replace("\x00", "")
+
+    # remove ipython \r\r\n> sequences from the start
+    cleaned = re.sub(r'^[ \r]*(?:\r*\n>[ \r]*)*', '', cleaned)
+    # also remove any amount of '> ' sequences from the start
+    cleaned = re.sub(r'^(>\s*)+', '', cleaned)
+
+    # Replace '\r\n' with '\n'
+    cleaned = cleaned.replace("\r\n", "\n")
+
+    # remove leading \r and spaces
+    cleaned = cleaned.lstrip("\r ")
+
+    # Split the string by newline characters to process each segment separately
+    lines = cleaned.split("\n")
+
+    for i in range(len(lines)):
+        # Handle carriage returns '\r' by splitting and taking the last part
+        parts = [part for part in lines[i].split("\r") if part.strip()]
+        if parts:
+            lines[i] = parts[
+                -1
+            ].rstrip()  # Overwrite with the last part after the last '\r'
+
+    return "\n".join(lines)
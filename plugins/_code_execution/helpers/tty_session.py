@@ -1,4 +1,4 @@
-import asyncio, os, sys, platform, errno
+import asyncio, codecs, os, sys, platform, errno
 
 _IS_WIN = platform.system() == "Windows"
 if _IS_WIN:
@@ -173,6 +173,13 @@ class TTYSession:
         except asyncio.TimeoutError:
             return None
 
+    def read_available(self) -> str:
+        # Return all decoded text already produced without waiting
+        chunks = []
+        while not self._buf.empty():
+            chunks.append(self._buf.get_nowait())
+        return "".join(chunks)
+
     # backward-compat alias:
     readline = read
 
@@ -205,11 +212,15 @@ class TTYSession:
         if self._proc is None:
             raise RuntimeError("TTYSpawn is not started")
         reader = self._proc.stdout
+        # multi-byte characters may be split between reads
+        decoder = codecs.getincrementaldecoder(self.encoding)("replace")
         while True:
             chunk = await reader.read(4096)  # grab whatever is ready # type: ignore
             if not chunk:
                 break
-            self._buf.put_nowait(chunk.decode(self.encoding, "replace"))
+            text = decoder.decode(chunk)
+            if text:
+                self._buf.put_nowait(text)
 
 
 # ──────────────────────────── POSIX IMPLEMENTATION ────────────────────
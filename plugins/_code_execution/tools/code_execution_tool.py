@@ -1,4 +1,3 @@
-import asyncio
 import errno
 from dataclasses import dataclass
 import re
@@ -11,6 +10,7 @@ from helpers.print_style import PrintStyle
 from helpers.strings import truncate_text as truncate_text_string
 from helpers.messages import truncate_text as truncate_text_agent
 from helpers import plugins
+from helpers.log import CONTENT_MAX_LEN
 
 from plugins._code_execution.helpers.shell_local import LocalInteractiveSession
 from plugins._code_execution.helpers.shell_ssh import SSHInteractiveSession
@@ -247,19 +247,24 @@ class CodeExecution(Tool):
 
         start_time = time.time()
         last_output_time = start_time
-        full_output = ""
-        truncated_output = ""
+        last_update_time = 0.0
+        pending_update = False
         got_output = False
+        shell = self.state.shells[session].session
+        output = shell.output
 
         # if prefix, log right away
         if prefix:
             self.log.update(content=prefix)
 
         while True:
-            await asyncio.sleep(sleep_time)
+            # wake up on new output, at least every sleep_time to check timeouts
+            wait = sleep_time
+            if pending_update:
+                wait = max(0.0, min(wait, last_update_time + sleep_time - time.time()))
             try:
-                full_output, partial_output = await self.state.shells[session].session.read_output(
-                    timeout=1, reset_full_output=reset_full_output
+                partial_output = await shell.read_new_output(
+                    timeout=wait, reset_full_output=reset_full_output
                 )
             except Exception as e:
                 if _is_closed_pty_error(e):
@@ -272,22 +277,20 @@ class CodeExecution(Tool):
                 raise
             reset_full_output = False  # only reset once
 
+            if self.agent.intervention:
+                # the whole output goes to history with the intervention
+                await self.set_progress(self.fix_full_output(output.text()))
             await self.agent.handle_intervention()
 
             now = time.time()
             if partial_output:
                 PrintStyle(font_color="#85C1E9").stream(partial_output)
-                truncated_output = self.fix_full_output(full_output)
-                await self.set_progress(truncated_output)
-                heading = self.get_heading_from_output(truncated_output, 0)
-                self.log.update(content=prefix + truncated_output, heading=heading)
                 last_output_time = now
                 got_output = True
+                pending_update = True
 
                 # Check for shell prompt at the end of output
-                last_lines = (
-                    truncated_output.splitlines()[-3:] if truncated_output else []
-                )
+                last_lines = [self.fix_full_output(line) for line in output.last_lines(3)]
                 last_lines.reverse()
                 for idx, line in enumerate(last_lines):
                     line = line.strip()
@@ -297,16 +300,28 @@ class CodeExecution(Tool):
                             PrintStyle.info(
                                 "Detected shell prompt, returning output early."
                             )
+                            truncated_output = self.fix_full_output(output.text())
+                            await self.set_progress(truncated_output)
                             last_lines.reverse()
                             heading = self.get_heading_from_output(
                                 "\n".join(last_lines), idx + 1, True
                             )
-                            self.log.update(heading=heading)
+                            self.log.update(content=prefix + truncated_output, heading=heading)
                             self.mark_session_idle(session)
                             return truncated_output
 
+            # progress and log get a bounded preview, at most every sleep_time
+            if pending_update and now - last_update_time >= sleep_time:
+                preview = self.fix_full_output(output.preview(CONTENT_MAX_LEN))
+                await self.set_progress(preview)
+                heading = self.get_heading_from_output(preview, 0)
+                self.log.update(content=prefix + preview, heading=heading)
+                last_update_time = now
+                pending_update = False
+
             # Check for max execution time
             if now - start_time > max_exec_timeout:
+                truncated_output = self.fix_full_output(output.text()) if got_output else ""
                 sysinfo = self.agent.read_prompt(
                     "fw.code.max_time.md", timeout=max_exec_timeout
                 )
@@ -331,6 +346,7 @@ class CodeExecution(Tool):
             else:
                 # Waiting for more output after first output
                 if now - last_output_time > between_output_timeout:
+                    truncated_output = self.fix_full_output(output.text())
                     sysinfo = self.agent.read_prompt(
                         "fw.code.pause_time.md", timeout=between_output_timeout
                     )
@@ -344,9 +360,7 @@ class CodeExecution(Tool):
 
                 # potential dialog detection
                 if now - last_output_time > dialog_timeout:
-                    last_lines = (
-                        truncated_output.splitlines()[-2:] if truncated_output else []
-                    )
+                    last_lines = [self.fix_full_output(line) for line in output.last_lines(2)]
                     for line in last_lines:
                         for pat in dialog_patterns:
                             if pat.search(line.strip()):
@@ -354,6 +368,7 @@ class CodeExecution(Tool):
                                     "Detected dialog prompt, returning output early."
                                 )
 
+                                truncated_output = self.fix_full_output(output.text())
                                 sysinfo = self.agent.read_prompt(
                                     "fw.code.pause_dialog.md", timeout=dialog_timeout
                                 )
@@ -388,7 +403,7 @@ class CodeExecution(Tool):
 
         try:
             full_output, _ = await self.state.shells[session].session.read_output(
-                timeout=1, reset_full_output=reset_full_output
+                timeout=0.01, reset_full_output=reset_full_output
             )
         except Exception as e:
             if _is_closed_pty_error(e):
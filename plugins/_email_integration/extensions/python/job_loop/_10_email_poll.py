@@ -54,36 +54,44 @@ async def _handler_poll_loop(handler_name: str) -> None:
         _poll_single_handler,
         _save_state,
         _state_lock,
+        close_idle_client,
+        wait_for_new_mail,
     )
 
     last_unread_days = 0
 
-    while True:
-        config = plugins.get_plugin_config(PLUGIN_NAME) or {}
-        handlers = config.get("handlers", [])
-        handler_cfg = next(
-            (h for h in handlers if h.get("name") == handler_name and h.get("enabled")),
-            None,
-        )
-        if handler_cfg is None:
-            break
-
-        try:
-            async with _state_lock:
-                state = _load_state()
-                # Reset state when process_unread_days is enabled or changed
-                # so the first-run path processes recent unread via date search.
-                unread_days = int(handler_cfg.get("process_unread_days", 0))
-                if unread_days > 0 and unread_days != last_unread_days:
-                    state.pop(handler_name, None)
-                last_unread_days = unread_days
-                await _poll_single_handler(handler_cfg, state)
-                _save_state(state)
-        except Exception as e:
-            PrintStyle.error(f"Email poll error ({handler_name}): {format_error(e)}")
-
-        sleep_sec = _get_sleep_seconds(handler_cfg)
-        await asyncio.sleep(sleep_sec)
+    try:
+        while True:
+            config = plugins.get_plugin_config(PLUGIN_NAME) or {}
+            handlers = config.get("handlers", [])
+            handler_cfg = next(
+                (h for h in handlers if h.get("name") == handler_name and h.get("enabled")),
+                None,
+            )
+            if handler_cfg is None:
+                break
+
+            last_uid = None
+            try:
+                async with _state_lock:
+                    state = _load_state()
+                    # Reset state when process_unread_days is enabled or changed
+                    # so the first-run path processes recent unread via date search.
+                    unread_days = int(handler_cfg.get("process_unread_days", 0))
+                    if unread_days > 0 and unread_days != last_unread_days:
+                        state.pop(handler_name, None)
+                    last_unread_days = unread_days
+                    await _poll_single_handler(handler_cfg, state)
+                    _save_state(state)
+                    last_uid = state.get(handler_name, {}).get("last_uid")
+            except Exception as e:
+                PrintStyle.error(f"Email poll error ({handler_name}): {format_error(e)}")
+
+            # with IMAP IDLE the next poll starts as soon as new mail arrives
+            if not await wait_for_new_mail(handler_cfg, last_uid):
+                await asyncio.sleep(_get_sleep_seconds(handler_cfg))
+    finally:
+        await close_idle_client(handler_name)
 
 
 # ------------------------------------------------------------------
@@ -30,6 +30,8 @@ from plugins._email_integration.helpers.imap_client import (
     get_highest_uid,
     connect_exchange,
     fetch_unread_exchange,
+    supports_idle,
+    wait_for_mail,
 )
 from plugins._email_integration.helpers.smtp_client import SmtpConfig, send_reply
 
@@ -50,6 +52,10 @@ _state_lock = asyncio.Lock()
 # which would reset module-level state and orphan running tasks.
 _poll_tasks: dict[str, asyncio.Task] = {}  # type: ignore[type-arg]
 
+# IDLE connections kept open between polls, and servers found without IDLE
+_idle_clients: dict[str, object] = {}
+_idle_unsupported: set[tuple[str, str, str]] = set()
+
 def _load_state() -> dict:
     path = files.get_abs_path(STATE_FILE)
     if os.path.isfile(path):
@@ -129,6 +135,51 @@ async def _poll_single_handler(handler_cfg: dict, state: dict):
         await disconnect_imap(client)
 
 
+async def wait_for_new_mail(handler_cfg: dict, last_uid: int | None = None) -> bool:
+    """Wait in IMAP IDLE until the inbox gets new mail, for handlers with imap_idle on.
+
+    last_uid is the one saved by the previous poll, mail past it returns at once.
+
+    Returns False without waiting when IDLE is off, not supported by the
+    server or the connection failed, the caller sleeps its poll interval then.
+    """
+    name = handler_cfg.get("name", "default")
+    if not handler_cfg.get("imap_idle") or handler_cfg.get("account_type", "imap") != "imap":
+        await close_idle_client(name)
+        return False
+    server_key = (name, handler_cfg.get("imap_server", ""), handler_cfg.get("username", ""))
+    if server_key in _idle_unsupported:
+        return False
+
+    client = _idle_clients.get(name)
+    try:
+        if client is None:
+            client = await connect_imap(
+                server=handler_cfg.get("imap_server", ""),
+                port=int(handler_cfg.get("imap_port", 993)),
+                username=handler_cfg.get("username", ""),
+                password=handler_cfg.get("password", ""),
+            )
+            if not supports_idle(client):
+                PrintStyle.info(f"Email ({name}): server has no IDLE, polling instead")
+                _idle_unsupported.add(server_key)
+                await disconnect_imap(client)
+                return False
+            _idle_clients[name] = client
+        await wait_for_mail(client, last_uid)  # type: ignore[arg-type]
+        return True
+    except Exception as e:
+        PrintStyle.error(f"Email IDLE error ({name}): {format_error(e)}")
+        await close_idle_client(name)
+        return False
+
+
+async def close_idle_client(name: str) -> None:
+    client = _idle_clients.pop(name, None)
+    if client is not None:
+        await disconnect_imap(client)  # type: ignore[arg-type]
+
+
 async def _fetch_exchange(
     cfg: dict, whitelist: list[str], since_days: int = 0,
 ) -> list[InboundMessage]:
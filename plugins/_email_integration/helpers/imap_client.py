@@ -8,6 +8,8 @@ import asyncio
 import email
 import os
 import re
+import threading
+import time
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -24,6 +26,16 @@ from helpers.errors import format_error
 from helpers.print_style import PrintStyle
 
 
+# full messages are downloaded in UID FETCH batches of this many messages or bytes
+FETCH_BATCH_SIZE = 25
+FETCH_BATCH_BYTES = 20 * 1024 * 1024
+# downloaded messages parsed at the same time, attachments included
+PARSE_CONCURRENCY = 4
+# IDLE is re-issued this often, servers drop idle connections after 30 minutes
+IDLE_TIMEOUT_SECONDS = 600
+IDLE_CHECK_SECONDS = 5
+
+
 # ------------------------------------------------------------------
 # Data models
 # ------------------------------------------------------------------
@@ -104,25 +116,11 @@ async def fetch_new(
         return [], last_uid
 
     new_last_uid = max(msg_ids)
+    PrintStyle.standard(f"Email: found {len(msg_ids)} new messages")
 
-    # Cap to most recent
-    if len(msg_ids) > max_messages:
-        PrintStyle.standard(
-            f"Email: {len(msg_ids)} new, processing latest {max_messages}"
-        )
-        msg_ids = msg_ids[-max_messages:]
-    else:
-        PrintStyle.standard(f"Email: found {len(msg_ids)} new messages")
-
-    results: list[InboundMessage] = []
-
-    for msg_id in msg_ids:
-        try:
-            msg = await _fetch_single(client, msg_id, download_folder, sender_whitelist)
-            if msg:
-                results.append(msg)
-        except Exception as e:
-            PrintStyle.error(f"Email: error processing message {msg_id}: {format_error(e)}")
+    results = await _fetch_messages(
+        client, msg_ids, download_folder, sender_whitelist, max_messages
+    )
     return results, new_last_uid
 
 
@@ -163,56 +161,99 @@ async def fetch_unread_since(
         return [], 0
 
     highest_uid = max(msg_ids)
+    PrintStyle.standard(
+        f"Email: found {len(msg_ids)} unread messages from last {days} days"
+    )
 
-    if len(msg_ids) > max_messages:
-        PrintStyle.standard(
-            f"Email: {len(msg_ids)} unread, processing latest {max_messages}"
-        )
-        msg_ids = msg_ids[-max_messages:]
-    else:
+    results = await _fetch_messages(
+        client, msg_ids, download_folder, sender_whitelist, max_messages
+    )
+    return results, highest_uid
+
+
+async def _fetch_messages(
+    client: IMAPClient,
+    msg_ids: list[int],
+    download_folder: str,
+    sender_whitelist: list[str] | None,
+    max_messages: int,
+) -> list[InboundMessage]:
+    """Download and parse the latest max_messages accepted messages of msg_ids.
+
+    Senders are filtered on the envelopes of all messages, fetched in one
+    command, so only accepted messages are downloaded. Their bodies come in
+    batched UID FETCH commands and are parsed while the next batch downloads.
+    Processed messages are marked read in one STORE. Rejected senders and
+    accepted messages over the cap stay unread, last_uid keeps them from being
+    fetched again.
+    """
+    loop = asyncio.get_event_loop()
+
+    def _sync_envelopes():
+        return client.fetch(msg_ids, ["ENVELOPE", "RFC822.SIZE"])
+
+    envelopes = await loop.run_in_executor(None, _sync_envelopes)
+    accepted: list[tuple[int, int]] = []
+    for msg_id in msg_ids:
+        data = envelopes.get(msg_id, {})
+        sender = _envelope_sender(data.get(b"ENVELOPE"))
+        # without an envelope the message is filtered after download
+        if sender is not None and not _accepts_sender(sender, sender_whitelist):
+            continue
+        accepted.append((msg_id, int(data.get(b"RFC822.SIZE") or 0)))
+
+    if len(accepted) > max_messages:
         PrintStyle.standard(
-            f"Email: found {len(msg_ids)} unread messages from last {days} days"
+            f"Email: {len(accepted)} accepted, processing latest {max_messages}"
         )
+        accepted = accepted[-max_messages:] if max_messages > 0 else []
+
+    parsed: dict[int, InboundMessage | None] = {}
+    semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+    async def _parse(msg_id: int, raw: bytes):
+        async with semaphore:
+            try:
+                parsed[msg_id] = await _parse_message(raw, download_folder, sender_whitelist)
+            except Exception as e:
+                PrintStyle.error(f"Email: error processing message {msg_id}: {format_error(e)}")
+
+    tasks: list[asyncio.Task] = []  # type: ignore[type-arg]
+    for batch in _fetch_batches(accepted):
+        def _sync_bodies(batch=batch):
+            # PEEK leaves \Seen alone, processed messages are flagged in one STORE below
+            return client.fetch(batch, ["BODY.PEEK[]"])
 
-    results: list[InboundMessage] = []
-    for msg_id in msg_ids:
         try:
-            msg = await _fetch_single(client, msg_id, download_folder, sender_whitelist)
-            if msg:
-                results.append(msg)
+            bodies = await loop.run_in_executor(None, _sync_bodies)
         except Exception as e:
-            PrintStyle.error(
-                f"Email: error processing message {msg_id}: {format_error(e)}"
-            )
+            PrintStyle.error(f"Email: error fetching messages {batch[0]}-{batch[-1]}: {format_error(e)}")
+            continue
+        for msg_id in batch:
+            raw = bodies.get(msg_id, {}).get(b"BODY[]")
+            if raw:
+                tasks.append(asyncio.create_task(_parse(msg_id, raw)))
+    await asyncio.gather(*tasks)
 
-    return results, highest_uid
+    # only processed messages are flagged, failed downloads and rejections stay unread
+    seen = [msg_id for msg_id, _size in accepted if parsed.get(msg_id) is not None]
+    if seen:
+        def _sync_flags():
+            client.add_flags(seen, [b"\\Seen"], silent=True)
 
+        await loop.run_in_executor(None, _sync_flags)
+    return [msg for msg_id in msg_ids if (msg := parsed.get(msg_id))]
 
-async def _fetch_single(
-    client: IMAPClient,
-    msg_id: int,
+
+async def _parse_message(
+    email_data: bytes,
     download_folder: str,
     sender_whitelist: list[str] | None,
 ) -> InboundMessage | None:
-    loop = asyncio.get_event_loop()
-
-    def _sync_fetch():
-        data = client.fetch([msg_id], ["RFC822"])[msg_id]
-        # Explicitly mark as read — RFC822 fetch doesn't always set \Seen on all servers
-        client.add_flags([msg_id], [b"\\Seen"])
-        return data
-
-    raw = await loop.run_in_executor(None, _sync_fetch)
-    email_data = raw.get(b"RFC822")
-    if not email_data:
-        return None
-
-    email_msg = email.message_from_bytes(email_data)  # type: ignore[arg-type]
+    email_msg = email.message_from_bytes(email_data)
 
     sender = _decode_header(email_msg.get("From", ""))
-    if _is_noreply(sender):
-        return None
-    if sender_whitelist and not _matches_whitelist(sender, sender_whitelist):
+    if not _accepts_sender(sender, sender_whitelist):
         return None
 
     subject = _decode_header(email_msg.get("Subject", ""))
@@ -233,6 +274,97 @@ async def _fetch_single(
     )
 
 
+def _accepts_sender(sender: str, sender_whitelist: list[str] | None) -> bool:
+    if _is_noreply(sender):
+        return False
+    return not sender_whitelist or _matches_whitelist(sender, sender_whitelist)
+
+
+def _envelope_sender(envelope) -> str | None:
+    """Sender of an ENVELOPE as a From header would give it, None when unknown."""
+    addresses = getattr(envelope, "from_", None)
+    if not addresses:
+        return None
+    address = addresses[0]
+    mailbox = _decode_bytes(address.mailbox)
+    host = _decode_bytes(address.host)
+    name = _decode_header(_decode_bytes(address.name))
+    email_address = f"{mailbox}@{host}" if host else mailbox
+    return f"{name} <{email_address}>" if name else email_address
+
+
+def _decode_bytes(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="ignore")
+    return str(value or "")
+
+
+def _fetch_batches(messages: list[tuple[int, int]]) -> list[list[int]]:
+    batches: list[list[int]] = []
+    batch: list[int] = []
+    batch_bytes = 0
+    for msg_id, size in messages:
+        if batch and (len(batch) >= FETCH_BATCH_SIZE or batch_bytes + size > FETCH_BATCH_BYTES):
+            batches.append(batch)
+            batch, batch_bytes = [], 0
+        batch.append(msg_id)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# ------------------------------------------------------------------
+# IDLE push
+# ------------------------------------------------------------------
+
+def supports_idle(client: IMAPClient) -> bool:
+    return client.has_capability("IDLE")
+
+
+async def wait_for_mail(
+    client: IMAPClient,
+    last_uid: int | None = None,
+    timeout: float = IDLE_TIMEOUT_SECONDS,
+) -> bool:
+    """Wait in IMAP IDLE until the inbox gets new mail or timeout passes.
+
+    Returns True when new mail was announced. With the last_uid of the previous
+    poll, mail that arrived since then (UIDNEXT past last_uid + 1) returns True
+    without idling. The wait runs in short checks, so a cancelled caller frees
+    its worker thread within IDLE_CHECK_SECONDS.
+    """
+    loop = asyncio.get_event_loop()
+    stop = threading.Event()
+
+    def _sync_idle() -> bool:
+        selected = client.select_folder("INBOX")
+        uid_next = selected.get(b"UIDNEXT")
+        if last_uid is not None and uid_next and int(uid_next) > last_uid + 1:
+            return True
+        client.idle()
+        try:
+            deadline = time.monotonic() + timeout
+            while not stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                responses = client.idle_check(timeout=min(IDLE_CHECK_SECONDS, remaining))
+                if any(
+                    len(response) > 1 and response[1] in (b"EXISTS", b"RECENT")
+                    for response in responses
+                ):
+                    return True
+            return False
+        finally:
+            client.idle_done()
+
+    try:
+        return await loop.run_in_executor(None, _sync_idle)
+    finally:
+        stop.set()
+
+
 # ------------------------------------------------------------------
 # Exchange connection
 # ------------------------------------------------------------------
@@ -192,6 +192,7 @@ export const store = createStore("emailConfig", {
       poll_mode: "seconds",
       poll_interval_seconds: 60,
       poll_interval_cron: "*/2 * * * *",
+      imap_idle: false,
       process_unread_days: 0,
       sender_whitelist: [],
       project: "",
@@ -0,0 +1,7 @@
+from helpers.extension import Extension
+from plugins._memory.helpers import persistence
+
+
+class FlushMemory(Extension):
+    def execute(self, **kwargs):
+        persistence.flush()
@@ -129,20 +129,17 @@ class RecallMemories(Extension):
         # get memory database
         db = await Memory.get(self.agent)
 
-        # search for general memories and fragments
-        memories = await db.search_similarity_threshold(
+        # search for general memories and fragments, and for solutions, in one pass
+        memories, solutions = await db.search_by_areas(
             query=query,
-            limit=set["memory_recall_memories_max_search"],
+            groups=[
+                (
+                    [Memory.Area.MAIN.value, Memory.Area.FRAGMENTS.value],
+                    set["memory_recall_memories_max_search"],
+                ),
+                ([Memory.Area.SOLUTIONS.value], set["memory_recall_solutions_max_search"]),
+            ],
             threshold=set["memory_recall_similarity_threshold"],
-            filter=f"area == '{Memory.Area.MAIN.value}' or area == '{Memory.Area.FRAGMENTS.value}'",  # exclude solutions
-        )
-
-        # search for solutions
-        solutions = await db.search_similarity_threshold(
-            query=query,
-            limit=set["memory_recall_solutions_max_search"],
-            threshold=set["memory_recall_similarity_threshold"],
-            filter=f"area == '{Memory.Area.SOLUTIONS.value}'",  # exclude solutions
         )
 
         if not memories and not solutions:
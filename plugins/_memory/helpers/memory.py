@@ -1,11 +1,8 @@
 from datetime import datetime
-from typing import Any, List, Sequence
-from langchain.storage import InMemoryByteStore, LocalFileStore
-from langchain.embeddings import CacheBackedEmbeddings
-from helpers import guids
+from typing import Any
+from helpers import embedding_cache, guids
 
 # from langchain_chroma import Chroma
-from langchain_community.vectorstores import FAISS
 
 # faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
 from helpers import faiss_monkey_patch
@@ -18,39 +15,27 @@ from langchain_community.vectorstores.utils import (
 )
 from langchain_core.embeddings import Embeddings
 
-import os, json, hashlib, re
+import asyncio, os, json, hashlib, re
 
 import numpy as np
 
 from helpers.print_style import PrintStyle
 from helpers import files, plugins, projects
+from helpers.vector_db import IndexSettings, MyFaiss
 from langchain_core.documents import Document
-from . import knowledge_import
+from . import knowledge_import, persistence
 from helpers.log import Log, LogItem
 from enum import Enum
 from agent import Agent, AgentContext
 import models
 import logging
-from simpleeval import simple_eval
+from simpleeval import SimpleEval
 
 
 # Raise the log level so WARNING messages aren't shown
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
-class MyFaiss(FAISS):
-    # override aget_by_ids
-    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
-        # return all self.docstore._dict[id] in ids
-        return [self.docstore._dict[id] for id in (ids if isinstance(ids, list) else [ids]) if id in self.docstore._dict]  # type: ignore
-
-    async def aget_by_ids(self, ids: Sequence[str], /) -> List[Document]:
-        return self.get_by_ids(ids)
-
-    def get_all_docs(self):
-        return self.docstore._dict  # type: ignore
-
-
 class Memory:
 
     class Area(Enum):
@@ -60,11 +45,19 @@ class Memory:
 
     index: dict[str, "MyFaiss"] = {}
 
+    # candidates fetched before metadata filtering, FAISS default fetch_k
+    FETCH_K = 20
+
     @staticmethod
     def _get_embedding_config(agent=None):
         from plugins._model_config.helpers.model_config import get_embedding_model_config_object
         return get_embedding_model_config_object(agent)
 
+    @staticmethod
+    def _get_index_settings(agent=None) -> IndexSettings:
+        config = plugins.get_plugin_config("_memory", agent)
+        return IndexSettings.from_config(config, prefix="memory_index_")
+
     @staticmethod
     async def get(agent: Agent):
         memory_subdir = get_agent_memory_subdir(agent)
@@ -78,6 +71,7 @@ class Memory:
                 Memory._get_embedding_config(agent),
                 memory_subdir,
                 False,
+                Memory._get_index_settings(agent),
             )
             Memory.index[memory_subdir] = db
             wrap = Memory(db, memory_subdir=memory_subdir)
@@ -109,6 +103,7 @@ class Memory:
                 model_config=model_config,
                 memory_subdir=memory_subdir,
                 in_memory=False,
+                index_settings=Memory._get_index_settings(),
             )
             wrap = Memory(db, memory_subdir=memory_subdir)
             if preload_knowledge:
@@ -135,6 +130,7 @@ class Memory:
         model_config: models.ModelConfig,
         memory_subdir: str,
         in_memory=False,
+        index_settings: IndexSettings | None = None,
     ) -> tuple[MyFaiss, bool]:
 
         PrintStyle.standard("Initializing VectorDB...")
@@ -142,32 +138,29 @@ class Memory:
         if log_item:
             log_item.stream(progress="\nInitializing VectorDB")
 
-        em_dir = files.get_abs_path(
-            "tmp/memory/embeddings"
-        )  # just caching, no need to parameterize
         db_dir = abs_db_dir(memory_subdir)
 
-        # make sure embeddings and database directories exist
+        # make sure database directory exists
         os.makedirs(db_dir, exist_ok=True)
 
+        # pending writes of a previously loaded instance go first
+        persistence.flush(db_dir)
+
+        # embeddings cache is shared with document stores unless kept in memory
         if in_memory:
-            store = InMemoryByteStore()
+            store = embedding_cache.EmbeddingCache()
         else:
-            os.makedirs(em_dir, exist_ok=True)
-            store = LocalFileStore(em_dir)
+            store = embedding_cache.get_cache()
 
         embeddings_model = models.get_embedding_model(
             model_config.provider,
             model_config.name,
             **model_config.build_kwargs(),
         )
-        embeddings_model_id = files.safe_file_name(
-            model_config.provider + "_" + model_config.name
-        )
 
         # here we setup the embeddings model with the chosen cache storage
-        embedder = CacheBackedEmbeddings.from_bytes_store(
-            embeddings_model, store, namespace=embeddings_model_id
+        embedder = embedding_cache.CachedEmbeddings(
+            embeddings_model, store, embedding_cache.get_namespace(embeddings_model)
         )
 
         # initial DB and docs variables
@@ -178,19 +171,22 @@ class Memory:
 
         # if db folder exists and is not empty:
         if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
+            persistence.recover(db_dir)
             if not Memory._verify_index_hash(db_dir):
                 PrintStyle(font_color="yellow").print(
                     f"FAISS index hash mismatch in '{db_dir}' — index will be rebuilt."
                 )
             else:
-                db = MyFaiss.load_local(
-                    folder_path=db_dir,
-                    embeddings=embedder,
-                    allow_dangerous_deserialization=True,
-                    distance_strategy=DistanceStrategy.COSINE,
-                    # normalize_L2=True,
-                    relevance_score_fn=Memory._cosine_normalizer,
-                )  # type: ignore
+                try:
+                    db = persistence.load(
+                        db_dir,
+                        embedder,
+                        distance_strategy=DistanceStrategy.COSINE,
+                        # normalize_L2=True,
+                        relevance_score_fn=Memory._cosine_normalizer,
+                    )
+                except ValueError as e:
+                    PrintStyle(font_color="yellow").print(f"{e} — index will be rebuilt.")
 
             # if there is a mismatch in embeddings used, re-index the whole DB
             emb_ok = False
@@ -211,7 +207,8 @@ class Memory:
 
         # DB not loaded, create one
         if not db:
-            index = faiss.IndexFlatIP(len(embedder.embed_query("example")))
+            # stores start flat and are promoted once large enough
+            index = faiss.IndexFlatIP(embedder.get_dimension())
 
             db = MyFaiss(
                 embedding_function=embedder,
@@ -246,6 +243,11 @@ class Memory:
 
             created = True
 
+        # search parameters and index strategy from the plugin config
+        db.set_index_settings(index_settings)
+        if db.apply_index_strategy():
+            Memory._save_db_file(db, memory_subdir)
+
         return db, created
 
     def __init__(
@@ -362,6 +364,80 @@ class Memory:
             filter=comparator,
         )
 
+    async def search_by_areas(
+        self, query: str, groups: list[tuple[list[str], int]], threshold: float
+    ) -> list[list[Document]]:
+        """Search several area groups with one query embedding and one index scan.
+
+        Groups are (areas, limit) pairs, results are returned in the same order.
+        """
+        results = await self.search_by_areas_with_scores([query], groups, threshold)
+        return [[doc for doc, _score in docs] for docs in results[0]]
+
+    async def search_by_areas_with_scores(
+        self,
+        queries: list[str],
+        groups: list[tuple[list[str], int]],
+        threshold: float,
+    ) -> list[list[list[tuple[Document, float]]]]:
+        """Batched search_similarity_threshold_with_scores filtered by area.
+
+        All queries are embedded in one call and searched in one index scan with
+        a fetch size covering every group. results[query][group] holds up to
+        limit (document, relevance) pairs from the group's areas above threshold.
+        """
+        if not queries or not groups:
+            return [[[] for _ in groups] for _ in queries]
+        vectors = await self._embed_queries(queries)
+        return await asyncio.to_thread(
+            self._search_vectors_by_areas, vectors, groups, threshold
+        )
+
+    async def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        embedder = self.db.embedding_function
+        if len(queries) == 1:
+            return [await embedder.aembed_query(queries[0])]  # type: ignore
+        # queries are not cached, embed them in one batch without the document cache
+        embedder = getattr(embedder, "underlying_embeddings", embedder)
+        return await embedder.aembed_documents(queries)  # type: ignore
+
+    def _search_vectors_by_areas(
+        self,
+        vectors: list[list[float]],
+        groups: list[tuple[list[str], int]],
+        threshold: float,
+    ) -> list[list[list[tuple[Document, float]]]]:
+        areas = [frozenset(group_areas) for group_areas, _limit in groups]
+        limits = [limit for _areas, limit in groups]
+        fetch_k = max(Memory.FETCH_K, sum(limits))
+
+        matrix = np.array(vectors, dtype=np.float32)
+        if self.db._normalize_L2:
+            faiss.normalize_L2(matrix)
+        scores, indices = self.db.search_index(matrix, fetch_k)
+
+        relevance = self.db._select_relevance_score_fn()
+        docs = self.db.get_all_docs()
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            found: list[list[tuple[Document, float]]] = [[] for _ in groups]
+            for score, i in zip(row_scores, row_indices):
+                if i == -1:
+                    continue
+                doc = docs.get(self.db.index_to_docstore_id[i])
+                if doc is None:
+                    continue
+                # candidates are sorted, so the threshold also ends each group
+                score = relevance(float(score))
+                if score < threshold:
+                    break
+                area = doc.metadata.get("area")
+                for g, group_areas in enumerate(areas):
+                    if area in group_areas and len(found[g]) < limits[g]:
+                        found[g].append((doc, score))
+            results.append(found)
+        return results
+
     async def delete_documents_by_query(
         self,
         query: str,
@@ -464,6 +540,7 @@ class Memory:
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
             await self.db.aadd_documents(documents=docs, ids=ids)
+            await asyncio.to_thread(self.db.apply_index_strategy)
             self._save_db()  # persist
         return ids
 
@@ -475,7 +552,12 @@ class Memory:
         return ins
 
     def _save_db(self):
-        Memory._save_db_file(self.db, self.memory_subdir)
+        # written behind by a timer, changes in quick succession share one write
+        persistence.schedule_save(self.db, abs_db_dir(self.memory_subdir))
+
+    def flush(self):
+        """Write pending changes of this memory to disk now."""
+        persistence.flush(abs_db_dir(self.memory_subdir))
 
     def _generate_doc_id(self):
         while True:
@@ -526,23 +608,7 @@ class Memory:
 
     @staticmethod
     def _save_db_file(db: MyFaiss, memory_subdir: str):
-        abs_dir = abs_db_dir(memory_subdir)
-        db.save_local(folder_path=abs_dir)
-        Memory._write_index_hash(abs_dir)
-
-    @staticmethod
-    def _write_index_hash(abs_dir: str) -> None:
-        faiss_path = os.path.join(abs_dir, "index.faiss")
-        hash_path = os.path.join(abs_dir, "index.faiss.sha256")
-        try:
-            h = hashlib.sha256()
-            with open(faiss_path, "rb") as f:
-                for chunk in iter(lambda: f.read(65536), b""):
-                    h.update(chunk)
-            with open(hash_path, "w") as f:
-                f.write(h.hexdigest())
-        except Exception as e:
-            PrintStyle(font_color="yellow").print(f"Warning: could not write FAISS hash: {e}")
+        persistence.save(db, abs_db_dir(memory_subdir))
 
     @staticmethod
     def _verify_index_hash(abs_dir: str) -> bool:
@@ -573,10 +639,17 @@ class Memory:
             )
             return lambda _data: False
 
+        # parse once, evaluate the parsed expression for each document
+        try:
+            parsed = SimpleEval().parse(condition)
+        except Exception as e:
+            PrintStyle.error(f"Error evaluating condition: {e}")
+            return lambda _data: False
+
         def comparator(data: dict[str, Any]):
             try:
-                result = simple_eval(condition, names=data, functions={})
-                return result
+                evaluator = SimpleEval(names=data, functions={})
+                return evaluator.eval(condition, previously_parsed=parsed)
             except Exception as e:
                 PrintStyle.error(f"Error evaluating condition: {e}")
                 return False
@@ -623,6 +696,7 @@ def get_custom_knowledge_subdir_abs(agent: Agent) -> str:
 
 def reload():
     # clear the memory index, this will force all DBs to reload
+    persistence.flush()
     Memory.index = {}
 
 
@@ -336,30 +336,22 @@ class MemoryConsolidator:
 
         all_similar = []
 
-        # Step 2: Semantic similarity search with real scores
-        semantic_results = await db.search_similarity_threshold_with_scores(
-            query=new_memory,
-            limit=self.config.max_similar_memories,
+        # Step 2 and 3: Semantic and keyword-based searches with real scores,
+        # embedded and searched in one batch
+        keyword_queries = [query.strip() for query in search_queries if query.strip()]
+        queries_count = max(1, len(search_queries))
+        semantic_limit = self.config.max_similar_memories
+        keyword_limit = max(3, self.config.max_similar_memories // queries_count)
+
+        batch_results = await db.search_by_areas_with_scores(
+            queries=[new_memory, *keyword_queries],
+            groups=[([area], max(semantic_limit, keyword_limit))],
             threshold=self.config.similarity_threshold,
-            filter=f"area == '{area}'"
         )
-        for doc, score in semantic_results:
-            doc.metadata['_consolidation_similarity'] = score
-            all_similar.append(doc)
-
-        # Step 3: Keyword-based searches with real scores
-        for query in search_queries:
-            if query.strip():
-                queries_count = max(1, len(search_queries))
-                keyword_results = await db.search_similarity_threshold_with_scores(
-                    query=query.strip(),
-                    limit=max(3, self.config.max_similar_memories // queries_count),
-                    threshold=self.config.similarity_threshold,
-                    filter=f"area == '{area}'"
-                )
-                for doc, score in keyword_results:
-                    doc.metadata['_consolidation_similarity'] = score
-                    all_similar.append(doc)
+        for i, (results,) in enumerate(batch_results):
+            for doc, score in results[: semantic_limit if i == 0 else keyword_limit]:
+                doc.metadata['_consolidation_similarity'] = score
+                all_similar.append(doc)
 
         # Step 4: Deduplicate by document ID, keep highest score per memory ID
         best_by_id: Dict[str, Document] = {}
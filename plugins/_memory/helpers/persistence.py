@@ -0,0 +1,279 @@
+import atexit
+import hashlib
+import os
+import pickle
+import threading
+import time
+from typing import Any
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from helpers import faiss_monkey_patch
+import faiss
+
+from langchain_core.embeddings import Embeddings
+
+from helpers.print_style import PrintStyle
+from helpers.vector_db import DELETED_ID, MyFaiss
+
+# Store layout: index.faiss with its sha256, index.pkl holding the docstore and
+# id mapping as written by FAISS.save_local, and index.journal with pickled
+# change records appended on each flush. A record is committed once the index
+# it belongs to replaces index.faiss, loading replays all records over index.pkl.
+INDEX_FILE = "index.faiss"
+HASH_FILE = "index.faiss.sha256"
+DOCSTORE_FILE = "index.pkl"
+JOURNAL_FILE = "index.journal"
+
+# journal is folded into index.pkl once it grows past this size
+COMPACT_SIZE = 8 * 1024 * 1024
+
+# flush after this many seconds without changes, but no later than FLUSH_MAX_DELAY
+FLUSH_DELAY = 2.0
+FLUSH_MAX_DELAY = 10.0
+
+
+def save(db: MyFaiss, folder: str) -> None:
+    """Write the whole store and reset the journal."""
+    _write_changes(db, folder, full=True)
+
+
+def save_changes(db: MyFaiss, folder: str) -> None:
+    """Persist the index and the documents changed since the last save."""
+    _write_changes(db, folder, full=False)
+
+
+def load(folder: str, embeddings: Embeddings, **kwargs: Any) -> MyFaiss:
+    """Load a store saved by save() or FAISS.save_local() and replay its journal."""
+    recover(folder)
+    db = MyFaiss.load_local(
+        folder_path=folder,
+        embeddings=embeddings,
+        allow_dangerous_deserialization=True,
+        **kwargs,
+    )
+    records = _read_journal(os.path.join(folder, JOURNAL_FILE))[0]
+    if records:
+        docs: dict = db.docstore._dict  # type: ignore
+        for record in records:
+            if record.get("full"):
+                docs.clear()
+            for doc_id in record["delete"]:
+                docs.pop(doc_id, None)
+            docs.update(record["put"])
+        db.set_id_mapping(dict(enumerate(records[-1]["ids"])))
+
+    if db.index.ntotal != len(db.index_to_docstore_id) or any(
+        doc_id not in db.docstore._dict and doc_id != DELETED_ID  # type: ignore
+        for doc_id in db.index_to_docstore_id.values()
+    ):
+        raise ValueError(f"FAISS index and docstore in '{folder}' do not match")
+    return db
+
+
+def recover(folder: str) -> None:
+    """Finish or roll back a save interrupted between the journal and the index."""
+    journal_path = os.path.join(folder, JOURNAL_FILE)
+    if not os.path.exists(journal_path):
+        return
+    records, valid_size = _read_journal(journal_path)
+    if os.path.getsize(journal_path) > valid_size:
+        # torn record at the end, drop it so new records stay readable
+        with open(journal_path, "r+b") as f:
+            f.truncate(valid_size)
+
+    index_path = os.path.join(folder, INDEX_FILE)
+    pending_path = index_path + ".tmp"
+    committed = records[-1]["sha256"] if records else None
+    if os.path.exists(pending_path):
+        if committed and _file_hash(pending_path) == committed:
+            os.replace(pending_path, index_path)
+        else:
+            os.remove(pending_path)
+    if committed and _read_text(os.path.join(folder, HASH_FILE)) != committed:
+        if os.path.exists(index_path) and _file_hash(index_path) == committed:
+            _atomic_write(os.path.join(folder, HASH_FILE), committed.encode())
+
+
+_save_lock = threading.RLock()
+
+
+def _write_changes(db: MyFaiss, folder: str, full: bool) -> None:
+    with _save_lock:
+        _write_changes_locked(db, folder, full)
+
+
+def _write_changes_locked(db: MyFaiss, folder: str, full: bool) -> None:
+    os.makedirs(folder, exist_ok=True)
+    journal_path = os.path.join(folder, JOURNAL_FILE)
+    compact = full or (
+        os.path.exists(journal_path) and os.path.getsize(journal_path) > COMPACT_SIZE
+    )
+
+    # snapshot under the store lock, serialize and write outside of it
+    with db.lock:
+        changed = db.take_changed_ids()
+        index_data = faiss.serialize_index(db.index)
+        all_docs: dict = db.docstore._dict  # type: ignore
+        ids = [db.index_to_docstore_id[i] for i in range(len(db.index_to_docstore_id))]
+        if full:
+            put = dict(all_docs)
+            deleted = []
+        else:
+            put = {doc_id: all_docs[doc_id] for doc_id in changed if doc_id in all_docs}
+            deleted = [doc_id for doc_id in changed if doc_id not in all_docs]
+        snapshot = dict(all_docs) if compact else None
+
+    try:
+        digest = hashlib.sha256(index_data).hexdigest()
+        record = {"ids": ids, "put": put, "delete": deleted, "sha256": digest, "full": full}
+
+        # index goes to a temp file, the journal record commits it
+        index_path = os.path.join(folder, INDEX_FILE)
+        _write_file(index_path + ".tmp", index_data)
+        with open(journal_path, "ab") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(index_path + ".tmp", index_path)
+        _atomic_write(os.path.join(folder, HASH_FILE), digest.encode())
+    except Exception:
+        # keep the changes for the next attempt
+        with db.lock:
+            db.changed_ids.update(changed)
+        raise
+
+    if snapshot is not None:
+        # same content as FAISS.save_local, replaying the journal over it is a no-op
+        docstore = type(db.docstore)(snapshot)
+        _atomic_write(
+            os.path.join(folder, DOCSTORE_FILE),
+            pickle.dumps((docstore, dict(enumerate(ids)))),
+        )
+        _atomic_write(journal_path, b"")
+
+
+def _read_journal(path: str) -> tuple[list[dict[str, Any]], int]:
+    records: list[dict[str, Any]] = []
+    valid_size = 0
+    if not os.path.exists(path):
+        return records, valid_size
+    with open(path, "rb") as f:
+        while True:
+            try:
+                records.append(pickle.load(f))
+            except EOFError:
+                break
+            except Exception:
+                PrintStyle(font_color="yellow").print(
+                    f"Warning: ignoring incomplete memory journal record in '{path}'"
+                )
+                break
+            valid_size = f.tell()
+    return records, valid_size
+
+
+def _write_file(path: str, data: Any) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _atomic_write(path: str, data: Any) -> None:
+    _write_file(path + ".tmp", data)
+    os.replace(path + ".tmp", path)
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class WriteBehind:
+    """Coalesces saves of changed stores and writes them from a timer thread.
+
+    A store marked dirty is flushed once it has not changed for `delay` seconds,
+    or `max_delay` seconds after its first unsaved change, whichever comes first.
+    """
+
+    def __init__(self, delay: float = FLUSH_DELAY, max_delay: float = FLUSH_MAX_DELAY):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._dirty: dict[str, MyFaiss] = {}
+        self._first_change = 0.0
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()  # guards _dirty and the timer
+        self._write_lock = threading.Lock()  # one writer at a time
+
+    def mark_dirty(self, folder: str, db: MyFaiss) -> None:
+        with self._lock:
+            self._queue(folder, db)
+
+    def _queue(self, folder: str, db: MyFaiss) -> None:
+        # called with _lock held, (re)starts the timer for the pending stores
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_change = now
+        self._dirty[folder] = db
+        if self._timer:
+            self._timer.cancel()
+        wait = max(0.0, min(self.delay, self._first_change + self.max_delay - now))
+        self._timer = threading.Timer(wait, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def is_dirty(self, folder: str | None = None) -> bool:
+        with self._lock:
+            return bool(self._dirty) if folder is None else folder in self._dirty
+
+    def flush(self, folder: str | None = None) -> None:
+        """Write pending changes of one store folder or of all of them."""
+        with self._write_lock:
+            with self._lock:
+                if folder is None:
+                    pending, self._dirty = self._dirty, {}
+                else:
+                    pending = {folder: self._dirty.pop(folder)} if folder in self._dirty else {}
+                if not self._dirty and self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+
+            for path, db in pending.items():
+                try:
+                    save_changes(db, path)
+                except Exception as e:
+                    PrintStyle.error(f"Failed to save memory in '{path}': {e}")
+                    # retried by the timer unless changed again meanwhile
+                    with self._lock:
+                        if path not in self._dirty:
+                            self._queue(path, db)
+
+
+_write_behind = WriteBehind()
+
+
+def schedule_save(db: MyFaiss, folder: str) -> None:
+    _write_behind.mark_dirty(folder, db)
+
+
+def flush(folder: str | None = None) -> None:
+    _write_behind.flush(folder)
+
+
+def is_dirty(folder: str | None = None) -> bool:
+    return _write_behind.is_dirty(folder)
+
+
+# last resort for processes exiting without the shutdown hook
+atexit.register(flush)
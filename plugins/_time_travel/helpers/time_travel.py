@@ -7,6 +7,7 @@ import json
 import os
 import posixpath
 import shutil
+import stat
 import subprocess
 import threading
 import time
@@ -32,11 +33,24 @@ AUTO_SNAPSHOT_DEBOUNCE_SECONDS = 10.0
 WATCHDOG_ID = "time_travel_usr"
 WATCHDOG_DEBOUNCE_SECONDS = 1.0
 SHADOW_REPO_BACKUP_PREFIX = "repo.git.invalid"
+HISTORY_PATHS_FILE = "history_paths.json"
+HISTORY_PATHS_VERSION = 1
+# incremental snapshots restage only hinted paths, a full restage still runs this often to catch missed events
+FULL_RESTAGE_INTERVAL_SECONDS = 600.0
+INCREMENTAL_MAX_PATHS = 1000
 
 _AUTO_SNAPSHOT_LOCK = threading.RLock()
 _AUTO_SNAPSHOT_TIMERS: dict[str, threading.Timer] = {}
 _AUTO_SNAPSHOT_PAYLOADS: dict[str, dict[str, Any]] = {}
 
+# workspace id -> (index file signature, monotonic time of the last full restage)
+_STAGED_INDEX_LOCK = threading.Lock()
+_STAGED_INDEXES: dict[str, tuple[tuple[int, int, int], float]] = {}
+
+# workspace id -> (history paths file signature, commit hash -> touched paths)
+_HISTORY_PATHS_LOCK = threading.RLock()
+_HISTORY_PATHS: dict[str, tuple[tuple[int, int, int], dict[str, list[str]]]] = {}
+
 STATUS_LABELS = {
     "A": "added",
     "C": "copied",
@@ -414,6 +428,8 @@ def schedule_debounced_snapshot(
     metadata_hints = _extract_changed_path_hints(clean_metadata)
     clean_metadata.pop("changed_path_hints", None)
     hints = _merge_hints(metadata_hints, changed_path_hints or [])
+    # a request without hints may have changed anything
+    restage_all = not hints
     delay_seconds = AUTO_SNAPSHOT_DEBOUNCE_SECONDS if delay is None else max(0.0, float(delay))
     with _AUTO_SNAPSHOT_LOCK:
         payload = _AUTO_SNAPSHOT_PAYLOADS.get(workspace.id)
@@ -423,6 +439,7 @@ def schedule_debounced_snapshot(
                 "trigger": trigger,
                 "metadata": clean_metadata,
                 "changed_path_hints": hints,
+                "restage_all": restage_all,
             }
             _AUTO_SNAPSHOT_PAYLOADS[workspace.id] = payload
             timer = threading.Timer(delay_seconds, _flush_debounced_snapshot, args=(workspace.id,))
@@ -437,6 +454,7 @@ def schedule_debounced_snapshot(
             payload.get("changed_path_hints", []),
             hints,
         )
+        payload["restage_all"] = bool(payload.get("restage_all")) or restage_all
 
 
 def flush_debounced_snapshots() -> None:
@@ -471,6 +489,7 @@ def _flush_debounced_snapshot(workspace_id: str) -> None:
             trigger=str(payload.get("trigger") or "watchdog"),
             metadata=payload.get("metadata") or {},
             changed_path_hints=payload.get("changed_path_hints") or None,
+            incremental=not payload.get("restage_all"),
         )
     except WorkspaceRejectedError:
         return
@@ -480,7 +499,10 @@ def _flush_debounced_snapshot(workspace_id: str) -> None:
 
 def _handle_usr_watchdog_events(items: list[Any]) -> None:
     by_workspace: dict[str, tuple[WorkspaceInfo, list[str]]] = {}
-    for path, _event in items:
+    for path, event in items:
+        if event == "modify" and os.path.isdir(path) and not os.path.islink(path):
+            # changes of a directory listing arrive as events of its entries
+            continue
         display_path = normalize_display_path(str(path or ""))
         if not _is_watchdog_snapshot_candidate(display_path):
             continue
@@ -588,11 +610,20 @@ class TimeTravelService:
         message: str = "",
         metadata: dict[str, Any] | None = None,
         changed_path_hints: list[str] | None = None,
+        incremental: bool = False,
     ) -> SnapshotResult:
+        """Commit the workspace when it changed since the current snapshot.
+
+        With incremental set, only changed_path_hints are restaged on top of
+        the index of the last snapshot, unless that index cannot be trusted.
+        """
         self._ensure_workspace_dir()
         self.ensure_repo()
         previous_hash = self.current_hash()
-        tree_hash, included_paths = self._stage_current_tree()
+        staged = None
+        if incremental and previous_hash and changed_path_hints:
+            staged = self._stage_changed_paths(changed_path_hints)
+        tree_hash, included_paths = staged or self._stage_current_tree()
 
         if previous_hash and self._commit_tree(previous_hash) == tree_hash:
             return SnapshotResult(
@@ -629,13 +660,15 @@ class TimeTravelService:
         commit = self._git(*args, input=commit_message, env=env).stdout.strip()
         self._git("update-ref", "HEAD", commit)
         diff_base = previous_hash or EMPTY_TREE
+        changed_files = self.diff_files(diff_base, commit)
+        self._index_history_paths(commit, changed_files)
         return SnapshotResult(
             created=True,
             hash=commit,
             short_hash=commit[:12],
             tree_hash=tree_hash,
             message=message or self._default_snapshot_message(trigger),
-            files=self.diff_files(diff_base, commit),
+            files=changed_files,
             metadata=full_metadata,
         )
 
@@ -650,14 +683,11 @@ class TimeTravelService:
 
         all_hashes = self._rev_list_all()
         if file_filter:
+            history_paths = self._history_paths(all_hashes)
             all_hashes = [
                 commit_hash
                 for commit_hash in all_hashes
-                if any(
-                    file_filter in str(item.get("path") or "").lower()
-                    or file_filter in str(item.get("old_path") or "").lower()
-                    for item in self.commit_files(commit_hash)
-                )
+                if any(file_filter in path.lower() for path in history_paths.get(commit_hash, []))
             ]
 
         window = all_hashes[offset : offset + limit + 1]
@@ -729,6 +759,7 @@ class TimeTravelService:
             self._preserve_ref(previous, reason="travel")
         affected = self.diff_files(previous or EMPTY_TREE, target)
         self._apply_commit_tree(previous or EMPTY_TREE, target, affected)
+        self._forget_staged_index()
         self._git("update-ref", "HEAD", target)
         return {
             "ok": True,
@@ -752,6 +783,7 @@ class TimeTravelService:
             if checked.returncode != 0:
                 raise TimeTravelConflictError(_compact_git_error(checked.stderr.decode("utf-8", "replace")))
             applied = self._git_bytes("apply", "--reverse", "--binary", "--whitespace=nowarn", input=patch, check=False)
+            self._forget_staged_index()
             if applied.returncode != 0:
                 raise TimeTravelConflictError(_compact_git_error(applied.stderr.decode("utf-8", "replace")))
 
@@ -847,19 +879,117 @@ class TimeTravelService:
         self.ensure_repo()
         self._git("read-tree", "--empty")
         paths = list(iter_snapshot_paths(self.workspace.real_path, display_path=self.workspace.display_path))
-        if paths:
-            payload = "\0".join(paths).encode("utf-8") + b"\0"
-            self._git_bytes(
-                "add",
-                "-f",
-                "-A",
-                "--pathspec-from-file=-",
-                "--pathspec-file-nul",
-                input=payload,
-            )
+        self._update_index("--add", "--remove", "--replace", paths=paths)
         tree_hash = self._git("write-tree").stdout.strip()
+        self._remember_staged_index(restaged=True)
         return tree_hash, paths
 
+    def _stage_changed_paths(self, changed_path_hints: list[str]) -> tuple[str, list[str]] | None:
+        """Restage the hinted paths in the index left by the last staging.
+
+        The tree is the one a full restage would write. Returns None when the
+        index may be stale or the hints do not narrow the work down.
+        """
+        if not self._staged_index_reusable():
+            return None
+        targets = self._changed_targets(changed_path_hints)
+        if targets is None:
+            return None
+        paths: list[str] = []
+        for target in targets:
+            paths.extend(self._snapshot_paths_at(target))
+        paths = list(dict.fromkeys(paths))
+        if targets:
+            current = set(paths)
+            indexed = self._git_bytes("--literal-pathspecs", "ls-files", "-z", "--", *targets).stdout
+            stale = [path for path in os.fsdecode(indexed).split("\0") if path and path not in current]
+            self._update_index("--force-remove", paths=stale)
+            self._update_index("--add", "--remove", "--replace", paths=paths)
+        tree_hash = self._git("write-tree").stdout.strip()
+        self._remember_staged_index(restaged=False)
+        return tree_hash, paths
+
+    def _changed_targets(self, changed_path_hints: list[str]) -> list[str] | None:
+        """Workspace relative paths to restage, each one with all of its entries."""
+        root = self.workspace.display_path.rstrip("/")
+        root_is_usr = normalize_display_path(root) == USR_DISPLAY_ROOT
+        targets: list[str] = []
+        for hint in changed_path_hints:
+            display_path = normalize_display_path(hint)
+            if display_path == root:
+                return None
+            if not display_path.startswith(root + "/"):
+                continue
+            parts = display_path[len(root) + 1 :].split("/")
+            # a parent that is no longer a snapshotted directory is restaged as a whole
+            target = parts
+            for depth in range(1, len(parts)):
+                folder = self.workspace.real_path.joinpath(*parts[:depth])
+                if not folder.is_dir() or folder.is_symlink() or not _is_snapshot_dir(
+                    folder, "/".join(parts[:depth]), self.workspace.real_path, root_is_usr=root_is_usr
+                ):
+                    target = parts[:depth]
+                    break
+            targets.append("/".join(target))
+        targets = list(dict.fromkeys(targets))
+        return targets if len(targets) <= INCREMENTAL_MAX_PATHS else None
+
+    def _snapshot_paths_at(self, rel_path: str) -> list[str]:
+        path = self.workspace.real_path.joinpath(*rel_path.split("/"))
+        try:
+            mode = path.lstat().st_mode
+        except OSError:
+            return []
+        if stat.S_ISDIR(mode):
+            root_is_usr = normalize_display_path(self.workspace.display_path) == USR_DISPLAY_ROOT
+            if not _is_snapshot_dir(path, rel_path, self.workspace.real_path, root_is_usr=root_is_usr):
+                return []
+            return list(
+                iter_snapshot_paths(
+                    self.workspace.real_path,
+                    display_path=self.workspace.display_path,
+                    rel_path=rel_path,
+                )
+            )
+        if (stat.S_ISREG(mode) or stat.S_ISLNK(mode)) and is_snapshot_candidate(rel_path, is_dir=False):
+            return [rel_path]
+        return []
+
+    def _update_index(self, *args: str, paths: list[str]) -> None:
+        # plain paths instead of pathspecs, matching thousands of pathspecs is quadratic
+        if not paths:
+            return
+        payload = b"\0".join(os.fsencode(path) for path in paths) + b"\0"
+        self._git_bytes("update-index", *args, "-z", "--stdin", input=payload)
+
+    def _index_signature(self) -> tuple[int, int, int] | None:
+        try:
+            index_stat = (self.workspace.repo_git_path / "index").stat()
+        except OSError:
+            return None
+        return index_stat.st_ino, index_stat.st_mtime_ns, index_stat.st_size
+
+    def _remember_staged_index(self, *, restaged: bool) -> None:
+        signature = self._index_signature()
+        with _STAGED_INDEX_LOCK:
+            previous = _STAGED_INDEXES.get(self.workspace.id)
+            if signature is None or (not restaged and previous is None):
+                _STAGED_INDEXES.pop(self.workspace.id, None)
+                return
+            restaged_at = time.monotonic() if restaged else previous[1]  # type: ignore[index]
+            _STAGED_INDEXES[self.workspace.id] = (signature, restaged_at)
+
+    def _staged_index_reusable(self) -> bool:
+        with _STAGED_INDEX_LOCK:
+            state = _STAGED_INDEXES.get(self.workspace.id)
+        if state is None or state[0] != self._index_signature():
+            return False
+        return time.monotonic() - state[1] < FULL_RESTAGE_INTERVAL_SECONDS
+
+    def _forget_staged_index(self) -> None:
+        with _STAGED_INDEX_LOCK:
+            _STAGED_INDEXES.pop(self.workspace.id, None)
+
     def _apply_commit_tree(self, base: str, target: str, affected: list[dict[str, Any]]) -> None:
         delete_paths: list[str] = []
         write_paths: list[str] = []
@@ -1008,6 +1138,101 @@ class TimeTravelService:
                 seen.add(commit)
         return result
 
+    def _history_paths(self, commit_hashes: list[str]) -> dict[str, list[str]]:
+        """Paths touched by each of commit_hashes, as listed by commit_files.
+
+        Read from a per-workspace index file. Commits missing from it are added
+        with a single git log run and commits no longer reachable are dropped,
+        so the index follows the refs even after they were changed outside.
+        """
+        with _HISTORY_PATHS_LOCK:
+            indexed = self._load_history_paths()
+            missing = [commit_hash for commit_hash in commit_hashes if commit_hash not in indexed]
+            reachable = set(commit_hashes)
+            stale = [commit_hash for commit_hash in indexed if commit_hash not in reachable]
+            if not missing and not stale:
+                return indexed
+            paths = {commit_hash: indexed[commit_hash] for commit_hash in commit_hashes if commit_hash in indexed}
+            if missing:
+                paths.update(self._log_history_paths(missing))
+            self._save_history_paths(paths)
+            return paths
+
+    def _index_history_paths(self, commit_hash: str, changed_files: list[dict[str, Any]]) -> None:
+        with _HISTORY_PATHS_LOCK:
+            # older commits not indexed yet are backfilled by the next filtered listing
+            paths = dict(self._load_history_paths())
+            paths[commit_hash] = _touched_paths(changed_files)
+            self._save_history_paths(paths)
+
+    def _log_history_paths(self, commit_hashes: list[str]) -> dict[str, list[str]]:
+        completed = self._git(
+            "log",
+            "--no-walk=unsorted",
+            "--stdin",
+            "--format=%x01%H",
+            "--name-status",
+            "-z",
+            "--find-renames",
+            "--diff-merges=first-parent",
+            input="\n".join(commit_hashes) + "\n",
+        )
+        result: dict[str, list[str]] = {commit_hash: [] for commit_hash in commit_hashes}
+        for record in completed.stdout.split("\x01"):
+            commit_hash, _sep, name_status = record.partition("\0")
+            commit_hash = commit_hash.strip()
+            if commit_hash in result:
+                result[commit_hash] = _touched_paths(_parse_name_status(name_status.lstrip("\n")))
+        return result
+
+    def _history_paths_path(self) -> Path:
+        return self.workspace.shadow_path / HISTORY_PATHS_FILE
+
+    def _load_history_paths(self) -> dict[str, list[str]]:
+        path = self._history_paths_path()
+        try:
+            file_stat = path.stat()
+        except OSError:
+            _HISTORY_PATHS.pop(self.workspace.id, None)
+            return {}
+        signature = (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+        cached = _HISTORY_PATHS.get(self.workspace.id)
+        if cached and cached[0] == signature:
+            return cached[1]
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            commits = data.get("commits") if data.get("version") == HISTORY_PATHS_VERSION else None
+        except (OSError, ValueError, AttributeError):
+            commits = None
+        if not isinstance(commits, dict):
+            # unreadable or from another version, rebuilt on the next lookup
+            commits = {}
+        paths = {
+            str(commit_hash): [str(item) for item in items]
+            for commit_hash, items in commits.items()
+            if isinstance(items, list)
+        }
+        _HISTORY_PATHS[self.workspace.id] = (signature, paths)
+        return paths
+
+    def _save_history_paths(self, paths: dict[str, list[str]]) -> None:
+        path = self._history_paths_path()
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_text(
+                json.dumps({"version": HISTORY_PATHS_VERSION, "commits": paths}, separators=(",", ":")),
+                encoding="utf-8",
+            )
+            os.replace(temp_path, path)
+            file_stat = path.stat()
+        except OSError as exc:
+            temp_path.unlink(missing_ok=True)
+            _HISTORY_PATHS.pop(self.workspace.id, None)
+            PrintStyle.error(f"Time Travel history index could not be saved: {exc}")
+            return
+        signature = (file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
+        _HISTORY_PATHS[self.workspace.id] = (signature, paths)
+
     def _validate_commit(self, commit_hash: str) -> str:
         candidate = str(commit_hash or "").strip()
         if not candidate:
@@ -1252,7 +1477,7 @@ class TimeTravelService:
         return completed
 
 
-def iter_snapshot_paths(workspace: Path, *, display_path: str = "") -> Iterable[str]:
+def iter_snapshot_paths(workspace: Path, *, display_path: str = "", rel_path: str = "") -> Iterable[str]:
     workspace = workspace.resolve(strict=False)
     if display_path:
         root_is_usr = normalize_display_path(display_path) == USR_DISPLAY_ROOT
@@ -1275,17 +1500,24 @@ def iter_snapshot_paths(workspace: Path, *, display_path: str = "") -> Iterable[
             except OSError:
                 continue
             if is_dir:
-                if root_is_usr and not rel_prefix and entry.name in USR_ROOT_EXCLUDED_DIR_NAMES:
-                    continue
-                if _is_nested_git_worktree_dir(Path(entry.path), workspace):
-                    continue
-                if not is_snapshot_candidate(rel, is_dir=True):
+                if not _is_snapshot_dir(Path(entry.path), rel, workspace, root_is_usr=root_is_usr):
                     continue
                 yield from walk(Path(entry.path), rel)
             elif (is_file or is_link) and is_snapshot_candidate(rel, is_dir=False):
                 yield rel
 
-    yield from walk(workspace)
+    if rel_path:
+        yield from walk(workspace.joinpath(*rel_path.split("/")), rel_path)
+    else:
+        yield from walk(workspace)
+
+
+def _is_snapshot_dir(folder: Path, rel: str, workspace: Path, *, root_is_usr: bool) -> bool:
+    if root_is_usr and "/" not in rel and rel in USR_ROOT_EXCLUDED_DIR_NAMES:
+        return False
+    if _is_nested_git_worktree_dir(folder, workspace):
+        return False
+    return is_snapshot_candidate(rel, is_dir=True)
 
 
 def _is_nested_git_worktree_dir(folder: Path, workspace: Path) -> bool:
@@ -1381,6 +1613,11 @@ def _parse_name_status(output: str) -> list[dict[str, str]]:
     return entries
 
 
+def _touched_paths(entries: list[dict[str, Any]]) -> list[str]:
+    paths = (str(entry.get(key) or "") for entry in entries for key in ("path", "old_path"))
+    return list(dict.fromkeys(path for path in paths if path))
+
+
 def _safe_int(value: str) -> int:
     try:
         return max(0, int(value))
@@ -0,0 +1,10 @@
+from helpers.extension import Extension
+from plugins._whatsapp_integration.helpers.handler import index_chat
+
+
+class WhatsAppIndexChat(Extension):
+    def execute(self, data: dict = {}, **kwargs):
+        args = data.get("args", ())
+        context = args[0] if isinstance(args, tuple) and args else None
+        if context is not None and data.get("exception") is None:
+            index_chat(context)
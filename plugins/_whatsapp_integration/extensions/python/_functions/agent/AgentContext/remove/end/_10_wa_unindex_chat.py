@@ -0,0 +1,10 @@
+from helpers.extension import Extension
+from plugins._whatsapp_integration.helpers.handler import unindex_chat
+
+
+class WhatsAppUnindexChat(Extension):
+    def execute(self, data: dict = {}, **kwargs):
+        args = data.get("args", ())
+        context_id = args[0] if isinstance(args, tuple) and args else ""
+        if context_id:
+            unindex_chat(str(context_id))
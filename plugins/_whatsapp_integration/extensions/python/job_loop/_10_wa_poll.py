@@ -1,4 +1,4 @@
-"""WhatsApp poll loop — start bridge and poll for incoming messages."""
+"""WhatsApp poll loop — start bridge and long-poll for incoming messages."""
 
 import asyncio
 from typing import Any
@@ -13,6 +13,9 @@ PLUGIN_NAME: str = "_whatsapp_integration"
 DEFAULT_INTERVAL: int = 3
 MIN_INTERVAL: int = 2
 MAX_CONSECUTIVE_FAILURES: int = 5
+# the bridge holds each poll until a message arrives, typing indicators are
+# refreshed between polls and WhatsApp drops them after 25s
+LONG_POLL_SECONDS: int = 10
 
 
 # ------------------------------------------------------------------
@@ -42,8 +45,11 @@ class WhatsAppAutoPoll(Extension):
 # ------------------------------------------------------------------
 
 async def _poll_loop() -> None:
-    from plugins._whatsapp_integration.helpers import bridge_manager
-    from plugins._whatsapp_integration.helpers.handler import poll_messages
+    from plugins._whatsapp_integration.helpers import bridge_manager, wa_client
+    from plugins._whatsapp_integration.helpers.handler import (
+        poll_messages,
+        reset_chats_index,
+    )
     from plugins._whatsapp_integration.helpers.storage_paths import (
         get_bridge_media_dir,
         get_bridge_session_dir,
@@ -106,13 +112,22 @@ async def _poll_loop() -> None:
                     continue
 
             try:
-                await poll_messages(config)
+                polled = await poll_messages(config, wait=LONG_POLL_SECONDS)
             except Exception as e:
+                polled = False
                 PrintStyle.error(f"WhatsApp poll error: {format_error(e)}")
 
-            sleep_sec = max(config.get("poll_interval_seconds", DEFAULT_INTERVAL), MIN_INTERVAL)
-            await asyncio.sleep(sleep_sec)
+            # messages are pushed through the long poll, wait only before retrying
+            if not polled:
+                sleep_sec = max(config.get("poll_interval_seconds", DEFAULT_INTERVAL), MIN_INTERVAL)
+                await asyncio.sleep(sleep_sec)
     finally:
+        # chats created while the plugin is disabled are not indexed
+        reset_chats_index()
+        try:
+            await wa_client.close()
+        except Exception:
+            pass
         # Ensure bridge stops when poll loop exits (plugin disabled or task cancelled)
         try:
             if bridge_manager.is_process_alive():
@@ -8,6 +8,7 @@ import asyncio
 import base64
 import os
 import re
+import threading
 import uuid
 
 from agent import Agent, AgentContext, UserMessage
@@ -47,28 +48,38 @@ CTX_WA_TYPING_ACTIVE = "_wa_typing_active"
 # which would reset module-level state and orphan running tasks.
 _poll_task: asyncio.Task | None = None  # type: ignore[type-arg]
 
+# WhatsApp JID -> ids of contexts chatting with it, kept in sync by the
+# AgentContext __init__/remove extensions, built from all contexts on first use
+_chats_by_jid: dict[str, set[str]] = {}
+_chats_index_ready = False
+_chats_lock = threading.RLock()
+
 
 # ------------------------------------------------------------------
 # Poll loop
 # ------------------------------------------------------------------
 
 async def _refresh_typing(base_url: str) -> None:
-    """Re-send composing for all contexts with active typing flag."""
-    for ctx in AgentContext._contexts.values():
-        if not isinstance(ctx, AgentContext):
-            continue
-        if not ctx.data.get(CTX_WA_TYPING_ACTIVE):
-            continue
-        chat_id = ctx.data.get(CTX_WA_CHAT_ID, "")
-        if chat_id:
-            await wa_client.send_typing(base_url, chat_id)
-
-
-async def poll_messages(config: dict) -> None:
+    """Re-send composing for all contexts with active typing flag, in one request."""
+    chat_ids = []
+    for chat_id, context_ids in _get_chats_index().items():
+        for context_id in context_ids:
+            ctx = AgentContext.get(context_id)
+            if ctx and ctx.data.get(CTX_WA_TYPING_ACTIVE):
+                chat_ids.append(chat_id)
+                break
+    await wa_client.send_typing_many(base_url, chat_ids)
+
+
+async def poll_messages(config: dict, wait: float = 0) -> bool:
+    """Dispatch messages from the bridge, waiting up to wait seconds for them.
+
+    Returns False if the bridge could not be polled.
+    """
     if not config.get("enabled", False):
-        return
+        return True
     if PLUGIN_NAME not in plugins.get_enabled_plugins(None):
-        return
+        return True
 
     port = int(config.get("bridge_port", 3100))
     base_url = bridge_manager.get_bridge_url(port)
@@ -77,13 +88,13 @@ async def poll_messages(config: dict) -> None:
     await _refresh_typing(base_url)
 
     try:
-        messages = await wa_client.get_messages(base_url)
+        messages = await wa_client.get_messages(base_url, wait=wait)
     except Exception as e:
         PrintStyle.error(f"WhatsApp poll error: {format_error(e)}")
-        return
+        return False
 
     if not messages:
-        return
+        return True
 
     # Allowed-numbers filtering is authoritative in Python.
     allowed_set = normalize_allowed_numbers(config.get("allowed_numbers"))
@@ -102,6 +113,7 @@ async def poll_messages(config: dict) -> None:
             await _dispatch_message(config, msg)
         except Exception as e:
             PrintStyle.error(f"WhatsApp dispatch error: {format_error(e)}")
+    return True
 
 
 # ------------------------------------------------------------------
@@ -157,6 +169,7 @@ async def _start_new_chat(config: dict, msg: dict) -> None:
     context.data[CTX_WA_LAST_BODY] = msg.get("body", "")
     context.data[CTX_WA_LAST_MSG_ID] = msg.get("messageId", "")
     context.data[CTX_WA_TYPING_ACTIVE] = True
+    index_chat(context)
 
     project = config.get("project", "")
     if project:
@@ -256,15 +269,51 @@ async def _handle_control_message(
 # Chat discovery
 # ------------------------------------------------------------------
 
+def index_chat(context: AgentContext) -> None:
+    """Add a context to the JID index if it is a WhatsApp chat."""
+    chat_id = context.data.get(CTX_WA_CHAT_ID)
+    if not chat_id:
+        return
+    with _chats_lock:
+        _chats_by_jid.setdefault(chat_id, set()).add(context.id)
+
+
+def unindex_chat(context_id: str) -> None:
+    with _chats_lock:
+        for chat_id, context_ids in list(_chats_by_jid.items()):
+            context_ids.discard(context_id)
+            if not context_ids:
+                del _chats_by_jid[chat_id]
+
+
+def reset_chats_index() -> None:
+    """Rebuild the index on next use, contexts may change while the plugin is disabled."""
+    global _chats_index_ready
+    with _chats_lock:
+        _chats_by_jid.clear()
+        _chats_index_ready = False
+
+
+def _get_chats_index(chat_id: str | None = None) -> dict[str, set[str]]:
+    """Copy of the JID index, only the entry of chat_id if given."""
+    global _chats_index_ready
+    with _chats_lock:
+        if not _chats_index_ready:
+            for ctx in AgentContext.all():
+                index_chat(ctx)
+            _chats_index_ready = True
+        if chat_id is not None:
+            return {chat_id: set(_chats_by_jid.get(chat_id, ()))}
+        return {chat_id: set(ids) for chat_id, ids in _chats_by_jid.items()}
+
+
 def _find_chats_by_jid(chat_id: str) -> list[str]:
     """Return context IDs for chats matching the given WhatsApp JID, newest first."""
     results = []
-    for ctx_id, ctx in AgentContext._contexts.items():
-        if not isinstance(ctx, AgentContext):
-            continue
-        if ctx.data.get(CTX_WA_CHAT_ID) != chat_id:
-            continue
-        results.append(ctx_id)
+    for ctx_id in _get_chats_index(chat_id)[chat_id]:
+        ctx = AgentContext.get(ctx_id)
+        if ctx and ctx.data.get(CTX_WA_CHAT_ID) == chat_id:
+            results.append(ctx_id)
 
     results.sort(reverse=True)
     return results
@@ -4,17 +4,48 @@ WhatsApp bridge HTTP client.
 No agent/tool dependencies.
 """
 
+import asyncio
+import weakref
+
 import aiohttp
 
+# one keep-alive session per event loop, aiohttp sessions are bound to their loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close() -> None:
+    """Close the session of the running event loop."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session and not session.closed:
+        await session.close()
 
-async def get_messages(base_url: str) -> list[dict]:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"{base_url}/messages", timeout=aiohttp.ClientTimeout(total=10),
-        ) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return []
+
+async def get_messages(base_url: str, wait: float = 0) -> list[dict]:
+    """Queued messages, with wait the bridge holds the request until one arrives.
+
+    Raises on error responses, so callers do not poll again right away.
+    """
+    params = {"wait": str(wait)} if wait > 0 else None
+    async with _get_session().get(
+        f"{base_url}/messages",
+        params=params,
+        timeout=aiohttp.ClientTimeout(total=wait + 10),
+    ) as resp:
+        resp.raise_for_status()
+        return await resp.json()
 
 
 async def send_message(
@@ -23,13 +54,12 @@ async def send_message(
     payload: dict = {"chatId": chat_id, "message": message}
     if reply_to:
         payload["replyTo"] = reply_to
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f"{base_url}/send",
-            json=payload,
-            timeout=aiohttp.ClientTimeout(total=30),
-        ) as resp:
-            return await resp.json()
+    async with _get_session().post(
+        f"{base_url}/send",
+        json=payload,
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as resp:
+        return await resp.json()
 
 
 async def send_media(
@@ -47,57 +77,63 @@ async def send_media(
         payload["mediaType"] = media_type
     if file_name:
         payload["fileName"] = file_name
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            f"{base_url}/send-media",
-            json=payload,
-            timeout=aiohttp.ClientTimeout(total=30),
-        ) as resp:
-            return await resp.json()
+    async with _get_session().post(
+        f"{base_url}/send-media",
+        json=payload,
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as resp:
+        return await resp.json()
 
 
 async def send_typing(base_url: str, chat_id: str, paused: bool = False) -> None:
+    await send_typing_many(base_url, [chat_id], paused=paused)
+
+
+async def send_typing_many(
+    base_url: str, chat_ids: list[str], paused: bool = False,
+) -> None:
+    """Typing state of several chats in one request."""
+    if not chat_ids:
+        return
     try:
-        payload: dict = {"chatId": chat_id}
+        payload: dict = (
+            {"chatId": chat_ids[0]} if len(chat_ids) == 1 else {"chatIds": chat_ids}
+        )
         if paused:
             payload["status"] = "paused"
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{base_url}/typing",
-                json=payload,
-                timeout=aiohttp.ClientTimeout(total=5),
-            ) as resp:
-                await resp.json()
+        async with _get_session().post(
+            f"{base_url}/typing",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=5),
+        ) as resp:
+            await resp.json()
     except Exception:
         pass
 
 
 async def get_health(base_url: str) -> dict:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"{base_url}/health", timeout=aiohttp.ClientTimeout(total=5),
-        ) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return {"status": "error", "queueLength": 0, "uptime": 0}
+    async with _get_session().get(
+        f"{base_url}/health", timeout=aiohttp.ClientTimeout(total=5),
+    ) as resp:
+        if resp.status == 200:
+            return await resp.json()
+        return {"status": "error", "queueLength": 0, "uptime": 0}
 
 
 async def get_qr(base_url: str) -> dict:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"{base_url}/qr", timeout=aiohttp.ClientTimeout(total=5),
-        ) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return {"status": "error", "qr": None}
+    async with _get_session().get(
+        f"{base_url}/qr", timeout=aiohttp.ClientTimeout(total=5),
+    ) as resp:
+        if resp.status == 200:
+            return await resp.json()
+        return {"status": "error", "qr": None}
 
 
 async def get_chat_info(base_url: str, chat_id: str) -> dict:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"{base_url}/chat/{chat_id}",
-            timeout=aiohttp.ClientTimeout(total=10),
-        ) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return {"name": "", "isGroup": False, "participants": []}
+    async with _get_session().get(
+        f"{base_url}/chat/{chat_id}",
+        timeout=aiohttp.ClientTimeout(total=10),
+    ) as resp:
+        if resp.status == 200:
+            return await resp.json()
+        return {"name": "", "isGroup": False, "participants": []}
@@ -88,6 +88,10 @@ const logger = pino({ level: 'warn' });
 const messageQueue = [];
 const MAX_QUEUE_SIZE = 100;
 
+// Long-poll requests waiting for the next message
+const messageWaiters = [];
+const MAX_WAIT_SECONDS = 60;
+
 // Track recently sent message IDs to prevent echo-back loops
 const recentlySentIds = new Set();
 const MAX_RECENT_IDS = 50;
@@ -394,6 +398,7 @@ async function startSocket() {
       if (messageQueue.length > MAX_QUEUE_SIZE) {
         messageQueue.shift();
       }
+      flushMessageWaiters();
     }
   });
 }
@@ -402,10 +407,34 @@ async function startSocket() {
 const app = express();
 app.use(express.json());
 
-// Poll for new messages
+function flushMessageWaiters() {
+  if (!messageQueue.length) return;
+  const waiter = messageWaiters.shift();
+  if (!waiter) return;
+  clearTimeout(waiter.timer);
+  waiter.res.json(messageQueue.splice(0, messageQueue.length));
+}
+
+function removeMessageWaiter(waiter) {
+  const index = messageWaiters.indexOf(waiter);
+  if (index !== -1) messageWaiters.splice(index, 1);
+  clearTimeout(waiter.timer);
+}
+
+// Poll for new messages, ?wait=<seconds> holds the request until one arrives
 app.get('/messages', (req, res) => {
-  const msgs = messageQueue.splice(0, messageQueue.length);
-  res.json(msgs);
+  const wait = Math.min(Number(req.query.wait) || 0, MAX_WAIT_SECONDS);
+  if (messageQueue.length || wait <= 0) {
+    return res.json(messageQueue.splice(0, messageQueue.length));
+  }
+
+  const waiter = { res, timer: null };
+  waiter.timer = setTimeout(() => {
+    removeMessageWaiter(waiter);
+    res.json([]);
+  }, wait * 1000);
+  req.on('close', () => removeMessageWaiter(waiter));
+  messageWaiters.push(waiter);
 });
 
 // Send a message
@@ -543,15 +572,16 @@ app.post('/typing', async (req, res) => {
     return res.status(503).json({ error: 'Not connected' });
   }
 
-  const { chatId, status } = req.body;
-  if (!chatId) return res.status(400).json({ error: 'chatId required' });
+  // chatIds updates several chats with one request
+  const { chatId, chatIds, status } = req.body;
+  const ids = Array.isArray(chatIds) ? chatIds : chatId ? [chatId] : [];
+  if (!ids.length) return res.status(400).json({ error: 'chatId required' });
 
-  try {
-    await sock.sendPresenceUpdate(status === 'paused' ? 'paused' : 'composing', chatId);
-    res.json({ success: true });
-  } catch (err) {
-    res.json({ success: false });
-  }
+  const presence = status === 'paused' ? 'paused' : 'composing';
+  const results = await Promise.allSettled(
+    ids.map(id => sock.sendPresenceUpdate(presence, id)),
+  );
+  res.json({ success: results.every(result => result.status === 'fulfilled') });
 });
 
 // Chat info
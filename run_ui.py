@@ -50,12 +50,15 @@ def start_web_server(server_runtime: UiServerRuntime, host: str, port: int) -> N
     )
 
 
+@extension.extensible
+def flush_and_shutdown() -> None:
+    """Flush pending state to disk before the server exits, extensions hook in here."""
+    return
+
+
 def create_flush_callback():
     def flush_and_shutdown_callback() -> None:
-        """
-        TODO(dev): add cleanup + flush-to-disk logic here.
-        """
-        return
+        flush_and_shutdown()
 
     flush_ran = False
 
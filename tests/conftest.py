@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+# timings against the previous implementations are slow and machine dependent,
+# they only run on request
+BENCHMARKS_ENV = "A0_BENCHMARKS"
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", f"benchmark: timing comparison, runs only with {BENCHMARKS_ENV}=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get(BENCHMARKS_ENV):
+        return
+    skip = pytest.mark.skip(reason=f"benchmark, set {BENCHMARKS_ENV}=1 to run it")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
@@ -0,0 +1,311 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from agent import Agent, AgentContext, Log
+from helpers import files, persist_chat
+from initialize import initialize_agent
+
+
+@pytest.fixture
+def chats(tmp_path, monkeypatch):
+    monkeypatch.setattr(persist_chat, "CHATS_FOLDER", str(tmp_path))
+    # no state monitor here, others may have re-imported the log module agent and persist_chat use
+    for log_class in (Log.Log, persist_chat.Log):
+        log_globals = log_class._notify_state_monitor.__globals__
+        monkeypatch.setitem(log_globals, "_lazy_mark_dirty_all", lambda **kwargs: None)
+        monkeypatch.setitem(
+            log_globals, "_lazy_mark_dirty_for_context", lambda *args, **kwargs: None
+        )
+    contexts: list[AgentContext] = []
+
+    def create() -> AgentContext:
+        context = AgentContext(config=initialize_agent(), name="journal")
+        contexts.append(context)
+        return context
+
+    yield create
+    for context in contexts:
+        AgentContext.remove(context.id)
+
+
+def _load(context_id: str) -> AgentContext:
+    return persist_chat._load_chat(persist_chat.get_chat_folder_path(context_id))
+
+
+def _add_turn(context: AgentContext, i: int):
+    context.agent0.history.add_message(False, f"question {i}")
+    context.agent0.history.add_message(True, f"answer {i} " * 20)
+    context.log.log(type="user", heading="User", content=f"question {i}")
+    context.log.log(type="response", heading="A0", content=f"answer {i}")
+
+
+def _messages(context: AgentContext) -> list:
+    return [message.to_dict() for message in context.agent0.history.current.messages]
+
+
+def _log(context: AgentContext) -> list:
+    # empty kvps are restored as None
+    return [{**item.output(), "kvps": item.kvps or None} for item in context.log.logs]
+
+
+def _journal_lines(context: AgentContext, name: str) -> list[dict]:
+    path = os.path.join(persist_chat.get_chat_folder_path(context.id), name)
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_saves_append_changes_and_load_replays_them(chats):
+    context = chats()
+    _add_turn(context, 0)
+    persist_chat.save_tmp_chat(context)
+    folder = persist_chat.get_chat_folder_path(context.id)
+    snapshot = os.path.getmtime(os.path.join(folder, persist_chat.HISTORY_FILE_NAME))
+
+    for i in range(1, 4):
+        _add_turn(context, i)
+        persist_chat.save_tmp_chat(context)
+    persist_chat.save_tmp_chat(context)  # nothing changed, nothing written
+
+    history_lines = _journal_lines(context, persist_chat.HISTORY_JOURNAL_FILE_NAME)
+    assert len(history_lines) == 3
+    assert [len(op[1]) for op in history_lines[0]["agents"][0]["ops"]] == [2]
+    assert len(_journal_lines(context, persist_chat.CHAT_JOURNAL_FILE_NAME)) == 3
+    assert os.path.getmtime(os.path.join(folder, persist_chat.HISTORY_FILE_NAME)) == snapshot
+    # histories are stored as JSON objects, not as JSON strings inside JSON
+    data = json.loads(files.read_file(os.path.join(folder, persist_chat.HISTORY_FILE_NAME)))
+    assert isinstance(data["agents"][0]["history"], dict)
+
+    context.agent0.history.new_topic()
+    _add_turn(context, 4)
+    context.name = "renamed"
+    persist_chat.save_tmp_chat(context)
+    ops = _journal_lines(context, persist_chat.HISTORY_JOURNAL_FILE_NAME)[-1]["agents"][0]["ops"]
+    assert [op[0] for op in ops] == ["new_topic", "append"]
+
+    expected_topics = [topic.to_dict() for topic in context.agent0.history.topics]
+    expected_messages = _messages(context)
+    expected_log = _log(context)
+    expected_counter = context.agent0.history.counter
+    AgentContext.remove(context.id)
+
+    loaded = _load(context.id)
+    assert loaded.name == "renamed"
+    assert _log(loaded) == expected_log
+    assert not loaded.agents_loaded()
+    assert loaded.output()["log_length"] == len(expected_log)
+    assert not loaded.agents_loaded()
+
+    assert _messages(loaded) == expected_messages
+    assert loaded.agents_loaded()
+    assert [topic.to_dict() for topic in loaded.agent0.history.topics] == expected_topics
+    assert loaded.agent0.history.counter == expected_counter
+
+    # journaling continues on the loaded chat
+    _add_turn(loaded, 5)
+    persist_chat.save_tmp_chat(loaded)
+    ops = _journal_lines(loaded, persist_chat.HISTORY_JOURNAL_FILE_NAME)[-1]["agents"][0]["ops"]
+    assert ops == [["append", _messages(loaded)[-2:]]]
+
+
+def test_other_history_changes_write_the_whole_history(chats):
+    context = chats()
+    for i in range(3):
+        _add_turn(context, i)
+    persist_chat.save_tmp_chat(context)
+
+    context.agent0.history.current.messages[1].set_summary("short")
+    persist_chat.save_tmp_chat(context)
+    change = _journal_lines(context, persist_chat.HISTORY_JOURNAL_FILE_NAME)[-1]["agents"][0]
+    assert "ops" not in change
+    assert change["history"]["current"]["messages"][1]["summary"] == "short"
+
+    # messages replaced outside of history methods are detected too
+    messages = context.agent0.history.current.messages
+    messages.pop()
+    context.agent0.history.add_message(True, "[BLOCKED]")
+    persist_chat.save_tmp_chat(context)
+    change = _journal_lines(context, persist_chat.HISTORY_JOURNAL_FILE_NAME)[-1]["agents"][0]
+    assert change["history"]["current"]["messages"][-1]["content"] == "[BLOCKED]"
+
+    expected = _messages(context)
+    AgentContext.remove(context.id)
+    assert _messages(_load(context.id)) == expected
+
+
+def test_edited_message_content_survives_reload(chats):
+    context = chats()
+    for i in range(2):
+        _add_turn(context, i)
+    persist_chat.save_tmp_chat(context)
+
+    message = context.agent0.history.current.messages[1]
+    message.set_summary("short")
+    persist_chat.save_tmp_chat(context)
+    message.set_content("screenshot [image reference superseded]")
+    persist_chat.save_tmp_chat(context)
+
+    expected = _messages(context)
+    assert expected[1]["content"] == "screenshot [image reference superseded]"
+    assert expected[1]["summary"] == ""
+    AgentContext.remove(context.id)
+    assert _messages(_load(context.id)) == expected
+
+
+def test_concurrent_readers_wait_for_lazy_agents(chats):
+    config = chats().config
+    started = threading.Event()
+    failures: list[bool] = []
+
+    def slow_loader(context: AgentContext):
+        started.set()
+        time.sleep(0.2)
+        if not failures:
+            failures.append(True)
+            raise OSError("history not readable yet")
+        agent0 = Agent(0, context.config, context)
+        return agent0, agent0
+
+    context = AgentContext(config=config, name="lazy", agents_loader=slow_loader)
+    try:
+        with pytest.raises(OSError):
+            context.agent0
+        # a failed load is retried on the next access
+        assert not context.agents_loaded()
+
+        started.clear()
+        loaded: list = []
+        loader_thread = threading.Thread(target=lambda: loaded.append(context.agent0))
+        loader_thread.start()
+        assert started.wait(5)
+        concurrent = context.agent0
+        loader_thread.join()
+        assert concurrent is not None and concurrent is loaded[0]
+        assert context.streaming_agent is concurrent and context.agents_loaded()
+    finally:
+        AgentContext.remove(context.id)
+
+
+def test_journals_are_compacted_and_log_reset_rewrites_the_chat(chats, monkeypatch):
+    monkeypatch.setattr(persist_chat, "JOURNAL_COMPACT_SIZE", 2000)
+    context = chats()
+    for i in range(12):
+        _add_turn(context, i)
+        persist_chat.save_tmp_chat(context)
+    for name in (persist_chat.CHAT_JOURNAL_FILE_NAME, persist_chat.HISTORY_JOURNAL_FILE_NAME):
+        path = os.path.join(persist_chat.get_chat_folder_path(context.id), name)
+        assert os.path.getsize(path) < 4000
+
+    context.log.reset()
+    context.log.log(type="info", content="fresh")
+    persist_chat.save_tmp_chat(context)
+    assert os.path.getsize(
+        os.path.join(persist_chat.get_chat_folder_path(context.id), persist_chat.CHAT_JOURNAL_FILE_NAME)
+    ) == 0
+
+    expected = _messages(context)
+    AgentContext.remove(context.id)
+    loaded = _load(context.id)
+    assert [item.content for item in loaded.log.logs] == ["fresh"]
+    assert _messages(loaded) == expected
+
+
+def test_previous_chat_json_loads_lazily_and_is_migrated(chats):
+    context = chats()
+    _add_turn(context, 0)
+    folder = persist_chat.get_chat_folder_path(context.id)
+    os.makedirs(folder)
+    files.write_file(persist_chat._get_chat_file_path(context.id), persist_chat.export_json_chat(context))
+    expected = _messages(context)
+    AgentContext.remove(context.id)
+
+    assert persist_chat.load_tmp_chats() == [context.id]
+    loaded = AgentContext.get(context.id)
+    assert loaded is not None and not loaded.agents_loaded()
+    # listing chats reads the saved profile without loading agents
+    from plugins._a0_connector.api.v1.chats_list import ChatsList
+
+    listed = asyncio.run(ChatsList(None, None).process({}, None))  # type: ignore
+    assert any(chat["id"] == context.id for chat in listed["chats"])  # type: ignore
+    assert not loaded.agents_loaded()
+    loaded.name = "migrated"
+    persist_chat.save_tmp_chat(loaded)
+    assert not loaded.agents_loaded()
+    data = json.loads(files.read_file(os.path.join(folder, persist_chat.CHAT_FILE_NAME)))
+    assert "agents" not in data
+    AgentContext.remove(context.id)
+
+    loaded = _load(context.id)
+    assert loaded.name == "migrated"
+    assert _messages(loaded) == expected
+
+
+@pytest.mark.benchmark
+def test_chat_journal_benchmark(chats, monkeypatch):
+    context = chats()
+    # building the config costs the same either way
+    monkeypatch.setattr(persist_chat, "initialize_agent", lambda **kwargs: context.config)
+    for i in range(300):
+        _add_turn(context, i)
+    path = persist_chat._get_chat_file_path(context.id)
+    persist_chat.save_tmp_chat(context)
+    iterations = 20
+
+    def legacy_save():
+        # previous behaviour: the whole context, histories as JSON strings, on every save
+        js = persist_chat._safe_json_serialize(persist_chat._serialize_context(context), ensure_ascii=False)
+        files.write_file(path + ".legacy", js)
+        return len(js)
+
+    def run(save) -> tuple[float, int]:
+        written = 0
+        started = time.perf_counter()
+        for i in range(iterations):
+            _add_turn(context, i)
+            written += save() or 0
+        return time.perf_counter() - started, written
+
+    folder = persist_chat.get_chat_folder_path(context.id)
+
+    def journal_save():
+        sizes = lambda: sum(
+            os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)
+        )
+        before = sizes()
+        persist_chat.save_tmp_chat(context)
+        return sizes() - before
+
+    legacy_time, legacy_bytes = run(legacy_save)
+    os.remove(path + ".legacy")
+    journal_time, journal_bytes = run(journal_save)
+
+    legacy_json = persist_chat.export_json_chat(context)
+    AgentContext.remove(context.id)
+    started = time.perf_counter()
+    restored = persist_chat._deserialize_context(json.loads(legacy_json))
+    legacy_load = time.perf_counter() - started
+    AgentContext.remove(restored.id)
+    started = time.perf_counter()
+    _load(context.id)
+    lazy_load = time.perf_counter() - started
+
+    print(
+        f"\n[chat journal] messages={len(_messages(restored))} saves={iterations} "
+        f"full={legacy_time / iterations * 1000:.1f}ms/{legacy_bytes // iterations}B "
+        f"journal={journal_time / iterations * 1000:.2f}ms/{journal_bytes // iterations}B "
+        f"speedup={legacy_time / journal_time:.1f}x "
+        f"load={legacy_load * 1000:.1f}ms lazy_load={lazy_load * 1000:.1f}ms"
+    )
+    assert journal_bytes < legacy_bytes / 10
+    assert journal_time < legacy_time
+    assert lazy_load < legacy_load
@@ -0,0 +1,117 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import dotenv, plugins, settings
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"limit": 1, "nested": {"items": [1, 2]}}))
+    lookups: list[tuple] = []
+
+    def find_plugin_asset(plugin_name, *subpaths, project_name="", agent_profile=""):
+        lookups.append((plugin_name, project_name, agent_profile))
+        return {"path": str(path)} if path.exists() else None
+
+    monkeypatch.setattr(plugins, "find_plugin_asset", find_plugin_asset)
+    monkeypatch.setattr(
+        plugins, "determine_plugin_asset_path", lambda *args: str(path)
+    )
+    plugins.clear_plugin_config_cache()
+    yield lookups
+    plugins.clear_plugin_config_cache()
+
+
+def test_plugin_config_is_loaded_once_per_location(config_file):
+    first = plugins.get_plugin_config("_test_cache")
+    assert first == {"limit": 1, "nested": {"items": [1, 2]}}
+    # callers get their own copy, modifying it does not touch the cache
+    first["nested"]["items"].append(3)
+    assert plugins.get_plugin_config("_test_cache") == {"limit": 1, "nested": {"items": [1, 2]}}
+    assert len(config_file) == 1
+
+    plugins.get_plugin_config("_test_cache", project_name="project")
+    plugins.get_plugin_config("_test_cache", project_name="project")
+    plugins.get_plugin_config("_test_cache", agent_profile="profile")
+    assert config_file[1:] == [("_test_cache", "project", ""), ("_test_cache", "", "profile")]
+
+
+def test_saving_a_config_invalidates_it_and_bumps_the_version(config_file):
+    assert plugins.get_plugin_config("_test_cache")["limit"] == 1
+    version = plugins.get_config_version()
+
+    plugins.save_plugin_config("_test_cache", "", "", {"limit": 2})
+    assert plugins.get_config_version() > version
+    assert plugins.get_plugin_config("_test_cache") == {"limit": 2}
+
+    # other plugins stay cached when one plugin changes
+    plugins.get_plugin_config("_other_cache")
+    lookups = len(config_file)
+    plugins.clear_plugin_config_cache(["_test_cache"])
+    plugins.get_plugin_config("_other_cache")
+    plugins.get_plugin_config("_test_cache")
+    assert len(config_file) == lookups + 1
+
+
+def test_settings_are_normalized_once_per_change(monkeypatch):
+    settings._invalidate_settings_cache()
+    normalized: list[int] = []
+    normalize = settings.normalize_settings
+
+    def counting_normalize(value):
+        normalized.append(1)
+        return normalize(value)
+
+    monkeypatch.setattr(settings, "normalize_settings", counting_normalize)
+    first = settings.get_settings()
+    loaded = len(normalized)
+    first["api_keys"]["cache_test"] = "modified"
+    second = settings.get_settings()
+    assert "cache_test" not in second["api_keys"]
+    assert len(normalized) == loaded
+
+    # a dotenv reload may change api keys and credentials
+    monkeypatch.setattr(dotenv, "_version", dotenv.get_version() + 1)
+    settings.get_settings()
+    assert len(normalized) == loaded + 1
+
+    version = plugins.get_config_version()
+    settings.reload_settings()
+    assert len(normalized) > loaded + 1
+    assert plugins.get_config_version() > version
+
+
+@pytest.mark.benchmark
+def test_config_cache_benchmark(config_file):
+    calls = 200
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        # previous behaviour: locate, read, parse and hook on every call
+        plugins._load_plugin_config("_memory", None, None, None)
+        settings._invalidate_settings_cache()
+        settings.get_settings()
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        plugins.get_plugin_config("_memory")
+        settings.get_settings()
+    cached_time = time.perf_counter() - started
+
+    print(
+        f"\n[config cache] calls={calls} "
+        f"uncached={legacy_time / calls * 1000:.2f}ms/call "
+        f"cached={cached_time / calls * 1000:.3f}ms/call "
+        f"speedup={legacy_time / cached_time:.1f}x"
+    )
+    assert cached_time < legacy_time
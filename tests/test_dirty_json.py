@@ -9,7 +9,7 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from helpers.dirty_json import DirtyJson
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
 
 
 @pytest.mark.parametrize(
@@ -54,3 +54,58 @@ def test_completed_remains_true_after_trailing_content() -> None:
     }
 
     assert parser.completed is True
+
+
+STREAM_PAYLOADS = [
+    '{"thoughts": ["a", "b"], "headline": "Hi", "tool_name": "response", '
+    '"tool_args": {"text": "line\\nnext \\u00e9 \\"quoted\\" }"}}',
+    'Sure:\n```json\n{\n  "tool_name": "code_execution_tool",\n'
+    '  "tool_args": {"runtime": "python", "code": "print(1)", "n": -1.5e3, '
+    '"ok": TRUE, "none": null, "list": [1, [2, []], {}, ],}\n}\n```',
+    "{'tool_name': 'x', \"tool_args\": {\"a\" 1 \"b\": 2}}}} trailing",
+    '{"tool_name": "x", // comment\n "tool_args": {unquoted: value}}',
+    '{{"tool_name": "x", "tool_args": {}}}',
+    '{"a": -',
+]
+
+
+@pytest.mark.parametrize("payload", STREAM_PAYLOADS)
+@pytest.mark.parametrize("chunk_size", [1, 3, 7])
+def test_stream_matches_full_parse_for_every_prefix(payload, chunk_size) -> None:
+    stream = DirtyJsonStream()
+
+    for end in range(chunk_size, len(payload) + chunk_size, chunk_size):
+        prefix = payload[:end]
+        full = DirtyJson()
+        try:
+            expected = full.parse(prefix)
+        except Exception as e:
+            with pytest.raises(type(e)):
+                stream.update(prefix)
+            continue
+
+        assert stream.update(prefix) == expected
+        assert stream.completed == full.completed
+        if full.completed:
+            assert stream.index == full.index
+
+
+def test_stream_reports_root_closed_once() -> None:
+    stream = DirtyJsonStream()
+
+    stream.feed('{"tool_name": "response", "tool_args": {"text": "hel')
+    assert stream.completed is False
+    assert stream.result == {"tool_name": "response", "tool_args": {"text": "hel"}}
+
+    stream.feed('lo"}} and more')
+    assert stream.completed is True
+    assert stream.text[: stream.index].endswith('"hello"}}')
+    assert stream.result == {"tool_name": "response", "tool_args": {"text": "hello"}}
+
+
+def test_stream_restarts_when_text_is_rewritten() -> None:
+    stream = DirtyJsonStream()
+
+    stream.update('{"text": "secret-val')
+    assert stream.update('{"text": "***"}') == {"text": "***"}
+    assert stream.completed is True
@@ -0,0 +1,94 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import extract_tools
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
+
+
+def _recorded_stream(text_size: int, seed: int = 7) -> list[str]:
+    """Tool call split the way providers stream it: 1-12 char deltas."""
+    rng = random.Random(seed)
+    words = ["the", "agent", "streams", "a", "long", "answer", "with", "\\n", "\\\"quotes\\\"", "é"]
+    text = ""
+    while len(text) < text_size:
+        text += rng.choice(words) + " "
+    payload = (
+        '{\n    "thoughts": [\n        "Reply to the user"\n    ],\n'
+        '    "headline": "Responding",\n    "tool_name": "response",\n'
+        '    "tool_args": {\n        "text": "' + text + '"\n    }\n}'
+    )
+    chunks, pos = [], 0
+    while pos < len(payload):
+        size = rng.randint(1, 12)
+        chunks.append(payload[pos : pos + size])
+        pos += size
+    return chunks
+
+
+def _parsed(parse, text: str):
+    try:
+        return parse(text)
+    except Exception as e:  # the agent swallows partial-parse errors
+        return type(e)
+
+
+def _replay_full_parse(chunks: list[str]):
+    full, results = "", []
+    for chunk in chunks:
+        full += chunk
+        snapshot = extract_tools.extract_json_root_string(full)
+        if snapshot:
+            extract_tools.json_parse_dirty(snapshot)
+        results.append((snapshot, _parsed(DirtyJson.parse_string, full)))
+    return results
+
+
+def _replay_incremental(chunks: list[str]):
+    root, parser = extract_tools.JsonRootStream(), DirtyJsonStream()
+    full, results = "", []
+    for chunk in chunks:
+        full += chunk
+        snapshot = root.update(full)
+        if snapshot:
+            root.result
+        results.append((snapshot, _parsed(parser.update, full)))
+    return results
+
+
+def test_incremental_stream_parse_matches_full_parse():
+    chunks = _recorded_stream(300, seed=3)
+    actual = _replay_incremental(chunks)
+    assert actual == _replay_full_parse(chunks)
+    assert actual[-1][0] is not None
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("text_size", [1_000, 4_000])
+def test_incremental_stream_parse_benchmark(text_size: int):
+    chunks = _recorded_stream(text_size)
+
+    started = time.perf_counter()
+    expected = _replay_full_parse(chunks)
+    full_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = _replay_incremental(chunks)
+    incremental_time = time.perf_counter() - started
+
+    print(
+        f"\n[dirty json stream] chars={len(''.join(chunks))} chunks={len(chunks)} "
+        f"full={full_time * 1000:.1f}ms incremental={incremental_time * 1000:.1f}ms "
+        f"speedup={full_time / incremental_time:.1f}x"
+    )
+
+    assert actual == expected
+    assert actual[-1][0] is not None
+    assert incremental_time < full_time
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import document_query, embedding_cache
+from helpers.document_query import DEFAULT_SEARCH_THRESHOLD, DocumentQueryHelper, DocumentQueryStore
+from helpers.embedding_cache import EmbeddingCache
+from helpers.vector_db import VectorDB
+
+LATENCY = 0.02
+WORDS = ["apple", "budget", "castle", "delta", "engine", "forest", "garden", "harbor"]
+
+
+class TopicEmbeddings(Embeddings):
+    """Vectors counting known words, each request takes LATENCY seconds."""
+
+    def __init__(self):
+        self.model_name = "test/topics"
+        self.requests: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(LATENCY)
+        self.requests.append(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    @staticmethod
+    def _vector(text: str) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        noise = np.random.default_rng(seed).normal(scale=0.05, size=len(WORDS))
+        vector = np.array([text.lower().count(word) for word in WORDS], dtype=np.float32) + noise
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeAgent:
+    def __init__(self):
+        self.config = object()
+        self.context = SimpleNamespace(id="ctx")
+        self.model = TopicEmbeddings()
+        self.utility_calls: list[float] = []
+        self.chat_messages = None
+
+    async def handle_intervention(self):
+        return None
+
+    def get_embedding_model(self):
+        return self.model
+
+    def parse_prompt(self, name: str) -> str:
+        return name
+
+    async def call_utility_model(self, system: str, message: str) -> str:
+        self.utility_calls.append(time.perf_counter())
+        await asyncio.sleep(LATENCY)
+        return message.removeprefix('Search Query: "').removesuffix('"')
+
+    async def call_chat_model(self, messages, explicit_caching=False):
+        self.chat_messages = messages
+        return "answer", None
+
+
+@pytest.fixture
+def agent(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_cache, "get_cache", lambda: EmbeddingCache())
+    monkeypatch.setattr(VectorDB, "_cached_embeddings", {})
+    monkeypatch.setattr(DocumentQueryStore, "_stores", {})
+    monkeypatch.setattr(document_query, "AgentContext", SimpleNamespace(get=lambda id: True))
+    agent = FakeAgent()
+    uris = []
+    for i, word in enumerate(WORDS):
+        path = tmp_path / f"{word}.md"
+        path.write_text("\n\n".join(f"{word} notes part {j}. " + f"{word} " * 40 for j in range(3)))
+        uris.append(str(path))
+
+    async def index():
+        helper = DocumentQueryHelper(agent)  # type: ignore
+        for uri in uris:
+            await helper.document_get_content(uri, True)
+
+    asyncio.run(index())
+    agent.model.requests.clear()
+    return agent, uris
+
+
+def test_questions_are_optimized_concurrently_and_searched_together(agent):
+    agent, uris = agent
+    questions = [f"What about the {word}?" for word in WORDS[:5]] * 2
+    helper = DocumentQueryHelper(agent)  # type: ignore
+
+    ok, _ = asyncio.run(helper.document_qa(uris[:4], questions))
+    assert ok
+    assert len(agent.utility_calls) == 10
+    assert max(agent.utility_calls) - min(agent.utility_calls) < LATENCY
+    # one embedding request for all questions
+    assert agent.model.requests == [questions]
+    context = agent.chat_messages[1].content
+    for word in WORDS[:4]:
+        assert f"{word} notes" in context
+    # the fifth topic is asked about but its document was not given
+    assert f"{WORDS[4]} notes" not in context
+
+
+def test_multi_query_search_matches_single_searches(agent):
+    agent, uris = agent
+    store = DocumentQueryStore.get(agent)  # type: ignore
+    queries = [f"{word} {WORDS[(i + 3) % len(WORDS)]}" for i, word in enumerate(WORDS)]
+
+    async def run():
+        many = await store.search_many(queries, uris[:5], limit=4, threshold=0.3)
+        doc_filter = " or ".join(f"document_uri == '{store.normalize_uri(uri)}'" for uri in uris[:5])
+        single = [
+            await store.search_documents(query, limit=4, threshold=0.3, filter=doc_filter)
+            for query in queries
+        ]
+        return many, single
+
+    many, single = asyncio.run(run())
+    assert [[doc.metadata["id"] for doc in found] for found in many] == [
+        [doc.metadata["id"] for doc in found] for found in single
+    ]
+    assert any(many)
+
+    # positions follow deletions
+    asyncio.run(store.delete_document(uris[0]))
+    after = asyncio.run(store.search_many([WORDS[0]], uris[:2], limit=10, threshold=0))
+    assert {doc.metadata["document_uri"] for doc in after[0]} == {store.normalize_uri(uris[1])}
+
+
+@pytest.mark.benchmark
+def test_document_qa_batch_benchmark(agent):
+    agent, uris = agent
+    store = DocumentQueryStore.get(agent)  # type: ignore
+    helper = DocumentQueryHelper(agent)  # type: ignore
+    questions = [f"How is the {word} doing?" for word in WORDS] + ["budget apple", "forest harbor"]
+
+    async def legacy():
+        # previous behaviour: one optimization, embedding and filtered search per question
+        doc_filter = " or ".join(f"document_uri == '{store.normalize_uri(uri)}'" for uri in uris)
+        for question in questions:
+            query = await agent.call_utility_model(system="", message=f'Search Query: "{question}"')
+            await store.search_documents(
+                query, limit=100, threshold=DEFAULT_SEARCH_THRESHOLD, filter=doc_filter
+            )
+
+    async def batched():
+        system = agent.parse_prompt("fw.document_query.optmimize_query.md")
+        queries = await asyncio.gather(*[helper._optimize_query(system, q) for q in questions])
+        await store.search_many(
+            list(queries), uris, limit=100, threshold=DEFAULT_SEARCH_THRESHOLD
+        )
+
+    started = time.perf_counter()
+    asyncio.run(legacy())
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asyncio.run(batched())
+    batched_time = time.perf_counter() - started
+
+    print(
+        f"\n[document qa] questions={len(questions)} latency={LATENCY * 1000:.0f}ms "
+        f"sequential={legacy_time * 1000:.1f}ms batched={batched_time * 1000:.1f}ms "
+        f"speedup={legacy_time / batched_time:.1f}x"
+    )
+    assert batched_time < legacy_time / 3
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import document_parsing, document_query, embedding_cache
+from helpers.document_query import DocumentQueryHelper, DocumentQueryStore
+from helpers.embedding_cache import EmbeddingCache
+from helpers.vector_db import VectorDB
+
+pymupdf = pytest.importorskip("pymupdf", exc_type=ImportError)
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.model_name = "test/documents"
+        self.batches: list[int] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(len(texts))
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=32).astype(np.float32).tolist()
+
+
+class FakeAgent:
+    def __init__(self, model: Embeddings, context_id: str = "ctx"):
+        self.config = object()
+        self.context = SimpleNamespace(id=context_id)
+        self.model = model
+
+    async def handle_intervention(self):
+        return None
+
+    def get_embedding_model(self):
+        return self.model
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(embedding_cache, "get_cache", lambda: EmbeddingCache())
+    monkeypatch.setattr(VectorDB, "_cached_embeddings", {})
+    monkeypatch.setattr(DocumentQueryStore, "_stores", {})
+    contexts = {"ctx", "other"}
+    monkeypatch.setattr(
+        document_query, "AgentContext", SimpleNamespace(get=lambda id: id in contexts)
+    )
+    document_parsing.clear_cache()
+    yield FakeAgent(CountingEmbeddings())
+    contexts.clear()
+    document_parsing.clear_cache()
+
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    calls: list[tuple[str, list[int] | None]] = []
+    run_in_process = document_parsing.run_in_process
+
+    async def counting_run(func, *args):
+        calls.append((func.__name__, args[1] if len(args) > 1 else None))
+        return await run_in_process(func, *args)
+
+    monkeypatch.setattr(document_parsing, "run_in_process", counting_run)
+    return calls
+
+
+def _pdf(pages: list[str]) -> bytes:
+    doc = pymupdf.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    return doc.tobytes()
+
+
+def _helper(agent: FakeAgent) -> DocumentQueryHelper:
+    return DocumentQueryHelper(agent)  # type: ignore
+
+
+def test_documents_are_indexed_once_per_content(agent, tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("\n\n".join(f"Paragraph {i}. " + "text " * 150 for i in range(120)))
+    model = agent.model
+
+    async def run():
+        first = await _helper(agent).document_get_content(str(path), True)
+        batches = list(model.batches)
+        # a new helper for the next tool call still finds the document indexed
+        second = await _helper(agent).document_get_content(str(path), True)
+        assert model.batches == batches
+        path.write_text("Changed.")
+        third = await _helper(agent).document_get_content(str(path), True)
+        store = DocumentQueryStore.get(agent)  # type: ignore
+        chunks = await store._get_document_chunks(str(path))
+        return first, second, third, batches, chunks
+
+    first, second, third, batches, chunks = asyncio.run(run())
+    assert first == second and third == "Changed."
+    assert [chunk.page_content for chunk in chunks] == ["Changed."]
+    # chunks go to the embedding model in batches
+    assert len(batches) > 1
+    assert max(batches) <= DocumentQueryStore.EMBED_BATCH_SIZE
+
+
+def test_stores_are_kept_per_context(agent, monkeypatch):
+    store = DocumentQueryStore.get(agent)  # type: ignore
+    assert DocumentQueryStore.get(agent) is store  # type: ignore
+    other = DocumentQueryStore.get(FakeAgent(agent.model, "other"))  # type: ignore
+    assert other is not store
+
+    monkeypatch.setattr(
+        document_query, "AgentContext", SimpleNamespace(get=lambda id: id == "other")
+    )
+    DocumentQueryStore.get(FakeAgent(agent.model, "other"))  # type: ignore
+    assert list(DocumentQueryStore._stores) == ["other"]
+
+
+def test_changed_pdf_pages_are_parsed_again_in_workers(agent, parse_calls, tmp_path):
+    pages = [f"Page {i} says hello {i}" for i in range(4)]
+    path = tmp_path / "report.pdf"
+    path.write_bytes(_pdf(pages))
+
+    async def run():
+        first = await _helper(agent).document_get_content(str(path))
+        pages[2] = "Page 2 was rewritten"
+        path.write_bytes(_pdf(pages))
+        second = await _helper(agent).document_get_content(str(path))
+        return first, second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        document_parsing.shutdown_executor()
+    assert "Page 2 says hello 2" in first
+    assert "Page 2 was rewritten" in second and "Page 3 says hello 3" in second
+    parsed = [pages for name, pages in parse_calls if name == "parse_pdf_pages"]
+    assert parsed == [[0, 1, 2, 3], [2]]
+
+
+@pytest.mark.benchmark
+def test_document_cache_benchmark(agent, tmp_path, monkeypatch):
+    content = _pdf([f"Section {i}\n" + "Quarterly figures and notes. " * 8 for i in range(30)])
+    path = tmp_path / "annual.pdf"
+    path.write_bytes(content)
+
+    async def in_thread(func, *args):
+        # same process, only the work skipped by the caches is compared
+        return await asyncio.to_thread(func, *args)
+
+    monkeypatch.setattr(document_parsing, "run_in_process", in_thread)
+    calls = 5
+
+    async def legacy():
+        # previous behaviour: a new store each call, parsed and indexed again
+        for _ in range(calls):
+            text = document_parsing.parse_pdf_pages(content, list(range(30)))
+            await DocumentQueryStore(agent).add_document("\n".join(text), str(path))  # type: ignore
+
+    async def cached():
+        for _ in range(calls):
+            await _helper(agent).document_get_content(str(path), True)
+
+    started = time.perf_counter()
+    asyncio.run(legacy())
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asyncio.run(cached())
+    cached_time = time.perf_counter() - started
+
+    print(
+        f"\n[document cache] pages=30 calls={calls} "
+        f"reparse={legacy_time / calls * 1000:.1f}ms/call "
+        f"cached={cached_time / calls * 1000:.1f}ms/call "
+        f"speedup={legacy_time / cached_time:.1f}x"
+    )
+    assert cached_time < legacy_time
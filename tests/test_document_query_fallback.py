@@ -16,8 +16,8 @@ class FakeStore:
     def normalize_uri(uri: str) -> str:
         return uri
 
-    async def search_documents(self, **_kwargs):
-        return []
+    async def search_many(self, queries, **_kwargs):
+        return [[] for _ in queries]
 
 
 class FakeAgent:
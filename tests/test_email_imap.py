@@ -0,0 +1,433 @@
+import asyncio
+import email.utils
+import re
+import select
+import socketserver
+import sys
+import threading
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._email_integration.helpers import imap_client
+
+# simulated network round trip per command
+LATENCY = 0.002
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """In-process IMAP4rev1 stand-in: UID SEARCH/FETCH/STORE, ENVELOPE and IDLE."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, idle: bool = True):
+        super().__init__(("127.0.0.1", 0), _ImapSession)
+        self.idle = idle
+        self.lock = threading.Lock()
+        self.messages: dict[int, bytes] = {}
+        self.seen: set[int] = set()
+        self.commands: list[str] = []
+        self.bytes_sent = 0
+        self.next_uid = 1
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def add(self, message: bytes) -> int:
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.messages[uid] = message
+            return uid
+
+    def reset_counters(self):
+        with self.lock:
+            self.commands.clear()
+            self.bytes_sent = 0
+
+
+class _ImapSession(socketserver.StreamRequestHandler):
+    server: FakeImapServer
+
+    def send(self, data: bytes):
+        self.wfile.write(data)
+        self.wfile.flush()
+        with self.server.lock:
+            self.server.bytes_sent += len(data)
+
+    def handle(self):
+        self.send(b"* OK IMAP4rev1 stand-in ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tag, _sep, rest = line.decode().rstrip("\r\n").partition(" ")
+            command, _sep, args = rest.partition(" ")
+            command = command.upper()
+            if command == "UID":
+                command, _sep, args = args.partition(" ")
+                command = command.upper()
+            with self.server.lock:
+                self.server.commands.append(command)
+            time.sleep(LATENCY)
+            handler = getattr(self, f"cmd_{command.lower()}", None)
+            if handler is None or (args.endswith("}") and command == "SEARCH"):
+                self.send(f"{tag} BAD unsupported\r\n".encode())
+                continue
+            if handler(tag, args) is False:
+                return
+
+    def cmd_capability(self, tag, args):
+        capabilities = "IMAP4rev1 IDLE" if self.server.idle else "IMAP4rev1"
+        self.send(f"* CAPABILITY {capabilities}\r\n{tag} OK done\r\n".encode())
+
+    def cmd_login(self, tag, args):
+        self.send(f"{tag} OK logged in\r\n".encode())
+
+    def cmd_noop(self, tag, args):
+        self.send(f"{tag} OK done\r\n".encode())
+
+    def cmd_logout(self, tag, args):
+        self.send(f"* BYE\r\n{tag} OK done\r\n".encode())
+        return False
+
+    def cmd_select(self, tag, args):
+        with self.server.lock:
+            count, uid_next = len(self.server.messages), self.server.next_uid
+        self.send(
+            (
+                f"* FLAGS (\\Seen)\r\n* {count} EXISTS\r\n* 0 RECENT\r\n"
+                f"* OK [UIDVALIDITY 1] ok\r\n* OK [UIDNEXT {uid_next}] ok\r\n"
+                f"{tag} OK [READ-WRITE] done\r\n"
+            ).encode()
+        )
+
+    def cmd_search(self, tag, args):
+        with self.server.lock:
+            uids = sorted(self.server.messages)
+            if "UNSEEN" in args.upper():
+                uids = [uid for uid in uids if uid not in self.server.seen]
+        self.send(f"* SEARCH {' '.join(map(str, uids))}\r\n{tag} OK done\r\n".encode())
+
+    def cmd_fetch(self, tag, args):
+        message_set, _sep, items = args.partition(" ")
+        items = items.strip("()").upper().split()
+        for uid in self._uids(message_set):
+            with self.server.lock:
+                raw = self.server.messages[uid]
+                seq = sorted(self.server.messages).index(uid) + 1
+            parts = [f"UID {uid}".encode()]
+            for item in items:
+                if item == "ENVELOPE":
+                    parts.append(b"ENVELOPE " + _envelope(raw))
+                elif item == "RFC822.SIZE":
+                    parts.append(f"RFC822.SIZE {len(raw)}".encode())
+                elif item in {"BODY.PEEK[]", "BODY[]", "RFC822"}:
+                    name = "RFC822" if item == "RFC822" else "BODY[]"
+                    parts.append(f"{name} {{{len(raw)}}}\r\n".encode() + raw)
+                    if item != "BODY.PEEK[]":
+                        with self.server.lock:
+                            self.server.seen.add(uid)
+            self.send(f"* {seq} FETCH (".encode() + b" ".join(parts) + b")\r\n")
+        self.send(f"{tag} OK done\r\n".encode())
+
+    def cmd_store(self, tag, args):
+        message_set, action, _flags = args.split(" ", 2)
+        for uid in self._uids(message_set):
+            with self.server.lock:
+                self.server.seen.add(uid)
+                seq = sorted(self.server.messages).index(uid) + 1
+            if "SILENT" not in action.upper():
+                self.send(f"* {seq} FETCH (UID {uid} FLAGS (\\Seen))\r\n".encode())
+        self.send(f"{tag} OK done\r\n".encode())
+
+    def cmd_idle(self, tag, args):
+        if not self.server.idle:
+            self.send(f"{tag} BAD unsupported\r\n".encode())
+            return
+        with self.server.lock:
+            known = len(self.server.messages)
+        self.send(b"+ idling\r\n")
+        while True:
+            with self.server.lock:
+                count = len(self.server.messages)
+            if count > known:
+                self.send(f"* {count} EXISTS\r\n".encode())
+                known = count
+            if select.select([self.request], [], [], 0.02)[0]:
+                self.rfile.readline()  # DONE
+                self.send(f"{tag} OK idle done\r\n".encode())
+                return
+
+    def _uids(self, message_set: str) -> list[int]:
+        with self.server.lock:
+            existing = set(self.server.messages)
+        uids: list[int] = []
+        for part in message_set.split(","):
+            first, _sep, last = part.partition(":")
+            uids.extend(range(int(first), int(last or first) + 1))
+        return [uid for uid in uids if uid in existing]
+
+
+def _quoted(value: str | None) -> bytes:
+    if value is None:
+        return b"NIL"
+    data = value.encode()
+    if re.search(rb'[\r\n"\\\x80-\xff]', data):
+        return f"{{{len(data)}}}\r\n".encode() + data
+    return b'"' + data + b'"'
+
+
+def _envelope(raw: bytes) -> bytes:
+    msg = email.message_from_bytes(raw)
+
+    def addresses(header: str) -> bytes:
+        values = email.utils.getaddresses(msg.get_all(header, []))
+        if not values:
+            return b"NIL"
+        items = []
+        for name, address in values:
+            mailbox, _sep, host = address.partition("@")
+            items.append(b"(" + b" ".join([_quoted(name or None), b"NIL", _quoted(mailbox), _quoted(host)]) + b")")
+        return b"(" + b"".join(items) + b")"
+
+    fields = [
+        _quoted(msg.get("Date")),
+        _quoted(msg.get("Subject")),
+        addresses("From"),
+        addresses("From"),
+        addresses("From"),
+        addresses("To"),
+        b"NIL",
+        b"NIL",
+        _quoted(msg.get("In-Reply-To")),
+        _quoted(msg.get("Message-ID")),
+    ]
+    return b"(" + b" ".join(fields) + b")"
+
+
+def make_message(number: int, sender: str, attachment_size: int = 0) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "agent@company.com"
+    msg["Subject"] = f"Message {number}"
+    msg["Message-ID"] = f"<m{number}@example.com>"
+    msg.set_content(f"Body of message {number}.\n")
+    if attachment_size:
+        msg.add_attachment(b"x" * attachment_size, maintype="application", subtype="pdf", filename=f"report{number}.pdf")
+    return msg.as_bytes()
+
+
+@pytest.fixture
+def server():
+    server = FakeImapServer()
+    server.thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def saved_attachments(monkeypatch):
+    saved: list[str] = []
+
+    async def save(filename, content, download_folder):
+        saved.append(filename)
+        return f"/tmp/{filename}"
+
+    monkeypatch.setattr(imap_client, "_save_attachment", save)
+    return saved
+
+
+def connect(server: FakeImapServer):
+    return imap_client.connect_imap("127.0.0.1", port=server.port, ssl=False, timeout=5)
+
+
+def test_only_accepted_messages_are_downloaded_and_all_flagged_at_once(server, saved_attachments):
+    senders = [
+        "Alice <alice@company.com>",
+        "noreply@company.com",
+        "News <news@letters.example>",
+        "=?utf-8?q?B=C3=B6b?= <bob@company.com>",
+        "Mailer <MAILER-DAEMON@company.com>",
+        "carol@company.com",
+    ]
+    for number, sender in enumerate(senders):
+        server.add(make_message(number, sender, attachment_size=1000))
+
+    async def run():
+        client = await connect(server)
+        server.reset_counters()
+        try:
+            return await imap_client.fetch_new(
+                client, "usr/email/attachments", last_uid=0, sender_whitelist=["*@company.com"]
+            )
+        finally:
+            await imap_client.disconnect_imap(client)
+
+    messages, last_uid = asyncio.run(run())
+    assert last_uid == 6
+    assert [msg.subject for msg in messages] == ["Message 0", "Message 3", "Message 5"]
+    assert messages[1].sender.startswith("Böb") and messages[1].sender.endswith("<bob@company.com>")
+    assert saved_attachments == ["report0.pdf", "report3.pdf", "report5.pdf"]
+    # search, envelopes, one body batch and one store
+    assert server.commands.count("FETCH") == 2 and server.commands.count("STORE") == 1
+    # rejected senders stay unread
+    assert server.seen == {1, 4, 6}
+
+
+def test_message_cap_applies_to_accepted_messages(server, saved_attachments, monkeypatch):
+    monkeypatch.setattr(imap_client, "FETCH_BATCH_SIZE", 2)
+    for number in range(8):
+        sender = "ann@company.com" if number % 2 else "noreply@company.com"
+        server.add(make_message(number, sender))
+
+    async def run():
+        client = await connect(server)
+        server.reset_counters()
+        try:
+            return await imap_client.fetch_new(client, "attachments", last_uid=0, max_messages=3)
+        finally:
+            await imap_client.disconnect_imap(client)
+
+    messages, _last_uid = asyncio.run(run())
+    assert [msg.subject for msg in messages] == ["Message 3", "Message 5", "Message 7"]
+    # envelopes plus two body batches
+    assert server.commands.count("FETCH") == 3
+    # the accepted message over the cap and the rejected ones stay unread
+    assert server.seen == {4, 6, 8}
+
+
+def test_idle_returns_when_new_mail_arrives(server):
+    async def run():
+        client = await connect(server)
+        try:
+            assert imap_client.supports_idle(client)
+
+            async def deliver():
+                await asyncio.sleep(0.2)
+                server.add(make_message(1, "ann@company.com"))
+
+            delivery = asyncio.create_task(deliver())
+            started = time.perf_counter()
+            arrived = await imap_client.wait_for_mail(client, timeout=10)
+            await delivery
+            elapsed = time.perf_counter() - started
+            quiet = await imap_client.wait_for_mail(client, timeout=0.3)
+            return arrived, elapsed, quiet
+        finally:
+            await imap_client.disconnect_imap(client)
+
+    arrived, elapsed, quiet = asyncio.run(run())
+    assert arrived and elapsed < 2
+    assert quiet is False
+
+
+def test_mail_arriving_after_the_poll_skips_idle(server, saved_attachments):
+    server.add(make_message(1, "ann@company.com"))
+
+    async def run():
+        client = await connect(server)
+        try:
+            _messages, last_uid = await imap_client.fetch_new(client, "attachments", last_uid=0)
+            # delivered between the poll's search and the wait
+            server.add(make_message(2, "ann@company.com"))
+            server.reset_counters()
+            started = time.perf_counter()
+            arrived = await imap_client.wait_for_mail(client, last_uid, timeout=10)
+            elapsed = time.perf_counter() - started
+            commands = list(server.commands)
+            quiet = await imap_client.wait_for_mail(client, last_uid + 1, timeout=0.3)
+            return arrived, elapsed, commands, quiet
+        finally:
+            await imap_client.disconnect_imap(client)
+
+    arrived, elapsed, commands, quiet = asyncio.run(run())
+    assert arrived and elapsed < 2
+    assert commands == ["SELECT"]
+    assert quiet is False
+
+
+def test_servers_without_idle_are_polled():
+    server = FakeImapServer(idle=False)
+    server.thread.start()
+
+    async def run():
+        client = await connect(server)
+        try:
+            return imap_client.supports_idle(client)
+        finally:
+            await imap_client.disconnect_imap(client)
+
+    try:
+        assert asyncio.run(run()) is False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.benchmark
+def test_imap_backlog_benchmark(server, saved_attachments):
+    backlog = 500
+    for number in range(backlog):
+        # 10% of the backlog comes from whitelisted senders
+        sender = "team@company.com" if number % 10 == 0 else f"Newsletter <news{number}@letters.example>"
+        server.add(make_message(number, sender, attachment_size=20_000))
+    whitelist = ["*@company.com"]
+
+    async def legacy(client):
+        # previous behaviour: one full download and one flag store per message
+        loop = asyncio.get_event_loop()
+        msg_ids = await loop.run_in_executor(None, lambda: client.search(["UNSEEN"]))
+        results = []
+        for msg_id in msg_ids:
+            def _sync_fetch(msg_id=msg_id):
+                data = client.fetch([msg_id], ["RFC822"])[msg_id]
+                client.add_flags([msg_id], [b"\\Seen"])
+                return data
+
+            raw = await loop.run_in_executor(None, _sync_fetch)
+            msg = await imap_client._parse_message(raw[b"RFC822"], "attachments", whitelist)
+            if msg:
+                results.append(msg)
+        return results
+
+    async def run(fetch):
+        client = await connect(server)
+        await asyncio.get_event_loop().run_in_executor(None, lambda: client.select_folder("INBOX"))
+        with server.lock:
+            server.seen.clear()
+        server.reset_counters()
+        started = time.perf_counter()
+        try:
+            messages = await fetch(client)
+        finally:
+            elapsed = time.perf_counter() - started
+            await imap_client.disconnect_imap(client)
+        return messages, elapsed, len(server.commands) - 1, server.bytes_sent
+
+    legacy_messages, legacy_time, legacy_trips, legacy_bytes = asyncio.run(run(legacy))
+    batched_messages, batched_time, batched_trips, batched_bytes = asyncio.run(
+        run(lambda client: imap_client.fetch_new(client, "attachments", 0, whitelist, max_messages=backlog))
+    )
+    batched_messages = batched_messages[0]
+
+    print(
+        f"\n[imap backlog] messages={backlog} accepted={len(batched_messages)} "
+        f"per_message={legacy_trips} round trips {legacy_bytes / 1e6:.1f}MB {legacy_time * 1000:.0f}ms "
+        f"header_first={batched_trips} round trips {batched_bytes / 1e6:.1f}MB {batched_time * 1000:.0f}ms "
+        f"speedup={legacy_time / batched_time:.1f}x"
+    )
+    assert [msg.subject for msg in batched_messages] == [msg.subject for msg in legacy_messages]
+    assert len(batched_messages) == backlog // 10
+    assert batched_trips < legacy_trips / 50
+    assert batched_bytes < legacy_bytes / 5
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import embedding_cache
+from helpers.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+DIMENSIONS = 48
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self, model_name: str = "test/model", **kwargs):
+        self.model_name = model_name
+        self.kwargs = kwargs
+        self.documents: list[str] = []
+        self.queries = 0
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=DIMENSIONS).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.documents += texts
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.queries += 1
+        return self._vector(text)
+
+
+def test_batched_lookup_embeds_only_misses(tmp_path):
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache(str(tmp_path / "cache.sqlite3")), "m")
+
+    first = cached.embed_documents(["a", "b", "a"])
+    assert model.documents == ["a", "b"]
+    assert first[0] == first[2] == model._vector("a")
+
+    second = asyncio.run(cached.aembed_documents(["b", "c", "a"]))
+    assert model.documents == ["a", "b", "c"]
+    assert second == [model._vector("b"), model._vector("c"), model._vector("a")]
+    assert cached.embed_documents([]) == []
+
+    # namespaces are separate
+    other = CachedEmbeddings(model, cached.cache, "other")
+    other.embed_documents(["a"])
+    assert model.documents[-1] == "a"
+
+
+def test_cache_survives_restart_and_records_dimension(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, EmbeddingCache(path), "m").embed_documents(["x", "y"])
+    assert model.queries == 0
+
+    model = CountingEmbeddings()
+    cached = CachedEmbeddings(model, EmbeddingCache(path), "m")
+    assert cached.embed_documents(["y", "x"]) == [model._vector("y"), model._vector("x")]
+    assert cached.get_dimension() == DIMENSIONS
+    assert model.documents == [] and model.queries == 0
+
+    # unknown models are probed once
+    fresh = CachedEmbeddings(model, EmbeddingCache(path), "fresh")
+    assert fresh.get_dimension() == DIMENSIONS
+    assert CachedEmbeddings(model, EmbeddingCache(path), "fresh").get_dimension() == DIMENSIONS
+    assert model.queries == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = EmbeddingCache(max_entries=10)
+    cache.put_many("m", [f"t{i}" for i in range(10)], [[float(i)] * 4 for i in range(10)])
+    assert len(cache) == 10
+
+    cache.get_many("m", ["t0", "t1"])
+    cache.put_many("m", ["t10"], [[10.0] * 4])
+    assert len(cache) == 9  # evicts with headroom
+    found = cache.get_many("m", ["t0", "t1", "t10"])
+    assert all(vector is not None for vector in found)
+    assert cache.get_many("m", [f"t{i}" for i in range(2, 10)]).count(None) == 2
+
+
+def test_namespace_includes_dimension_setting():
+    assert embedding_cache.get_namespace(CountingEmbeddings("a/b")) == "a/b"
+    assert embedding_cache.get_namespace(CountingEmbeddings("a/b", dimensions=256)) == "a/b@256"
+
+
+def test_namespace_separates_providers_and_endpoints():
+    default = CountingEmbeddings("text-embedding-3-small")
+    default.provider = "openai"  # type: ignore
+    local = CountingEmbeddings("text-embedding-3-small", api_base="http://localhost:1234/v1/")
+    local.provider = "openai"  # type: ignore
+    other = CountingEmbeddings("text-embedding-3-small", api_base="http://gpu:8000/v1")
+    other.provider = "openai"  # type: ignore
+    routed = CountingEmbeddings("openrouter/text-embedding-3-small")
+    routed.provider = "openrouter"  # type: ignore
+
+    namespaces = [embedding_cache.get_namespace(m) for m in (default, local, other, routed)]
+    assert namespaces == [
+        "openai/text-embedding-3-small",
+        "openai/text-embedding-3-small http://localhost:1234/v1",
+        "openai/text-embedding-3-small http://gpu:8000/v1",
+        "openrouter/text-embedding-3-small",
+    ]
+
+
+def test_vector_db_uses_shared_cache(monkeypatch):
+    from helpers.vector_db import VectorDB
+
+    cache = EmbeddingCache()
+    monkeypatch.setattr(embedding_cache, "get_cache", lambda: cache)
+    monkeypatch.setattr(VectorDB, "_cached_embeddings", {})
+    model = CountingEmbeddings()
+    agent = SimpleNamespace(get_embedding_model=lambda: model)
+
+    db = VectorDB(agent)  # type: ignore
+    asyncio.run(db.insert_documents([Document("hello"), Document("world")]))
+    assert model.queries == 1
+
+    second = VectorDB(agent)  # type: ignore
+    asyncio.run(second.insert_documents([Document("hello")]))
+    assert model.queries == 1
+    assert model.documents == ["hello", "world"]
+    assert db.index.d == second.index.d == DIMENSIONS
+
+
+@pytest.mark.benchmark
+def test_embedding_cache_benchmark(tmp_path):
+    texts = [f"chunk {i} " + "lorem ipsum " * 20 for i in range(3000)]
+    model = CountingEmbeddings()
+    vectors = model.embed_documents(texts)
+
+    legacy = CacheBackedEmbeddings.from_bytes_store(
+        model, LocalFileStore(str(tmp_path / "files")), namespace="m"
+    )
+    legacy.embed_documents(texts)
+    started = time.perf_counter()
+    legacy_found = legacy.embed_documents(texts)
+    legacy_time = time.perf_counter() - started
+
+    cached = CachedEmbeddings(model, EmbeddingCache(str(tmp_path / "cache.sqlite3")), "m")
+    cached.embed_documents(texts)
+    started = time.perf_counter()
+    found = cached.embed_documents(texts)
+    cached_time = time.perf_counter() - started
+
+    files = len(list((tmp_path / "files").iterdir()))
+    print(
+        f"\n[embedding cache] texts={len(texts)} warm lookup: "
+        f"file_store={legacy_time * 1000:.1f}ms ({files} files) "
+        f"sqlite={cached_time * 1000:.1f}ms (1 file) "
+        f"speedup={legacy_time / cached_time:.1f}x"
+    )
+    assert np.allclose(found, vectors) and np.allclose(legacy_found, vectors)
+    assert cached_time < legacy_time
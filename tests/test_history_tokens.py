@@ -0,0 +1,100 @@
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import history, tokens
+
+
+def _recount(record) -> int:
+    if isinstance(record, history.Message):
+        return record.tokens
+    if isinstance(record, history.History):
+        return (
+            sum(_recount(b) for b in record.bulks)
+            + sum(_recount(t) for t in record.topics)
+            + _recount(record.current)
+        )
+    if record.summary:
+        return tokens.approximate_tokens(record.summary)
+    if isinstance(record, history.Topic):
+        return sum(_recount(m) for m in record.messages)
+    return sum(_recount(r) for r in record.records)
+
+
+def _build_history(topics: int = 4, messages: int = 5) -> history.History:
+    hist = history.History(agent=None)
+    for t in range(topics):
+        for m in range(messages):
+            hist.add_message(ai=bool(m % 2), content=f"topic {t} message {m} " * (m + 1))
+        hist.new_topic()
+    hist.add_message(ai=False, content="current request")
+    return hist
+
+
+def test_count_tokens_encodes_same_content_once(monkeypatch):
+    tokens.clear_count_cache()
+    calls = []
+    encoding = tokens.get_encoding()
+
+    class _Encoding:
+        def encode(self, text, **kwargs):
+            calls.append(text)
+            return encoding.encode(text, **kwargs)
+
+    monkeypatch.setattr(tokens, "get_encoding", lambda name="cl100k_base": _Encoding())
+
+    first = tokens.count_tokens("hello world " * 50)
+    second = tokens.count_tokens("hello world " * 50)
+
+    assert first == second == len(encoding.encode("hello world " * 50))
+    assert len(calls) == 1
+
+
+def test_running_totals_follow_messages_and_summaries():
+    hist = _build_history()
+    assert hist.get_tokens() == _recount(hist)
+
+    hist.add_message(ai=True, content="another reply " * 20)
+    assert hist.get_tokens() == _recount(hist)
+
+    hist.topics[1].messages[2].set_summary("short")
+    assert hist.get_topics_tokens() == sum(_recount(t) for t in hist.topics)
+
+    hist.topics[2].summary = "topic summary"
+    assert hist.get_tokens() == _recount(hist)
+
+    # direct token edits, as plugins do, are tracked as well
+    hist.topics[0].messages[0].tokens = 999
+    assert hist.get_tokens() == _recount(hist)
+
+
+def test_running_totals_survive_compression_and_serialization(monkeypatch):
+    hist = _build_history(topics=7)
+    hist.get_tokens()
+
+    async def fake_summarize(self):
+        self.summary = "bulk summary"
+        return self.summary
+
+    async def no_attention_compression(self, ratio=0):
+        return False
+
+    monkeypatch.setattr(history.Bulk, "summarize", fake_summarize)
+    monkeypatch.setattr(history.Topic, "compress_large_messages", lambda self, ratio=0: False)
+    monkeypatch.setattr(history.Topic, "compress_attention", no_attention_compression)
+
+    assert asyncio.run(hist.compress_topics()) is True
+    assert hist.get_tokens() == _recount(hist)
+
+    assert asyncio.run(hist.merge_bulks_by(history.BULK_MERGE_COUNT)) is True
+    assert hist.get_tokens() == _recount(hist)
+
+    restored = history.deserialize_history(hist.serialize(), agent=None)
+    assert restored.get_tokens() == hist.get_tokens()
+
+    restored.add_message(ai=True, content="after restore")
+    assert restored.get_tokens() == _recount(restored)
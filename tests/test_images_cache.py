@@ -0,0 +1,185 @@
+import asyncio
+import base64
+import io
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import images
+
+
+@pytest.fixture(autouse=True)
+def vision_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(images, "DISK_CACHE_DIR", str(tmp_path / "vision_cache"))
+    # the vision_max_edge setting, images are sent unscaled by default
+    monkeypatch.setattr(images, "get_max_edge", lambda: images.VISION_MAX_EDGE)
+    images.clear_cache()
+    yield
+    images.clear_cache()
+
+
+def _png(path: Path, width: int, height: int, seed: int = 0) -> Path:
+    rng = np.random.default_rng(seed)
+    # screenshot-like: flat regions with some noise
+    base = np.kron(rng.integers(0, 255, (height // 60 + 1, width // 60 + 1, 3)), np.ones((60, 60, 1)))
+    pixels = (base[:height, :width] + rng.integers(0, 3, (height, width, 3))).clip(0, 255)
+    Image.fromarray(pixels.astype(np.uint8)).save(path, format="PNG", compress_level=1)
+    return path
+
+
+def _decode(data_url: str) -> tuple[str, Image.Image]:
+    header, encoded = data_url.split(",", 1)
+    return header, Image.open(io.BytesIO(base64.b64decode(encoded)))
+
+
+def test_data_url_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    path = _png(tmp_path / "shot.png", 64, 48)
+    first = images.to_data_url(str(path))
+    assert first == "data:image/png;base64," + base64.b64encode(path.read_bytes()).decode()
+
+    reads: list[Path] = []
+    read_bytes = Path.read_bytes
+
+    def counting_read(self):
+        reads.append(self)
+        return read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_read)
+    assert images.to_data_url(str(path)) is first
+    assert reads == []
+
+    # same size, only the modification time tells the new content apart
+    stat = path.stat()
+    _png(path, 64, 48, seed=1)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    second = images.to_data_url(str(path))
+    assert second != first and reads == [path]
+    assert _decode(second)[1].tobytes() == Image.open(path).tobytes()
+
+    # a rewrite with another size is picked up even with the old mtime
+    _png(path, 80, 48, seed=2)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert _decode(images.to_data_url(str(path)))[1].size == (80, 48)
+
+
+def test_large_images_are_scaled_down_and_kept_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "get_max_edge", lambda: 1024)
+    path = _png(tmp_path / "screen.png", 3840, 2160)
+    data_url = images.to_data_url(str(path))
+    header, image = _decode(data_url)
+    assert header == "data:image/jpeg;base64"
+    assert max(image.size) <= 1024 and max(image.size) > 1000
+    assert len(data_url) < len(base64.b64encode(path.read_bytes()))
+
+    # after a restart the scaled image comes from the disk tier
+    images.clear_cache()
+    monkeypatch.setattr(images, "_scale_image", lambda *args: pytest.fail("scaled again"))
+    assert images.to_data_url(str(path)) == data_url
+    assert len(list((tmp_path / "vision_cache").glob("*.txt"))) == 1
+
+
+def test_images_are_not_scaled_by_default(tmp_path):
+    assert images.VISION_MAX_EDGE == 0
+    path = _png(tmp_path / "screen.png", 3000, 200)
+    header, image = _decode(images.to_data_url(str(path)))
+    assert header == "data:image/png;base64" and image.size == (3000, 200)
+
+
+def test_preload_encodes_off_the_event_loop(tmp_path, monkeypatch):
+    paths = [_png(tmp_path / f"shot{i}.png", 64, 48, seed=i) for i in range(2)]
+    content = [
+        {"type": "text", "text": "look"},
+        *({"type": "image_url", "image_url": {"url": str(path)}} for path in paths),
+    ]
+    images.to_data_url(str(paths[0]))
+    threads: list[int] = []
+    encode = images._encode_image
+
+    def recording_encode(*args):
+        threads.append(threading.get_ident())
+        return encode(*args)
+
+    monkeypatch.setattr(images, "_encode_image", recording_encode)
+
+    async def run():
+        await images.preload([content, "text only"])
+        loop_thread = threading.get_ident()
+        prepared = images.prepare_content(content)
+        return loop_thread, prepared
+
+    loop_thread, prepared = asyncio.run(run())
+    # only the image missing from the cache was encoded, in a worker thread
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert prepared[2]["image_url"]["url"] == images.to_data_url(str(paths[1]))
+    assert len(threads) == 1
+
+
+def test_memory_cache_is_bounded(tmp_path, monkeypatch):
+    paths = [_png(tmp_path / f"small{i}.png", 32, 32, seed=i) for i in range(4)]
+    size = len(images.to_data_url(str(paths[0])))
+    monkeypatch.setattr(images, "CACHE_MAX_BYTES", size * 2 + size // 2)
+    for path in paths[1:]:
+        images.to_data_url(str(path))
+    assert len(images._cache) == 2
+    assert images._cache_bytes <= images.CACHE_MAX_BYTES
+
+
+@pytest.mark.benchmark
+def test_vision_payload_benchmark(tmp_path, monkeypatch):
+    paths = [_png(tmp_path / f"screen{i}.png", 3840, 2160, seed=i) for i in range(10)]
+    history = [
+        {"role": "user", "content": [{"type": "image_url", "image_url": {"url": str(path)}}]}
+        for path in paths
+    ]
+    iterations = 20
+
+    def legacy_data_url(url: str) -> str:
+        # previous behaviour: read and encode the full file on every call
+        path = images.resolve_ref(url)
+        return "data:image/png;base64," + base64.b64encode(path.read_bytes()).decode("utf-8")
+
+    def run(prepare) -> tuple[float, float, int]:
+        started = time.perf_counter()
+        prepared = prepare()
+        first_time = time.perf_counter() - started
+        for _ in range(iterations - 1):
+            prepared = prepare()
+        total_time = time.perf_counter() - started
+        size = sum(len(content[0]["image_url"]["url"]) for content in prepared)
+        return total_time / iterations, (total_time - first_time) / (iterations - 1), size
+
+    legacy = run(
+        lambda: [
+            [{**item, "image_url": {"url": legacy_data_url(item["image_url"]["url"])}} for item in message["content"]]
+            for message in history
+        ]
+    )
+    prepare = lambda: [images.prepare_content(message["content"]) for message in history]
+    cached = run(prepare)
+    images.clear_cache()
+    monkeypatch.setattr(images, "get_max_edge", lambda: 2048)
+    scaled = run(prepare)
+
+    def report(name: str, result: tuple[float, float, int]) -> str:
+        return (
+            f"{name}={result[0] * 1000:.1f}ms/call (repeat {result[1] * 1000:.2f}ms) "
+            f"{result[2] / 1e6:.1f}MB/call"
+        )
+
+    print(
+        f"\n[vision payload] images=10 size=3840x2160 iterations={iterations} "
+        f"{report('legacy', legacy)} {report('cached', cached)} {report('cached_2048px', scaled)} "
+        f"speedup={legacy[0] / cached[0]:.1f}x bytes_saved={1 - scaled[2] / legacy[2]:.0%}"
+    )
+    assert cached[2] == legacy[2] and cached[0] < legacy[0]
+    assert scaled[2] < legacy[2] / 10 and scaled[1] < legacy[1]
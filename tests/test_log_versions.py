@@ -0,0 +1,126 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import log as log_module
+from helpers.log import Log, _truncate_content
+from helpers.persist_chat import _deserialize_log, _serialize_log
+from helpers.secrets import SecretsManager, alias_for_key
+
+
+@pytest.fixture(autouse=True)
+def _secrets(monkeypatch):
+    manager = SecretsManager("nonexistent-secrets.env")
+    manager._secrets_cache = {"TOKEN": "tok-123456789"}
+    monkeypatch.setattr(log_module, "get_secrets_manager", lambda *_: manager)
+
+
+def _nos(output) -> list[int]:
+    return [item["no"] for item in output.items]
+
+
+def test_output_returns_only_items_changed_since_version():
+    log = Log()
+    first = log.log(type="agent", heading="first")
+    second = log.log(type="agent", heading="second")
+    third = log.log(type="agent", heading="third")
+
+    full = log.output()
+    assert _nos(full) == [0, 1, 2]
+    assert full.start == 0 and full.end == log.version == 3
+
+    version = log.version
+    assert log.output(start=version).items == []
+
+    third.update(content="x")
+    first.stream(content="y")
+    changed = log.output(start=version)
+    assert _nos(changed) == [0, 2]
+    assert changed.end == log.version
+    assert changed.items[0] == first.output()
+
+    # an end bound excludes later updates
+    assert _nos(log.output(start=version, end=version + 1)) == [2]
+    second.update(heading="again")
+    assert _nos(log.output(start=version)) == [0, 1, 2]
+
+
+def test_streamed_content_matches_full_rewrites():
+    chunks = [f"chunk {i} tok-1234" + ("56789 " if i % 3 == 0 else " ") for i in range(400)]
+
+    streamed_log, rewritten_log = Log(), Log()
+    streamed = streamed_log.log(type="agent", content="start ")
+    rewritten = rewritten_log.log(type="agent", content="start ")
+    for chunk in chunks:
+        streamed.stream(content=chunk)
+
+    full = "start " + "".join(chunks)
+    rewritten.update(content=full)
+
+    assert streamed.content == rewritten.content
+    assert streamed.content == _truncate_content(
+        full.replace("tok-123456789", alias_for_key("TOKEN")), "agent"
+    )
+    assert streamed.kvps == rewritten.kvps
+
+
+def test_assigning_content_ends_stream():
+    log = Log()
+    item = log.log(type="response", content="a")
+    item.stream(content="b")
+    item.update(content="reset")
+    item.stream(content="!")
+    assert item.content == "reset!"
+
+    item.content = "direct"
+    assert item.content == "direct"
+    item.stream(content="?")
+    assert item.content == "direct?"
+
+
+def test_reset_and_deserialize_restart_versions():
+    log = Log()
+    item = log.log(type="agent", content="hello")
+    item.stream(content=" world")
+    assert log.version == 2
+
+    restored = _deserialize_log(_serialize_log(log))
+    assert restored.version == 1
+    assert restored.output().items[0]["content"] == "hello world"
+
+    log.reset()
+    assert log.version == 0
+    assert log.output().items == []
+
+
+@pytest.mark.benchmark
+def test_stream_benchmark():
+    chunks = [f"streamed token number {i} " * 3 for i in range(2000)]
+
+    rewrite_log = Log()
+    item = rewrite_log.log(type="response", content="")
+    started = time.perf_counter()
+    for chunk in chunks:
+        item.update(content=item.content + chunk)
+    rewrite_time = time.perf_counter() - started
+
+    stream_log = Log()
+    streamed = stream_log.log(type="response", content="")
+    started = time.perf_counter()
+    for chunk in chunks:
+        streamed.stream(content=chunk)
+    stream_time = time.perf_counter() - started
+
+    print(
+        f"\n[log stream] chunks={len(chunks)} rewrite={rewrite_time * 1000:.1f}ms "
+        f"stream={stream_time * 1000:.1f}ms speedup={rewrite_time / stream_time:.1f}x"
+    )
+
+    assert streamed.content == item.content
+    assert stream_time < rewrite_time
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import mcp_handler
+from helpers.mcp_handler import MCPServerLocal, MCPSessionManager
+
+ECHO_SERVER = textwrap.dedent(
+    """
+    import asyncio
+    import os
+
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("echo")
+
+
+    @mcp.tool()
+    def echo(text: str) -> str:
+        return text
+
+
+    @mcp.tool()
+    def pid() -> str:
+        return str(os.getpid())
+
+
+    @mcp.tool()
+    async def wait(seconds: float) -> str:
+        await asyncio.sleep(seconds)
+        return "done"
+
+
+    mcp.run()
+    """
+)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    values = {"mcp_client_init_timeout": 20, "mcp_client_tool_timeout": 20}
+    monkeypatch.setattr(mcp_handler.settings, "get_settings", lambda: values)
+
+
+@pytest.fixture
+def echo_server(tmp_path, settings):
+    script = tmp_path / "echo_server.py"
+    script.write_text(ECHO_SERVER)
+    servers = []
+
+    def create(**options) -> MCPServerLocal:
+        server = MCPServerLocal({"name": "echo", "command": sys.executable, "args": [str(script)]})
+        client = server._MCPServerLocal__client  # type: ignore
+        client.sessions = MCPSessionManager(client, **options)
+        servers.append(server)
+        return server
+
+    yield create
+    for server in servers:
+        server._MCPServerLocal__client.sessions.close(wait=True)  # type: ignore
+
+
+def _text(result) -> str:
+    return result.content[0].text
+
+
+async def _pid(server: MCPServerLocal) -> str:
+    return _text(await server.call_tool("pid", {}))
+
+
+def test_calls_reuse_one_server_process(echo_server):
+    server = echo_server()
+    sessions = server._MCPServerLocal__client.sessions  # type: ignore
+
+    async def run():
+        await server.initialize()
+        assert {tool["name"] for tool in server.get_tools()} == {"echo", "pid", "wait"}
+        assert _text(await server.call_tool("echo", {"text": "hi"})) == "hi"
+        return {await _pid(server) for _ in range(5)}
+
+    pids = asyncio.run(run())
+    assert len(pids) == 1 and sessions.connects == 1
+
+    # callers on other event loops share the same session
+    assert asyncio.run(_pid(server)) in pids
+    assert sessions.connects == 1
+
+
+def test_concurrent_calls_are_limited_per_session(echo_server):
+    server = echo_server(max_concurrency=2)
+    sessions = server._MCPServerLocal__client.sessions  # type: ignore
+
+    async def run():
+        await server.initialize()
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[server.call_tool("wait", {"seconds": 0.5}) for _ in range(4)]
+        )
+        return time.perf_counter() - started, results
+
+    elapsed, results = asyncio.run(run())
+    assert [_text(result) for result in results] == ["done"] * 4
+    # two waves of two parallel calls on one session
+    assert 0.9 < elapsed < 1.9
+    assert sessions.connects == 1
+
+
+def test_dead_server_is_reconnected(echo_server):
+    server = echo_server(ping_interval=0)
+    sessions = server._MCPServerLocal__client.sessions  # type: ignore
+
+    async def run():
+        await server.initialize()
+        first = await _pid(server)
+        os.kill(int(first), 9)
+        await asyncio.sleep(0.2)
+        return first, await _pid(server)
+
+    first, second = asyncio.run(run())
+    assert first != second
+    assert sessions.connects == 2
+
+
+def test_idle_session_is_closed(echo_server):
+    server = echo_server(idle_timeout=0.3)
+    sessions = server._MCPServerLocal__client.sessions  # type: ignore
+
+    first = asyncio.run(_pid(server))
+    assert sessions.is_open()
+    deadline = time.monotonic() + 5
+    while sessions.is_open() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not sessions.is_open()
+
+    assert asyncio.run(_pid(server)) != first
+    assert sessions.connects == 2
+
+
+def test_update_closes_session(echo_server):
+    server = echo_server()
+    sessions = server._MCPServerLocal__client.sessions  # type: ignore
+    asyncio.run(server.initialize())
+    assert sessions.is_open()
+    server.update({"description": "changed"})
+    deadline = time.monotonic() + 5
+    while sessions.is_open() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not sessions.is_open()
+
+
+@pytest.mark.benchmark
+def test_mcp_session_benchmark(echo_server):
+    calls = 10
+    pooled = echo_server()
+    asyncio.run(pooled.initialize())
+
+    async def per_call_sessions():
+        # previous behaviour: new process, transport and handshake for every call
+        for _ in range(calls):
+            await pooled.call_tool("echo", {"text": "x"})
+            pooled.close()
+            while pooled._MCPServerLocal__client.sessions.is_open():  # type: ignore
+                await asyncio.sleep(0.001)
+
+    async def shared_session():
+        for _ in range(calls):
+            await pooled.call_tool("echo", {"text": "x"})
+
+    started = time.perf_counter()
+    asyncio.run(per_call_sessions())
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asyncio.run(shared_session())
+    pooled_time = time.perf_counter() - started
+
+    print(
+        f"\n[mcp sessions] calls={calls} "
+        f"per_call={legacy_time / calls * 1000:.1f}ms/call "
+        f"pooled={pooled_time / calls * 1000:.1f}ms/call "
+        f"speedup={legacy_time / pooled_time:.1f}x"
+    )
+    assert pooled_time < legacy_time
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._memory.helpers.memory import Memory, MyFaiss
+
+DIMENSIONS = 64
+AREAS = [area.value for area in Memory.Area]
+RECALL_GROUPS = [(["main", "fragments"], 12), (["solutions"], 8)]
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).normal(size=DIMENSIONS)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        return self._vector(text)
+
+
+def _memory(count: int) -> tuple[Memory, CountingEmbeddings]:
+    embeddings = CountingEmbeddings()
+    db = MyFaiss(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatIP(DIMENSIONS),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+        relevance_score_fn=Memory._cosine_normalizer,
+    )
+    docs = [
+        Document(f"memory {i}", metadata={"id": f"m{i}", "area": AREAS[i % 5 % 3]})
+        for i in range(count)
+    ]
+    if docs:
+        db.add_documents(docs, ids=[doc.metadata["id"] for doc in docs])
+    embeddings.calls = 0
+    return Memory(db, memory_subdir="test"), embeddings
+
+
+def _area_filter(areas: list[str]) -> str:
+    return " or ".join(f"area == '{area}'" for area in areas)
+
+
+async def _legacy_recall(memory: Memory, query: str, threshold: float) -> list[list[Document]]:
+    return [
+        await memory.search_similarity_threshold(
+            query=query, limit=limit, threshold=threshold, filter=_area_filter(areas)
+        )
+        for areas, limit in RECALL_GROUPS
+    ]
+
+
+def _ids(groups) -> list[list[str]]:
+    return [[doc.metadata["id"] for doc in docs] for docs in groups]
+
+
+def test_area_search_matches_separate_filtered_searches():
+    memory, embeddings = _memory(300)
+    for query in ["memory 7", "memory 120", "something else"]:
+        for threshold in [0.0, 0.5, 0.6]:
+            expected = asyncio.run(_legacy_recall(memory, query, threshold))
+            embeddings.calls = 0
+            found = asyncio.run(memory.search_by_areas(query, RECALL_GROUPS, threshold))
+            assert embeddings.calls == 1
+            assert _ids(found) == _ids(expected)
+            assert all(doc.metadata["area"] == "solutions" for doc in found[1])
+
+
+def test_batched_queries_match_single_searches_with_scores():
+    memory, embeddings = _memory(200)
+    queries = ["memory 3", "memory 50", "other words"]
+    batched = asyncio.run(
+        memory.search_by_areas_with_scores(queries, [(["main"], 5)], threshold=0.4)
+    )
+    assert embeddings.calls == 1
+
+    for query, (results,) in zip(queries, batched):
+        expected = asyncio.run(
+            memory.search_similarity_threshold_with_scores(
+                query=query, limit=5, threshold=0.4, filter="area == 'main'"
+            )
+        )
+        assert [(doc.metadata["id"], round(score, 5)) for doc, score in results] == [
+            (doc.metadata["id"], round(score, 5)) for doc, score in expected
+        ]
+
+
+def test_area_search_on_empty_index_and_groups():
+    memory, _ = _memory(0)
+    assert asyncio.run(memory.search_by_areas("query", RECALL_GROUPS, 0.0)) == [[], []]
+    assert asyncio.run(memory.search_by_areas_with_scores(["a", "b"], [], 0.0)) == [[], []]
+
+
+def test_comparator_is_parsed_once():
+    comparator = Memory._get_comparator("area == 'main' and score > 1")
+    assert comparator({"area": "main", "score": 2})
+    assert not comparator({"area": "main", "score": 0})
+    assert not comparator({"score": 2})
+    assert not Memory._get_comparator("area == ")({"area": "main"})
+
+
+@pytest.mark.benchmark
+def test_area_search_benchmark():
+    memory, embeddings = _memory(20000)
+    queries = [f"recall query {i}" for i in range(50)]
+
+    started = time.perf_counter()
+    embeddings.calls = 0
+    expected = [asyncio.run(_legacy_recall(memory, query, 0.5)) for query in queries]
+    legacy_time = time.perf_counter() - started
+    legacy_calls = embeddings.calls
+
+    started = time.perf_counter()
+    embeddings.calls = 0
+    found = [asyncio.run(memory.search_by_areas(query, RECALL_GROUPS, 0.5)) for query in queries]
+    batched_time = time.perf_counter() - started
+
+    print(
+        f"\n[memory recall] docs=20000 queries={len(queries)} "
+        f"legacy={legacy_time * 1000:.1f}ms ({legacy_calls} embeddings) "
+        f"batched={batched_time * 1000:.1f}ms ({embeddings.calls} embeddings) "
+        f"speedup={legacy_time / batched_time:.1f}x"
+    )
+
+    assert [_ids(groups) for groups in found] == [_ids(groups) for groups in expected]
+    assert embeddings.calls == len(queries) == legacy_calls // 2
+    assert batched_time < legacy_time
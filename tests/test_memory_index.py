@@ -0,0 +1,171 @@
+import sys
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.vector_db import IndexSettings, MyFaiss, get_index_strategy
+
+DIMENSIONS = 32
+
+
+class SeededEmbeddings(Embeddings):
+    def _vector(self, text: str) -> list[float]:
+        seed = int(text.rsplit(" ", 1)[-1]) if text[-1].isdigit() else len(text)
+        vector = np.random.default_rng(seed).normal(size=DIMENSIONS)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._vector(text)
+
+
+def _store(count: int, settings: IndexSettings) -> MyFaiss:
+    db = MyFaiss(
+        embedding_function=SeededEmbeddings(),
+        index=faiss.IndexFlatIP(DIMENSIONS),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+    db.set_index_settings(settings)
+    _add(db, range(count))
+    return db
+
+
+def _add(db: MyFaiss, numbers) -> None:
+    docs = [Document(f"doc {i}", metadata={"id": f"d{i}"}) for i in numbers]
+    if docs:
+        db.add_documents(docs, ids=[doc.metadata["id"] for doc in docs])
+
+
+def _top_id(db: MyFaiss, i: int) -> str:
+    return db.similarity_search(f"doc {i}", k=1)[0].metadata["id"]
+
+
+def _assert_consistent(db: MyFaiss) -> None:
+    # every position holds the vector of the document mapped to it
+    assert db.index.ntotal == len(db.index_to_docstore_id) == len(db.get_all_docs())
+    vectors = db.get_vectors()
+    for position, doc_id in db.index_to_docstore_id.items():
+        expected = db.embedding_function.embed_query(f"doc {doc_id[1:]}")  # type: ignore
+        assert np.allclose(vectors[position], expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("strategy", ["ivf", "hnsw"])
+def test_flat_index_is_promoted_past_threshold(strategy):
+    db = _store(400, IndexSettings(strategy=strategy, promote_threshold=500))
+    assert not db.apply_index_strategy()
+    assert get_index_strategy(db.index) == "flat"
+
+    _add(db, range(400, 800))
+    assert db.apply_index_strategy()
+    assert get_index_strategy(db.index) == strategy
+    assert not db.apply_index_strategy()
+
+    _assert_consistent(db)
+    assert all(_top_id(db, i) == f"d{i}" for i in range(0, 800, 37))
+
+    # added documents keep sequential positions
+    _add(db, range(800, 850))
+    _assert_consistent(db)
+    assert _top_id(db, 820) == "d820"
+
+
+@pytest.mark.parametrize("strategy", ["flat", "ivf", "hnsw"])
+def test_delete_keeps_id_mapping(strategy):
+    db = _store(800, IndexSettings(strategy=strategy, promote_threshold=100))
+    db.apply_index_strategy()
+    assert get_index_strategy(db.index) == strategy
+
+    removed = [f"d{i}" for i in range(0, 800, 3)]
+    assert db.delete(removed)
+    assert get_index_strategy(db.index) == strategy
+    _assert_consistent(db)
+    assert _top_id(db, 1) == "d1"
+    assert _top_id(db, 3) != "d3"
+
+    with pytest.raises(ValueError):
+        db.delete(["d0"])
+
+    _add(db, [3])
+    _assert_consistent(db)
+    assert _top_id(db, 3) == "d3"
+
+
+@pytest.mark.parametrize("strategy", ["ivf", "hnsw"])
+def test_delete_marks_positions_until_compacted(strategy, tmp_path):
+    db = _store(800, IndexSettings(strategy=strategy, promote_threshold=100))
+    db.apply_index_strategy()
+    index = db.index
+
+    removed = [f"d{i}" for i in range(0, 60, 2)]
+    assert db.delete(removed)
+    assert db.index is index and db.index.ntotal == 800
+    assert len(db.tombstones) == len(removed)
+    assert all(_top_id(db, i) != f"d{i}" for i in range(0, 60, 2))
+    assert _top_id(db, 1) == "d1"
+    found = db.max_marginal_relevance_search("doc 2", k=5, fetch_k=40)
+    assert all(doc.metadata["id"] not in removed for doc in found)
+    found = db.search_by_vectors([db.embedding_function.embed_query("doc 4")], 5)  # type: ignore
+    assert all(doc.metadata["id"] not in removed for doc, _ in found[0])
+
+    with pytest.raises(ValueError):
+        db.delete(["d0"])
+    _add(db, [0])
+    assert _top_id(db, 0) == "d0"
+
+    db.save_local(str(tmp_path))
+    loaded = MyFaiss.load_local(
+        str(tmp_path), SeededEmbeddings(), allow_dangerous_deserialization=True
+    )
+    assert loaded.tombstones == db.tombstones
+    assert _top_id(loaded, 2) != "d2"
+
+    # enough deletions compact the index back to sequential positions
+    assert db.delete([f"d{i}" for i in range(100, 160)])
+    assert not db.tombstones
+    assert get_index_strategy(db.index) == strategy
+    _assert_consistent(db)
+    assert _top_id(db, 1) == "d1"
+    assert _top_id(db, 0) == "d0"
+
+
+def test_strategy_change_rebuilds_and_survives_save(tmp_path):
+    db = _store(600, IndexSettings(strategy="hnsw", promote_threshold=100))
+    db.apply_index_strategy()
+    db.save_local(str(tmp_path))
+
+    loaded = MyFaiss.load_local(
+        str(tmp_path), SeededEmbeddings(), allow_dangerous_deserialization=True
+    )
+    assert get_index_strategy(loaded.index) == "hnsw"
+    assert _top_id(loaded, 42) == "d42"
+
+    # going back to flat rebuilds the exact index even below the threshold
+    loaded.set_index_settings(IndexSettings(strategy="flat", promote_threshold=10**6))
+    assert loaded.apply_index_strategy()
+    assert get_index_strategy(loaded.index) == "flat"
+    _assert_consistent(loaded)
+
+
+def test_index_settings_from_config():
+    settings = IndexSettings.from_config(
+        {"memory_index_strategy": "ivf", "memory_index_ivf_nprobe": "8", "other": 1},
+        prefix="memory_index_",
+    )
+    assert settings.strategy == "ivf"
+    assert settings.ivf_nprobe == 8
+    assert settings.promote_threshold == IndexSettings().promote_threshold
+    assert IndexSettings.from_config(None) == IndexSettings()
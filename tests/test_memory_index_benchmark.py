@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.vector_db import IndexSettings, build_index
+
+# run with A0_BENCHMARKS=1 MEMORY_INDEX_BENCHMARK_SIZES=1000,10000,100000 to include the large store
+SIZES = [int(size) for size in os.getenv("MEMORY_INDEX_BENCHMARK_SIZES", "1000,10000").split(",")]
+DIMENSIONS = 64
+QUERIES = 200
+K = 10
+
+
+def _clustered_vectors(count: int, rng: np.random.Generator) -> np.ndarray:
+    # memories cluster by topic, uniform random vectors would be a worst case
+    centers = rng.normal(size=(max(8, count // 200), DIMENSIONS))
+    vectors = centers[rng.integers(0, len(centers), count)] + rng.normal(
+        scale=0.6, size=(count, DIMENSIONS)
+    )
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _measure(index, queries: np.ndarray) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    for query in queries:
+        _scores, found = index.search(query[None, :], K)
+    latency = (time.perf_counter() - started) / len(queries)
+    _scores, found = index.search(queries, K)
+    return found, latency
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+
+@pytest.mark.benchmark
+def test_index_strategies_recall_and_latency():
+    rng = np.random.default_rng(7)
+    for size in SIZES:
+        vectors = _clustered_vectors(size, rng)
+        queries = _clustered_vectors(QUERIES, rng)
+
+        flat = build_index(vectors, IndexSettings(strategy="flat"))
+        truth, flat_latency = _measure(flat, queries)
+        print(f"\n[memory index] size={size} flat: recall=1.000 latency={flat_latency * 1e6:.0f}us")
+
+        for settings in [
+            IndexSettings(strategy="ivf", ivf_nprobe=8),
+            IndexSettings(strategy="ivf", ivf_nprobe=16),
+            IndexSettings(strategy="ivf", ivf_nprobe=32),
+            IndexSettings(strategy="hnsw", hnsw_ef_search=64),
+            IndexSettings(strategy="hnsw", hnsw_ef_search=128),
+        ]:
+            started = time.perf_counter()
+            index = build_index(vectors, settings)
+            build_time = time.perf_counter() - started
+            found, latency = _measure(index, queries)
+            recall = _recall(found, truth)
+            param = (
+                f"nprobe={settings.ivf_nprobe}"
+                if settings.strategy == "ivf"
+                else f"ef_search={settings.hnsw_ef_search}"
+            )
+            print(
+                f"[memory index] size={size} {settings.strategy} {param}: "
+                f"recall={recall:.3f} latency={latency * 1e6:.0f}us "
+                f"speedup={flat_latency / latency:.1f}x build={build_time:.2f}s"
+            )
+            assert index.ntotal == size
+            assert recall > 0.5
@@ -0,0 +1,261 @@
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers.vector_db import IndexSettings, MyFaiss
+from plugins._memory.helpers import persistence
+
+DIMENSIONS = 32
+
+
+class SeededEmbeddings(Embeddings):
+    def _vector(self, text: str) -> list[float]:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).normal(size=DIMENSIONS)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._vector(text)
+
+
+def _store(count: int) -> MyFaiss:
+    db = MyFaiss(
+        embedding_function=SeededEmbeddings(),
+        index=faiss.IndexFlatIP(DIMENSIONS),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+    _add(db, range(count))
+    return db
+
+
+def _add(db: MyFaiss, numbers, text: str = "doc") -> None:
+    docs = [Document(f"{text} {i}", metadata={"id": f"d{i}"}) for i in numbers]
+    if docs:
+        db.add_documents(docs, ids=[doc.metadata["id"] for doc in docs])
+
+
+def _load(folder) -> MyFaiss:
+    return persistence.load(str(folder), SeededEmbeddings())
+
+
+def _assert_same(loaded: MyFaiss, db: MyFaiss) -> None:
+    assert loaded.index_to_docstore_id == db.index_to_docstore_id
+    assert {k: v.page_content for k, v in loaded.get_all_docs().items()} == {
+        k: v.page_content for k, v in db.get_all_docs().items()
+    }
+    assert np.allclose(loaded.get_vectors(), db.get_vectors())
+
+
+def test_changes_are_journaled_and_replayed(tmp_path):
+    db = _store(50)
+    persistence.save(db, str(tmp_path))
+    docstore_stat = os.stat(tmp_path / persistence.DOCSTORE_FILE)
+    assert os.path.getsize(tmp_path / persistence.JOURNAL_FILE) == 0
+
+    _add(db, range(50, 60))
+    persistence.save_changes(db, str(tmp_path))
+    db.delete(["d3", "d55"])
+    db.delete(["d7"])
+    _add(db, [7], text="updated")
+    persistence.save_changes(db, str(tmp_path))
+
+    # documents are not re-pickled, only the changes are appended
+    assert os.stat(tmp_path / persistence.DOCSTORE_FILE) == docstore_stat
+    assert len(persistence._read_journal(str(tmp_path / persistence.JOURNAL_FILE))[0]) == 2
+    assert not db.changed_ids
+
+    loaded = _load(tmp_path)
+    _assert_same(loaded, db)
+    assert loaded.get_by_ids(["d7"])[0].page_content == "updated 7"
+    assert not loaded.get_by_ids(["d3"])
+
+
+def test_journal_is_compacted(tmp_path, monkeypatch):
+    db = _store(20)
+    persistence.save(db, str(tmp_path))
+    monkeypatch.setattr(persistence, "COMPACT_SIZE", 1)
+
+    _add(db, range(20, 25))
+    persistence.save_changes(db, str(tmp_path))
+    _add(db, range(25, 30))
+    persistence.save_changes(db, str(tmp_path))
+    assert os.path.getsize(tmp_path / persistence.JOURNAL_FILE) == 0
+
+    # folded store is readable by plain FAISS as well
+    _assert_same(_load(tmp_path), db)
+    plain = MyFaiss.load_local(str(tmp_path), SeededEmbeddings(), allow_dangerous_deserialization=True)
+    _assert_same(plain, db)
+
+
+def test_interrupted_save_is_recovered(tmp_path, monkeypatch):
+    db = _store(30)
+    persistence.save(db, str(tmp_path))
+
+    # crash after the journal record was written, before the index was replaced
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if str(src).endswith(persistence.INDEX_FILE + ".tmp"):
+            raise OSError("crash")
+        real_replace(src, dst)
+
+    _add(db, range(30, 40))
+    monkeypatch.setattr(persistence.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        persistence.save_changes(db, str(tmp_path))
+    monkeypatch.setattr(persistence.os, "replace", real_replace)
+    assert db.changed_ids  # kept for the next attempt
+
+    _assert_same(_load(tmp_path), db)
+    with open(tmp_path / persistence.HASH_FILE) as f:
+        assert f.read() == persistence._file_hash(str(tmp_path / persistence.INDEX_FILE))
+
+    # uncommitted index and a torn journal record are dropped
+    committed = persistence._file_hash(str(tmp_path / persistence.INDEX_FILE))
+    (tmp_path / (persistence.INDEX_FILE + ".tmp")).write_bytes(b"partial")
+    with open(tmp_path / persistence.JOURNAL_FILE, "ab") as f:
+        f.write(b"\x80\x05partial")
+    _assert_same(_load(tmp_path), db)
+    assert not (tmp_path / (persistence.INDEX_FILE + ".tmp")).exists()
+    assert persistence._file_hash(str(tmp_path / persistence.INDEX_FILE)) == committed
+
+    _add(db, [40])
+    persistence.save_changes(db, str(tmp_path))
+    _assert_same(_load(tmp_path), db)
+
+
+def test_promoted_index_is_persisted(tmp_path):
+    db = _store(300)
+    persistence.save(db, str(tmp_path))
+    db.set_index_settings(IndexSettings(strategy="ivf", promote_threshold=100))
+    assert db.apply_index_strategy()
+    db.delete(["d1"])
+    persistence.save_changes(db, str(tmp_path))
+    loaded = _load(tmp_path)
+    _assert_same(loaded, db)
+    # the deleted position is replayed from the journal and still skipped
+    assert loaded.tombstones == db.tombstones == {1}
+    assert loaded.similarity_search("doc 1", k=1)[0].metadata["id"] != "d1"
+
+
+def test_write_behind_coalesces_and_flushes(tmp_path, monkeypatch):
+    writes = []
+    monkeypatch.setattr(persistence, "save_changes", lambda db, folder: writes.append(folder))
+    writer = persistence.WriteBehind(delay=0.2, max_delay=5)
+    db = _store(1)
+
+    for _ in range(5):
+        writer.mark_dirty("a", db)
+    writer.mark_dirty("b", db)
+    assert writer.is_dirty("a") and not writes
+
+    writer.flush("b")
+    assert writes == ["b"]
+    assert writer.is_dirty("a") and not writer.is_dirty("b")
+
+    deadline = time.monotonic() + 5
+    while writer.is_dirty() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert writes == ["b", "a"]
+
+    # continuous changes are still written after max_delay
+    writer = persistence.WriteBehind(delay=0.2, max_delay=0.3)
+    started = time.monotonic()
+    while len(writes) < 3 and time.monotonic() - started < 5:
+        writer.mark_dirty("c", db)
+        time.sleep(0.05)
+    assert writes[-1] == "c"
+    writer.flush()
+
+
+def test_failed_flush_stays_dirty(tmp_path, monkeypatch):
+    def failing_save(db, folder):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(persistence, "save_changes", failing_save)
+    writer = persistence.WriteBehind(delay=60)
+    writer.mark_dirty("a", _store(1))
+    writer.flush()
+    assert writer.is_dirty("a")
+    # clears the retry timer
+    monkeypatch.setattr(persistence, "save_changes", lambda db, folder: None)
+    writer.flush()
+    assert not writer.is_dirty()
+
+
+def test_failed_flush_is_retried(tmp_path, monkeypatch):
+    writes: list[str] = []
+
+    def save_once_failing(db, folder):
+        writes.append(folder)
+        if len(writes) == 1:
+            raise OSError("disk full")
+
+    monkeypatch.setattr(persistence, "save_changes", save_once_failing)
+    writer = persistence.WriteBehind(delay=0.1, max_delay=0.3)
+    writer.mark_dirty("a", _store(1))
+
+    deadline = time.monotonic() + 5
+    while (len(writes) < 2 or writer.is_dirty()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert writes == ["a", "a"]
+    assert not writer.is_dirty()
+
+
+@pytest.mark.benchmark
+def test_persistence_benchmark(tmp_path):
+    db = _store(20000)
+    changes = 20
+
+    legacy_dir = tmp_path / "legacy"
+    started = time.perf_counter()
+    for i in range(changes):
+        _add(db, [100000 + i])
+        db.save_local(str(legacy_dir))
+        persistence._file_hash(str(legacy_dir / persistence.INDEX_FILE))
+    legacy_time = time.perf_counter() - started
+
+    journal_dir = tmp_path / "journal"
+    persistence.save(db, str(journal_dir))
+    started = time.perf_counter()
+    for i in range(changes):
+        _add(db, [200000 + i])
+        persistence.save_changes(db, str(journal_dir))
+    journal_time = time.perf_counter() - started
+
+    writer = persistence.WriteBehind(delay=60)
+    started = time.perf_counter()
+    for i in range(changes):
+        _add(db, [300000 + i])
+        writer.mark_dirty(str(journal_dir), db)
+    writer.flush()
+    coalesced_time = time.perf_counter() - started
+
+    print(
+        f"\n[memory persistence] docs=20000 changes={changes} "
+        f"full_save={legacy_time * 1000:.1f}ms journal={journal_time * 1000:.1f}ms "
+        f"write_behind={coalesced_time * 1000:.1f}ms "
+        f"speedup={legacy_time / journal_time:.1f}x/{legacy_time / coalesced_time:.1f}x"
+    )
+    _assert_same(_load(journal_dir), db)
+    assert journal_time < legacy_time
+    assert coalesced_time < journal_time
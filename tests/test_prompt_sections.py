@@ -0,0 +1,110 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import cache, prompt_sections
+from helpers.secrets import SecretsManager
+
+
+class FakeContext:
+    def __init__(self, project: str | None = None):
+        self.data = {"project": project}
+
+    def get_data(self, key: str):
+        return self.data.get(key)
+
+
+class FakeAgent:
+    def __init__(self, profile: str = "agent0", project: str | None = None):
+        self.config = SimpleNamespace(profile=profile)
+        self.context = FakeContext(project)
+        self.data: dict = {}
+
+
+class CountingSection(prompt_sections.SystemPromptSection):
+    builds = 0
+
+    def cache_key(self, agent):
+        return cache.determine_cache_key(agent)
+
+    async def build(self, agent):
+        type(self).builds += 1
+        return f"section {type(self).builds} for {agent.context.get_data('project')}"
+
+
+class UncachedSection(CountingSection):
+    def cache_key(self, agent):
+        return None
+
+
+def _run(cls, agent) -> list[str]:
+    system_prompt: list[str] = []
+    asyncio.run(cls(agent=agent).execute(system_prompt=system_prompt))
+    return system_prompt
+
+
+def test_section_is_reused_while_key_is_unchanged():
+    CountingSection.builds = 0
+    agent = FakeAgent()
+
+    first = _run(CountingSection, agent)
+    assert _run(CountingSection, agent) == first
+    assert CountingSection.builds == 1
+
+    agent.context.data["project"] = "demo"
+    assert _run(CountingSection, agent) == ["section 2 for demo"]
+    assert CountingSection.builds == 2
+
+    # other agents keep their own sections
+    assert _run(CountingSection, FakeAgent()) == ["section 3 for None"]
+    assert _run(CountingSection, agent) == ["section 2 for demo"]
+
+
+def test_invalidate_rebuilds_sections():
+    CountingSection.builds = 0
+    agent = FakeAgent()
+    _run(CountingSection, agent)
+
+    prompt_sections.invalidate()
+    assert _run(CountingSection, agent) == ["section 2 for None"]
+
+    # saving secrets invalidates sections as well
+    SecretsManager._invalidate_all_caches()
+    assert _run(CountingSection, agent) == ["section 3 for None"]
+
+
+def test_sections_without_key_are_always_built():
+    UncachedSection.builds = 0
+    agent = FakeAgent()
+    _run(UncachedSection, agent)
+    _run(UncachedSection, agent)
+    assert UncachedSection.builds == 2
+    assert prompt_sections.DATA_NAME_SECTIONS not in agent.data
+
+
+def test_mcp_tools_version_changes_with_servers():
+    from helpers.mcp_handler import MCPConfig
+
+    version = MCPConfig.get_tools_version()
+    MCPConfig(servers_list=[])
+    assert MCPConfig.get_tools_version() > version
+
+
+def test_sources_watchdog_invalidates(monkeypatch):
+    from helpers import watchdog
+
+    handlers = {}
+    monkeypatch.setattr(
+        watchdog, "add_watchdog", lambda id, roots, handler, **kwargs: handlers.setdefault(id, handler)
+    )
+    prompt_sections.register_watchdogs()
+    assert set(handlers) == {"system_prompt_sections"}
+
+    generation = prompt_sections.get_generation()
+    handlers["system_prompt_sections"]([["usr/skills/demo/SKILL.md", "modify"]])
+    assert prompt_sections.get_generation() == generation + 1
@@ -0,0 +1,144 @@
+import os
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import files, templates
+
+
+@pytest.fixture(autouse=True)
+def _clear_template_cache():
+    templates.clear_cache()
+    yield
+    templates.clear_cache()
+
+
+def _legacy_render(content: str, variables: dict) -> str:
+    # conditions and placeholders exactly as read_prompt_file used to apply them
+    content = files.evaluate_text_conditions(content, **variables)
+    return files.replace_placeholders_text(content, **variables)
+
+
+def _prompt_files():
+    for folder in ("prompts", "agents", "plugins"):
+        yield from (PROJECT_ROOT / folder).rglob("*.md")
+
+
+def test_compiled_render_matches_legacy_for_repo_prompts():
+    variable_sets = [
+        {},
+        {"agent_profiles": None, "vars": "", "secrets": "", "project_name": ""},
+        {"agent_profiles": {"x": 1}, "vars": "v", "secrets": "s", "project_name": "p", "tools": "T"},
+    ]
+    checked = 0
+    for path in _prompt_files():
+        content = path.read_text(encoding="utf-8")
+        template = templates.PromptTemplate(content)
+        for variables in variable_sets:
+            assert template.render(variables) == _legacy_render(content, variables), path
+        checked += 1
+    assert checked > 50
+
+
+@pytest.mark.parametrize(
+    "content, variables",
+    [
+        ("a {{if x}}b {{if y}}c{{endif}} d{{endif}} e", {"x": 1, "y": 0}),
+        ("a {{if x}}b {{if y}}c{{endif}} d{{endif}} e", {"x": 0, "y": 1}),
+        ("{{if x > }}broken{{endif}} {{if 1}}kept raw{{endif}}", {"x": 1}),
+        ("{{if missing}}no name{{endif}} after {{if 1}}x{{endif}}", {}),
+        ("{{if x}}unterminated {{name}}", {"x": 1, "name": "n"}),
+        ("{{ if  x == 'a' }}{{name}}{{ endif }}", {"x": "a", "name": "N"}),
+        ("{{a}} {{b}} {{c}}", {"a": "{{b}}", "b": "B", "c": "{{a}}"}),
+        ("{{{{a}}}}", {"a": "x", "x": "y"}),
+        ("{{a{{b}}}}", {"a": "A", "b": ""}),
+        ("{{a}}{{a}} {{ a }}", {"a": 1, "{x}": 2}),
+    ],
+)
+def test_compiled_render_matches_legacy_edge_cases(content, variables):
+    assert templates.PromptTemplate(content).render(variables) == _legacy_render(content, variables)
+
+
+def test_random_templates_match_legacy():
+    rng = random.Random(5)
+    pieces = ["{{if a}}", "{{if b}}", "{{if a and b}}", "{{if +}}", "{{endif}}", "{{a}}", "{{b}}", "text ", "{{", "}}", "\n"]
+    for _ in range(2000):
+        content = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        variables = {"a": rng.choice([0, 1, "{{b}}"]), "b": rng.choice([0, 1, "x"])}
+        assert templates.PromptTemplate(content).render(variables) == _legacy_render(content, variables), content
+
+
+def test_read_prompt_file_caches_and_reloads_on_change(tmp_path):
+    high, low = tmp_path / "high", tmp_path / "low"
+    high.mkdir()
+    low.mkdir()
+    (low / "main.md").write_text("low {{name}} {{ include 'part.md' }}", encoding="utf-8")
+    (low / "part.md").write_text("{{if name}}part {{name}}{{endif}}", encoding="utf-8")
+    dirs = [str(high), str(low)]
+
+    assert files.read_prompt_file("main.md", dirs, name="N") == "low N part N"
+    first = templates.get_template(str(low / "main.md"))
+    assert files.read_prompt_file("main.md", dirs, name="N") == "low N part N"
+    assert templates.get_template(str(low / "main.md")) is first
+
+    main = low / "main.md"
+    main.write_text("changed {{name}}", encoding="utf-8")
+    stat = main.stat()
+    os.utime(main, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert files.read_prompt_file("main.md", dirs, name="N") == "changed N"
+
+    # a new higher priority file is picked up once the watchdog clears the cache
+    (high / "main.md").write_text("high {{include original}}", encoding="utf-8")
+    assert files.read_prompt_file("main.md", dirs, name="N") == "changed N"
+    templates.clear_cache()
+    assert files.read_prompt_file("main.md", dirs, name="N") == "high changed N"
+
+    # a deleted file is resolved again
+    (high / "main.md").unlink()
+    assert files.read_prompt_file("main.md", dirs, name="N") == "changed N"
+
+
+def test_variables_plugin_is_loaded_once(tmp_path, monkeypatch):
+    (tmp_path / "tips.md").write_text("path={{workdir}}", encoding="utf-8")
+    (tmp_path / "tips.py").write_text(
+        "from helpers.files import VariablesPlugin\n"
+        "class Tips(VariablesPlugin):\n"
+        "    def get_variables(self, file, backup_dirs=None, **kwargs):\n"
+        "        return {'workdir': kwargs.get('suffix', '') + '/work'}\n",
+        encoding="utf-8",
+    )
+    from helpers import modules
+
+    loads = []
+    original = modules.load_classes_from_file
+    monkeypatch.setattr(
+        modules,
+        "load_classes_from_file",
+        lambda *args, **kwargs: loads.append(args[0]) or original(*args, **kwargs),
+    )
+
+    for suffix in ("a", "b", "c"):
+        assert files.read_prompt_file("tips.md", [str(tmp_path)], suffix=suffix) == f"path={suffix}/work"
+    assert len(loads) == 1
+
+
+def test_prompts_watchdog_clears_cache(monkeypatch):
+    from helpers import watchdog
+
+    handlers = {}
+    monkeypatch.setattr(
+        watchdog, "add_watchdog", lambda id, roots, handler, **kwargs: handlers.setdefault(id, handler)
+    )
+    templates.register_watchdogs()
+    assert set(handlers) == {"prompt_templates_base", "prompt_templates_nested"}
+
+    files.read_prompt_file("fw.warning.md", ["prompts"], message="m")
+    assert templates.cache.get(templates.RESOLVE_CACHE_AREA, ("fw.warning.md", ("prompts",)))
+    handlers["prompt_templates_nested"]([["prompts/fw.warning.md", "modify"]])
+    assert templates.cache.get(templates.RESOLVE_CACHE_AREA, ("fw.warning.md", ("prompts",))) is None
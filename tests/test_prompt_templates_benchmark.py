@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import files, templates
+
+BUILDS = 1000
+
+
+PROMPT_DIRS = ["agents/agent0/prompts", "prompts"]
+
+
+def _record_system_prompt_reads(monkeypatch) -> list[tuple[tuple, dict]]:
+    """Read the default system prompt files once and record every prompt file read,
+    including nested includes."""
+    calls = []
+    original = files.read_prompt_file
+
+    def recording(*args, **kwargs):
+        calls.append((args, kwargs))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(files, "read_prompt_file", recording)
+    tool_files = files.get_unique_filenames_in_dirs(PROMPT_DIRS, "agent.system.tool.*.md")
+    for name in ["agent.system.main.md", *map(os.path.basename, tool_files)]:
+        files.read_prompt_file(name, list(PROMPT_DIRS))
+    files.read_prompt_file("agent.system.tools.md", list(PROMPT_DIRS), tools="")
+    monkeypatch.setattr(files, "read_prompt_file", original)
+    return calls
+
+
+def _split(args: tuple, kwargs: dict) -> tuple[str, list[str], dict]:
+    file, dirs = args[0], list(args[1] if len(args) > 1 else kwargs.get("_directories") or [])
+    if "/" in file:
+        dirs = [file.rsplit("/", 1)[0]] + dirs
+        file = file.rsplit("/", 1)[1]
+    kwargs = {k: v for k, v in kwargs.items() if k != "_directories"}
+    variables = files.load_plugin_variables(file, dirs, **kwargs) or {}
+    variables.update(kwargs)
+    return file, dirs, variables
+
+
+def _build_legacy(reads) -> list[str]:
+    out = []
+    for file, dirs, variables in reads:
+        with open(files.find_file_in_dirs(file, dirs), "r", encoding="utf-8") as f:
+            content = f.read()
+        content = files.evaluate_text_conditions(content, **variables)
+        out.append(files.replace_placeholders_text(content, **variables))
+    return out
+
+
+def _build_compiled(reads) -> list[str]:
+    return [
+        templates.load_template(file, dirs)[1].render(variables)
+        for file, dirs, variables in reads
+    ]
+
+
+def test_system_prompt_templates_render_like_legacy_reads(monkeypatch):
+    calls = _record_system_prompt_reads(monkeypatch)
+    assert len(calls) > 10
+    reads = [_split(args, kwargs) for args, kwargs in calls]
+    assert _build_compiled(reads) == _build_legacy(reads)
+
+
+@pytest.mark.benchmark
+def test_system_prompt_templates_benchmark(monkeypatch):
+    calls = _record_system_prompt_reads(monkeypatch)
+    assert len(calls) > 10
+    # Variables plugins are resolved once, the benchmark measures template work only
+    reads = [_split(args, kwargs) for args, kwargs in calls]
+    expected = _build_legacy(reads)
+
+    started = time.perf_counter()
+    for _ in range(BUILDS):
+        assert _build_legacy(reads) == expected
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(BUILDS):
+        assert _build_compiled(reads) == expected
+    compiled_time = time.perf_counter() - started
+
+    print(
+        f"\n[prompt templates] files={len(reads)} builds={BUILDS} "
+        f"legacy={legacy_time * 1000:.1f}ms compiled={compiled_time * 1000:.1f}ms "
+        f"speedup={legacy_time / compiled_time:.1f}x"
+    )
+
+    assert compiled_time < legacy_time
@@ -0,0 +1,190 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import tokens
+from helpers.rate_limiter import RateLimiter
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def _limiter(clock: Clock, **limits) -> RateLimiter:
+    limiter = RateLimiter(seconds=60, **limits)
+    limiter.clock = clock  # type: ignore
+    return limiter
+
+
+def test_running_totals_expire_with_the_window(clock):
+    limiter = _limiter(clock, input=100)
+    limiter.add(input=40, requests=1)
+    clock.now += 30
+    limiter.add(input=50, requests=1)
+    assert asyncio.run(limiter.get_total("input")) == 90
+    assert asyncio.run(limiter.get_total("requests")) == 2
+
+    clock.now += 31
+    assert asyncio.run(limiter.get_total("input")) == 50
+    clock.now += 30
+    assert asyncio.run(limiter.get_total("input")) == 0
+    assert all(not buckets for buckets in limiter.values.values())
+
+
+def test_delay_is_computed_from_the_oldest_buckets(clock):
+    limiter = _limiter(clock, input=100, requests=0)
+    limiter.add(input=60)
+    clock.now += 10
+    limiter.add(input=30)
+    clock.now += 10
+    assert limiter.get_delay()[0] == 0
+
+    limiter.add(input=30, requests=50)  # requests are unlimited
+    delay, key, total, limit = limiter.get_delay()
+    assert (key, total, limit) == ("input", 120, 100)
+    # the first bucket has to expire, it ends at most one bucket after its value
+    assert 40 < delay <= 41
+    clock.now += delay
+    assert limiter.get_delay()[0] == 0
+    assert asyncio.run(limiter.get_total("input")) == 60
+
+
+def test_wait_sleeps_once_until_the_limit_frees_up(clock, monkeypatch):
+    limiter = _limiter(clock, requests=2)
+    for _ in range(3):
+        limiter.add(requests=1)
+    sleeps: list[float] = []
+    messages: list[str] = []
+
+    async def fake_sleep(seconds: float):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    async def callback(message: str, key: str, total: int, limit: int) -> bool:
+        messages.append(message)
+        return False
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    asyncio.run(limiter.wait(callback))
+    assert len(sleeps) == 1 and 60 < sleeps[0] <= 61
+    assert messages[0].startswith("Rate limit exceeded for requests (3/2)")
+
+    # a callback returning True skips waiting
+    for _ in range(3):
+        limiter.add(requests=1)
+
+    async def skip(*args) -> bool:
+        return True
+
+    asyncio.run(limiter.wait(skip))
+    assert len(sleeps) == 1
+
+
+def test_usage_reports_utilization(clock):
+    limiter = _limiter(clock, input=200, output=0)
+    limiter.add(input=50, output=10)
+    usage = limiter.get_usage()
+    assert usage["input"] == {"total": 50, "limit": 200, "utilization": 0.25}
+    assert usage["output"]["utilization"] is None
+
+
+def test_models_share_limiters_and_estimate_per_message(monkeypatch):
+    import models
+
+    monkeypatch.setattr(models, "rate_limiters", {})
+    config = models.ModelConfig(
+        type=models.ModelType.CHAT, provider="openai", name="gpt", limit_input=100000
+    )
+    history = [{"role": "user", "content": f"message {i} " * 50} for i in range(20)]
+    estimate = models.estimate_input_tokens(history)
+    assert abs(estimate - tokens.approximate_tokens(str(history))) < estimate * 0.2
+
+    asyncio.run(models.apply_rate_limiter(config, input_tokens=estimate))
+    utility = models.ModelConfig(
+        type=models.ModelType.CHAT, provider="openai", name="gpt", limit_input=100000
+    )
+    asyncio.run(models.apply_rate_limiter(utility, "short text"))
+    usage = models.get_rate_limiter_usage()
+    assert list(usage) == ["openai\\gpt"]
+    assert usage["openai\\gpt"]["requests"]["total"] == 2
+    assert usage["openai\\gpt"]["input"]["total"] == estimate + tokens.approximate_tokens(
+        "short text"
+    )
+
+    # a new message only tokenizes itself
+    # the tokens module models was imported with, others may have re-imported it
+    tokens_globals = models.approximate_tokens.__globals__
+    encoded: list[str] = []
+    encoding = tokens_globals["get_encoding"]()
+    real_encode = encoding.encode
+
+    class CountingEncoding:
+        def encode(self, text, **kwargs):
+            encoded.append(text)
+            return real_encode(text, **kwargs)
+
+    monkeypatch.setitem(
+        tokens_globals, "get_encoding", lambda name="cl100k_base": CountingEncoding()
+    )
+    reply = f"new reply {time.time()}"
+    history.append({"role": "assistant", "content": reply})
+    models.estimate_input_tokens(history)
+    assert encoded == [reply]
+
+
+@pytest.mark.benchmark
+def test_rate_limiter_benchmark(clock):
+    class ListRateLimiter:
+        # previous behaviour: a list per key, rebuilt and summed on every check
+        def __init__(self, seconds: int):
+            self.timeframe = seconds
+            self.values: dict[str, list] = {}
+
+        def add(self, **kwargs: int):
+            for key, value in kwargs.items():
+                self.values.setdefault(key, []).append((clock.now, value))
+
+        def check(self, key: str) -> int:
+            cutoff = clock.now - self.timeframe
+            for name in self.values:
+                self.values[name] = [(t, v) for t, v in self.values[name] if t > cutoff]
+            return sum(v for _, v in self.values[key])
+
+    calls = 3000
+
+    def run(limiter, check) -> float:
+        clock.now = 1000.0
+        started = time.perf_counter()
+        for _ in range(calls):
+            clock.now += 0.01
+            limiter.add(input=100, output=10, requests=1)
+            check(limiter)
+        return time.perf_counter() - started
+
+    legacy_time = run(ListRateLimiter(60), lambda limiter: limiter.check("input"))
+    bucket_time = run(
+        _limiter(clock, input=10**9, output=10**9, requests=10**9),
+        lambda limiter: limiter.get_delay(),
+    )
+    print(
+        f"\n[rate limiter] calls={calls} in_window={calls} "
+        f"lists={legacy_time * 1000:.1f}ms buckets={bucket_time * 1000:.1f}ms "
+        f"speedup={legacy_time / bucket_time:.1f}x"
+    )
+    assert bucket_time < legacy_time
@@ -0,0 +1,183 @@
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import task_scheduler
+from helpers.task_scheduler import (
+    PlannedTask,
+    ScheduledTask,
+    SchedulerTaskList,
+    TaskPlan,
+    TaskSchedule,
+    TaskState,
+)
+
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_scheduler, "SCHEDULER_FOLDER", str(tmp_path))
+    return tmp_path
+
+
+def _planned(name: str, *offsets: float) -> PlannedTask:
+    now = datetime.now(timezone.utc)
+    plan = TaskPlan.create(todo=[now + timedelta(seconds=offset) for offset in offsets])
+    return PlannedTask.create(name=name, system_prompt="", prompt=name, plan=plan)
+
+
+def _scheduled(name: str, minute: str = "*") -> ScheduledTask:
+    schedule = TaskSchedule(minute=minute, hour="*", day="*", month="*", weekday="*", timezone="UTC")
+    return ScheduledTask.create(name=name, system_prompt="", prompt=name, schedule=schedule)
+
+
+def test_due_tasks_come_from_the_heap_once(folder):
+    tasks = SchedulerTaskList(tasks=[])
+    due = _planned("due", -1)
+    later = _planned("later", 3600)
+    cron = _scheduled("cron")
+
+    async def run():
+        for task in (due, later, cron):
+            await tasks.add_task(task)
+        first = await tasks.get_due_tasks()
+        # the run was handed out, it is not due again before the task changes
+        second = await tasks.get_due_tasks()
+        await tasks.update_task_by_uuid(due.uuid, lambda task: task.update(name="renamed"))
+        third = await tasks.get_due_tasks()
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert [task.uuid for task in first] == [due.uuid]
+    assert second == [] and third == []
+
+    next_minute = cron.get_next_run()
+    assert next_minute is not None
+    assert tasks.get_next_due_time() == next_minute.timestamp()
+
+    # running tasks are not scheduled until they are idle again
+    asyncio.run(tasks.update_task_by_uuid(cron.uuid, lambda task: task.update(state=TaskState.RUNNING)))
+    assert tasks.get_next_due_time() == later.get_next_run().timestamp()  # type: ignore
+    asyncio.run(tasks.remove_task_by_uuid(later.uuid))
+    assert tasks.get_next_due_time() is None
+
+
+def test_cron_run_passed_during_startup_is_not_skipped(folder):
+    # every minute has a run less than SCHEDULE_LOOKBACK ago
+    ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+    missed = _scheduled("missed")
+    missed.created_at = ago
+    done = _scheduled("done")
+    done.created_at = ago
+    done.last_run = datetime.now(timezone.utc)
+    tasks = SchedulerTaskList(tasks=[missed, done])
+
+    async def run():
+        return await tasks.get_due_tasks(), await tasks.get_due_tasks()
+
+    first, second = asyncio.run(run())
+    assert [task.uuid for task in first] == [missed.uuid]
+    assert second == []
+    # the following run is the next cron time after the one handed out
+    assert tasks._next_runs[missed.uuid][0] == missed.get_next_run().timestamp()  # type: ignore
+
+
+def test_wait_wakes_up_when_an_earlier_task_is_added(folder):
+    tasks = SchedulerTaskList(tasks=[])
+
+    async def run():
+        await tasks.add_task(_planned("later", 3600))
+        started = time.perf_counter()
+        waiting = asyncio.create_task(tasks.wait_until_due(10))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        await tasks.add_task(_planned("soon", 0.3))
+        await waiting
+        woken = time.perf_counter() - started
+        # woken by the add, then sleeps exactly until the new task is due
+        await tasks.wait_until_due(10)
+        return woken, time.perf_counter() - started, await tasks.get_due_tasks()
+
+    woken, due_after, due = asyncio.run(run())
+    assert woken < 0.2
+    assert 0.25 < due_after < 0.6
+    assert [task.name for task in due] == ["soon"]
+
+
+def test_tasks_json_is_only_parsed_after_an_external_change(folder, monkeypatch):
+    tasks = SchedulerTaskList(tasks=[])
+    task = _planned("task", 3600)
+    asyncio.run(tasks.add_task(task))
+
+    parsed: list[str] = []
+    validate = SchedulerTaskList.model_validate_json.__func__  # type: ignore
+
+    def counting_validate(cls, data, *args, **kwargs):
+        parsed.append(data)
+        return validate(cls, data, *args, **kwargs)
+
+    monkeypatch.setattr(SchedulerTaskList, "model_validate_json", classmethod(counting_validate))
+
+    async def run():
+        for i in range(20):
+            await tasks.get_due_tasks()
+            await tasks.update_task_by_uuid(task.uuid, lambda task: task.update(last_result=str(i)))
+
+    asyncio.run(run())
+    assert parsed == []
+
+    # another process moves the task to an earlier time
+    other = SchedulerTaskList.model_validate_json((folder / "tasks.json").read_text())
+    other.tasks[0].plan.todo = [datetime.now(timezone.utc) - timedelta(seconds=1)]
+    asyncio.run(other.save())
+    parsed.clear()
+
+    due = asyncio.run(tasks.get_due_tasks())
+    assert len(parsed) == 1
+    assert [item.uuid for item in due] == [task.uuid]
+
+
+@pytest.mark.benchmark
+def test_scheduler_heap_benchmark(folder):
+    count = 300
+    tasks = SchedulerTaskList(tasks=[])
+
+    async def populate():
+        for i in range(count):
+            await tasks.add_task(_scheduled(f"task {i}", minute=str(i % 60)))
+
+    asyncio.run(populate())
+    ticks = 20
+
+    async def legacy_ticks():
+        # previous behaviour: parse tasks.json and check every crontab on each tick
+        for _ in range(ticks):
+            await tasks.reload()
+            [task for task in tasks.tasks if task.check_schedule() and task.state == TaskState.IDLE]
+
+    async def heap_ticks():
+        for _ in range(ticks):
+            await tasks.get_due_tasks()
+
+    started = time.perf_counter()
+    asyncio.run(legacy_ticks())
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asyncio.run(heap_ticks())
+    heap_time = time.perf_counter() - started
+
+    print(
+        f"\n[scheduler heap] tasks={count} ticks={ticks} "
+        f"reparse={legacy_time / ticks * 1000:.2f}ms/tick "
+        f"heap={heap_time / ticks * 1000:.3f}ms/tick "
+        f"speedup={legacy_time / heap_time:.1f}x"
+    )
+    assert heap_time < legacy_time
@@ -0,0 +1,146 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import log as log_module
+from helpers.log import Log
+from helpers.secrets import SecretsManager, SecretsMatcher, alias_for_key
+
+
+SECRETS = {
+    "API_KEY": "sk-abc123456",
+    "API_KEY_LONG": "sk-abc123456789",
+    "PASSWORD": "hunter2hunter2",
+    "SHORT": "abc",
+}
+
+
+def _manager(secrets: dict[str, str]) -> SecretsManager:
+    manager = SecretsManager("nonexistent-secrets.env")
+    manager._secrets_cache = dict(secrets)
+    return manager
+
+
+def _sequential_mask(secrets: dict[str, str], text: str, min_length: int = 4) -> str:
+    # Reference: the per-secret replace loop the matcher replaces
+    for key, value in sorted(secrets.items(), key=lambda x: len(x[1]), reverse=True):
+        if value and len(value.strip()) >= min_length:
+            text = text.replace(value, alias_for_key(key))
+    return text
+
+
+def test_mask_values_matches_sequential_replacement():
+    manager = _manager(SECRETS)
+    texts = [
+        "",
+        "no secrets here",
+        "key=sk-abc123456 and long=sk-abc123456789!",
+        "hunter2hunter2hunter2hunter2 abc sk-abc12345",
+        "sk-abc123456sk-abc123456789sk-abc123456",
+    ]
+    for text in texts:
+        assert manager.mask_values(text) == _sequential_mask(SECRETS, text)
+
+
+def test_matcher_is_cached_and_invalidated():
+    manager = _manager(SECRETS)
+    matcher = manager.get_matcher()
+    assert manager.get_matcher() is matcher
+    assert manager.get_matcher(min_length=0) is not matcher
+
+    manager.clear_cache()
+    manager._secrets_cache = {"OTHER": "totally-secret"}
+    assert manager.get_matcher() is not matcher
+    assert manager.mask_values("sk-abc123456 totally-secret") == (
+        "sk-abc123456 " + alias_for_key("OTHER")
+    )
+
+
+def test_matcher_handles_long_and_special_values():
+    long_value = "-----BEGIN KEY-----\n" + "A+/=" * 2000 + "\n-----END KEY-----"
+    matcher = SecretsMatcher({long_value: "<KEY>", "a.b*c": "<X>", "a.b": "<Y>"})
+    assert matcher.sub(f"x{long_value}y") == "x<KEY>y"
+    assert matcher.sub("a.b*c a.b a-b") == "<X> <Y> a-b"
+
+
+def test_overlapping_values_are_masked_as_a_whole():
+    matcher = SecretsMatcher({"passw0rd123": "<A>", "xxpass": "<B>"})
+    assert matcher.sub("xxpassw0rd123") == "<A>"
+    assert matcher.sub("a xxpass b passw0rd123 c") == "a <B> b <A> c"
+    # overlaps are merged unless the following match already covers them
+    matcher = SecretsMatcher({"abcd": "<1>", "cdef": "<2>", "efgh": "<3>"})
+    assert matcher.sub("_abcdefgh_") == "_<1><3>_"
+    assert matcher.sub("_abcdefg_") == "_<1>g_"
+    # a streamed prefix is not settled while an overlapping value may follow
+    matcher = SecretsMatcher({"passw0rd123": "<A>", "xxpass": "<B>"})
+    text = "key xxpassw0rd"
+    settled, length = matcher.sub_stable(text)
+    assert "xxpass" not in settled and length <= text.index("xxpass")
+    assert settled + matcher.sub(text[length:] + "123") == "key <A>"
+
+
+def test_sub_stable_only_settles_final_text():
+    matcher = SecretsMatcher({"secret": "<S>", "secretive": "<L>"})
+    text = "a secret secreti"
+    settled, length = matcher.sub_stable(text)
+    assert settled + matcher.sub(text[length:]) == matcher.sub(text)
+    # the trailing "secreti" may still grow into "secretive"
+    assert length <= text.rindex("secreti")
+
+
+def test_streaming_filter_uses_manager_matcher():
+    manager = _manager({k: v for k, v in SECRETS.items() if k != "SHORT"})
+    stream = manager.create_streaming_filter()
+    chunks = ["pass: hun", "ter2hun", "ter2, key sk-abc1", "23456789 done"]
+    out = "".join(stream.process_chunk(c) for c in chunks) + stream.finalize()
+    assert out == (
+        f"pass: {alias_for_key('PASSWORD')}, key "
+        f"{alias_for_key('API_KEY_LONG')} done"
+    )
+
+
+@pytest.fixture
+def masked_log(monkeypatch):
+    manager = _manager(SECRETS)
+    monkeypatch.setattr(log_module, "get_secrets_manager", lambda *_: manager)
+    return Log(), manager
+
+
+def test_log_stream_masks_secrets_split_across_chunks(masked_log):
+    log, _ = masked_log
+    item = log.log(type="agent", heading="start ", content="token: sk-")
+    for chunk in ["abc1", "23456", "789 and hunter2", "hunter2", " end"]:
+        item.stream(content=chunk, heading="h", result=chunk)
+
+    full = "token: sk-abc123456789 and hunter2hunter2 end"
+    assert item.content == _sequential_mask(SECRETS, full)
+    assert item.heading == "start hhhhh"
+    assert item.kvps["result"] == _sequential_mask(SECRETS, full[len("token: sk-"):])
+
+
+def test_log_stream_restarts_after_regular_update(masked_log):
+    log, _ = masked_log
+    item = log.log(type="agent", content="hello ")
+    item.stream(content="hunter2")
+    item.update(content="reset sk-abc")
+    item.stream(content="123456 hunter2hunter2")
+    assert item.content == (
+        f"reset {alias_for_key('API_KEY')} {alias_for_key('PASSWORD')}"
+    )
+
+
+def test_log_stream_follows_reloaded_secrets(masked_log):
+    log, manager = masked_log
+    item = log.log(type="agent", content="value: ")
+    item.stream(content="new-secret-value")
+    assert item.content == "value: new-secret-value"
+
+    manager.clear_cache()
+    manager._secrets_cache = {"NEW": "new-secret-value"}
+    item.stream(content=" again")
+    assert item.content == f"value: {alias_for_key('NEW')} again"
@@ -0,0 +1,358 @@
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from helpers import embedding_cache, skills
+from helpers.embedding_cache import EmbeddingCache
+
+
+def write_skill(
+    root: Path,
+    name: str,
+    description: str,
+    tags: list[str] | None = None,
+    triggers: list[str] | None = None,
+    body: str = "",
+) -> Path:
+    folder = root / name
+    folder.mkdir(parents=True, exist_ok=True)
+    lines = ["---", f"name: {name}", f'description: "{description}"']
+    if tags:
+        lines.append(f"tags: [{', '.join(tags)}]")
+    if triggers:
+        lines.append("triggers:")
+        lines.extend(f'  - "{trigger}"' for trigger in triggers)
+    lines.extend(["---", "", body or f"# {name}\n\nSteps for {description.lower()}"])
+    path = folder / "SKILL.md"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def index(monkeypatch, tmp_path):
+    roots = [tmp_path / "skills", tmp_path / "usr_skills"]
+    for root in roots:
+        root.mkdir()
+    monkeypatch.setattr(skills, "get_skill_roots", lambda agent=None: [str(root) for root in roots])
+    index = skills._SkillsIndex(path=str(tmp_path / "skills_index.pickle"))
+    monkeypatch.setattr(skills, "_index", index)
+
+    parsed: list[str] = []
+    original = skills.skill_from_markdown
+
+    def counting(path, **kwargs):
+        parsed.append(str(path))
+        return original(path, **kwargs)
+
+    monkeypatch.setattr(skills, "skill_from_markdown", counting)
+    return index, roots, parsed
+
+
+LABELLED = [
+    ("pdf-reports", "Create PDF reports from tables and charts", ["pdf", "report"], ["export to pdf"]),
+    ("calc-spreadsheets", "Edit spreadsheets, formulas and pivot tables in Calc or Excel", ["excel", "xlsx"], []),
+    ("browser-form-workflows", "Fill complex multi-step web forms in the browser", ["browser", "forms"], []),
+    ("git-history-cleanup", "Rewrite git history, squash commits and fix authors", ["git"], ["rebase my branch"]),
+    ("docker-compose-setup", "Write docker compose files for local services", ["docker", "containers"], []),
+    ("email-triage", "Sort the inbox, draft replies and archive newsletters", ["email", "inbox"], []),
+    ("image-resizing", "Resize, crop and convert images in batch", ["images", "photos"], []),
+    ("sql-query-tuning", "Speed up slow SQL queries with indexes and query plans", ["sql", "database"], []),
+    ("unit-test-writing", "Write pytest unit tests for Python modules", ["testing", "pytest"], []),
+    ("meeting-notes", "Summarize meeting transcripts into notes and action items", ["meetings"], []),
+]
+
+QUERIES = [
+    ("Please export the quarterly sales table to PDF", "pdf-reports"),
+    ("add a pivot table to my excel workbook", "calc-spreadsheets"),
+    ("fill out the signup form on the website for me", "browser-form-workflows"),
+    ("can you rebase my branch onto main", "git-history-cleanup"),
+    ("squash the last three commits", "git-history-cleanup"),
+    ("set up postgres and redis containers with docker compose", "docker-compose-setup"),
+    ("go through my inbox and draft replies", "email-triage"),
+    ("crop all photos in this folder to 800px", "image-resizing"),
+    ("this SQL query is slow, which indexes should I add?", "sql-query-tuning"),
+    ("write tests for the parser module", "unit-test-writing"),
+    ("summarize the transcript of yesterday's meeting", "meeting-notes"),
+]
+
+
+def test_search_ranks_labelled_queries(index):
+    index, roots, parsed = index
+    for name, description, tags, triggers in LABELLED:
+        write_skill(roots[0], name, description, tags, triggers)
+    # a long body mentioning other topics ranks below focused skills
+    write_skill(
+        roots[1],
+        "general-office",
+        "Office tasks",
+        body="pdf excel email meeting docker git sql images " * 50,
+    )
+
+    for query, expected in QUERIES:
+        found = [skill.name for skill in skills.search_skills(query, limit=3)]
+        assert found and found[0] == expected, (query, found)
+
+    assert skills.search_skills("rebase my branch")[0].name == "git-history-cleanup"
+    assert skills.search_skills("the and of") == []
+    assert skills.search_skills("") == []
+
+
+def test_watched_index_applies_file_events_only(index):
+    index, roots, parsed = index
+    first = write_skill(roots[0], "alpha-skill", "First skill")
+    write_skill(roots[1], "beta-skill", "Second skill")
+    index.watch()
+    assert [s.name for s in skills.list_skills()] == ["alpha-skill", "beta-skill"]
+    assert len(parsed) == 2
+
+    assert [s.name for s in skills.search_skills("first")] == ["alpha-skill"]
+
+    # served from memory until the watchdog reports the change
+    write_skill(roots[0], "alpha-skill", "Renamed description with more words")
+    assert skills.find_skill("alpha-skill").description == "First skill"
+    index.changed([[str(first), "modify"]])
+    assert skills.find_skill("alpha-skill").description == "Renamed description with more words"
+    assert len(parsed) == 3
+    # the search corpus is patched in place
+    assert skills.search_skills("first") == []
+    assert [s.name for s in skills.search_skills("renamed words")] == ["alpha-skill"]
+
+    added = write_skill(roots[1], "gamma-skill", "Third skill")
+    index.changed([[str(added.parent), "create"], [str(added), "create"]])
+    assert [s.name for s in skills.list_skills()] == ["alpha-skill", "beta-skill", "gamma-skill"]
+    # the new folder rescans its root, unchanged files are not parsed again
+    assert parsed[3:] == [str(added)]
+
+    shutil.rmtree(roots[1] / "beta-skill")
+    index.changed([[str(roots[1] / "beta-skill"), "delete"]])
+    assert [s.name for s in skills.list_skills()] == ["alpha-skill", "gamma-skill"]
+    assert skills.find_skill("beta-skill") is None
+
+    # content is only returned on request and copies do not leak into the index
+    loaded = skills.find_skill("gamma-skill", include_content=True)
+    assert "Steps for third skill" in loaded.content
+    loaded.tags.append("changed")
+    assert skills.list_skills()[1].content == ""
+    assert skills.find_skill("gamma-skill").tags == []
+
+
+def test_unwatched_index_reparses_changed_files_only(index):
+    index, roots, parsed = index
+    paths = [write_skill(roots[0], f"skill-{i}", f"Skill number {i}") for i in range(5)]
+    assert len(skills.list_skills()) == 5
+    assert len(parsed) == 5
+
+    write_skill(roots[0], "skill-2", "Skill number two, now longer")
+    paths[4].unlink()
+    assert [s.description for s in skills.list_skills()][2] == "Skill number two, now longer"
+    assert len(skills.list_skills()) == 4
+    assert parsed[5:] == [str(paths[2])]
+
+
+def test_index_is_persisted_between_processes(index, monkeypatch, tmp_path):
+    index, roots, parsed = index
+    for i in range(4):
+        write_skill(roots[0], f"skill-{i}", f"Skill number {i}")
+    assert len(skills.list_skills()) == 4
+    index.flush()
+
+    restarted = skills._SkillsIndex(path=index.path)
+    monkeypatch.setattr(skills, "_index", restarted)
+    parsed.clear()
+    assert [s.name for s in skills.list_skills()] == [f"skill-{i}" for i in range(4)]
+    assert parsed == []
+
+    # a corrupt file only costs a reparse
+    Path(index.path).write_bytes(b"not a pickle")
+    monkeypatch.setattr(skills, "_index", skills._SkillsIndex(path=index.path))
+    assert len(skills.list_skills()) == 4
+    assert len(parsed) == 4
+
+
+def test_skills_watchdog_updates_the_index(index, monkeypatch):
+    from helpers import watchdog
+
+    index, roots, parsed = index
+    handlers = {}
+    monkeypatch.setattr(
+        watchdog,
+        "add_watchdog",
+        lambda id, roots, handler, **kwargs: handlers.setdefault(id, (kwargs["patterns"], handler)),
+    )
+    skills.register_watchdogs()
+    assert set(handlers) == {"skills_index"}
+    assert index.watched
+
+    patterns, handler = handlers["skills_index"]
+    assert skills.list_skills() == []
+    path = write_skill(roots[0], "alpha-skill", "First skill")
+    assert skills.list_skills() == []  # not reported yet
+    handler([[str(path), "create"]])
+    assert [s.name for s in skills.list_skills()] == ["alpha-skill"]
+
+    # the same patterns on a real observer
+    monkeypatch.undo()
+    monkeypatch.setattr(skills, "get_skill_roots", lambda agent=None: [str(root) for root in roots])
+    monkeypatch.setattr(skills, "_index", index)
+    watchdog.add_watchdog(
+        id="test_skills_index",
+        roots=[str(roots[0].parent)],
+        patterns=patterns,
+        debounce=0.01,
+        handler=index.changed,
+    )
+    try:
+        write_skill(roots[0], "beta-skill", "Second skill")
+        deadline = time.time() + 5
+        while time.time() < deadline and len(skills.list_skills()) < 2:
+            time.sleep(0.02)
+        assert [s.name for s in skills.list_skills()] == ["alpha-skill", "beta-skill"]
+    finally:
+        watchdog.remove_watchdog("test_skills_index")
+
+
+TOPICS = ["spreadsheet", "excel", "workbook", "invoice", "browser", "website", "photo", "image"]
+
+
+class TopicEmbeddings(Embeddings):
+    """Related words share a dimension, so synonyms without common terms are close."""
+
+    def __init__(self):
+        self.model_name = "test/skill-topics"
+        self.documents: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.documents.extend(texts)
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        text = text.lower()
+        groups = [TOPICS[0:3], TOPICS[3:4], TOPICS[4:6], TOPICS[6:8]]
+        vector = np.array([sum(text.count(word) for word in group) for group in groups], dtype=np.float32)
+        return (vector + 0.01).tolist()
+
+
+def test_embeddings_are_blended_and_cached_by_content(index, monkeypatch):
+    index, roots, parsed = index
+    monkeypatch.setattr(embedding_cache, "get_cache", lambda: EmbeddingCache())
+    write_skill(roots[0], "calc-sheets", "Work with an Excel workbook")
+    write_skill(roots[0], "web-forms", "Fill forms on a website")
+    write_skill(roots[0], "photo-tools", "Resize a photo")
+    model = TopicEmbeddings()
+
+    # no shared term, only the embedding finds it
+    assert skills.search_skills("update my spreadsheet") == []
+    found = skills.search_skills("update my spreadsheet", embeddings=model)
+    assert [s.name for s in found] == ["calc-sheets"]
+    assert len(model.documents) == 3
+
+    # lexical matches still lead
+    found = skills.search_skills("fill the forms", embeddings=model)
+    assert found[0].name == "web-forms"
+    assert len(model.documents) == 3
+
+    # a changed skill is embedded again, the others come from memory
+    path = write_skill(roots[0], "photo-tools", "Resize an image or photo")
+    index.watch()
+    skills.list_skills()
+    index.changed([[str(path), "modify"]])
+    assert skills.search_skills("image please", embeddings=model)[0].name == "photo-tools"
+    assert model.documents[3:] == ["photo-tools\nResize an image or photo"]
+
+
+WORDS = (
+    "account agent alert api archive audio backup batch billing blog browser budget cache calendar "
+    "camera chart chat cloud code commit config contract crawler csv dashboard data database deploy "
+    "design diagram docker document domain email export feed file finance form git graph image "
+    "import inbox invoice json kubernetes label lead linux log map markdown meeting metric model "
+    "monitor network note notebook order password payment pdf photo pipeline plugin podcast "
+    "presentation printer project python query queue recipe report research resume schedule "
+    "scraper script search server sheet shell slide sql survey task template terminal test ticket "
+    "timeline translation travel tweet upload user video vpn weather webhook website wiki workflow"
+).split()
+
+
+@pytest.mark.benchmark
+def test_skills_index_benchmark(monkeypatch, tmp_path):
+    count = 2000
+    root = tmp_path / "skills"
+    root.mkdir()
+    rng = random.Random(7)
+    names = []
+    for i in range(count):
+        topic = rng.sample(WORDS, 4)
+        name = f"{topic[0]}-{topic[1]}-{i}"
+        names.append(name)
+        write_skill(
+            root,
+            name,
+            f"Handle {' and '.join(topic)} tasks",
+            tags=topic[2:],
+            body=" ".join(rng.choice(WORDS) for _ in range(300)),
+        )
+    monkeypatch.setattr(skills, "get_skill_roots", lambda agent=None: [str(root)])
+    queries = [" ".join(rng.sample(WORDS, 3)) for _ in range(20)]
+
+    def legacy_lookup(query: str):
+        # previous behaviour: walk, read and parse every SKILL.md, then score substrings
+        found = []
+        for path in skills.discover_skill_md_files(root):
+            skill = skills.skill_from_markdown(path)
+            if skill and any(term in skill.name or term in skill.description for term in query.split()):
+                found.append(skill)
+        return found
+
+    started = time.perf_counter()
+    for query in queries[:3]:
+        legacy_lookup(query)
+    legacy_time = (time.perf_counter() - started) / 3
+
+    index = skills._SkillsIndex(path=str(tmp_path / "skills_index.pickle"))
+    monkeypatch.setattr(skills, "_index", index)
+    index.watch()
+    started = time.perf_counter()
+    assert len(skills.list_skills()) == count
+    assert skills.search_skills(queries[0], limit=6)
+    cold_time = time.perf_counter() - started
+    index.flush()
+
+    started = time.perf_counter()
+    for query in queries:
+        assert skills.search_skills(query, limit=6)
+    warm_time = (time.perf_counter() - started) / len(queries)
+
+    restarted = skills._SkillsIndex(path=index.path)
+    monkeypatch.setattr(skills, "_index", restarted)
+    started = time.perf_counter()
+    assert len(skills.list_skills()) == count
+    disk_time = time.perf_counter() - started
+    restarted.watch()
+    skills.search_skills(queries[0])
+
+    updates = 10
+    started = time.perf_counter()
+    for i in range(updates):
+        path = write_skill(root, names[i], f"Handle zeppelin maintenance {i}")
+        restarted.changed([[str(path), "modify"]])
+        assert skills.search_skills("zeppelin maintenance", limit=1)
+    update_time = (time.perf_counter() - started) / updates
+
+    print(
+        f"\n[skills index] skills={count} legacy_lookup={legacy_time * 1000:.0f}ms "
+        f"cold_build={cold_time * 1000:.0f}ms cold_from_disk={disk_time * 1000:.0f}ms "
+        f"warm_search={warm_time * 1000:.2f}ms incremental_update={update_time * 1000:.1f}ms "
+        f"speedup={legacy_time / warm_time:.1f}x"
+    )
+    assert warm_time < legacy_time / 5
+    assert disk_time < cold_time
+    assert update_time < legacy_time
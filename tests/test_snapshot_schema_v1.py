@@ -26,6 +26,7 @@ EXPECTED_SNAPSHOT_KEYS = {
     "notifications",
     "notifications_guid",
     "notifications_version",
+    "list_patch",
 }
 
 
@@ -55,6 +56,7 @@ async def test_poll_snapshot_matches_contract_schema_key_set_null_context():
     assert payload["log_progress"] == 0
     assert payload["log_progress_active"] is False
     assert payload["paused"] is False
+    assert payload["list_patch"] is None
 
 
 @pytest.mark.asyncio
@@ -78,6 +80,7 @@ async def test_snapshot_builder_produces_contract_schema_key_set_and_defaults():
     assert payload["log_progress"] == 0
     assert payload["log_progress_active"] is False
     assert payload["paused"] is False
+    assert payload["list_patch"] is None
     assert isinstance(payload["contexts"], list)
     assert isinstance(payload["tasks"], list)
     assert isinstance(payload["notifications"], list)
@@ -0,0 +1,249 @@
+import asyncio
+import importlib
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from agent import AgentContextType
+from helpers import state_snapshot
+from helpers.state_snapshot import StateRequestV1, validate_snapshot_schema_v1
+
+
+class FakeContext:
+    outputs = 0
+
+    def __init__(self, no: int, type: AgentContextType = AgentContextType.USER):
+        self.id = f"ctx-{no}"
+        self.no = no
+        self.type = type
+        self.name = f"chat {no}"
+        self.log_version = 0
+
+    def output(self):
+        type(self).outputs += 1
+        return {
+            "id": self.id,
+            "name": self.name,
+            "created_at": f"2026-01-01T00:{self.no // 60:02d}:{self.no % 60:02d}",
+            "log_version": self.log_version,
+            "type": self.type.value,
+        }
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.tasks: dict[str, dict] = {}
+
+    def get_task_by_uuid(self, uuid):
+        return SimpleNamespace(context_id=uuid) if uuid in self.tasks else None
+
+    def serialize_task(self, uuid):
+        return self.tasks.get(uuid)
+
+
+@pytest.fixture
+def world(monkeypatch):
+    # other tests may have re-imported helpers.* after this module was collected
+    snapshot_module = importlib.import_module("helpers.state_snapshot")
+    monkeypatch.setattr(sys.modules[__name__], "state_snapshot", snapshot_module)
+    contexts: dict[str, FakeContext] = {}
+    scheduler = FakeScheduler()
+    notifications = SimpleNamespace(output=lambda start=0: [], guid="n", updates=[])
+    monkeypatch.setattr(
+        snapshot_module,
+        "AgentContext",
+        SimpleNamespace(
+            all=lambda: list(contexts.values()),
+            get=lambda ctxid: None,
+            get_notification_manager=lambda: notifications,
+        ),
+    )
+    monkeypatch.setattr(snapshot_module.TaskScheduler, "get", staticmethod(lambda: scheduler))
+    monkeypatch.setattr(snapshot_module, "_get_agent_profile_labels", lambda: {})
+    monkeypatch.setattr(snapshot_module, "_chat_lists", {})
+    FakeContext.outputs = 0
+    return contexts, scheduler
+
+
+def _add(contexts: dict, *numbers: int, **kwargs) -> None:
+    for no in numbers:
+        ctx = FakeContext(no, **kwargs)
+        contexts[ctx.id] = ctx
+
+
+def _snapshot(known=None):
+    request = StateRequestV1(context=None, log_from=0, notifications_from=0, timezone="UTC")
+    chat_list = state_snapshot.get_chat_list("UTC")
+    snapshot = asyncio.run(
+        state_snapshot.build_snapshot_from_request(
+            request=request, chat_list=chat_list, known_list=known
+        )
+    )
+    validate_snapshot_schema_v1(snapshot)
+    return snapshot, chat_list.versions()
+
+
+def _apply(lists: dict, patch: dict) -> dict:
+    # mirrors patchList() in webui/index.js
+    result = {}
+    for kind in state_snapshot.LIST_KINDS:
+        removed = set(patch[kind]["removed"])
+        put = {item["id"]: item for item in patch[kind]["put"]}
+        result[kind] = [
+            item for item in lists[kind] if item["id"] not in removed and item["id"] not in put
+        ] + list(put.values())
+    return result
+
+
+def _ids(items) -> list[str]:
+    return sorted(item["id"] for item in items)
+
+
+def test_patch_carries_only_changed_contexts(world):
+    contexts, scheduler = world
+    _add(contexts, 1, 2, 3)
+    _add(contexts, 4, type=AgentContextType.BACKGROUND)
+
+    full, versions = _snapshot()
+    assert full["list_patch"] is None
+    assert [c["id"] for c in full["contexts"]] == ["ctx-3", "ctx-2", "ctx-1"]
+    lists = {"contexts": full["contexts"], "tasks": full["tasks"]}
+
+    # nothing changed: empty patch and no rebuild
+    outputs = FakeContext.outputs
+    delta, versions = _snapshot(versions)
+    assert delta["contexts"] == [] and delta["tasks"] == []
+    assert all(not part["put"] and not part["removed"] for part in delta["list_patch"].values())
+    assert FakeContext.outputs == outputs
+
+    # one log line rebuilds a single entry
+    contexts["ctx-2"].log_version = 5
+    state_snapshot.invalidate_chat_list("ctx-2")
+    delta, versions = _snapshot(versions)
+    assert FakeContext.outputs == outputs + 1
+    assert [c["id"] for c in delta["list_patch"]["contexts"]["put"]] == ["ctx-2"]
+    lists = _apply(lists, delta["list_patch"])
+
+    # new, removed and task contexts are picked up without explicit invalidation
+    _add(contexts, 5, 6)
+    del contexts["ctx-1"]
+    scheduler.tasks["ctx-6"] = {"name": "job", "type": "adhoc", "token": "t"}
+    state_snapshot.invalidate_chat_list("ctx-6")
+    delta, versions = _snapshot(versions)
+    assert delta["list_patch"]["contexts"]["removed"] == ["ctx-1"]
+    lists = _apply(lists, delta["list_patch"])
+
+    expected, _ = _snapshot()
+    assert _ids(lists["contexts"]) == _ids(expected["contexts"]) == ["ctx-2", "ctx-3", "ctx-5"]
+    assert lists["tasks"] == expected["tasks"]
+    assert expected["tasks"][0]["task_name"] == "job"
+    assert next(c for c in lists["contexts"] if c["id"] == "ctx-2")["log_version"] == 5
+
+    # a chat turning into a task moves between the lists
+    scheduler.tasks["ctx-3"] = {"name": "promoted", "type": "adhoc"}
+    state_snapshot.invalidate_chat_list()
+    delta, versions = _snapshot(versions)
+    assert delta["list_patch"]["contexts"]["removed"] == ["ctx-3"]
+    assert [t["id"] for t in delta["list_patch"]["tasks"]["put"]] == ["ctx-3"]
+
+
+def test_unchanged_rebuild_keeps_versions(world):
+    contexts, _ = world
+    _add(contexts, 1, 2)
+    _, versions = _snapshot()
+    state_snapshot.invalidate_chat_list()
+    _, again = _snapshot()
+    assert again == versions
+
+
+def test_state_monitor_pushes_full_lists_then_patches(world):
+    StateMonitor = pytest.importorskip("helpers.state_monitor", exc_type=ImportError).StateMonitor
+
+    contexts, _ = world
+    _add(contexts, 1, 2)
+    pushes: dict[str, list[dict]] = {"sid-a": [], "sid-b": []}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        done = asyncio.Event()
+
+        async def emit_to(namespace, sid, event_type, payload, **kwargs):
+            pushes[sid].append(payload["snapshot"])
+            if all(len(items) >= 2 for items in pushes.values()):
+                done.set()
+
+        manager = SimpleNamespace(_dispatcher_loop=loop, emit_to=emit_to)
+        monitor = StateMonitor(debounce_seconds=0.0)
+        monitor.bind_manager(manager, handler_id="test")  # type: ignore
+        for sid in pushes:
+            monitor.register_sid("/ws", sid)
+            monitor.update_projection(
+                "/ws",
+                sid,
+                request=StateRequestV1(context=None, log_from=0, notifications_from=0, timezone="UTC"),
+                seq_base=1,
+            )
+            monitor.mark_dirty("/ws", sid)
+        while not all(pushes.values()):
+            await asyncio.sleep(0.01)
+
+        outputs = FakeContext.outputs
+        contexts["ctx-1"].log_version = 3
+        monitor.mark_dirty_all(reason="test", context_id="ctx-1")
+        await asyncio.wait_for(done.wait(), timeout=2)
+        return outputs
+
+    outputs = asyncio.run(run())
+
+    for sid, snapshots in pushes.items():
+        first, second = snapshots[0], snapshots[1]
+        assert first["list_patch"] is None and len(first["contexts"]) == 2
+        assert second["contexts"] == []
+        assert [c["id"] for c in second["list_patch"]["contexts"]["put"]] == ["ctx-1"]
+    # one rebuild of the changed context is shared by both sids
+    assert FakeContext.outputs == outputs + 1
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("sids,count", [(10, 300)])
+def test_chat_list_load(world, sids, count):
+    contexts, _ = world
+    _add(contexts, *range(count))
+    waves = 30
+
+    def run(shared: bool) -> tuple[float, int]:
+        FakeContext.outputs = 0
+        known = [_snapshot()[1] for _ in range(sids)]
+        started = time.perf_counter()
+        for wave in range(waves):
+            ctx = contexts[f"ctx-{wave}"]
+            ctx.log_version += 1
+            state_snapshot.invalidate_chat_list(ctx.id)
+            for sid in range(sids):
+                if not shared:
+                    # previous behaviour: every sid rebuilt and sent the full lists
+                    state_snapshot.invalidate_chat_list()
+                    _snapshot()
+                    continue
+                snapshot, known[sid] = _snapshot(known[sid])
+                assert [c["id"] for c in snapshot["list_patch"]["contexts"]["put"]] == [ctx.id]
+        return time.perf_counter() - started, FakeContext.outputs
+
+    legacy_time, legacy_outputs = run(shared=False)
+    shared_time, shared_outputs = run(shared=True)
+    print(
+        f"\n[chat list] sids={sids} contexts={count} waves={waves} "
+        f"per_sid_full={legacy_time * 1000:.1f}ms ({legacy_outputs} serializations) "
+        f"shared_delta={shared_time * 1000:.1f}ms ({shared_outputs} serializations) "
+        f"speedup={legacy_time / shared_time:.1f}x"
+    )
+    assert legacy_outputs >= waves * sids * count
+    assert shared_outputs <= count + waves
+    assert shared_time < legacy_time
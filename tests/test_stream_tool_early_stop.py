@@ -94,3 +94,23 @@ async def test_unified_call_stops_after_canonical_root_snapshot(monkeypatch):
     assert stream.index == 1
     assert len(seen) == 1
     assert seen[0][1] == '{"tool_name":"response","tool_args":{"text":"hello"}} trailing text'
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        'prefix {"tool_name":"response","tool_args":{"text":"brace } inside"}} '
+        "trailing noise",
+        '```json\n{"tool_name":"response","tool_args":{"text":"a"}}}}\n```',
+        '[{"tool_name":"response"}] {"tool_name":"x","tool_args":{}}',
+    ],
+)
+def test_json_root_stream_matches_extract_json_root_string(text):
+    root = extract_tools.JsonRootStream()
+
+    for end in range(1, len(text) + 1):
+        prefix = text[:end]
+        expected = extract_tools.extract_json_root_string(prefix)
+        assert root.update(prefix) == expected
+        if expected:
+            assert root.result == extract_tools.json_parse_dirty(expected)
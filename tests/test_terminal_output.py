@@ -0,0 +1,209 @@
+import asyncio
+import io
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._code_execution.helpers.terminal_output import TerminalOutput, clean_string
+
+PROMPT = "root@host:/root# "
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    pytest.importorskip("paramiko", exc_type=ImportError)
+    # tty_session reconfigures stdin on import, pytest's capture has no reconfigure
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO()))
+    from plugins._code_execution.helpers import shell_local
+    from plugins._code_execution.tools import code_execution_tool
+
+    return shell_local, code_execution_tool
+
+
+def test_incremental_cleaning_matches_cleaning_everything():
+    pieces = ["ok", " ", "\r", "\n", "\r\n", ">", "\x00", "\x1b", "[", "1;3", "m", "\x1b[0m", "\t", "é"]
+    rng = random.Random(7)
+    for _ in range(3000):
+        raw = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+        output = TerminalOutput()
+        fed = 0
+        while fed < len(raw):
+            size = rng.randint(1, 6)
+            output.feed(raw[fed : fed + size])
+            fed += size
+            expected = clean_string(raw[:fed])
+            assert output.text() == expected, repr(raw[:fed])
+            assert len(output) == len(expected)
+            assert output.last_lines(3) == expected.splitlines()[-3:]
+
+
+def test_progress_rewrites_and_preview_stay_bounded():
+    output = TerminalOutput()
+    output.feed("\r\n> building\r\n")
+    for i in range(10000):
+        output.feed(f"\r{i}% \x1b[32m####\x1b[0m")
+    # carriage returns overwrite the unfinished line instead of growing it
+    assert len(output._line) < 40
+    assert output.text() == "building\n9999% ####"
+
+    output.feed("\n")
+    for i in range(5000):
+        output.feed(f"compiling module {i}\n")
+    preview = output.preview(1000)
+    assert len(preview) < 1100
+    assert preview.startswith("building\n9999% ####\ncompiling module 0")
+    assert preview.endswith("compiling module 4999\n")
+    assert "Characters hidden" in preview
+
+
+class FakeShell:
+    def __init__(self):
+        self.output = TerminalOutput()
+        self.chunks: asyncio.Queue = asyncio.Queue()
+
+    async def read_new_output(self, timeout=0, reset_full_output=False):
+        if reset_full_output:
+            self.output.reset()
+        try:
+            chunk = await asyncio.wait_for(self.chunks.get(), timeout) if timeout > 0 else self.chunks.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            return None
+        self.output.feed(chunk)
+        return clean_string(chunk)
+
+
+def _tool(code_execution_tool, shell: FakeShell):
+    CodeExecution = code_execution_tool.CodeExecution
+    ShellWrap = code_execution_tool.ShellWrap
+    State = code_execution_tool.State
+
+    class Agent:
+        intervention = None
+
+        async def handle_intervention(self):
+            pass
+
+        def read_prompt(self, name, **kwargs):
+            return f"{name} {kwargs}"
+
+    class Log:
+        def __init__(self):
+            self.updates: list[dict] = []
+
+        def update(self, **kwargs):
+            self.updates.append(kwargs)
+
+    tool = CodeExecution.__new__(CodeExecution)
+    tool.agent = Agent()  # type: ignore
+    tool.log = Log()  # type: ignore
+    tool.args = {"runtime": "terminal"}
+    tool.name = "code_execution_tool"
+    state = State(ssh_enabled=False, shells={0: ShellWrap(id=0, session=shell, running=True)})  # type: ignore
+
+    async def prepare_state(cfg, reset=False, session=None):
+        return state
+
+    async def set_progress(content):
+        tool.progress = content
+
+    tool.prepare_state = prepare_state  # type: ignore
+    tool.set_progress = set_progress  # type: ignore
+    return tool
+
+
+CONFIG = {
+    "prompt_patterns": [re.compile(r"root@[^:]+:[^#]+# ?$")],
+    "dialog_patterns": [re.compile(r"Y/N", re.IGNORECASE)],
+}
+
+
+def test_tool_returns_when_the_prompt_arrives(sessions):
+    async def run():
+        shell = FakeShell()
+        tool = _tool(sessions[1], shell)
+
+        async def command():
+            await asyncio.sleep(0.05)
+            shell.chunks.put_nowait("file_a\r\nfile_b\r\n")
+            await asyncio.sleep(0.01)
+            shell.chunks.put_nowait(PROMPT)
+
+        started = time.perf_counter()
+        asyncio.get_running_loop().create_task(command())
+        result = await tool.get_terminal_output(CONFIG, prefix="bash> ls\n\n", timeouts={})
+        return time.perf_counter() - started, result, tool
+
+    elapsed, result, tool = asyncio.run(run())
+    assert result == "file_a\nfile_b\n" + PROMPT.rstrip()
+    # no fixed polling interval before the prompt is noticed
+    assert elapsed < 0.3
+    assert tool.log.updates[-1]["content"] == "bash> ls\n\n" + result
+    assert "done_all" in tool.log.updates[-1]["heading"]
+
+
+def test_local_session_streams_output_as_it_arrives(sessions, monkeypatch):
+    shell_local = sessions[0]
+    # no rc files, their startup time is not what is measured here
+    monkeypatch.setattr(shell_local.runtime, "get_terminal_executable", lambda: "/bin/bash --norc --noprofile")
+
+    async def run():
+        session = shell_local.LocalInteractiveSession()
+        await session.connect()
+        try:
+            await session.send_command("echo first; sleep 0.3; echo second")
+            started = time.perf_counter()
+            while "first" not in session.output.text():
+                await session.read_new_output(timeout=5)
+            first_after = time.perf_counter() - started
+            while "second" not in session.output.text():
+                await session.read_new_output(timeout=5)
+            return first_after, time.perf_counter() - started, session.output.text()
+        finally:
+            await session.close()
+
+    first_after, second_after, text = asyncio.run(run())
+    # each line is read as soon as it is printed
+    assert first_after < 0.25
+    assert 0.3 <= second_after < 0.6
+    lines = text.splitlines()
+    assert lines.index("second") == lines.index("first") + 1
+
+
+@pytest.mark.benchmark
+def test_terminal_output_benchmark():
+    chunks = [
+        f"\x1b[32m[{i:05d}]\x1b[0m compiling src/module_{i}.c ... ok\r\n" * 4 for i in range(600)
+    ]
+
+    started = time.perf_counter()
+    # previous behaviour: accumulate and clean everything again for every read
+    raw = ""
+    for chunk in chunks:
+        raw += chunk
+        clean_string(chunk)
+        clean_string(raw).splitlines()[-3:]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    output = TerminalOutput()
+    for chunk in chunks:
+        output.feed(chunk)
+        clean_string(chunk)
+        output.last_lines(3)
+    incremental_time = time.perf_counter() - started
+
+    assert output.text() == clean_string(raw)
+    print(
+        f"\n[terminal output] chunks={len(chunks)} chars={len(raw)} "
+        f"reclean={legacy_time * 1000:.1f}ms incremental={incremental_time * 1000:.1f}ms "
+        f"speedup={legacy_time / incremental_time:.1f}x"
+    )
+    assert incremental_time < legacy_time
@@ -5,6 +5,7 @@ import shutil
 import subprocess
 import sys
 import threading
+import time
 import uuid
 from pathlib import Path
 from types import ModuleType, SimpleNamespace
@@ -373,3 +374,247 @@ def test_workspace_resolution_prefers_project_and_rejects_external_paths(monkeyp
     projects_mod.get_context_project_name = lambda _context: ""
     with pytest.raises(WorkspaceRejectedError):
         resolve_workspace("ctx", context_loader=lambda _ctxid: SimpleNamespace(id="ctx"))
+
+
+def full_restage_tree(service: TimeTravelService) -> str:
+    return service._stage_current_tree()[0]
+
+
+def test_incremental_snapshot_writes_the_tree_of_a_full_restage(workspace):
+    root, service = workspace
+    tt._STAGED_INDEXES.clear()
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "src" / "pkg" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (root / "src" / "pkg" / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (root / "docs").mkdir()
+    (root / "docs" / "guide.md").write_text("guide\n", encoding="utf-8")
+    (root / "old.txt").write_text("old\n", encoding="utf-8")
+    (root / "sub").mkdir()
+    (root / "sub" / "kept.txt").write_text("kept\n", encoding="utf-8")
+    (root / "swap").write_text("file first\n", encoding="utf-8")
+    service.snapshot(trigger="manual")
+
+    (root / "src" / "pkg" / "a.py").write_text("a = 2\n", encoding="utf-8")
+    (root / "old.txt").unlink()
+    shutil.rmtree(root / "docs")
+    (root / "moved" / "deep").mkdir(parents=True)
+    (root / "moved" / "deep" / "n.txt").write_text("new\n", encoding="utf-8")
+    (root / "moved" / "node_modules").mkdir()
+    (root / "moved" / "node_modules" / "dep.js").write_text("ignored\n", encoding="utf-8")
+    (root / "moved" / "cache.pyc").write_bytes(b"ignored")
+    (root / "a*.txt").write_text("literal name\n", encoding="utf-8")
+    (root / "swap").unlink()
+    (root / "swap").mkdir()
+    (root / "swap" / "inner.txt").write_text("now a directory\n", encoding="utf-8")
+    os.symlink("src/pkg/b.py", root / "link.py")
+    # a nested repository drops the files that were tracked below it
+    (root / "sub" / ".git").mkdir()
+    (root / "sub" / "new.txt").write_text("inside nested repo\n", encoding="utf-8")
+
+    display = service.workspace.display_path
+    hints = [
+        f"{display}/src/pkg/a.py",
+        f"{display}/old.txt",
+        f"{display}/docs",
+        f"{display}/moved",
+        f"{display}/a*.txt",
+        f"{display}/swap",
+        f"{display}/link.py",
+        f"{display}/sub/new.txt",
+        "/a0/usr/elsewhere/file.txt",
+    ]
+    snapshot = service.snapshot(trigger="watchdog", changed_path_hints=hints, incremental=True)
+    assert snapshot.created
+    incremental_tree = snapshot.tree_hash
+    assert tracked_paths(service) == {
+        "src/pkg/a.py",
+        "src/pkg/b.py",
+        "moved/deep/n.txt",
+        "a*.txt",
+        "swap/inner.txt",
+        "link.py",
+    }
+    assert full_restage_tree(service) == incremental_tree
+
+
+def test_incremental_snapshot_falls_back_to_a_full_restage(workspace, monkeypatch: pytest.MonkeyPatch):
+    root, service = workspace
+    tt._STAGED_INDEXES.clear()
+    (root / "a.txt").write_text("one\n", encoding="utf-8")
+    service.snapshot(trigger="manual")
+    restaged: list[bool] = []
+    stage = TimeTravelService._stage_current_tree
+
+    def counting_stage(self):
+        restaged.append(True)
+        return stage(self)
+
+    monkeypatch.setattr(TimeTravelService, "_stage_current_tree", counting_stage)
+    hint = [f"{service.workspace.display_path}/a.txt"]
+
+    # a missed event is picked up by the periodic full restage
+    (root / "a.txt").write_text("two\n", encoding="utf-8")
+    (root / "missed.txt").write_text("no event\n", encoding="utf-8")
+    service.snapshot(trigger="watchdog", changed_path_hints=hint, incremental=True)
+    assert restaged == [] and "missed.txt" not in tracked_paths(service)
+    monkeypatch.setattr(tt, "FULL_RESTAGE_INTERVAL_SECONDS", 0.0)
+    (root / "a.txt").write_text("three\n", encoding="utf-8")
+    service.snapshot(trigger="watchdog", changed_path_hints=hint, incremental=True)
+    assert restaged == [True] and "missed.txt" in tracked_paths(service)
+    monkeypatch.setattr(tt, "FULL_RESTAGE_INTERVAL_SECONDS", 600.0)
+
+    # an index written by anything else is not trusted
+    service._git("read-tree", "--empty")
+    (root / "a.txt").write_text("four\n", encoding="utf-8")
+    service.snapshot(trigger="watchdog", changed_path_hints=hint, incremental=True)
+    assert restaged == [True, True] and tracked_paths(service) == {"a.txt", "missed.txt"}
+
+    # debounced requests without hints restage everything
+    tt.clear_debounced_snapshots()
+    try:
+        (root / "a.txt").write_text("five\n", encoding="utf-8")
+        tt.schedule_debounced_snapshot(service.workspace, trigger="watchdog", changed_path_hints=hint, delay=60)
+        tt.schedule_debounced_snapshot(service.workspace, trigger="code_execution_tool", delay=60)
+        tt.flush_debounced_snapshots()
+    finally:
+        tt.clear_debounced_snapshots()
+    assert restaged == [True, True, True]
+
+
+@pytest.mark.benchmark
+def test_incremental_snapshot_benchmark(workspace):
+    root, service = workspace
+    tt._STAGED_INDEXES.clear()
+    file_count = 50_000
+    for folder in range(file_count // 500):
+        folder_path = root / f"pkg{folder:03d}"
+        folder_path.mkdir()
+        for i in range(500):
+            (folder_path / f"mod{i:03d}.py").write_text(f"value = {folder * 500 + i}\n", encoding="utf-8")
+    # the index of the previous snapshot
+    full_restage_tree(service)
+
+    touched = [f"pkg{folder * 10:03d}/mod{folder:03d}.py" for folder in range(10)]
+    for rel in touched:
+        (root / rel).write_text("value = 'changed'\n", encoding="utf-8")
+    hints = [f"{service.workspace.display_path}/{rel}" for rel in touched]
+
+    started = time.perf_counter()
+    incremental_tree = service._stage_changed_paths(hints)[0]  # type: ignore[index]
+    incremental_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    full_tree = full_restage_tree(service)  # previous behaviour for every snapshot
+    full_time = time.perf_counter() - started
+
+    print(
+        f"\n[time travel] files={file_count} touched={len(touched)} "
+        f"full_restage={full_time * 1000:.0f}ms incremental={incremental_time * 1000:.0f}ms "
+        f"speedup={full_time / incremental_time:.1f}x"
+    )
+    assert incremental_tree == full_tree
+    assert incremental_time < full_time
+
+
+def legacy_filtered_hashes(service: TimeTravelService, file_filter: str) -> list[str]:
+    # previous behaviour: the changed files of every commit from git
+    return [
+        commit_hash
+        for commit_hash in service._rev_list_all()
+        if any(
+            file_filter in str(item.get("path") or "").lower()
+            or file_filter in str(item.get("old_path") or "").lower()
+            for item in service.commit_files(commit_hash)
+        )
+    ]
+
+
+def filtered_hashes(service: TimeTravelService, file_filter: str) -> list[str]:
+    listing = service.history_list(limit=200, file_filter=file_filter)
+    return [commit["hash"] for commit in listing["commits"]]
+
+
+def test_history_file_filter_is_answered_from_the_paths_index(workspace, monkeypatch: pytest.MonkeyPatch):
+    root, service = workspace
+    (root / "src").mkdir()
+    (root / "src" / "Main.py").write_text("print('one')\n" * 20, encoding="utf-8")
+    (root / "notes.md").write_text("notes\n", encoding="utf-8")
+    first = service.snapshot(trigger="manual").hash
+    (root / "src" / "Main.py").rename(root / "src" / "app.py")
+    service.snapshot(trigger="manual")
+    (root / "notes.md").write_text("more notes\n", encoding="utf-8")
+    service.snapshot(trigger="manual")
+
+    index_file = service.workspace.shadow_path / tt.HISTORY_PATHS_FILE
+    assert len(tt.json.loads(index_file.read_text())["commits"]) == 3
+    for file_filter in ("main", "SRC/APP", "notes", ".py", "missing"):
+        assert filtered_hashes(service, file_filter.strip().lower()) == legacy_filtered_hashes(
+            service, file_filter.strip().lower()
+        )
+
+    # commits made before the index existed are backfilled with one git log run
+    index_file.unlink()
+    git_calls: list[tuple[str, ...]] = []
+    git = TimeTravelService._git
+
+    def counting_git(self, *args, **kwargs):
+        git_calls.append(args)
+        return git(self, *args, **kwargs)
+
+    monkeypatch.setattr(TimeTravelService, "_git", counting_git)
+    backfilled = filtered_hashes(service, "main")
+    monkeypatch.undo()
+    assert [args[0] for args in git_calls].count("log") == 1
+    assert backfilled == legacy_filtered_hashes(service, "main")
+
+    # commits no longer reachable from the refs are dropped, a broken file is rebuilt
+    service._git("update-ref", "HEAD", first)
+    assert filtered_hashes(service, "notes") == [first]
+    assert list(tt.json.loads(index_file.read_text())["commits"]) == [first]
+    index_file.write_text("{not json", encoding="utf-8")
+    assert filtered_hashes(service, "main") == [first]
+
+
+@pytest.mark.benchmark
+def test_history_file_filter_benchmark(workspace):
+    root, service = workspace
+    service.ensure_repo()
+    commit_count = 2000
+    stream: list[bytes] = []
+    for number in range(1, commit_count + 1):
+        message = f"Snapshot {number}".encode()
+        content = f"revision {number}\n".encode()
+        stream.append(f"commit {tt.CURRENT_REF}\nmark :{number}\n".encode())
+        stream.append(f"committer Test <test@example.com> {1_700_000_000 + number} +0000\n".encode())
+        stream.append(b"data %d\n%s\n" % (len(message), message))
+        if number > 1:
+            stream.append(f"from :{number - 1}\n".encode())
+        stream.append(f"M 100644 inline folder{number % 50}/file{number % 400}.txt\n".encode())
+        stream.append(b"data %d\n%s\n" % (len(content), content))
+    service._git_bytes("fast-import", "--quiet", input=b"".join(stream))
+    file_filter = "folder7/"
+
+    started = time.perf_counter()
+    legacy = legacy_filtered_hashes(service, file_filter)[:100]
+    legacy_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    service._history_paths(service._rev_list_all())  # first listing backfills the index
+    backfill_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indexed = [
+        commit_hash
+        for commit_hash, paths in service._history_paths(service._rev_list_all()).items()
+        if any(file_filter in path for path in paths)
+    ]
+    listed = filtered_hashes(service, file_filter)[:100]
+    indexed_time = time.perf_counter() - started
+
+    print(
+        f"\n[time travel history] commits={commit_count} "
+        f"per_commit_git={legacy_time * 1000:.0f}ms backfill={backfill_time * 1000:.0f}ms "
+        f"indexed_listing={indexed_time * 1000:.0f}ms speedup={legacy_time / indexed_time:.1f}x"
+    )
+    assert listed == legacy and len(indexed) == commit_count // 50
+    assert indexed_time < legacy_time
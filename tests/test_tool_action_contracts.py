@@ -42,6 +42,9 @@ class _FakeAgent:
     def read_prompt(self, _name: str, **kwargs) -> str:
         return f"deleted {kwargs.get('memory_count', 0)}"
 
+    def get_embedding_model(self):
+        return None
+
 
 @dataclass
 class _FakeSkill:
@@ -75,6 +78,9 @@ def _load_skills_tool(monkeypatch, skill_root: Path):
     skills_stub.search_skills = lambda *args, **kwargs: [fake_skill]
     skills_stub.find_skill = lambda *args, **kwargs: fake_skill
     monkeypatch.setitem(sys.modules, "helpers.skills", skills_stub)
+    # "from helpers import skills" prefers the package attribute once imported
+    if "helpers" in sys.modules:
+        monkeypatch.setattr(sys.modules["helpers"], "skills", skills_stub, raising=False)
 
     print_style_stub = types.ModuleType("helpers.print_style")
     print_style_stub.PrintStyle = lambda *args, **kwargs: types.SimpleNamespace(
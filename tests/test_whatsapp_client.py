@@ -0,0 +1,215 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from plugins._whatsapp_integration.helpers import wa_client
+
+
+class FakeBridge:
+    """Bridge HTTP endpoints as served by bridge.js."""
+
+    def __init__(self):
+        self.queue: list[dict] = []
+        self.arrived = asyncio.Event()
+        self.typing: list[dict] = []
+        self.connections: set = set()
+        self.url = ""
+
+    async def start(self) -> web.AppRunner:
+        app = web.Application(middlewares=[self.track])
+        app.router.add_get("/messages", self.messages)
+        app.router.add_post("/typing", self.send_typing)
+        app.router.add_get("/health", self.health)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore
+        self.url = f"http://127.0.0.1:{port}"
+        return runner
+
+    @web.middleware
+    async def track(self, request, handler):
+        self.connections.add(request.transport.get_extra_info("peername"))
+        return await handler(request)
+
+    def push(self, message: dict):
+        self.queue.append(message)
+        self.arrived.set()
+
+    async def messages(self, request):
+        wait = float(request.query.get("wait", 0))
+        if not self.queue and wait > 0:
+            try:
+                await asyncio.wait_for(self.arrived.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+        self.arrived.clear()
+        messages, self.queue = self.queue, []
+        return web.json_response(messages)
+
+    async def send_typing(self, request):
+        self.typing.append(await request.json())
+        return web.json_response({"success": True})
+
+    async def health(self, request):
+        return web.json_response({"status": "connected", "queueLength": len(self.queue), "uptime": 1})
+
+
+def run_with_bridge(test):
+    async def run():
+        bridge = FakeBridge()
+        runner = await bridge.start()
+        try:
+            return await test(bridge)
+        finally:
+            await wa_client.close()
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_requests_reuse_one_keep_alive_connection():
+    async def test(bridge):
+        for _ in range(5):
+            assert (await wa_client.get_health(bridge.url))["status"] == "connected"
+        await wa_client.send_typing(bridge.url, "a@s.whatsapp.net")
+        await wa_client.get_messages(bridge.url)
+        return bridge.connections
+
+    assert len(run_with_bridge(test)) == 1
+
+
+def test_long_poll_returns_as_soon_as_a_message_arrives():
+    async def test(bridge):
+        async def push_later():
+            await asyncio.sleep(0.1)
+            bridge.push({"chatId": "a@s.whatsapp.net", "body": "hi"})
+
+        asyncio.get_running_loop().create_task(push_later())
+        started = time.perf_counter()
+        messages = await wa_client.get_messages(bridge.url, wait=5)
+        elapsed = time.perf_counter() - started
+        empty_started = time.perf_counter()
+        empty = await wa_client.get_messages(bridge.url, wait=0.2)
+        return messages, elapsed, empty, time.perf_counter() - empty_started
+
+    messages, elapsed, empty, empty_elapsed = run_with_bridge(test)
+    assert [message["body"] for message in messages] == ["hi"]
+    assert elapsed < 1
+    assert empty == [] and empty_elapsed >= 0.2
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    from plugins._whatsapp_integration.helpers import handler
+
+    contexts: dict[str, SimpleNamespace] = {}
+    monkeypatch.setattr(
+        handler,
+        "AgentContext",
+        SimpleNamespace(get=contexts.get, all=lambda: list(contexts.values())),
+    )
+    handler.reset_chats_index()
+
+    def add(context_id: str, chat_id: str, typing: bool = False, index: bool = True):
+        context = SimpleNamespace(
+            id=context_id,
+            data={handler.CTX_WA_CHAT_ID: chat_id, handler.CTX_WA_TYPING_ACTIVE: typing},
+        )
+        contexts[context_id] = context
+        if index:
+            handler.index_chat(context)
+        return context
+
+    yield handler, contexts, add
+    handler.reset_chats_index()
+
+
+def test_chats_are_found_through_the_jid_index(handler):
+    handler, contexts, add = handler
+    # contexts existing before the index is first used are picked up then
+    add("a1", "111@s.whatsapp.net", index=False)
+    add("b1", "222@s.whatsapp.net", index=False)
+    assert handler._find_chats_by_jid("111@s.whatsapp.net") == ["a1"]
+
+    add("a2", "111@s.whatsapp.net")
+    assert handler._find_chats_by_jid("111@s.whatsapp.net") == ["a2", "a1"]
+
+    # the AgentContext remove extension drops removed contexts
+    from plugins._whatsapp_integration.extensions.python._functions.agent.AgentContext.remove.end._10_wa_unindex_chat import (
+        WhatsAppUnindexChat,
+    )
+
+    del contexts["a2"]
+    WhatsAppUnindexChat(None).execute(data={"args": ("a2",)})
+    assert handler._find_chats_by_jid("111@s.whatsapp.net") == ["a1"]
+    assert handler._get_chats_index()["111@s.whatsapp.net"] == {"a1"}
+
+
+def test_typing_of_all_active_chats_is_refreshed_in_one_request(handler, monkeypatch):
+    handler, contexts, add = handler
+    for i in range(5):
+        add(f"c{i}", f"{i}@s.whatsapp.net", typing=i % 2 == 0)
+    add("c5", "0@s.whatsapp.net", typing=True)
+
+    async def test(bridge):
+        await handler._refresh_typing(bridge.url)
+        return bridge.typing
+
+    typing = run_with_bridge(test)
+    assert len(typing) == 1
+    assert sorted(typing[0]["chatIds"]) == ["0@s.whatsapp.net", "2@s.whatsapp.net", "4@s.whatsapp.net"]
+
+
+@pytest.mark.benchmark
+def test_whatsapp_client_benchmark(handler):
+    handler, contexts, add = handler
+    calls = 100
+
+    async def test(bridge):
+        started = time.perf_counter()
+        for _ in range(calls):
+            # previous behaviour: a new session and connection per request
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{bridge.url}/health") as resp:
+                    await resp.json()
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(calls):
+            await wa_client.get_health(bridge.url)
+        pooled_time = time.perf_counter() - started
+        return legacy_time, pooled_time
+
+    legacy_time, pooled_time = run_with_bridge(test)
+
+    for i in range(5000):
+        add(f"ctx{i:05d}", f"{i}@s.whatsapp.net")
+    started = time.perf_counter()
+    for i in range(calls):
+        # previous behaviour: scan every context for each inbound message
+        [c.id for c in contexts.values() if c.data.get(handler.CTX_WA_CHAT_ID) == f"{i}@s.whatsapp.net"]
+    scan_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for i in range(calls):
+        handler._find_chats_by_jid(f"{i}@s.whatsapp.net")
+    index_time = time.perf_counter() - started
+
+    print(
+        f"\n[whatsapp client] requests={calls} "
+        f"session_per_request={legacy_time / calls * 1000:.2f}ms pooled={pooled_time / calls * 1000:.2f}ms "
+        f"speedup={legacy_time / pooled_time:.1f}x "
+        f"jid_scan={scan_time / calls * 1000:.3f}ms jid_index={index_time / calls * 1000:.3f}ms"
+    )
+    assert pooled_time < legacy_time
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 from pathlib import Path
-from typing import List
+from typing import Any, List
 
 from helpers.tool import Tool, Response
 from helpers import skills as skills_helper
@@ -106,7 +107,10 @@ class SkillsTool(Tool):
                 return Response(message=self._list(), break_loop=False)
             if action == "search":
                 query = str(kwargs.get("query") or self.args.get("query") or "").strip()
-                return Response(message=self._search(query), break_loop=False)
+                # ranking may embed the skills, keep the event loop free
+                embeddings = self.agent.get_embedding_model() if query else None
+                message = await asyncio.to_thread(self._search, query, embeddings)
+                return Response(message=message, break_loop=False)
             if action == "load":
                 skill_name = self._normalize_skill_name(
                     str(kwargs.get("skill_name") or self.args.get("skill_name") or "")
@@ -160,7 +164,7 @@ class SkillsTool(Tool):
         lines.append("Tip: use skills_tool action=search or action=load for details.")
         return "\n".join(lines)
 
-    def _search(self, query: str) -> str:
+    def _search(self, query: str, embeddings: Any = None) -> str:
         if not query:
             return "Error: 'query' is required for action=search."
 
@@ -168,6 +172,7 @@ class SkillsTool(Tool):
             query,
             limit=25,
             agent=self.agent,
+            embeddings=embeddings,
         )
         if not results:
             return f"No skills matched query: {query!r}"
@@ -285,6 +285,27 @@ function setConnectionStatus(connected) {
 let lastLogVersion = 0;
 let lastLogGuid = "";
 let lastSpokenNo = 0;
+// Chat and task lists of the last snapshot, base for list_patch deltas
+let lastLists = { contexts: [], tasks: [] };
+
+function patchList(list, patch) {
+  if (!patch) return list;
+  const removed = new Set(patch.removed || []);
+  const put = new Map((patch.put || []).map((item) => [item.id, item]));
+  const result = list.filter((item) => !removed.has(item.id) && !put.has(item.id));
+  result.push(...put.values());
+  return result;
+}
+
+// Expand a push that carries list changes only into full contexts/tasks lists
+function materializeLists(snapshot) {
+  const patch = snapshot.list_patch;
+  if (patch) {
+    snapshot.contexts = patchList(lastLists.contexts, patch.contexts);
+    snapshot.tasks = patchList(lastLists.tasks, patch.tasks);
+  }
+  lastLists = { contexts: snapshot.contexts || [], tasks: snapshot.tasks || [] };
+}
 
 export function buildStateRequestPayload(options = {}) {
   const { forceFull = false } = options || {};
@@ -308,6 +329,8 @@ export async function applySnapshot(snapshot, options = {}) {
     return { updated: false };
   }
 
+  materializeLists(snapshot);
+
   // deselect chat if it is requested by the backend
   if (snapshot.deselect_chat) {
     chatsStore.deselectChat();